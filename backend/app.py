@@ -4,19 +4,31 @@ Backend de recomendação de produtos
 """
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
 
 # Importações locais
 from config import settings
-from database import init_db, engine
+from database import init_db, engine, async_engine, get_db_context
+from services.persistencia import fila_escrita, carregar_historico
+from services.jobs import fila_jobs
+from services.agendador import agendador
+from services.conector_api import fechar_cliente
+from services.pool_conectores import pool_conectores
+from services.cache_respostas import CacheRespostasMiddleware, cache_respostas
+from services.metricas import MetricasMiddleware, registro_metricas
+from services.perfilador import PerfiladorMiddleware, perfilador
+from services.estado_compartilhado import estado_compartilhado
 
 # IMPORTANTE: Importar as rotas dos módulos
 from routes.usuarios import router as usuarios_router
 
-from routes.recomendacoes import router as recomendacoes_router
+from routes.recomendacoes import router as recomendacoes_router, restaurar_historico
 
 from routes.fontes import router as fontes_router
 
+from routes.perfis import router as perfis_router
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -25,9 +37,40 @@ async def lifespan(app: FastAPI):
     """
     print("🚀 Iniciando IARECOMEND API...")
     init_db()
+    
+    # Restaura histórico persistido e inicia a fila de escrita em lote
+    estado_compartilhado.marcar_inicio()
+    with get_db_context() as db:
+        recomendacoes, feedbacks = carregar_historico(db, settings.PERSISTENCIA_CARREGAR_LIMITE)
+    restaurar_historico(recomendacoes, feedbacks)
+    print(f"✅ Histórico restaurado: {len(recomendacoes)} recomendações, {len(feedbacks)} feedbacks")
+    fila_escrita.iniciar()
+    
+    # Workers de sincronização (recupera jobs/fontes travados antes de iniciar)
+    await fila_jobs.iniciar()
+    print(f"✅ Workers de sincronização iniciados: {fila_jobs.workers}")
+    
+    # Sincronizações automáticas a partir de proxima_sincronizacao
+    if settings.AGENDADOR_ATIVO:
+        agendador.iniciar()
+        print("✅ Agendador de sincronizações iniciado")
+    
     print("✅ API pronta para uso!")
     yield
     print("👋 Encerrando IARECOMEND API...")
+    
+    await agendador.encerrar()
+    
+    # Jobs em execução voltam para a fila e serão retomados no próximo start
+    await fila_jobs.encerrar()
+    await fechar_cliente()
+    pool_conectores.limpar()
+    
+    # Grava o que ainda estiver pendente na fila antes de sair
+    fila_escrita.encerrar()
+    print(f"✅ Fila de escrita finalizada: {fila_escrita.gravados} registros gravados")
+    
+    await async_engine.dispose()
 
 # Inicializa FastAPI
 app = FastAPI(
@@ -38,6 +81,10 @@ app = FastAPI(
     redirect_slashes=False  # Evita 307 redirects
 )
 
+# Cache de respostas com ETag/304 (registrado antes do CORS para ficar por dentro dele)
+if settings.CACHE_RESPOSTAS_ATIVO:
+    app.add_middleware(CacheRespostasMiddleware, cache=cache_respostas)
+
 # Configuração de CORS
 app.add_middleware(
     CORSMiddleware,
@@ -47,6 +94,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Perfilador de requests: só registrado quando ligado (taxa > 0 ou token)
+if perfilador.ativo:
+    app.add_middleware(PerfiladorMiddleware, perfilador=perfilador)
+
+# Métricas HTTP por rota (por fora de tudo: mede também CORS e cache de respostas)
+app.add_middleware(MetricasMiddleware, roteador=app.router)
+
 # ============================================
 # REGISTRAR ROUTERS (IMPORTANTE!)
 # ============================================
@@ -57,6 +111,8 @@ app.include_router(recomendacoes_router)  # Endpoints de recomendacoes
 
 app.include_router(fontes_router) # Endpoints de fontes de dados
 
+app.include_router(perfis_router)  # Download de perfis do perfilador
+
 
 # Futuros routers (quando criar os arquivos):
 # from routes.fontes import router as fontes_router
@@ -104,6 +160,19 @@ def health_check():
             detail=f"Database error: {str(e)}"
         )
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Métricas no formato texto do Prometheus
+    - HTTP: requests, latência e em andamento por rota
+    - Etapas de /gerar: seleção, desconto, pontuação, motivo e serialização
+    - Pool de conexões: espera de checkout, timeouts e conexões em uso por rota
+    """
+    return PlainTextResponse(
+        registro_metricas.exportar(),
+        media_type="text/plain; version=0.0.4"
+    )
+
 # ============================================
 # INICIALIZAÇÃO
 # ============================================
@@ -0,0 +1,24 @@
+"""
+Benchmarks in-process - IARECOMEND
+A aplicação FastAPI roda no mesmo processo (httpx + ASGITransport, sem
+rede) sobre um SQLite descartável, com o lifespan completo
+
+Cenários:
+- recomendacoes: POST /gerar (quantidade x tamanho do histórico),
+  listagem/resumo/produtos por cliente, pontuação do catálogo, motor de
+  motivos e sobrecarga do perfilador
+- crud: /api/usuarios (página 1 x profunda, offset x cursor, busca,
+  stats), /api/fontes/stats e rotas async x síncronas por concorrência
+- sincronizacao: CSV, incremental, API paginada, pool de conectores e
+  /health com sincronizações em andamento
+
+Uso (a partir de backend/):
+    python -m benchmarks executar --escala pequena --saida base.json
+    python -m benchmarks executar --escala pequena --saida novo.json
+    python -m benchmarks comparar base.json novo.json --limite 0.10
+
+O JSON traz p50/p95/p99, média, mínimo, máximo e vazão por caso; só faz
+sentido comparar execuções da mesma escala e da mesma máquina. Por padrão
+a comparação olha p50 e vazão (as caudas oscilam muito na escala pequena);
+p95/p99 entram com `--metricas p50_ms p95_ms p99_ms vazao`.
+"""
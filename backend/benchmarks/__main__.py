@@ -0,0 +1,136 @@
+"""
+Linha de comando dos benchmarks - IARECOMEND
+
+    python -m benchmarks listar
+    python -m benchmarks executar [--escala pequena|media|grande] [--cenarios gerar crud ...] [--saida base.json]
+    python -m benchmarks comparar base.json novo.json [--limite 0.10] [--metricas p50_ms p99_ms vazao]
+
+`comparar` sai com código 1 quando há regressão (uso em CI).
+"""
+import argparse
+import asyncio
+import json
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks import nucleo
+
+MODULOS_CENARIOS = ("benchmarks.recomendacoes", "benchmarks.crud", "benchmarks.sincronizacao")
+
+
+def carregar_cenarios(diretorio: str, url_banco=None):
+    """Prepara o ambiente e importa os módulos de cenários (que importam a aplicação)"""
+    nucleo.preparar_ambiente(diretorio, url_banco)
+    import importlib
+    for modulo in MODULOS_CENARIOS:
+        importlib.import_module(modulo)
+
+def selecionar(nomes):
+    """Cenários por nome ou grupo, na ordem de registro"""
+    if not nomes:
+        return list(nucleo.CENARIOS.values())
+
+    desconhecidos = [
+        nome for nome in nomes
+        if nome not in nucleo.CENARIOS and not any(c.grupo == nome for c in nucleo.CENARIOS.values())
+    ]
+    if desconhecidos:
+        raise SystemExit(f"❌ Cenários desconhecidos: {', '.join(desconhecidos)} (veja `python -m benchmarks listar`)")
+
+    return [c for c in nucleo.CENARIOS.values() if c.nome in nomes or c.grupo in nomes]
+
+async def executar_cenarios(cenarios, escala: str, diretorio: str) -> list:
+    """Sobe a aplicação (lifespan completo) e roda os cenários com um cliente in-process"""
+    from app import app
+
+    resultados = []
+    async with app.router.lifespan_context(app):
+        async with nucleo.novo_cliente(app) as cliente:
+            contexto = nucleo.Contexto(escala, diretorio, app, cliente)
+            for cenario in cenarios:
+                print(f"\n⏱️  {cenario.nome}: {cenario.descricao}")
+                inicio = time.perf_counter()
+                itens = await cenario.funcao(contexto)
+                for item in itens:
+                    nucleo.imprimir_resultado(item)
+                print(f"   ({time.perf_counter() - inicio:.1f}s)")
+                resultados.extend(itens)
+    return resultados
+
+
+# ============================================
+# COMANDOS
+# ============================================
+
+def comando_listar(args):
+    diretorio = tempfile.mkdtemp(prefix="iarecomend-bench-")
+    try:
+        carregar_cenarios(diretorio)
+        for cenario in nucleo.CENARIOS.values():
+            print(f"{cenario.grupo:<14} {cenario.nome:<20} {cenario.descricao}")
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+def comando_executar(args):
+    diretorio = args.diretorio or tempfile.mkdtemp(prefix="iarecomend-bench-")
+    try:
+        carregar_cenarios(diretorio, args.banco)
+        cenarios = selecionar(args.cenarios)
+        print(f"🚀 Benchmarks ({args.escala}): {', '.join(c.nome for c in cenarios)}")
+
+        inicio = time.perf_counter()
+        resultados = asyncio.run(executar_cenarios(cenarios, args.escala, diretorio))
+        relatorio = nucleo.montar_relatorio(args.escala, resultados, time.perf_counter() - inicio)
+        nucleo.gravar_relatorio(relatorio, args.saida)
+    finally:
+        if not args.diretorio:
+            shutil.rmtree(diretorio, ignore_errors=True)
+
+def comando_comparar(args):
+    base = nucleo.carregar_relatorio(args.base)
+    novo = nucleo.carregar_relatorio(args.novo)
+    comparacao = nucleo.comparar(base, novo, args.limite, args.tolerancia_ms, args.metricas)
+    nucleo.imprimir_comparacao(comparacao, todos=args.todos)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(comparacao, arquivo, ensure_ascii=False, indent=2)
+
+    sys.exit(1 if comparacao["regressoes"] else 0)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks in-process do IARECOMEND")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    listar = comandos.add_parser("listar", help="Lista os cenários disponíveis")
+    listar.set_defaults(funcao=comando_listar)
+
+    executar = comandos.add_parser("executar", help="Executa os cenários e gera o JSON de resultados")
+    executar.add_argument("--escala", choices=sorted(nucleo.ESCALAS), default="pequena",
+                          help="Tamanho dos dados (grande = 1M de histórico/usuários, 10M de linhas)")
+    executar.add_argument("--cenarios", nargs="*", help="Nomes ou grupos (recomendacoes, crud, sincronizacao)")
+    executar.add_argument("--saida", help="Arquivo JSON de resultados (padrão: stdout)")
+    executar.add_argument("--banco", help="URL do banco (padrão: SQLite descartável)")
+    executar.add_argument("--diretorio", help="Diretório de trabalho mantido entre execuções (reaproveita arquivos gerados)")
+    executar.set_defaults(funcao=comando_executar)
+
+    comparar = comandos.add_parser("comparar", help="Compara duas execuções e aponta regressões")
+    comparar.add_argument("base")
+    comparar.add_argument("novo")
+    comparar.add_argument("--limite", type=float, default=0.10, help="Variação tolerada (fração, padrão 0.10)")
+    comparar.add_argument("--tolerancia-ms", type=float, default=0.05,
+                          help="Diferença mínima de latência para contar como regressão")
+    comparar.add_argument("--metricas", nargs="+", choices=sorted(nucleo.METRICAS_COMPARADAS),
+                          default=list(nucleo.METRICAS_PADRAO), help="Métricas comparadas (padrão: p50_ms vazao)")
+    comparar.add_argument("--todos", action="store_true", help="Mostra também os casos estáveis")
+    comparar.add_argument("--saida", help="Grava a comparação em JSON")
+    comparar.set_defaults(funcao=comando_comparar)
+
+    args = parser.parse_args(argv)
+    args.funcao(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Cenários de CRUD - IARECOMEND
+/api/usuarios (listagem por offset e cursor, busca, stats) com a tabela
+cheia, /api/fontes/stats e vazão x concorrência da rota async contra uma
+rota síncrona equivalente
+"""
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi import Depends, FastAPI, HTTPException
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.orm import Session
+
+from benchmarks.nucleo import cenario, medir_requests, novo_cliente, resultado
+from database import async_engine, engine, get_db
+from models import FonteDados, StatusFonte, StatusUsuario, TipoFonte, TipoUsuario, Usuario
+from schemas import UsuarioResponse
+from services.agregados import invalidar_estatisticas_fontes, invalidar_estatisticas_usuarios
+from services.busca import motor_busca
+from services.paginacao import codificar_cursor, paginar_consulta
+
+TAMANHO_LOTE_INSERCAO = 20_000
+LIMITE_PAGINA = 100
+
+NOMES = ["Ana", "Bruno", "Carla", "Daniel", "Eduarda", "Felipe", "Gabriela", "Hugo",
+         "Isabela", "João", "Karina", "Lucas", "Mariana", "Nelson", "Olívia", "Pedro"]
+SOBRENOMES = ["Silva", "Santos", "Oliveira", "Souza", "Lima", "Pereira", "Costa",
+              "Ferreira", "Almeida", "Rodrigues", "Gomes", "Martins", "Araújo", "Barbosa"]
+DEPARTAMENTOS = ["Vendas", "TI", "Marketing", "Financeiro", "Logística", None]
+
+
+# ============================================
+# DADOS SINTÉTICOS
+# ============================================
+
+def semear_usuarios(total: int):
+    """Completa a tabela de usuários até `total` linhas (insert em lote, criado_em crescente)"""
+    with engine.connect() as conexao:
+        existentes = conexao.execute(select(func.count(Usuario.id))).scalar()
+    if existentes >= total:
+        return
+
+    rng = random.Random(total)
+    inicio = datetime(2023, 1, 1)
+    tipos = list(TipoUsuario)
+    status_usuario = [StatusUsuario.ATIVO] * 8 + [StatusUsuario.INATIVO, StatusUsuario.BLOQUEADO]
+
+    print(f"🌱 Semeando {total - existentes:,} usuários...")
+    for bloco in range(existentes, total, TAMANHO_LOTE_INSERCAO):
+        linhas = []
+        for i in range(bloco, min(bloco + TAMANHO_LOTE_INSERCAO, total)):
+            nome, sobrenome = rng.choice(NOMES), rng.choice(SOBRENOMES)
+            linhas.append({
+                "nome": f"{nome} {sobrenome} {i}",
+                "email": f"{nome.lower()}.{sobrenome.lower()}.{i}@shopinfo.com",
+                "senha_hash": "benchmark",
+                "tipo": rng.choice(tipos),
+                "status": rng.choice(status_usuario),
+                "departamento": rng.choice(DEPARTAMENTOS),
+                "criado_em": inicio + timedelta(seconds=i),
+                "atualizado_em": inicio + timedelta(seconds=i),
+            })
+        with engine.begin() as conexao:
+            conexao.execute(insert(Usuario.__table__), linhas)
+
+    # Inserções por fora das rotas: índice de busca e stats são recarregados
+    motor_busca.limpar()
+    invalidar_estatisticas_usuarios()
+
+def semear_fontes(total: int):
+    """Completa a tabela de fontes até `total` linhas com tipos e status variados"""
+    with engine.connect() as conexao:
+        existentes = conexao.execute(select(func.count(FonteDados.id))).scalar()
+    if existentes >= total:
+        return
+
+    rng = random.Random(total)
+    agora = datetime.utcnow()
+    linhas = [{
+        "nome": f"Fonte Benchmark {i}",
+        "tipo": rng.choice(list(TipoFonte)),
+        "status": rng.choice([StatusFonte.ATIVA, StatusFonte.ATIVA, StatusFonte.INATIVA, StatusFonte.ERRO]),
+        "total_registros_importados": rng.randint(0, 1_000_000),
+        "total_erros": rng.randint(0, 100),
+        "ultima_sincronizacao": agora - timedelta(hours=rng.randint(1, 500)),
+        "criado_em": agora - timedelta(days=rng.randint(1, 365)),
+    } for i in range(existentes, total)]
+
+    with engine.begin() as conexao:
+        conexao.execute(insert(FonteDados.__table__), linhas)
+    motor_busca.limpar()
+    invalidar_estatisticas_fontes()
+
+def cursor_na_posicao(posicao: int) -> str:
+    """Cursor que começa depois da linha `posicao` da listagem (criado_em desc, id desc)"""
+    with engine.connect() as conexao:
+        criado_em, id_usuario = conexao.execute(
+            select(Usuario.criado_em, Usuario.id)
+            .order_by(Usuario.criado_em.desc(), Usuario.id.desc())
+            .offset(posicao).limit(1)
+        ).one()
+    return codificar_cursor((criado_em, id_usuario))
+
+@contextmanager
+def contar_consultas():
+    """Conta os comandos SQL enviados pela engine async (round trips das rotas)"""
+    contagem = {"consultas": 0}
+
+    def contar(*_):
+        contagem["consultas"] += 1
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", contar)
+    try:
+        yield contagem
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", contar)
+
+
+# ============================================
+# ROTA SÍNCRONA EQUIVALENTE (COMPARAÇÃO)
+# ============================================
+
+def app_sincrono() -> FastAPI:
+    """
+    As mesmas consultas de GET /api/usuarios/{id} e GET /api/usuarios em
+    rotas `def` com Session (threadpool), como eram antes da AsyncSession
+    """
+    app = FastAPI(redirect_slashes=False)
+
+    @app.get("/api/usuarios/{usuario_id}", response_model=UsuarioResponse)
+    def obter_usuario(usuario_id: int, db: Session = Depends(get_db)):
+        usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
+        if not usuario:
+            raise HTTPException(status_code=404, detail=f"Usuário com ID {usuario_id} não encontrado")
+        return usuario
+
+    @app.get("/api/usuarios/", response_model=List[UsuarioResponse])
+    def listar_usuarios(limite: int = 20, db: Session = Depends(get_db)):
+        return paginar_consulta(db.query(Usuario), (Usuario.criado_em, Usuario.id), limite).itens
+
+    return app
+
+
+# ============================================
+# CENÁRIOS
+# ============================================
+
+@cenario("usuarios_listagem", "crud")
+async def usuarios_listagem(ctx) -> List[dict]:
+    """GET /api/usuarios: primeira página, página profunda por offset e por cursor"""
+    total = ctx["usuarios"]
+    semear_usuarios(total)
+
+    pagina_profunda = min(10_000, total // LIMITE_PAGINA - 1)
+    cursor = cursor_na_posicao(pagina_profunda * LIMITE_PAGINA - 1)
+    casos = {
+        ("offset", 1): f"/api/usuarios/?limite={LIMITE_PAGINA}",
+        ("offset", pagina_profunda + 1): f"/api/usuarios/?limite={LIMITE_PAGINA}&offset={pagina_profunda * LIMITE_PAGINA}",
+        ("cursor", pagina_profunda + 1): f"/api/usuarios/?limite={LIMITE_PAGINA}&cursor={cursor}",
+        ("filtro", 1): f"/api/usuarios/?limite={LIMITE_PAGINA}&tipo=gestor&status=ativo",
+    }
+
+    resultados = []
+    for (modo, pagina), url in casos.items():
+        metricas = await medir_requests(lambda i: ctx.cliente.get(url), ctx["requests"] // 2, aquecimento=3)
+        resultados.append(resultado("usuarios_listagem", {"usuarios": total, "modo": modo, "pagina": pagina}, metricas))
+    return resultados
+
+@cenario("usuarios_busca", "crud")
+async def usuarios_busca(ctx) -> List[dict]:
+    """GET /api/usuarios?busca=: carga do índice e termos frequentes, raros e inexistentes"""
+    total = ctx["usuarios"]
+    semear_usuarios(total)
+    motor_busca.limpar()
+
+    inicio = time.perf_counter_ns()
+    resposta = await ctx.cliente.get("/api/usuarios/?busca=silva&limite=20")
+    resposta.raise_for_status()
+    carga_ms = (time.perf_counter_ns() - inicio) / 1e6
+
+    termos = {"frequente": "silva", "raro": f"{total - 1}@", "inexistente": "xyzw"}
+    resultados = []
+    for tipo_termo, termo in termos.items():
+        metricas = await medir_requests(
+            lambda i: ctx.cliente.get(f"/api/usuarios/?busca={termo}&limite=20"),
+            ctx["requests"] // 2, aquecimento=3
+        )
+        resultados.append(resultado(
+            "usuarios_busca", {"usuarios": total, "termo": tipo_termo}, metricas,
+            primeira_busca_ms=round(carga_ms, 2)
+        ))
+    return resultados
+
+@cenario("stats", "crud")
+async def stats(ctx) -> List[dict]:
+    """GET /api/usuarios/stats e /api/fontes/stats com cache frio e quente (e round trips)"""
+    semear_usuarios(ctx["usuarios"])
+    semear_fontes(ctx["fontes"])
+
+    rotas = {
+        "usuarios": ("/api/usuarios/stats", invalidar_estatisticas_usuarios, ctx["usuarios"]),
+        "fontes": ("/api/fontes/stats", invalidar_estatisticas_fontes, ctx["fontes"]),
+    }
+
+    resultados = []
+    for nome, (url, invalidar, linhas) in rotas.items():
+        for cache in ("frio", "quente"):
+            repeticoes = max(10, ctx["requests"] // 10) if cache == "frio" else ctx["requests"]
+            antes = (lambda i: invalidar()) if cache == "frio" else None
+
+            with contar_consultas() as contagem:
+                metricas = await medir_requests(lambda i: ctx.cliente.get(url), repeticoes, antes=antes)
+
+            resultados.append(resultado(
+                "stats", {"rota": nome, "linhas": linhas, "cache": cache}, metricas,
+                consultas_por_request=round(contagem["consultas"] / repeticoes, 2)
+            ))
+    return resultados
+
+@cenario("concorrencia", "crud")
+async def concorrencia(ctx) -> List[dict]:
+    """Vazão x concorrência das rotas async de usuários contra rotas síncronas equivalentes"""
+    total = ctx["usuarios"]
+    semear_usuarios(total)
+    rng = random.Random(0)
+    ids = [rng.randint(1, total) for _ in range(1024)]
+
+    rotas = {
+        "obter": lambda i: f"/api/usuarios/{ids[i % len(ids)]}",
+        "listar": lambda i: "/api/usuarios/?limite=20",
+    }
+
+    resultados = []
+    async with novo_cliente(app_sincrono()) as cliente_sincrono:
+        clientes = {"async": ctx.cliente, "sync": cliente_sincrono}
+        for rota, url in rotas.items():
+            for caminho, cliente in clientes.items():
+                for concorrencia in ctx["concorrencias"]:
+                    metricas = await medir_requests(
+                        lambda i: cliente.get(url(i)),
+                        ctx["requests"], concorrencia=concorrencia, aquecimento=5
+                    )
+                    resultados.append(resultado(
+                        "concorrencia",
+                        {"rota": rota, "caminho": caminho, "concorrencia": concorrencia},
+                        metricas
+                    ))
+    return resultados
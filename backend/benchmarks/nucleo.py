@@ -0,0 +1,390 @@
+"""
+Núcleo dos benchmarks - IARECOMEND
+Ambiente isolado, medição (percentis e vazão), registro de cenários,
+formato do JSON de resultados e comparação entre duas execuções
+
+Este módulo não importa a aplicação: `comparar` roda sem banco nem Settings.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+VERSAO_FORMATO = 1
+
+# ============================================
+# ESCALAS
+# ============================================
+
+# Tamanhos dos dados por escala (`--escala`); "grande" é a do backlog (1M de
+# histórico/usuários, 10M de linhas na ingestão) e leva bastante memória e tempo
+ESCALAS: Dict[str, Dict[str, Any]] = {
+    "pequena": {
+        "requests": 200,
+        "historicos": [1_000, 10_000],
+        "quantidades": [1, 5, 20],
+        "usuarios": 10_000,
+        "fontes": 200,
+        "produtos_catalogo": [1_000, 10_000],
+        "motivos": (1_000, 200),            # (produtos, clientes)
+        "linhas_csv": 50_000,
+        "linhas_incremental": 50_000,
+        "registros_api": 10_000,
+        "syncs_simultaneas": 20,
+        "concorrencias": [1, 8, 32],
+    },
+    "media": {
+        "requests": 500,
+        "historicos": [10_000, 100_000],
+        "quantidades": [1, 5, 10, 20],
+        "usuarios": 100_000,
+        "fontes": 1_000,
+        "produtos_catalogo": [1_000, 100_000],
+        "motivos": (10_000, 1_000),
+        "linhas_csv": 1_000_000,
+        "linhas_incremental": 1_000_000,
+        "registros_api": 100_000,
+        "syncs_simultaneas": 200,
+        "concorrencias": [1, 8, 32, 64],
+    },
+    "grande": {
+        "requests": 1_000,
+        "historicos": [10_000, 100_000, 1_000_000],
+        "quantidades": [1, 5, 10, 20],
+        "usuarios": 1_000_000,
+        "fontes": 1_000,
+        "produtos_catalogo": [1_000, 100_000, 1_000_000],
+        "motivos": (10_000, 10_000),
+        "linhas_csv": 10_000_000,
+        "linhas_incremental": 10_000_000,
+        "registros_api": 1_000_000,
+        "syncs_simultaneas": 200,
+        "concorrencias": [1, 8, 32, 64, 128],
+    },
+}
+
+
+# ============================================
+# AMBIENTE
+# ============================================
+
+def preparar_ambiente(diretorio: str, url_banco: Optional[str] = None):
+    """
+    Variáveis de ambiente lidas pelas Settings; precisa rodar ANTES de
+    importar config/database/app
+
+    - Banco SQLite descartável em `diretorio` (ou `url_banco`)
+    - Sem SQL no console, sem agendador e sem cache de respostas (as
+      listagens medem a rota, não o ETag/304)
+    - Perfilador desligado: o cenário de sobrecarga monta os seus
+    - Fontes relacionais apontam para arquivos SQLite locais
+      (parametros_adicionais.url) e os CSVs gerados ficam em `diretorio`
+    """
+    os.environ["DATABASE_URL"] = url_banco or f"sqlite:///{os.path.join(diretorio, 'benchmark.db')}"
+    os.environ.setdefault("DEBUG", "False")
+    os.environ.setdefault("AGENDADOR_ATIVO", "False")
+    os.environ.setdefault("CACHE_RESPOSTAS_ATIVO", "False")
+    os.environ["FONTES_PERMITIR_URL"] = "True"
+    os.environ["ARQUIVOS_DIRETORIO"] = diretorio
+    os.environ["PERFIL_TAXA_AMOSTRAGEM"] = "0"
+    os.environ["PERFIL_TOKEN"] = ""
+
+def descrever_ambiente() -> dict:
+    """Máquina e versão do código (para saber se duas execuções são comparáveis)"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+
+    return {
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "processador": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "commit": commit,
+    }
+
+
+# ============================================
+# MEDIÇÃO
+# ============================================
+
+def resumir(latencias_ns: Sequence[int], duracao_segundos: float,
+            unidades: Optional[int] = None, unidade_vazao: str = "requests/s") -> dict:
+    """
+    Percentis de latência (ms) e vazão
+
+    `unidades` é o que conta na vazão (linhas, produtos...); sem ele, cada
+    medição vale uma unidade.
+    """
+    amostras = np.asarray(latencias_ns, dtype=np.float64) / 1e6
+    unidades = len(amostras) if unidades is None else unidades
+    p50, p95, p99 = np.percentile(amostras, (50, 95, 99)) if len(amostras) else (0.0, 0.0, 0.0)
+
+    return {
+        "n": len(amostras),
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "media_ms": round(float(amostras.mean()), 4) if len(amostras) else 0.0,
+        "min_ms": round(float(amostras.min()), 4) if len(amostras) else 0.0,
+        "max_ms": round(float(amostras.max()), 4) if len(amostras) else 0.0,
+        "vazao": round(unidades / duracao_segundos, 2) if duracao_segundos > 0 else None,
+        "unidade_vazao": unidade_vazao,
+    }
+
+def medir(funcao: Callable[[int], Any], repeticoes: int, aquecimento: int = 0,
+          antes: Optional[Callable[[int], Any]] = None, unidades: Optional[int] = None,
+          unidade_vazao: str = "operacoes/s") -> dict:
+    """
+    Chama `funcao(i)` `repeticoes` vezes e resume as latências
+    `antes(i)` roda fora da medição (ex: invalidar um cache)
+    """
+    for i in range(aquecimento):
+        funcao(i)
+
+    latencias = []
+    total_ns = 0
+    for i in range(repeticoes):
+        if antes is not None:
+            antes(i)
+        inicio = time.perf_counter_ns()
+        funcao(i)
+        decorrido = time.perf_counter_ns() - inicio
+        latencias.append(decorrido)
+        total_ns += decorrido
+
+    return resumir(latencias, total_ns / 1e9, unidades, unidade_vazao)
+
+async def medir_requests(
+    requisitar: Callable[[int], Awaitable[Any]],
+    repeticoes: int,
+    concorrencia: int = 1,
+    aquecimento: int = 0,
+    antes: Optional[Callable[[int], Any]] = None
+) -> dict:
+    """
+    Dispara `requisitar(i)` (corrotina que devolve um httpx.Response) com
+    `concorrencia` clientes simultâneos; a vazão é sobre o tempo de parede.
+    Respostas fora de 2xx/3xx interrompem o cenário.
+    """
+    import asyncio
+
+    for i in range(aquecimento):
+        _verificar(await requisitar(i))
+
+    latencias: List[int] = []
+    proximo = iter(range(repeticoes))
+
+    async def cliente():
+        for i in proximo:
+            if antes is not None:
+                antes(i)
+            inicio = time.perf_counter_ns()
+            resposta = await requisitar(i)
+            latencias.append(time.perf_counter_ns() - inicio)
+            _verificar(resposta)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente() for _ in range(max(1, concorrencia))))
+    return resumir(latencias, time.perf_counter() - inicio)
+
+def novo_cliente(app):
+    """Cliente HTTP in-process (sem rede) para uma aplicação ASGI"""
+    import httpx
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark")
+
+def _verificar(resposta):
+    if resposta.status_code >= 400:
+        raise RuntimeError(
+            f"{resposta.request.method} {resposta.request.url.path} -> "
+            f"{resposta.status_code}: {resposta.text[:200]}"
+        )
+
+
+# ============================================
+# CENÁRIOS
+# ============================================
+
+class Contexto:
+    """O que os cenários recebem: app, cliente HTTP in-process e tamanhos da escala"""
+
+    def __init__(self, nome_escala: str, diretorio: str, app, cliente):
+        self.nome_escala = nome_escala
+        self.escala = ESCALAS[nome_escala]
+        self.diretorio = diretorio
+        self.app = app
+        self.cliente = cliente          # httpx.AsyncClient com ASGITransport(app)
+
+    def __getitem__(self, chave: str):
+        return self.escala[chave]
+
+class Cenario:
+    """Corrotina `funcao(contexto)` que devolve uma lista de resultados"""
+
+    def __init__(self, nome: str, grupo: str, descricao: str, funcao: Callable):
+        self.nome = nome
+        self.grupo = grupo
+        self.descricao = descricao
+        self.funcao = funcao
+
+CENARIOS: Dict[str, Cenario] = {}
+
+def cenario(nome: str, grupo: str):
+    """Registra o cenário (descrição = primeira linha da docstring)"""
+    def registrar(funcao):
+        descricao = (funcao.__doc__ or "").strip().splitlines()[0] if funcao.__doc__ else ""
+        CENARIOS[nome] = Cenario(nome, grupo, descricao, funcao)
+        return funcao
+    return registrar
+
+def resultado(cenario_nome: str, parametros: dict, metricas: dict, **extras) -> dict:
+    """Entrada do JSON; o `caso` (cenário + parâmetros) é a chave da comparação"""
+    caso = " ".join(f"{chave}={valor}" for chave, valor in parametros.items())
+    return {
+        "cenario": cenario_nome,
+        "caso": f"{cenario_nome} {caso}".strip(),
+        "parametros": parametros,
+        "metricas": {**metricas, **extras},
+    }
+
+def imprimir_resultado(item: dict):
+    m = item["metricas"]
+    vazao = f"{m['vazao']:>12,.1f} {m['unidade_vazao']}" if m.get("vazao") is not None else ""
+    aceleracao = f"  {m['aceleracao_vs_original']}x vs original" if m.get("aceleracao_vs_original") else ""
+    print(f"   {item['caso']:<58} p50 {m['p50_ms']:>9.3f}ms  p95 {m['p95_ms']:>9.3f}ms  "
+          f"p99 {m['p99_ms']:>9.3f}ms  {vazao}{aceleracao}")
+
+
+# ============================================
+# ARQUIVO DE RESULTADOS
+# ============================================
+
+def montar_relatorio(escala: str, resultados: List[dict], duracao_segundos: float) -> dict:
+    return {
+        "versao_formato": VERSAO_FORMATO,
+        "gerado_em": datetime.utcnow().isoformat(),
+        "escala": escala,
+        "duracao_segundos": round(duracao_segundos, 1),
+        "ambiente": descrever_ambiente(),
+        "resultados": resultados,
+    }
+
+def gravar_relatorio(relatorio: dict, caminho: Optional[str]):
+    texto = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if caminho:
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto + "\n")
+        print(f"💾 Resultados gravados em {caminho}")
+    else:
+        sys.stdout.write(texto + "\n")
+
+def carregar_relatorio(caminho: str) -> dict:
+    with open(caminho, encoding="utf-8") as arquivo:
+        relatorio = json.load(arquivo)
+    if relatorio.get("versao_formato") != VERSAO_FORMATO:
+        raise ValueError(f"{caminho}: versao_formato {relatorio.get('versao_formato')} (esperado {VERSAO_FORMATO})")
+    return relatorio
+
+
+# ============================================
+# COMPARAÇÃO
+# ============================================
+
+# Métrica -> True quando maior é pior
+METRICAS_COMPARADAS = {
+    "p50_ms": True,
+    "p95_ms": True,
+    "p99_ms": True,
+    "vazao": False,
+}
+
+# Caudas (p95/p99) variam muito entre execuções idênticas: só entram se pedidas
+METRICAS_PADRAO = ("p50_ms", "vazao")
+
+def comparar(base: dict, novo: dict, limite: float = 0.10, tolerancia_ms: float = 0.05,
+             metricas: Sequence[str] = METRICAS_PADRAO) -> dict:
+    """
+    Compara os casos presentes nas duas execuções
+
+    Regressão: latência `limite` (fração) acima da base e pelo menos
+    `tolerancia_ms` maior (evita alarmes em medições sub-milissegundo), ou
+    vazão `limite` abaixo da base. Melhorias usam os mesmos limites.
+    """
+    casos_base = {item["caso"]: item["metricas"] for item in base["resultados"]}
+    casos_novo = {item["caso"]: item["metricas"] for item in novo["resultados"]}
+
+    linhas = []
+    regressoes = 0
+    for caso, metricas_novo in casos_novo.items():
+        metricas_base = casos_base.get(caso)
+        if metricas_base is None:
+            continue
+
+        for metrica in metricas:
+            maior_pior = METRICAS_COMPARADAS[metrica]
+            antes, depois = metricas_base.get(metrica), metricas_novo.get(metrica)
+            if not antes or depois is None:
+                continue
+
+            variacao = (depois - antes) / antes
+            piorou = variacao > limite if maior_pior else variacao < -limite
+            melhorou = variacao < -limite if maior_pior else variacao > limite
+            if metrica.endswith("_ms") and abs(depois - antes) < tolerancia_ms:
+                piorou = melhorou = False
+
+            situacao = "regressao" if piorou else "melhoria" if melhorou else "estavel"
+            regressoes += piorou
+            linhas.append({
+                "caso": caso,
+                "metrica": metrica,
+                "base": antes,
+                "novo": depois,
+                "variacao": round(variacao, 4),
+                "situacao": situacao,
+            })
+
+    return {
+        "limite": limite,
+        "tolerancia_ms": tolerancia_ms,
+        "metricas": list(metricas),
+        "escala_base": base.get("escala"),
+        "escala_novo": novo.get("escala"),
+        "regressoes": regressoes,
+        "comparacoes": linhas,
+        "somente_base": sorted(set(casos_base) - set(casos_novo)),
+        "somente_novo": sorted(set(casos_novo) - set(casos_base)),
+    }
+
+def imprimir_comparacao(comparacao: dict, todos: bool = False):
+    simbolos = {"regressao": "🔴", "melhoria": "🟢", "estavel": "  "}
+
+    if comparacao["escala_base"] != comparacao["escala_novo"]:
+        print(f"⚠️  Escalas diferentes: {comparacao['escala_base']} x {comparacao['escala_novo']}")
+
+    for linha in comparacao["comparacoes"]:
+        if not todos and linha["situacao"] == "estavel":
+            continue
+        print(f"{simbolos[linha['situacao']]} {linha['caso']:<58} {linha['metrica']:<7} "
+              f"{linha['base']:>12.3f} -> {linha['novo']:>12.3f}  ({linha['variacao']:+.1%})")
+
+    for caso in comparacao["somente_base"]:
+        print(f"⚠️  Só na base: {caso}")
+    for caso in comparacao["somente_novo"]:
+        print(f"ℹ️  Só na nova execução: {caso}")
+
+    total = len(comparacao["comparacoes"])
+    if comparacao["regressoes"]:
+        print(f"❌ {comparacao['regressoes']} regressões em {total} comparações (limite {comparacao['limite']:.0%})")
+    else:
+        print(f"✅ Nenhuma regressão em {total} comparações (limite {comparacao['limite']:.0%})")
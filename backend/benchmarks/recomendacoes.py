@@ -0,0 +1,311 @@
+"""
+Cenários de recomendação - IARECOMEND
+POST /gerar, listagens por cliente sobre históricos grandes, pontuação do
+catálogo, motor de motivos e sobrecarga do perfilador
+"""
+import itertools
+import random
+from datetime import datetime, timedelta
+from typing import List
+
+from benchmarks.nucleo import cenario, medir, medir_requests, novo_cliente, resultado
+from routes.recomendacoes import (
+    MOTOR,
+    PRODUTOS_MOCK,
+    VERSAO_MODELO,
+    ClienteInfo,
+    limpar_estado_local,
+    restaurar_historico,
+)
+from services.catalogo import CatalogoProdutos
+from services.motivos import CONFIG_PADRAO, MotorMotivos
+from services.perfilador import Perfilador, PerfiladorMiddleware
+
+# Recomendações por cliente no histórico semeado: fixo, para que a latência
+# por cliente só cresça se a rota depender do tamanho total do histórico
+RECOMENDACOES_POR_CLIENTE = 100
+
+CATEGORIAS = sorted({p["categoria"] for p in PRODUTOS_MOCK})
+FREQUENCIAS = ["Alta", "Média", "Baixa", None]
+
+# Ids de cliente nunca repetidos entre requests (cache do motor sempre frio)
+_ids_clientes = itertools.count(1)
+
+
+# ============================================
+# DADOS SINTÉTICOS
+# ============================================
+
+def perfil_cliente(i: int, prefixo: str = "BENCH") -> dict:
+    """ClienteInfo variado (histórico, valor médio e frequência) e reproduzível"""
+    rng = random.Random(i)
+    return {
+        "id_cliente": f"{prefixo}{i:07d}",
+        "nome": f"Cliente Benchmark {i}",
+        "idade": rng.randint(18, 70),
+        "cidade": "Fortaleza",
+        "historico_categorias": rng.sample(CATEGORIAS, rng.randint(0, 3)),
+        "valor_medio_compra": rng.choice([None, 300.0, 1500.0, 3500.0, 7000.0]),
+        "frequencia_compra": rng.choice(FREQUENCIAS),
+    }
+
+def _produtos_recomendados(rng: random.Random) -> List[dict]:
+    produtos = []
+    for produto in rng.sample(PRODUTOS_MOCK, rng.randint(3, 5)):
+        desconto = rng.choice([0.0, 5.0, 10.0, 15.0])
+        produtos.append({
+            "id_produto": produto["id"],
+            "nome": produto["nome"],
+            "categoria": produto["categoria"],
+            "preco": produto["preco"],
+            "desconto": desconto,
+            "preco_final": round(produto["preco"] * (1 - desconto / 100), 2),
+            "confianca_ia": round(rng.uniform(75, 98), 2),
+            "motivo_recomendacao": "Tendência de compra identificada pela IA",
+            "estoque_disponivel": produto["estoque"],
+            "url_imagem": f"https://api.shopinfo.com/images/{produto['id']}.jpg",
+            "tags": produto["tags"],
+        })
+    return produtos
+
+def semear_historico(total: int) -> int:
+    """
+    Substitui o histórico em memória por `total` recomendações sintéticas
+    (RECOMENDACOES_POR_CLIENTE por cliente, datas crescentes)
+
+    As listas de produtos vêm de um conjunto pequeno compartilhado entre
+    as entradas: 1M de recomendações cabem em memória. Retorna o número
+    de clientes.
+    """
+    rng = random.Random(total)
+    listas = []
+    for _ in range(256):
+        produtos = _produtos_recomendados(rng)
+        # Mesmos campos que montar_produtos grava (resumo e rollups leem todos)
+        metadados = {
+            "perfil_cliente": {
+                "historico_categorias": sorted({p["categoria"] for p in produtos}),
+                "valor_medio": round(sum(p["preco"] for p in produtos) / len(produtos), 2),
+                "frequencia": rng.choice(FREQUENCIAS),
+            },
+            "confianca_media": round(sum(p["confianca_ia"] for p in produtos) / len(produtos), 2),
+            "desconto_medio": round(sum(p["desconto"] for p in produtos) / len(produtos), 2),
+            "versao_modelo": VERSAO_MODELO,
+        }
+        listas.append((produtos, metadados))
+    clientes = max(1, total // RECOMENDACOES_POR_CLIENTE)
+    inicio = datetime(2024, 1, 1)
+
+    recomendacoes = []
+    for i in range(total):
+        produtos, metadados = listas[i % len(listas)]
+        recomendacoes.append({
+            "id_recomendacao": f"REC-BENCH-{i:08d}",
+            "id_cliente": f"HIST{i % clientes:07d}",
+            "nome_cliente": f"Cliente Histórico {i % clientes}",
+            "data_geracao": (inicio + timedelta(seconds=i)).isoformat(),
+            "produtos_recomendados": produtos,
+            "total_recomendacoes": len(produtos),
+            "algoritmo_usado": "Benchmark",
+            "tempo_processamento_ms": 10,
+            "metadados": metadados,
+        })
+
+    limpar_estado_local()
+    MOTOR.limpar_cache()
+    restaurar_historico(recomendacoes, [])
+    return clientes
+
+def produtos_sinteticos(total: int) -> List[dict]:
+    """Catálogo de `total` produtos com as categorias e tags do catálogo mock"""
+    rng = random.Random(total)
+    produtos = []
+    for i in range(total):
+        modelo = PRODUTOS_MOCK[i % len(PRODUTOS_MOCK)]
+        produtos.append({
+            "id": f"P{i:07d}",
+            "nome": f"{modelo['nome']} #{i}",
+            "categoria": modelo["categoria"],
+            "preco": round(modelo["preco"] * rng.uniform(0.5, 1.5), 2),
+            "estoque": rng.choice([0, 5, 10, 20]),
+            "tags": modelo["tags"],
+        })
+    return produtos
+
+def selecionar_produtos_original(produtos: List[dict], cliente_info: ClienteInfo, quantidade: int = 5) -> List[dict]:
+    """
+    selecionar_produtos_ia antes do catálogo vetorizado (referência do cenário
+    `catalogo`), copiada sem alterações exceto o catálogo recebido por parâmetro
+    """
+    produtos_candidatos = produtos.copy()
+    random.shuffle(produtos_candidatos)
+    
+    # Peso maior para categorias já compradas
+    produtos_priorizados = []
+    produtos_novos = []
+    
+    for produto in produtos_candidatos:
+        if cliente_info.historico_categorias and produto["categoria"] in cliente_info.historico_categorias:
+            produtos_priorizados.append(produto)
+        else:
+            produtos_novos.append(produto)
+    
+    # Mix: 60% produtos de categorias conhecidas, 40% novos
+    num_priorizados = int(quantidade * 0.6)
+    num_novos = quantidade - num_priorizados
+    
+    selecionados = (
+        produtos_priorizados[:num_priorizados] + 
+        produtos_novos[:num_novos]
+    )
+    
+    # Garantir que temos a quantidade solicitada
+    if len(selecionados) < quantidade:
+        selecionados += produtos_candidatos[:quantidade - len(selecionados)]
+    
+    return selecionados[:quantidade]
+
+
+# ============================================
+# CENÁRIOS
+# ============================================
+
+@cenario("gerar", "recomendacoes")
+async def gerar(ctx) -> List[dict]:
+    """POST /gerar por quantidade e tamanho do histórico (cache do motor frio e quente)"""
+    resultados = []
+
+    for historico in ctx["historicos"]:
+        semear_historico(historico)
+
+        for quantidade in ctx["quantidades"]:
+            url = f"/api/recomendacoes/gerar?quantidade={quantidade}"
+
+            # Cliente diferente a cada request: o motor seleciona e monta sempre
+            metricas = await medir_requests(
+                lambda i: ctx.cliente.post(url, json=perfil_cliente(next(_ids_clientes))),
+                ctx["requests"], aquecimento=10
+            )
+            resultados.append(resultado("gerar", {"historico": historico, "quantidade": quantidade, "cache": "frio"}, metricas))
+
+            # Mesmo cliente e seed: produtos montados saem do cache do motor
+            perfil = perfil_cliente(0, prefixo="QUENTE")
+            metricas = await medir_requests(
+                lambda i: ctx.cliente.post(f"{url}&seed=42", json=perfil),
+                ctx["requests"], aquecimento=1
+            )
+            resultados.append(resultado("gerar", {"historico": historico, "quantidade": quantidade, "cache": "quente"}, metricas))
+
+    return resultados
+
+@cenario("cliente_historico", "recomendacoes")
+async def cliente_historico(ctx) -> List[dict]:
+    """GET /cliente/{id}, /resumo e /produtos com o histórico cheio"""
+    resultados = []
+    rotas = {
+        "listar": "/api/recomendacoes/cliente/{id}?limite=10",
+        "listar_confianca": "/api/recomendacoes/cliente/{id}?limite=50&ordem=confianca",
+        "resumo": "/api/recomendacoes/cliente/{id}/resumo",
+        "produtos": "/api/recomendacoes/cliente/{id}/produtos?min_confianca=80",
+    }
+
+    for historico in ctx["historicos"]:
+        clientes = semear_historico(historico)
+
+        for nome, rota in rotas.items():
+            metricas = await medir_requests(
+                lambda i: ctx.cliente.get(rota.format(id=f"HIST{i % clientes:07d}")),
+                ctx["requests"], aquecimento=10
+            )
+            resultados.append(resultado(
+                "cliente_historico",
+                {"historico": historico, "rota": nome},
+                metricas,
+                recomendacoes_por_cliente=min(historico, RECOMENDACOES_POR_CLIENTE)
+            ))
+
+    return resultados
+
+@cenario("catalogo", "recomendacoes")
+async def catalogo(ctx) -> List[dict]:
+    """
+    Pontuação vetorizada do catálogo (selecionar e selecionar_lote) por
+    tamanho, comparada com o shuffle + laço da implementação original
+    """
+    resultados = []
+    clientes = [ClienteInfo(**perfil_cliente(i)) for i in range(256)]
+
+    for tamanho in ctx["produtos_catalogo"]:
+        produtos = produtos_sinteticos(tamanho)
+        catalogo_teste = CatalogoProdutos(produtos)
+        repeticoes = max(20, min(ctx["requests"], 50_000_000 // tamanho))
+
+        # Original: embaralha e percorre o catálogo inteiro a cada chamada
+        repeticoes_original = max(5, min(ctx["requests"], 5_000_000 // tamanho))
+        random.seed(tamanho)
+        original = medir(
+            lambda i: selecionar_produtos_original(produtos, clientes[i % len(clientes)], 10),
+            repeticoes_original, aquecimento=1, unidades=repeticoes_original * tamanho, unidade_vazao="produtos/s"
+        )
+        resultados.append(resultado("catalogo", {"produtos": tamanho, "modo": "original"}, original))
+
+        metricas = medir(
+            lambda i: catalogo_teste.selecionar(clientes[i % len(clientes)], 10, random.Random(i)),
+            repeticoes, aquecimento=3, unidades=repeticoes * tamanho, unidade_vazao="produtos/s"
+        )
+        resultados.append(resultado(
+            "catalogo", {"produtos": tamanho, "modo": "selecionar"}, metricas,
+            aceleracao_vs_original=round(original["p50_ms"] / metricas["p50_ms"], 1) if metricas["p50_ms"] else None
+        ))
+
+        lote = clientes[:64]
+        metricas = medir(
+            lambda i: list(catalogo_teste.selecionar_lote(lote, 10, [random.Random(i * 64 + j) for j in range(len(lote))])),
+            max(5, repeticoes // len(lote)), aquecimento=1,
+            unidades=max(5, repeticoes // len(lote)) * len(lote), unidade_vazao="clientes/s"
+        )
+        resultados.append(resultado("catalogo", {"produtos": tamanho, "modo": "lote_64"}, metricas))
+
+    return resultados
+
+@cenario("motivos", "recomendacoes")
+async def motivos(ctx) -> List[dict]:
+    """Motor de motivos: todos os produtos do catálogo para cada cliente"""
+    total_produtos, total_clientes = ctx["motivos"]
+    produtos = produtos_sinteticos(total_produtos)
+
+    compilacao = medir(lambda i: MotorMotivos(CONFIG_PADRAO, produtos), 1)
+    motor = MotorMotivos(CONFIG_PADRAO, produtos)
+    clientes = [ClienteInfo(**perfil_cliente(i)) for i in range(total_clientes)]
+
+    metricas = medir(
+        lambda i: motor.motivos_lote(clientes[i], produtos),
+        total_clientes, unidades=total_clientes * total_produtos, unidade_vazao="motivos/s"
+    )
+    return [resultado(
+        "motivos",
+        {"produtos": total_produtos, "clientes": total_clientes},
+        metricas,
+        compilacao_ms=compilacao["p50_ms"]
+    )]
+
+@cenario("perfilador", "recomendacoes")
+async def perfilador(ctx) -> List[dict]:
+    """Sobrecarga do perfilador em /gerar: desligado, ligado sem sorteio e perfilando todos"""
+    semear_historico(ctx["historicos"][0])
+    variantes = {
+        "desligado": ctx.app,
+        "ligado": PerfiladorMiddleware(ctx.app, Perfilador(token="benchmark")),
+        "amostrado": PerfiladorMiddleware(ctx.app, Perfilador(taxa_amostragem=1.0)),
+    }
+
+    resultados = []
+    for nome, app in variantes.items():
+        async with novo_cliente(app) as cliente:
+            metricas = await medir_requests(
+                lambda i: cliente.post("/api/recomendacoes/gerar?quantidade=5", json=perfil_cliente(next(_ids_clientes))),
+                ctx["requests"], aquecimento=10
+            )
+        resultados.append(resultado("perfilador", {"modo": nome}, metricas))
+
+    return resultados
@@ -0,0 +1,283 @@
+"""
+Cenários de sincronização - IARECOMEND
+Ingestão de CSV, sincronização incremental, ingestão de API, pool de
+conectores e latência do /health com sincronizações em andamento
+"""
+import asyncio
+import csv
+import json
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+import httpx
+from sqlalchemy import insert, text
+
+from benchmarks.nucleo import cenario, medir, medir_requests, resultado, resumir
+from database import engine
+from models import FonteDados, StatusFonte, TipoFonte
+from services import conectores
+from services.conector_api import IngestaoAPI
+from services.ingestao_arquivos import importar_arquivo_sync
+from services.pool_conectores import PoolConectores
+from services.sincronizacao_incremental import sincronizar_incremental_sync
+
+# Ids das fontes criadas pelos cenários (longe das semeadas pelo cenário de stats)
+ID_FONTE_BASE = 900_000
+
+ESQUEMA_CSV = {
+    "colunas": {
+        "id_cliente": {"tipo": "str", "obrigatorio": True},
+        "categoria": "str",
+        "valor": "float",
+        "data_compra": "date",
+    },
+    "chave": "id_cliente",
+}
+
+
+# ============================================
+# DADOS SINTÉTICOS
+# ============================================
+
+def criar_fonte(fonte_id: int, tipo: TipoFonte, **campos):
+    """Fonte mínima no banco (a sincronização incremental lê e grava o watermark nela)"""
+    with engine.begin() as conexao:
+        conexao.execute(FonteDados.__table__.delete().where(FonteDados.id == fonte_id))
+        conexao.execute(insert(FonteDados.__table__), [{
+            "id": fonte_id,
+            "nome": f"Benchmark {fonte_id}",
+            "tipo": tipo,
+            "status": StatusFonte.ATIVA,
+            "criado_em": datetime.utcnow(),
+            **campos,
+        }])
+
+def escrever_csv(caminho: str, linhas: int):
+    """CSV de compras com as colunas de ESQUEMA_CSV (1% das linhas com valor inválido)"""
+    if os.path.exists(caminho):
+        return
+    rng = random.Random(linhas)
+    categorias = ["Notebooks", "Smartphones", "Tablets", "Monitores", "Periféricos"]
+    inicio = datetime(2024, 1, 1)
+
+    with open(caminho, "w", newline="", encoding="utf-8") as arquivo:
+        escritor = csv.writer(arquivo)
+        escritor.writerow(ESQUEMA_CSV["colunas"].keys())
+        for i in range(linhas):
+            valor = "n/d" if i % 100 == 99 else f"{rng.uniform(50, 9000):.2f}"
+            escritor.writerow((
+                f"CLI{i:08d}",
+                categorias[i % len(categorias)],
+                valor,
+                (inicio + timedelta(days=i % 365)).date().isoformat(),
+            ))
+
+def config_csv(fonte_id: int, caminho: str) -> dict:
+    return {
+        "id": fonte_id,
+        "tipo": "csv",
+        "caminho_arquivo": caminho,
+        "encoding": "utf-8",
+        "delimiter": ",",
+        "parametros_adicionais": {"esquema": ESQUEMA_CSV},
+    }
+
+def criar_origem(caminho: str, linhas: int):
+    """Banco SQLite de origem com a tabela `vendas` (id crescente, atualizado_em)"""
+    if os.path.exists(caminho):
+        os.remove(caminho)
+    inicio = datetime(2024, 1, 1)
+
+    conexao = sqlite3.connect(caminho)
+    conexao.execute(
+        "CREATE TABLE vendas (id INTEGER PRIMARY KEY, id_cliente TEXT, valor REAL, atualizado_em TEXT)"
+    )
+    conexao.execute("CREATE INDEX ix_vendas_atualizado_em ON vendas (atualizado_em, id)")
+    for bloco in range(0, linhas, 100_000):
+        conexao.executemany(
+            "INSERT INTO vendas VALUES (?, ?, ?, ?)",
+            (
+                (i, f"CLI{i % 50_000:06d}", float(i % 9000), (inicio + timedelta(seconds=i)).isoformat(" "))
+                for i in range(bloco + 1, min(bloco + 100_000, linhas) + 1)
+            )
+        )
+        conexao.commit()
+    conexao.close()
+
+
+# ============================================
+# CENÁRIOS
+# ============================================
+
+@cenario("ingestao_csv", "sincronizacao")
+async def ingestao_csv(ctx) -> List[dict]:
+    """Importação de CSV em blocos (linhas/s), da leitura à troca da carga"""
+    linhas = ctx["linhas_csv"]
+    caminho = os.path.join(ctx.diretorio, f"compras_{linhas}.csv")
+    escrever_csv(caminho, linhas)
+    criar_fonte(ID_FONTE_BASE, TipoFonte.CSV, caminho_arquivo=caminho)
+
+    inicio = time.perf_counter_ns()
+    importacao = await asyncio.to_thread(importar_arquivo_sync, config_csv(ID_FONTE_BASE, caminho))
+    decorrido = time.perf_counter_ns() - inicio
+
+    return [resultado(
+        "ingestao_csv", {"linhas": linhas},
+        resumir([decorrido], decorrido / 1e9, unidades=linhas, unidade_vazao="linhas/s"),
+        registros_importados=importacao["registros_importados"],
+        registros_com_erro=importacao["registros_com_erro"],
+        tamanho_arquivo_mb=round(os.path.getsize(caminho) / 2**20, 1)
+    )]
+
+@cenario("incremental", "sincronizacao")
+async def incremental(ctx) -> List[dict]:
+    """Sincronização incremental: carga completa e delta de 1% depois do watermark"""
+    linhas = ctx["linhas_incremental"]
+    caminho = os.path.join(ctx.diretorio, "origem.db")
+    criar_origem(caminho, linhas)
+
+    fonte_id = ID_FONTE_BASE + 1
+    parametros = {
+        "url": f"sqlite:///{caminho}",
+        "incremental": {"tabela": "vendas", "coluna_watermark": "atualizado_em", "coluna_chave": "id"},
+    }
+    criar_fonte(fonte_id, TipoFonte.POSTGRESQL, parametros_adicionais=parametros)
+    config = {"id": fonte_id, "tipo": "postgresql", "parametros_adicionais": parametros}
+
+    resultados = []
+    for carga in ("completa", "delta"):
+        if carga == "delta":
+            # 1% das linhas alteradas depois do watermark
+            delta = max(1, linhas // 100)
+            conexao = sqlite3.connect(caminho)
+            conexao.execute(
+                "UPDATE vendas SET valor = valor + 1, atualizado_em = ? WHERE id % ? = 0",
+                (datetime(2030, 1, 1).isoformat(" "), max(1, linhas // delta))
+            )
+            conexao.commit()
+            conexao.close()
+
+        inicio = time.perf_counter_ns()
+        sincronizacao = await asyncio.to_thread(sincronizar_incremental_sync, config)
+        decorrido = time.perf_counter_ns() - inicio
+        processadas = sincronizacao["registros_importados"] + sincronizacao["registros_atualizados"]
+
+        resultados.append(resultado(
+            "incremental", {"linhas": linhas, "carga": carga},
+            resumir([decorrido], decorrido / 1e9, unidades=processadas, unidade_vazao="linhas/s"),
+            registros_importados=sincronizacao["registros_importados"],
+            registros_atualizados=sincronizacao["registros_atualizados"]
+        ))
+    return resultados
+
+@cenario("ingestao_api", "sincronizacao")
+async def ingestao_api(ctx) -> List[dict]:
+    """Ingestão de API paginada (registros/s) contra uma API simulada em memória"""
+    registros = ctx["registros_api"]
+    tamanho_pagina = 1_000
+    total_paginas = max(1, -(-registros // tamanho_pagina))
+    paginas_geradas = {}
+
+    def pagina_json(numero: int) -> bytes:
+        if numero not in paginas_geradas:
+            inicio = (numero - 1) * tamanho_pagina
+            itens = [
+                {"id": i, "id_cliente": f"CLI{i:08d}", "valor": i % 9000, "categoria": "Notebooks"}
+                for i in range(inicio, min(inicio + tamanho_pagina, registros))
+            ]
+            paginas_geradas[numero] = json.dumps({"data": itens, "total_pages": total_paginas}).encode()
+        return paginas_geradas[numero]
+
+    def responder(requisicao: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=pagina_json(int(requisicao.url.params.get("page", 1))))
+
+    fonte_id = ID_FONTE_BASE + 2
+    criar_fonte(fonte_id, TipoFonte.API, url_api="http://api.benchmark/vendas")
+    config = {
+        "id": fonte_id,
+        "tipo": "api",
+        "url_api": "http://api.benchmark/vendas",
+        "parametros_adicionais": {"api": {
+            "paginacao": "pagina",
+            "caminho_registros": "data",
+            "caminho_total_paginas": "total_pages",
+            "tamanho_pagina": tamanho_pagina,
+            "coluna_chave": "id",
+        }},
+    }
+
+    # Páginas pré-geradas: mede o cliente (parse em streaming e gravação), não a API
+    for numero in range(1, total_paginas + 1):
+        pagina_json(numero)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(responder)) as cliente:
+        inicio = time.perf_counter_ns()
+        ingestao = await IngestaoAPI(config, cliente=cliente).executar()
+        decorrido = time.perf_counter_ns() - inicio
+
+    return [resultado(
+        "ingestao_api", {"registros": registros, "tamanho_pagina": tamanho_pagina},
+        resumir([decorrido], decorrido / 1e9, unidades=ingestao["registros_importados"], unidade_vazao="registros/s"),
+        paginas=ingestao["paginas"],
+        paginas_por_segundo=ingestao["paginas_por_segundo"]
+    )]
+
+@cenario("pool_conectores", "sincronizacao")
+async def pool_conectores(ctx) -> List[dict]:
+    """Conexão com a fonte pelo pool de conectores: engine reaproveitada (hit) x criada (miss)"""
+    caminho = os.path.join(ctx.diretorio, "origem_pool.db")
+    sqlite3.connect(caminho).close()
+    config = {"id": ID_FONTE_BASE + 3, "tipo": "postgresql", "parametros_adicionais": {"url": f"sqlite:///{caminho}"}}
+    pool = PoolConectores()
+
+    def conectar(i):
+        with pool.engine(config).connect() as conexao:
+            conexao.execute(text("SELECT 1"))
+
+    resultados = []
+    for modo, antes in (("hit", None), ("miss", lambda i: pool.invalidar(fonte_id=config["id"]))):
+        metricas = medir(conectar, ctx["requests"], aquecimento=1 if modo == "hit" else 0, antes=antes,
+                         unidade_vazao="conexoes/s")
+        resultados.append(resultado("pool_conectores", {"modo": modo}, metricas))
+
+    pool.limpar()
+    return resultados
+
+@cenario("saude_sob_sync", "sincronizacao")
+async def saude_sob_sync(ctx) -> List[dict]:
+    """GET /health ocioso e com N sincronizações de CSV rodando no mesmo processo"""
+    syncs = ctx["syncs_simultaneas"]
+    caminho = os.path.join(ctx.diretorio, "compras_saude.csv")
+    escrever_csv(caminho, 5_000)
+    for i in range(syncs):
+        criar_fonte(ID_FONTE_BASE + 100 + i, TipoFonte.CSV, caminho_arquivo=caminho)
+
+    resultados = [resultado(
+        "saude_sob_sync", {"syncs": 0},
+        await medir_requests(lambda i: ctx.cliente.get("/health"), ctx["requests"], aquecimento=5)
+    )]
+
+    tarefa = asyncio.gather(*(
+        conectores.sincronizar(config_csv(ID_FONTE_BASE + 100 + i, caminho)) for i in range(syncs)
+    ))
+
+    latencias = []
+    inicio = time.perf_counter()
+    while not tarefa.done():
+        inicio_request = time.perf_counter_ns()
+        resposta = await ctx.cliente.get("/health")
+        latencias.append(time.perf_counter_ns() - inicio_request)
+        resposta.raise_for_status()
+    duracao = time.perf_counter() - inicio
+    await tarefa
+
+    resultados.append(resultado(
+        "saude_sob_sync", {"syncs": syncs},
+        resumir(latencias, duracao),
+        duracao_syncs_segundos=round(duracao, 2)
+    ))
+    return resultados
@@ -21,6 +21,95 @@ class Settings:
         self.DB_USER: str = os.getenv("RDS_DB_USER") or os.getenv("DB_USER") or "postgres"
         self.DB_PASSWORD: str = os.getenv("RDS_DB_PASSWORD") or os.getenv("DB_PASSWORD") or "postgres"
         
+        # URL completa opcional (ex: sqlite:///./iarecomend.db para desenvolvimento local)
+        self.DB_URL_OVERRIDE: str = os.getenv("DATABASE_URL", "")
+        
+        # Pool de conexões (por engine e por worker: com --workers N e as
+        # engines síncrona e assíncrona, o máximo no banco é
+        # N * 2 * (DB_POOL_TAMANHO + DB_POOL_MAX_OVERFLOW))
+        self.DB_POOL_TAMANHO: int = int(os.getenv("DB_POOL_TAMANHO", "5"))
+        self.DB_POOL_MAX_OVERFLOW: int = int(os.getenv("DB_POOL_MAX_OVERFLOW", "10"))
+        self.DB_POOL_TIMEOUT_SEGUNDOS: float = float(os.getenv("DB_POOL_TIMEOUT_SEGUNDOS", "30"))
+        self.DB_POOL_RECYCLE_SEGUNDOS: int = int(os.getenv("DB_POOL_RECYCLE_SEGUNDOS", "-1"))
+        self.DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "True") == "True"
+        
+        # Persistência de recomendações (fila de escrita em lote)
+        self.PERSISTENCIA_TAMANHO_FILA: int = int(os.getenv("PERSISTENCIA_TAMANHO_FILA", "10000"))
+        self.PERSISTENCIA_TAMANHO_LOTE: int = int(os.getenv("PERSISTENCIA_TAMANHO_LOTE", "500"))
+        self.PERSISTENCIA_INTERVALO_SEGUNDOS: float = float(os.getenv("PERSISTENCIA_INTERVALO_SEGUNDOS", "1.0"))
+        self.PERSISTENCIA_CARREGAR_LIMITE: int = int(os.getenv("PERSISTENCIA_CARREGAR_LIMITE", "50000"))
+        
+        # Conectores de fontes de dados
+        self.SYNC_CONCORRENCIA_POR_TIPO: int = int(os.getenv("SYNC_CONCORRENCIA_POR_TIPO", "4"))
+        self.SYNC_TIMEOUT_SEGUNDOS: float = float(os.getenv("SYNC_TIMEOUT_SEGUNDOS", "600"))
+        self.TESTE_CONEXAO_TIMEOUT_SEGUNDOS: float = float(os.getenv("TESTE_CONEXAO_TIMEOUT_SEGUNDOS", "10"))
+        # URL SQLAlchemy livre em parametros_adicionais.url (apenas desenvolvimento/benchmarks)
+        self.FONTES_PERMITIR_URL: bool = os.getenv("FONTES_PERMITIR_URL", "False") == "True"
+        
+        # Ingestão de arquivos CSV/Excel (linhas por bloco)
+        self.INGESTAO_TAMANHO_BLOCO: int = int(os.getenv("INGESTAO_TAMANHO_BLOCO", "10000"))
+        # Diretório dos arquivos das fontes CSV/Excel (caminho_arquivo é relativo a ele)
+        self.ARQUIVOS_DIRETORIO: str = os.getenv("ARQUIVOS_DIRETORIO", "./arquivos")
+        
+        # Sincronização incremental de fontes relacionais (linhas por lote)
+        self.INCREMENTAL_TAMANHO_LOTE: int = int(os.getenv("INCREMENTAL_TAMANHO_LOTE", "5000"))
+        
+        # Ingestão de fontes do tipo API (cliente HTTP compartilhado)
+        self.API_TIMEOUT_SEGUNDOS: float = float(os.getenv("API_TIMEOUT_SEGUNDOS", "30"))
+        self.API_MAX_CONEXOES: int = int(os.getenv("API_MAX_CONEXOES", "20"))
+        self.API_CONCORRENCIA: int = int(os.getenv("API_CONCORRENCIA", "4"))
+        
+        # Pool de conectores (engines por fonte externa)
+        self.POOL_CONECTORES_TAMANHO_MAXIMO: int = int(os.getenv("POOL_CONECTORES_TAMANHO_MAXIMO", "50"))
+        self.POOL_CONECTORES_OCIOSO_SEGUNDOS: float = float(os.getenv("POOL_CONECTORES_OCIOSO_SEGUNDOS", "600"))
+        self.POOL_CONECTORES_CONEXOES_POR_FONTE: int = int(os.getenv("POOL_CONECTORES_CONEXOES_POR_FONTE", "2"))
+        
+        # Cache dos agregados do dashboard (/stats)
+        self.STATS_CACHE_TTL_SEGUNDOS: float = float(os.getenv("STATS_CACHE_TTL_SEGUNDOS", "5"))
+        
+        # Cache de respostas HTTP (ETag/304) dos GETs de leitura frequente
+        # Backend: "memoria" ou "pacote.modulo:Classe" (implementa services.cache.BackendCache)
+        self.CACHE_RESPOSTAS_ATIVO: bool = os.getenv("CACHE_RESPOSTAS_ATIVO", "True") == "True"
+        self.CACHE_RESPOSTAS_BACKEND: str = os.getenv("CACHE_RESPOSTAS_BACKEND", "memoria")
+        self.CACHE_RESPOSTAS_MAX_ENTRADAS: int = int(os.getenv("CACHE_RESPOSTAS_MAX_ENTRADAS", "1000"))
+        self.CACHE_RESPOSTAS_TTL_SEGUNDOS: float = float(os.getenv("CACHE_RESPOSTAS_TTL_SEGUNDOS", "30"))
+        
+        # Estado do recomendador compartilhado entre workers (histórico/feedbacks
+        # e versões do cache de respostas)
+        # Backend: "memoria" (processo único), "mmap" (workers na mesma máquina) ou "sql"
+        self.ESTADO_BACKEND: str = os.getenv("ESTADO_BACKEND", "memoria")
+        self.ESTADO_MMAP_CAMINHO: str = os.getenv("ESTADO_MMAP_CAMINHO", "/tmp/iarecomend_estado.log")
+        self.ESTADO_INTERVALO_LEITURA_SEGUNDOS: float = float(os.getenv("ESTADO_INTERVALO_LEITURA_SEGUNDOS", "0.2"))
+        self.ESTADO_RETENCAO_SEGUNDOS: float = float(os.getenv("ESTADO_RETENCAO_SEGUNDOS", "3600"))
+        
+        # Perfilador de requests (desligado: taxa 0 e sem token)
+        # Cabeçalho "X-Perfil: <PERFIL_TOKEN>" perfila um request; o token também
+        # protege o download em /api/admin/perfis
+        self.PERFIL_TAXA_AMOSTRAGEM: float = float(os.getenv("PERFIL_TAXA_AMOSTRAGEM", "0"))
+        self.PERFIL_TOKEN: str = os.getenv("PERFIL_TOKEN", "")
+        self.PERFIL_INTERVALO_MS: float = float(os.getenv("PERFIL_INTERVALO_MS", "2"))
+        self.PERFIL_MAX_PERFIS: int = int(os.getenv("PERFIL_MAX_PERFIS", "50"))
+        
+        # Motor de recomendação: cache de (seed, perfil do cliente) -> produtos montados
+        self.MOTOR_CACHE_MAX_ENTRADAS: int = int(os.getenv("MOTOR_CACHE_MAX_ENTRADAS", "10000"))
+        self.MOTOR_CACHE_TTL_SEGUNDOS: float = float(os.getenv("MOTOR_CACHE_TTL_SEGUNDOS", "300"))
+        
+        # Regras de motivo de recomendação (JSON; vazio = regras padrão)
+        self.MOTIVOS_CONFIG_ARQUIVO: str = os.getenv("MOTIVOS_CONFIG_ARQUIVO", "")
+        
+        # Jobs de sincronização em segundo plano
+        self.JOBS_WORKERS: int = int(os.getenv("JOBS_WORKERS", "2"))
+        self.JOBS_LEASE_SEGUNDOS: int = int(os.getenv("JOBS_LEASE_SEGUNDOS", "60"))
+        self.JOBS_HEARTBEAT_SEGUNDOS: int = int(os.getenv("JOBS_HEARTBEAT_SEGUNDOS", "10"))
+        self.JOBS_MAX_TENTATIVAS: int = int(os.getenv("JOBS_MAX_TENTATIVAS", "3"))
+        self.JOBS_INTERVALO_POLL_SEGUNDOS: float = float(os.getenv("JOBS_INTERVALO_POLL_SEGUNDOS", "1.0"))
+        
+        # Agendador de sincronizações automáticas (proxima_sincronizacao)
+        self.AGENDADOR_ATIVO: bool = os.getenv("AGENDADOR_ATIVO", "True") == "True"
+        self.AGENDADOR_INTERVALO_RECARGA_SEGUNDOS: float = float(os.getenv("AGENDADOR_INTERVALO_RECARGA_SEGUNDOS", "60"))
+        self.AGENDADOR_HORIZONTE_SEGUNDOS: float = float(os.getenv("AGENDADOR_HORIZONTE_SEGUNDOS", "300"))
+        self.AGENDADOR_JITTER_SEGUNDOS: float = float(os.getenv("AGENDADOR_JITTER_SEGUNDOS", "120"))
+        
         # Security
         self.SECRET_KEY: str = os.getenv("SECRET_KEY", "dev-secret-key-change-in-production")
         
@@ -36,6 +125,8 @@ class Settings:
     @property
     def DATABASE_URL(self) -> str:
         """Monta URL de conexão do banco de dados"""
+        if self.DB_URL_OVERRIDE:
+            return self.DB_URL_OVERRIDE
         return f"postgresql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
 # Instância global das configurações
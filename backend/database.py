@@ -2,24 +2,126 @@
 Configuração do banco de dados PostgreSQL
 Gerenciamento de conexões e sessões
 """
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import QueuePool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from contextlib import contextmanager
-from typing import Generator
+from typing import AsyncGenerator, Generator
+import time
 
 # Importar configuração
 from config import settings
+from services.metricas import registro_metricas, rota_atual
+
+# ============================================
+# POOL DE CONEXÕES INSTRUMENTADO
+# ============================================
+
+POOL_CHECKOUT_SEGUNDOS = registro_metricas.histograma(
+    "db_pool_checkout_segundos",
+    "Espera para obter uma conexão do pool (inclui pre-ping)",
+    ("engine", "rota")
+)
+POOL_TIMEOUTS = registro_metricas.contador(
+    "db_pool_timeouts_total",
+    "Checkouts que estouraram DB_POOL_TIMEOUT_SEGUNDOS",
+    ("engine", "rota")
+)
+POOL_EM_USO = registro_metricas.medidor(
+    "db_pool_conexoes_em_uso",
+    "Conexões emprestadas pelo pool, pela rota que as segura",
+    ("engine", "rota")
+)
+POOL_OVERFLOW = registro_metricas.medidor(
+    "db_pool_overflow",
+    "Conexões abertas além de DB_POOL_TAMANHO",
+    ("engine",)
+)
+POOL_OCIOSAS = registro_metricas.medidor(
+    "db_pool_conexoes_ociosas",
+    "Conexões abertas aguardando no pool",
+    ("engine",)
+)
+POOL_CAPACIDADE = registro_metricas.medidor(
+    "db_pool_capacidade",
+    "Máximo de conexões do pool (DB_POOL_TAMANHO + DB_POOL_MAX_OVERFLOW)",
+    ("engine",)
+)
+POOL_CONEXOES_ABERTAS = registro_metricas.contador(
+    "db_pool_conexoes_abertas_total",
+    "Conexões novas abertas com o banco",
+    ("engine",)
+)
+
+class _CheckoutMedido:
+    """Mede a espera de `connect()` e conta os timeouts, rotulados pela rota"""
+    rotulo = ""
+    
+    def connect(self):
+        rota = rota_atual()
+        inicio = time.perf_counter()
+        try:
+            conexao = super().connect()
+        except exc.TimeoutError:
+            POOL_TIMEOUTS.inc(engine=self.rotulo, rota=rota)
+            raise
+        POOL_CHECKOUT_SEGUNDOS.observar(time.perf_counter() - inicio, engine=self.rotulo, rota=rota)
+        return conexao
+
+class PoolSincrono(_CheckoutMedido, QueuePool):
+    rotulo = "sync"
+
+class PoolAssincrono(_CheckoutMedido, AsyncAdaptedQueuePool):
+    rotulo = "async"
+
+def opcoes_pool() -> dict:
+    """Dimensionamento do pool a partir das Settings (DB_POOL_*)"""
+    return {
+        "pool_size": settings.DB_POOL_TAMANHO,  # Número de conexões permanentes
+        "max_overflow": settings.DB_POOL_MAX_OVERFLOW,  # Conexões adicionais sob demanda
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SEGUNDOS,  # Espera máxima por uma conexão
+        "pool_recycle": settings.DB_POOL_RECYCLE_SEGUNDOS,  # Renova conexões antigas (-1 = nunca)
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,  # Verifica conexões antes de usar
+    }
+
+def instrumentar_pool(engine_sync, rotulo: str):
+    """Liga os eventos do pool da engine às métricas (em uso por rota, conexões abertas)"""
+    
+    @event.listens_for(engine_sync, "connect")
+    def _conectou(dbapi_connection, connection_record):
+        POOL_CONEXOES_ABERTAS.inc(engine=rotulo)
+    
+    @event.listens_for(engine_sync, "checkout")
+    def _emprestou(dbapi_connection, connection_record, connection_proxy):
+        rota = connection_record.info["rota_metricas"] = rota_atual()
+        POOL_EM_USO.inc(engine=rotulo, rota=rota)
+    
+    @event.listens_for(engine_sync, "checkin")
+    def _devolveu(dbapi_connection, connection_record):
+        rota = connection_record.info.pop("rota_metricas", None)
+        if rota is not None:
+            POOL_EM_USO.dec(engine=rotulo, rota=rota)
+    
+    def coletar():
+        # engine.pool é trocado em dispose(): lido a cada coleta
+        pool = engine_sync.pool
+        if isinstance(pool, QueuePool):
+            POOL_OVERFLOW.definir(max(pool.overflow(), 0), engine=rotulo)
+            POOL_OCIOSAS.definir(pool.checkedin(), engine=rotulo)
+            POOL_CAPACIDADE.definir(pool.size() + settings.DB_POOL_MAX_OVERFLOW, engine=rotulo)
+    
+    registro_metricas.coletor(coletar)
 
 # Engine do SQLAlchemy com pool de conexões
 engine = create_engine(
     settings.DATABASE_URL,
-    poolclass=QueuePool,
-    pool_size=5,  # Número de conexões permanentes
-    max_overflow=10,  # Conexões adicionais sob demanda
-    pool_pre_ping=True,  # Verifica conexões antes de usar
-    echo=settings.DEBUG  # Mostra SQL no console se DEBUG=True
+    poolclass=PoolSincrono,
+    echo=settings.DEBUG,  # Mostra SQL no console se DEBUG=True
+    **opcoes_pool()
 )
+instrumentar_pool(engine, PoolSincrono.rotulo)
 
 # Session factory
 SessionLocal = sessionmaker(
@@ -28,6 +130,36 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+# Drivers assíncronos equivalentes aos síncronos
+DRIVERS_ASSINCRONOS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def url_assincrona(url: str) -> str:
+    """URL do banco com o driver assíncrono (asyncpg / aiosqlite)"""
+    url_obj = make_url(url)
+    driver = DRIVERS_ASSINCRONOS.get(url_obj.get_backend_name())
+    if driver is None:
+        return url
+    return url_obj.set(drivername=driver).render_as_string(hide_password=False)
+
+# Engine assíncrona (rotas async def: usuários e fontes), mesmo dimensionamento da síncrona
+async_engine = create_async_engine(
+    url_assincrona(settings.DATABASE_URL),
+    poolclass=PoolAssincrono,
+    echo=settings.DEBUG,
+    **opcoes_pool()
+)
+instrumentar_pool(async_engine.sync_engine, PoolAssincrono.rotulo)
+
+# Sem expirar no commit: atributos lidos após o commit não disparam I/O implícito
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 def get_db() -> Generator[Session, None, None]:
     """
     Dependency para obter sessão do banco de dados
@@ -44,6 +176,21 @@ def get_db() -> Generator[Session, None, None]:
     finally:
         db.close()
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency assíncrona (AsyncSession)
+    
+    Exemplo:
+        @app.get("/usuarios")
+        async def listar(db: AsyncSession = Depends(get_async_db)):
+            return (await db.scalars(select(Usuario))).all()
+    
+    Funções escritas para Session (Query API) rodam com
+    `await db.run_sync(funcao, *args)`.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
 @contextmanager
 def get_db_context():
     """
@@ -68,6 +215,7 @@ def init_db():
     Inicializa o banco de dados criando todas as tabelas
     """
     from models import Base
+    from services.busca import motor_busca
     
     print(f"\n🔧 Inicializando banco de dados...")
     print(f"📍 Conectando em: {settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}")
@@ -76,6 +224,9 @@ def init_db():
         Base.metadata.create_all(bind=engine)
         print("✅ Banco de dados inicializado com sucesso!")
         print(f"✅ Tabelas criadas: {', '.join(Base.metadata.tables.keys())}")
+        
+        # Índices de trigramas para o filtro `busca` (PostgreSQL)
+        motor_busca.criar_indices(engine)
     except Exception as e:
         print(f"❌ Erro ao inicializar banco: {e}")
         raise
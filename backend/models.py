@@ -3,7 +3,7 @@ Modelos de dados do IARECOMEND
 SQLAlchemy Models para PostgreSQL
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Enum as SQLEnum, Float, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Enum as SQLEnum, Float, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
 import enum
 
@@ -39,8 +39,19 @@ class StatusFonte(str, enum.Enum):
     PENDENTE = "pending"
     SINCRONIZANDO = "syncing"
 
+class StatusJob(str, enum.Enum):
+    """Status de um job de sincronização"""
+    PENDENTE = "pending"
+    EXECUTANDO = "running"
+    CONCLUIDO = "done"
+    ERRO = "error"
+
 class Usuario(Base):
     __tablename__ = "usuarios"
+    __table_args__ = (
+        # Paginação por cursor: ORDER BY criado_em DESC, id DESC
+        Index('ix_usuarios_criado_em_id', 'criado_em', 'id'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String(200), nullable=False)
@@ -75,6 +86,12 @@ class FonteDados(Base):
     Armazena configurações de conexão com diferentes fontes de dados
     """
     __tablename__ = "fontes_dados"
+    __table_args__ = (
+        # Consulta do agendador: fontes ativas com sincronização vencida
+        Index('ix_fontes_dados_status_proxima_sync', 'status', 'proxima_sincronizacao'),
+        # Paginação por cursor: ORDER BY criado_em DESC, id DESC
+        Index('ix_fontes_dados_criado_em_id', 'criado_em', 'id'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String(200), nullable=False, unique=True, index=True)
@@ -105,6 +122,7 @@ class FonteDados(Base):
     ultima_sincronizacao = Column(DateTime, nullable=True)
     proxima_sincronizacao = Column(DateTime, nullable=True)
     frequencia_sync_horas = Column(Integer, default=24)  # Sincronizar a cada 24h
+    watermark = Column(JSON, nullable=True)  # Posição da sincronização incremental (valor + chave)
     
     # Estatísticas
     total_registros_importados = Column(Integer, default=0)
@@ -136,6 +154,7 @@ class FonteDados(Base):
             'ultima_sincronizacao': self.ultima_sincronizacao.isoformat() if self.ultima_sincronizacao else None,
             'proxima_sincronizacao': self.proxima_sincronizacao.isoformat() if self.proxima_sincronizacao else None,
             'frequencia_sync_horas': self.frequencia_sync_horas,
+            'watermark': self.watermark,
             'total_registros_importados': self.total_registros_importados,
             'total_erros': self.total_erros,
             'tempo_ultima_sync_segundos': self.tempo_ultima_sync_segundos,
@@ -151,3 +170,184 @@ class FonteDados(Base):
         data.pop('senha_criptografada', None)
         data.pop('api_key', None)
         return data
+
+class Recomendacao(Base):
+    """
+    Recomendação gerada pelo motor de IA
+    Gravada em lote pela fila de escrita (services/persistencia.py)
+    """
+    __tablename__ = "recomendacoes"
+    __table_args__ = (
+        # Histórico mais recente primeiro (carga inicial e paginação)
+        Index('ix_recomendacoes_data_geracao_id', 'data_geracao', 'id_recomendacao'),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    id_recomendacao = Column(String(50), unique=True, nullable=False, index=True)
+    id_cliente = Column(String(50), nullable=False, index=True)
+    nome_cliente = Column(String(200), nullable=False)
+    data_geracao = Column(DateTime, nullable=False, index=True)
+    total_recomendacoes = Column(Integer, nullable=False, default=0)
+    algoritmo_usado = Column(String(200), nullable=True)
+    tempo_processamento_ms = Column(Integer, nullable=True)
+    metadados = Column(JSON, nullable=True)
+    
+    def to_dict(self, itens=None):
+        """Converte para o formato de RecomendacaoResponse"""
+        return {
+            'id_recomendacao': self.id_recomendacao,
+            'id_cliente': self.id_cliente,
+            'nome_cliente': self.nome_cliente,
+            'data_geracao': self.data_geracao.isoformat() if self.data_geracao else None,
+            'produtos_recomendados': [item.to_dict() for item in (itens or [])],
+            'total_recomendacoes': self.total_recomendacoes,
+            'algoritmo_usado': self.algoritmo_usado,
+            'tempo_processamento_ms': self.tempo_processamento_ms,
+            'metadados': self.metadados or {}
+        }
+
+class ItemRecomendado(Base):
+    """Produto recomendado dentro de uma recomendação"""
+    __tablename__ = "itens_recomendados"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    id_recomendacao = Column(String(50), nullable=False, index=True)
+    posicao = Column(Integer, nullable=False, default=0)
+    id_produto = Column(String(50), nullable=False, index=True)
+    nome = Column(String(200), nullable=False)
+    categoria = Column(String(100), nullable=False)
+    preco = Column(Float, nullable=False)
+    desconto = Column(Float, default=0.0)
+    preco_final = Column(Float, nullable=False)
+    confianca_ia = Column(Float, nullable=False)
+    motivo_recomendacao = Column(Text, nullable=True)
+    estoque_disponivel = Column(Integer, default=0)
+    url_imagem = Column(String(500), nullable=True)
+    tags = Column(JSON, nullable=True)
+    
+    def to_dict(self):
+        """Converte para o formato de ProdutoRecomendado"""
+        return {
+            'id_produto': self.id_produto,
+            'nome': self.nome,
+            'categoria': self.categoria,
+            'preco': self.preco,
+            'desconto': self.desconto,
+            'preco_final': self.preco_final,
+            'confianca_ia': self.confianca_ia,
+            'motivo_recomendacao': self.motivo_recomendacao,
+            'estoque_disponivel': self.estoque_disponivel,
+            'url_imagem': self.url_imagem,
+            'tags': self.tags or []
+        }
+
+class FeedbackRecomendacao(Base):
+    """Feedback do vendedor sobre um produto recomendado"""
+    __tablename__ = "feedbacks_recomendacao"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    id_feedback = Column(String(50), unique=True, nullable=False, index=True)
+    id_recomendacao = Column(String(50), nullable=False, index=True)
+    id_produto = Column(String(50), nullable=False)
+    aceito = Column(Boolean, nullable=False)
+    comprado = Column(Boolean, default=False)
+    motivo_recusa = Column(Text, nullable=True)
+    observacoes = Column(Text, nullable=True)
+    data_registro = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def to_dict(self):
+        """Converte para o formato do histórico de feedbacks"""
+        return {
+            'id_feedback': self.id_feedback,
+            'data_registro': self.data_registro.isoformat() if self.data_registro else None,
+            'id_recomendacao': self.id_recomendacao,
+            'id_produto': self.id_produto,
+            'aceito': self.aceito,
+            'comprado': self.comprado,
+            'motivo_recusa': self.motivo_recusa,
+            'observacoes': self.observacoes
+        }
+
+class JobSincronizacao(Base):
+    """
+    Job de sincronização de uma fonte de dados
+    Executado em segundo plano pelo pool de workers (services/jobs.py)
+    
+    O worker que pega o job recebe um lease até `lease_ate` e o renova com
+    heartbeats; se o lease expirar (worker caiu), o job volta para a fila.
+    """
+    __tablename__ = "jobs_sincronizacao"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    fonte_id = Column(Integer, nullable=False, index=True)
+    status = Column(SQLEnum(StatusJob), nullable=False, default=StatusJob.PENDENTE, index=True)
+    force = Column(Boolean, default=False)
+    tentativas = Column(Integer, default=0)
+    
+    # Lease / heartbeat
+    worker_id = Column(String(200), nullable=True)
+    lease_ate = Column(DateTime, nullable=True, index=True)
+    heartbeat_em = Column(DateTime, nullable=True)
+    
+    # Progresso
+    registros_processados = Column(Integer, default=0)
+    total_estimado = Column(Integer, nullable=True)
+    
+    # Resultado
+    registros_importados = Column(Integer, default=0)
+    registros_atualizados = Column(Integer, default=0)
+    registros_com_erro = Column(Integer, default=0)
+    registros_por_segundo = Column(Float, nullable=True)
+    paginas_por_segundo = Column(Float, nullable=True)  # Fontes do tipo API
+    mensagem = Column(Text, nullable=True)
+    
+    criado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+    iniciado_em = Column(DateTime, nullable=True)
+    concluido_em = Column(DateTime, nullable=True)
+    
+    @property
+    def progresso_percent(self):
+        """Percentual concluído (None enquanto o total não é conhecido)"""
+        if self.status == StatusJob.CONCLUIDO:
+            return 100.0
+        if not self.total_estimado:
+            return None
+        return round(min(self.registros_processados / self.total_estimado, 1.0) * 100, 1)
+    
+    @property
+    def eta_segundos(self):
+        """Estimativa de tempo restante com base na taxa até agora"""
+        if self.status != StatusJob.EXECUTANDO or not self.total_estimado or not self.registros_processados:
+            return None
+        decorrido = ((self.heartbeat_em or datetime.utcnow()) - self.iniciado_em).total_seconds()
+        restante = max(self.total_estimado - self.registros_processados, 0)
+        return round(decorrido / self.registros_processados * restante, 1)
+
+class RegistroImportado(Base):
+    """
+    Registro importado de uma fonte de dados
+    Cada linha válida do arquivo/tabela/API vira um registro com os dados em JSON
+    """
+    __tablename__ = "registros_importados"
+    __table_args__ = (
+        Index('ix_registros_importados_fonte_chave', 'fonte_id', 'chave'),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    fonte_id = Column(Integer, nullable=False)
+    chave = Column(String(200), nullable=True)  # Chave natural (coluna `chave` do esquema)
+    dados = Column(JSON, nullable=False)
+    importado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class EventoEstado(Base):
+    """
+    Evento do log de estado compartilhado entre workers (backend "sql")
+    Ver services/estado_compartilhado.py
+    """
+    __tablename__ = "eventos_estado"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    origem = Column(String(50), nullable=False)  # Worker que publicou
+    tipo = Column(String(20), nullable=False)  # recomendacoes, feedbacks, limpar
+    dados = Column(JSON, nullable=False)
+    criado_em = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
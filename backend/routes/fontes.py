@@ -3,16 +3,20 @@ Routes de Fontes de Dados - IARECOMEND
 API REST completa com FastAPI
 CRIAR ARQUIVO: backend/routes/fontes.py
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime, timedelta
-import time
-import secrets
-
-from database import get_db
-from models import FonteDados, TipoFonte, StatusFonte
+from database import get_async_db
+from models import FonteDados, TipoFonte, StatusFonte, JobSincronizacao
+from services import conectores
+from services.agregados import estatisticas_fontes, invalidar_estatisticas_fontes
+from services.busca import motor_busca
+from services.conectores import criptografar_senha
+from services.jobs import fila_jobs
+from services.paginacao import definir_cabecalhos, paginar_consulta
+from services.pool_conectores import pool_conectores
 from schemas import (
     FonteDadosCreate,
     FonteDadosUpdate,
@@ -20,7 +24,7 @@ from schemas import (
     TesteConexaoRequest,
     TesteConexaoResponse,
     SincronizacaoRequest,
-    SincronizacaoResponse,
+    JobSincronizacaoResponse,
     FonteDadosStats,
     FonteDadosFiltros
 )
@@ -28,159 +32,52 @@ from schemas import (
 # IMPORTANTE: redirect_slashes=False evita 307 redirects
 router = APIRouter(prefix="/api/fontes", tags=["Fontes de Dados"], redirect_slashes=False)
 
-# ============================================
-# FUNÇÕES AUXILIARES
-# ============================================
-
-def criptografar_senha(senha: str) -> str:
-    """
-    Criptografia simples para demonstração
-    EM PRODUÇÃO: usar Fernet ou similar
-    """
-    if not senha:
-        return None
-    # Apenas para demonstração - em produção usar criptografia real
-    import base64
-    return base64.b64encode(senha.encode()).decode()
-
-def descriptografar_senha(senha_cripto: str) -> str:
-    """Descriptografa senha"""
-    if not senha_cripto:
-        return None
-    import base64
-    return base64.b64decode(senha_cripto.encode()).decode()
-
-def simular_teste_conexao(fonte_config: dict) -> dict:
-    """
-    Simula teste de conexão com a fonte de dados
-    EM PRODUÇÃO: implementar conexões reais
-    """
-    import random
-    time.sleep(random.uniform(0.5, 1.5))  # Simula latência
-    
-    tipo = fonte_config.get('tipo')
-    
-    # Simula falha aleatória (10% de chance)
-    if random.random() < 0.1:
-        return {
-            'sucesso': False,
-            'mensagem': f'Erro ao conectar: Timeout na conexão com {tipo}',
-            'tempo_resposta_ms': random.uniform(3000, 5000),
-            'detalhes': {'erro': 'Connection timeout'}
-        }
-    
-    # Sucesso
-    detalhes_por_tipo = {
-        'mysql': {'versao_servidor': 'MySQL 8.0.35', 'charset': 'utf8mb4', 'tabelas_encontradas': random.randint(20, 100)},
-        'postgresql': {'versao_servidor': 'PostgreSQL 15.3', 'encoding': 'UTF8', 'schemas': random.randint(2, 10)},
-        'sqlserver': {'versao_servidor': 'SQL Server 2022', 'collation': 'Latin1_General_CI_AS'},
-        'oracle': {'versao_servidor': 'Oracle 19c', 'sid': fonte_config.get('database', 'ORCL')},
-        'mongodb': {'versao_servidor': 'MongoDB 7.0', 'collections': random.randint(10, 50)},
-        'api': {'endpoint': fonte_config.get('url_api'), 'status_code': 200, 'formato': 'JSON'},
-        'csv': {'linhas_encontradas': random.randint(100, 10000), 'colunas': random.randint(5, 30)},
-        'excel': {'planilhas': random.randint(1, 5), 'linhas_total': random.randint(500, 20000)}
-    }
-    
-    return {
-        'sucesso': True,
-        'mensagem': f'Conexão estabelecida com sucesso em {tipo.upper()}!',
-        'tempo_resposta_ms': random.uniform(50, 300),
-        'detalhes': detalhes_por_tipo.get(tipo, {})
-    }
-
-def executar_sincronizacao(fonte: FonteDados, force: bool = False) -> dict:
-    """
-    Executa sincronização de dados da fonte
-    EM PRODUÇÃO: implementar lógica real de importação
-    """
-    import random
-    
-    # Verifica se já foi sincronizado recentemente
-    if not force and fonte.ultima_sincronizacao:
-        tempo_desde_sync = (datetime.utcnow() - fonte.ultima_sincronizacao).total_seconds() / 3600
-        if tempo_desde_sync < 1:  # Menos de 1 hora
-            return {
-                'sucesso': False,
-                'mensagem': f'Fonte sincronizada há {tempo_desde_sync:.1f}h. Use force=true para forçar.',
-                'registros_importados': 0,
-                'registros_atualizados': 0,
-                'registros_com_erro': 0,
-                'tempo_total_segundos': 0,
-                'data_sincronizacao': fonte.ultima_sincronizacao
-            }
-    
-    # Simula sincronização
-    inicio = time.time()
-    time.sleep(random.uniform(1, 3))  # Simula processamento
-    
-    registros_importados = random.randint(100, 5000)
-    registros_atualizados = random.randint(10, 500)
-    registros_com_erro = random.randint(0, 10)
-    
-    tempo_total = time.time() - inicio
-    
-    # Atualiza estatísticas da fonte
-    fonte.ultima_sincronizacao = datetime.utcnow()
-    fonte.proxima_sincronizacao = datetime.utcnow() + timedelta(hours=fonte.frequencia_sync_horas)
-    fonte.total_registros_importados += registros_importados
-    fonte.total_erros += registros_com_erro
-    fonte.tempo_ultima_sync_segundos = tempo_total
-    
-    if registros_com_erro > 0:
-        fonte.mensagem_ultimo_erro = f'{registros_com_erro} registros com erro de validação'
-    else:
-        fonte.mensagem_ultimo_erro = None
-        fonte.status = StatusFonte.ATIVA
-    
-    return {
-        'sucesso': True,
-        'mensagem': 'Sincronização concluída com sucesso',
-        'registros_importados': registros_importados,
-        'registros_atualizados': registros_atualizados,
-        'registros_com_erro': registros_com_erro,
-        'tempo_total_segundos': round(tempo_total, 2),
-        'data_sincronizacao': fonte.ultima_sincronizacao
-    }
+# Campos que, alterados, invalidam as conexões da fonte no pool
+CAMPOS_CONEXAO_FONTE = {
+    'host', 'port', 'database', 'username', 'senha_criptografada',
+    'url_api', 'api_key', 'headers_json', 'parametros_adicionais'
+}
 
 # ============================================
 # ENDPOINTS CRUD
 # ============================================
 
 @router.get("/", response_model=List[FonteDadosResponse])
-def listar_fontes(
+async def listar_fontes(
+    request: Request,
+    response: Response,
     busca: Optional[str] = Query(None, description="Buscar por nome"),
     tipo: Optional[str] = Query(None, description="Filtrar por tipo"),
     status: Optional[str] = Query(None, description="Filtrar por status"),
     limite: int = Query(100, ge=1, le=1000, description="Máximo de resultados"),
     offset: int = Query(0, ge=0, description="Pular N resultados"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor de paginação (X-Cursor-Proximo/X-Cursor-Anterior)"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Lista todas as fontes de dados com filtros opcionais
     
     **Filtros:**
-    - `busca`: Busca por nome (case insensitive)
+    - `busca`: Busca por nome (case insensitive), mais relevantes primeiro
     - `tipo`: mysql, postgresql, sqlserver, oracle, mongodb, api, csv, excel
     - `status`: active, inactive, error, pending, syncing
     - `limite`: Quantidade máxima (padrão: 100)
     - `offset`: Pular N resultados (paginação)
+    - `cursor`: Paginação por cursor sobre (criado_em, id), tem prioridade
+      sobre `offset`; os cursores vêm em `X-Cursor-Proximo`/`X-Cursor-Anterior` e `Link`
     
     **Exemplo:**
     ```
     GET /api/fontes?tipo=mysql&status=active&limite=10
     ```
     """
-    query = db.query(FonteDados)
-    
-    # Filtro de busca
-    if busca:
-        query = query.filter(FonteDados.nome.ilike(f"%{busca}%"))
+    filtros = []
     
     # Filtro por tipo
     if tipo:
         try:
             tipo_enum = TipoFonte(tipo)
-            query = query.filter(FonteDados.tipo == tipo_enum)
+            filtros.append(FonteDados.tipo == tipo_enum)
         except ValueError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -191,20 +88,36 @@ def listar_fontes(
     if status:
         try:
             status_enum = StatusFonte(status)
-            query = query.filter(FonteDados.status == status_enum)
+            filtros.append(FonteDados.status == status_enum)
         except ValueError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Status inválido: {status}"
             )
     
-    # Ordenação e paginação
-    fontes = query.order_by(FonteDados.criado_em.desc()).limit(limite).offset(offset).all()
+    # Busca por nome: ordenada por relevância, paginada por offset
+    if busca:
+        if cursor:
+            raise HTTPException(
+                status_code=400,
+                detail="Paginação por cursor não disponível com busca. Use offset"
+            )
+        return await db.run_sync(
+            lambda sessao: motor_busca.buscar(sessao, "fontes", sessao.query(FonteDados).filter(*filtros), busca, limite, offset)
+        )
     
-    return fontes
+    # Ordenação e paginação (cursor ou offset)
+    pagina = await db.run_sync(
+        lambda sessao: paginar_consulta(
+            sessao.query(FonteDados).filter(*filtros), (FonteDados.criado_em, FonteDados.id), limite, cursor, offset
+        )
+    )
+    definir_cabecalhos(request, response, pagina)
+    
+    return pagina.itens
 
 @router.get("/stats", response_model=FonteDadosStats)
-def obter_estatisticas(db: Session = Depends(get_db)):
+async def obter_estatisticas(db: AsyncSession = Depends(get_async_db)):
     """
     Retorna estatísticas gerais das fontes de dados
     
@@ -215,43 +128,14 @@ def obter_estatisticas(db: Session = Depends(get_db)):
     - Total de registros importados
     - Data da última sincronização
     """
-    total = db.query(func.count(FonteDados.id)).scalar()
-    
-    # Por status
-    ativas = db.query(func.count(FonteDados.id)).filter(FonteDados.status == StatusFonte.ATIVA).scalar()
-    inativas = db.query(func.count(FonteDados.id)).filter(FonteDados.status == StatusFonte.INATIVA).scalar()
-    com_erro = db.query(func.count(FonteDados.id)).filter(FonteDados.status == StatusFonte.ERRO).scalar()
-    pendentes = db.query(func.count(FonteDados.id)).filter(FonteDados.status == StatusFonte.PENDENTE).scalar()
-    sincronizando = db.query(func.count(FonteDados.id)).filter(FonteDados.status == StatusFonte.SINCRONIZANDO).scalar()
-    
-    # Por tipo
-    tipos = db.query(FonteDados.tipo, func.count(FonteDados.id)).group_by(FonteDados.tipo).all()
-    por_tipo = {tipo.value: count for tipo, count in tipos}
-    
-    # Total de registros
-    total_registros = db.query(func.sum(FonteDados.total_registros_importados)).scalar() or 0
-    
-    # Última sincronização
-    ultima_sync = db.query(func.max(FonteDados.ultima_sincronizacao)).scalar()
-    
-    return FonteDadosStats(
-        total=total,
-        ativas=ativas,
-        inativas=inativas,
-        com_erro=com_erro,
-        pendentes=pendentes,
-        sincronizando=sincronizando,
-        por_tipo=por_tipo,
-        total_registros_todos=total_registros,
-        ultima_sincronizacao_geral=ultima_sync
-    )
+    return FonteDadosStats(**await db.run_sync(estatisticas_fontes))
 
 @router.get("/{fonte_id}", response_model=FonteDadosResponse)
-def obter_fonte(fonte_id: int, db: Session = Depends(get_db)):
+async def obter_fonte(fonte_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Obtém detalhes de uma fonte específica pelo ID
     """
-    fonte = db.query(FonteDados).filter(FonteDados.id == fonte_id).first()
+    fonte = await db.scalar(select(FonteDados).where(FonteDados.id == fonte_id))
     
     if not fonte:
         raise HTTPException(
@@ -262,7 +146,7 @@ def obter_fonte(fonte_id: int, db: Session = Depends(get_db)):
     return fonte
 
 @router.post("/", response_model=FonteDadosResponse, status_code=status.HTTP_201_CREATED)
-def criar_fonte(fonte_data: FonteDadosCreate, db: Session = Depends(get_db)):
+async def criar_fonte(fonte_data: FonteDadosCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Cria uma nova fonte de dados
     
@@ -286,7 +170,7 @@ def criar_fonte(fonte_data: FonteDadosCreate, db: Session = Depends(get_db)):
     ```
     """
     # Verifica se nome já existe
-    existe = db.query(FonteDados).filter(FonteDados.nome == fonte_data.nome).first()
+    existe = await db.scalar(select(FonteDados).where(FonteDados.nome == fonte_data.nome))
     if existe:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -317,13 +201,15 @@ def criar_fonte(fonte_data: FonteDadosCreate, db: Session = Depends(get_db)):
     )
     
     db.add(nova_fonte)
-    db.commit()
-    db.refresh(nova_fonte)
+    await db.commit()
+    invalidar_estatisticas_fontes()
+    await db.refresh(nova_fonte)
+    motor_busca.atualizar("fontes", nova_fonte)
     
     return nova_fonte
 
 @router.put("/{fonte_id}", response_model=FonteDadosResponse)
-def atualizar_fonte(fonte_id: int, fonte_data: FonteDadosUpdate, db: Session = Depends(get_db)):
+async def atualizar_fonte(fonte_id: int, fonte_data: FonteDadosUpdate, db: AsyncSession = Depends(get_async_db)):
     """
     Atualiza uma fonte de dados existente
     
@@ -332,7 +218,7 @@ def atualizar_fonte(fonte_id: int, fonte_data: FonteDadosUpdate, db: Session = D
     - Status pode ser alterado manualmente
     - Senha é re-criptografada se fornecida
     """
-    fonte = db.query(FonteDados).filter(FonteDados.id == fonte_id).first()
+    fonte = await db.scalar(select(FonteDados).where(FonteDados.id == fonte_id))
     
     if not fonte:
         raise HTTPException(
@@ -349,10 +235,10 @@ def atualizar_fonte(fonte_id: int, fonte_data: FonteDadosUpdate, db: Session = D
     
     # Verifica nome único (se alterado)
     if 'nome' in update_data and update_data['nome'] != fonte.nome:
-        existe = db.query(FonteDados).filter(
+        existe = await db.scalar(select(FonteDados).where(
             FonteDados.nome == update_data['nome'],
             FonteDados.id != fonte_id
-        ).first()
+        ))
         if existe:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -369,19 +255,25 @@ def atualizar_fonte(fonte_id: int, fonte_data: FonteDadosUpdate, db: Session = D
     
     fonte.atualizado_em = datetime.utcnow()
     
-    db.commit()
-    db.refresh(fonte)
+    await db.commit()
+    invalidar_estatisticas_fontes()
+    await db.refresh(fonte)
+    motor_busca.atualizar("fontes", fonte)
+    
+    # Conexão mudou: descarta as engines da fonte no pool de conectores
+    if CAMPOS_CONEXAO_FONTE & update_data.keys():
+        pool_conectores.invalidar(fonte_id)
     
     return fonte
 
 @router.delete("/{fonte_id}", status_code=status.HTTP_204_NO_CONTENT)
-def excluir_fonte(fonte_id: int, db: Session = Depends(get_db)):
+async def excluir_fonte(fonte_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Exclui uma fonte de dados
     
     **ATENÇÃO:** Esta ação não pode ser desfeita!
     """
-    fonte = db.query(FonteDados).filter(FonteDados.id == fonte_id).first()
+    fonte = await db.scalar(select(FonteDados).where(FonteDados.id == fonte_id))
     
     if not fonte:
         raise HTTPException(
@@ -389,8 +281,11 @@ def excluir_fonte(fonte_id: int, db: Session = Depends(get_db)):
             detail=f"Fonte com ID {fonte_id} não encontrada"
         )
     
-    db.delete(fonte)
-    db.commit()
+    await db.delete(fonte)
+    await db.commit()
+    invalidar_estatisticas_fontes()
+    motor_busca.remover("fontes", fonte_id)
+    pool_conectores.invalidar(fonte_id)
     
     return None
 
@@ -399,7 +294,7 @@ def excluir_fonte(fonte_id: int, db: Session = Depends(get_db)):
 # ============================================
 
 @router.post("/testar-conexao", response_model=TesteConexaoResponse)
-def testar_conexao(config: TesteConexaoRequest):
+async def testar_conexao(config: TesteConexaoRequest):
     """
     Testa conexão com uma fonte de dados ANTES de criar/salvar
     
@@ -420,7 +315,7 @@ def testar_conexao(config: TesteConexaoRequest):
     }
     ```
     """
-    resultado = simular_teste_conexao(config.dict())
+    resultado = await conectores.testar_conexao(config.dict())
     
     return TesteConexaoResponse(
         sucesso=resultado['sucesso'],
@@ -429,24 +324,29 @@ def testar_conexao(config: TesteConexaoRequest):
         detalhes=resultado.get('detalhes')
     )
 
-@router.post("/{fonte_id}/sincronizar", response_model=SincronizacaoResponse)
-def sincronizar_fonte(
+@router.post(
+    "/{fonte_id}/sincronizar",
+    response_model=JobSincronizacaoResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def sincronizar_fonte(
     fonte_id: int,
     sync_request: SincronizacaoRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Inicia sincronização manual de uma fonte de dados
+    Agenda a sincronização manual de uma fonte de dados
+    
+    A importação roda em segundo plano no pool de workers. A resposta
+    (202) traz o job criado; acompanhe em `GET /api/fontes/jobs/{id}`.
     
     **Parâmetros:**
     - `force`: Se true, força sincronização mesmo que já tenha sido feita recentemente
     
     **Retorna:**
-    - Estatísticas da sincronização
-    - Quantidade de registros importados/atualizados
-    - Tempo total de processamento
+    - Job com status `pending`
     """
-    fonte = db.query(FonteDados).filter(FonteDados.id == fonte_id).first()
+    fonte = await db.scalar(select(FonteDados).where(FonteDados.id == fonte_id))
     
     if not fonte:
         raise HTTPException(
@@ -454,40 +354,66 @@ def sincronizar_fonte(
             detail=f"Fonte com ID {fonte_id} não encontrada"
         )
     
-    if fonte.status == StatusFonte.SINCRONIZANDO:
+    if fonte.status == StatusFonte.SINCRONIZANDO or await db.run_sync(fila_jobs.job_ativo, fonte_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Fonte já está sincronizando. Aguarde a conclusão."
+        )
+    
+    # Verifica se já foi sincronizado recentemente
+    if not sync_request.force and fonte.ultima_sincronizacao:
+        tempo_desde_sync = (datetime.utcnow() - fonte.ultima_sincronizacao).total_seconds() / 3600
+        if tempo_desde_sync < 1:  # Menos de 1 hora
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Fonte sincronizada há {tempo_desde_sync:.1f}h. Use force=true para forçar."
+            )
+    
+    # Verificação acima é só a resposta rápida: a reivindicação é atômica
+    job = await db.run_sync(fila_jobs.enfileirar_se_livre, fonte, force=sync_request.force)
+    if job is None:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Fonte já está sincronizando. Aguarde a conclusão."
         )
+    return job
+
+@router.get("/conectores/metricas")
+async def metricas_conectores():
+    """
+    Métricas do pool de conectores (engines por fonte externa)
+    
+    **Retorna:**
+    - Entradas no pool e tamanho máximo
+    - Hits, misses e taxa de hit
+    - Evictions por ociosidade/LRU e invalidações
+    """
+    return pool_conectores.metricas()
+
+@router.get("/jobs/{job_id}", response_model=JobSincronizacaoResponse)
+async def obter_job(job_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Acompanha um job de sincronização
     
-    # Marca como sincronizando
-    fonte.status = StatusFonte.SINCRONIZANDO
-    db.commit()
-    
-    try:
-        # Executa sincronização
-        resultado = executar_sincronizacao(fonte, force=sync_request.force)
-        
-        # Atualiza fonte no banco
-        db.commit()
-        db.refresh(fonte)
-        
-        return SincronizacaoResponse(**resultado)
-    
-    except Exception as e:
-        fonte.status = StatusFonte.ERRO
-        fonte.mensagem_ultimo_erro = str(e)
-        db.commit()
-        
+    **Retorna:**
+    - Status (pending, running, done, error)
+    - Registros processados, total estimado, percentual e ETA
+    - Resultado da importação quando concluído
+    """
+    job = await db.scalar(select(JobSincronizacao).where(JobSincronizacao.id == job_id))
+    
+    if not job:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Erro durante sincronização: {str(e)}"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job com ID {job_id} não encontrado"
         )
+    
+    return job
 
 @router.post("/{fonte_id}/ativar")
-def ativar_fonte(fonte_id: int, db: Session = Depends(get_db)):
+async def ativar_fonte(fonte_id: int, db: AsyncSession = Depends(get_async_db)):
     """Ativa uma fonte de dados"""
-    fonte = db.query(FonteDados).filter(FonteDados.id == fonte_id).first()
+    fonte = await db.scalar(select(FonteDados).where(FonteDados.id == fonte_id))
     
     if not fonte:
         raise HTTPException(
@@ -498,14 +424,15 @@ def ativar_fonte(fonte_id: int, db: Session = Depends(get_db)):
     fonte.status = StatusFonte.ATIVA
     fonte.atualizado_em = datetime.utcnow()
     
-    db.commit()
+    await db.commit()
+    invalidar_estatisticas_fontes()
     
     return {"message": f"Fonte '{fonte.nome}' ativada com sucesso", "status": "active"}
 
 @router.post("/{fonte_id}/desativar")
-def desativar_fonte(fonte_id: int, db: Session = Depends(get_db)):
+async def desativar_fonte(fonte_id: int, db: AsyncSession = Depends(get_async_db)):
     """Desativa uma fonte de dados"""
-    fonte = db.query(FonteDados).filter(FonteDados.id == fonte_id).first()
+    fonte = await db.scalar(select(FonteDados).where(FonteDados.id == fonte_id))
     
     if not fonte:
         raise HTTPException(
@@ -516,6 +443,7 @@ def desativar_fonte(fonte_id: int, db: Session = Depends(get_db)):
     fonte.status = StatusFonte.INATIVA
     fonte.atualizado_em = datetime.utcnow()
     
-    db.commit()
+    await db.commit()
+    invalidar_estatisticas_fontes()
     
     return {"message": f"Fonte '{fonte.nome}' desativada", "status": "inactive"}
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""
+Rotas administrativas do perfilador de requests
+Download dos últimos perfis (pilhas collapsed para flamegraph)
+"""
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+import hmac
+
+from services.perfilador import perfilador
+
+# IMPORTANTE: redirect_slashes=False evita 307 redirects
+router = APIRouter(prefix="/api/admin/perfis", tags=["Administração"], redirect_slashes=False)
+
+def verificar_token(token: Optional[str]):
+    """Exige X-Perfil-Token igual a PERFIL_TOKEN (sem token configurado, tudo 403)"""
+    if not perfilador.token or not token or not hmac.compare_digest(token.encode(), perfilador.token):
+        raise HTTPException(status_code=403, detail="Token do perfilador inválido ou não configurado")
+
+@router.get("/")
+def listar_perfis(
+    limite: int = Query(20, ge=1, le=1000, description="Quantidade de perfis (mais recentes primeiro)"),
+    x_perfil_token: Optional[str] = Header(None)
+):
+    """
+    Lista os perfis guardados no buffer (sem as pilhas)
+    
+    **Como perfilar:**
+    - Cabeçalho `X-Perfil: <PERFIL_TOKEN>` no request desejado (o id volta em `X-Perfil-Id`)
+    - Ou `PERFIL_TAXA_AMOSTRAGEM` > 0 para perfilar uma fração dos requests
+    
+    **Retorna:**
+    - id, método, rota, status, duração, intervalo e quantidade de amostras
+    """
+    verificar_token(x_perfil_token)
+    return [perfil.resumo() for perfil in perfilador.ultimos(limite)]
+
+@router.get("/download", response_class=PlainTextResponse)
+def baixar_perfis(
+    limite: int = Query(20, ge=1, le=1000, description="Quantidade de perfis (mais recentes primeiro)"),
+    id: Optional[int] = Query(None, description="Baixa só este perfil (X-Perfil-Id)"),
+    x_perfil_token: Optional[str] = Header(None)
+):
+    """
+    Baixa os últimos N perfis no formato collapsed ("raiz;...;folha N")
+    
+    Cada pilha começa por "MÉTODO /rota", então o arquivo serve direto para
+    flamegraph.pl, inferno-flamegraph ou speedscope, separado por endpoint.
+    
+    **Exemplo:**
+    ```
+    curl -H "X-Perfil-Token: $PERFIL_TOKEN" \\
+        "/api/admin/perfis/download?limite=10" | flamegraph.pl > perfis.svg
+    ```
+    """
+    verificar_token(x_perfil_token)
+    
+    if id is not None:
+        perfil = perfilador.obter(id)
+        if perfil is None:
+            raise HTTPException(status_code=404, detail=f"Perfil {id} não encontrado (fora do buffer)")
+        perfis = [perfil]
+    else:
+        perfis = perfilador.ultimos(limite)
+    
+    return PlainTextResponse(
+        "".join(perfil.collapsed() for perfil in perfis),
+        headers={"Content-Disposition": 'attachment; filename="perfis.collapsed"'}
+    )
@@ -3,11 +3,30 @@ Routes de Recomendação de Produtos - IARECOMEND
 API REST com FastAPI
 Simula IA de recomendação com dados mockados dinâmicos
 """
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from datetime import datetime
+import json
 import random
+import time
+import uuid
+
+from config import settings
+from services.catalogo import CatalogoProdutos
+from services.estatisticas import AgregadorEstatisticas, horarios_pico
+from services.historico import HistoricoRecomendacoes
+from services.metricas import etapa, registrar_etapas
+from services.motivos import MotorMotivos, carregar_config
+from services.motor_recomendacao import MotorRecomendacao
+from services.paginacao import PROXIMO, decodificar_cursor, definir_cabecalhos, montar_pagina
+from services.cache_respostas import cache_respostas
+from services.estado_compartilhado import (
+    EVENTO_FEEDBACKS, EVENTO_LIMPAR, EVENTO_RECOMENDACOES, estado_compartilhado
+)
+from services.persistencia import fila_escrita
+from services.resumo_clientes import ResumosClientes
 
 router = APIRouter(
     prefix="/api/recomendacoes",
@@ -126,6 +145,15 @@ PRODUTOS_MOCK = [
     {"id": "AC003", "nome": "Hub USB 7 Portas", "categoria": "Acessórios", "preco": 89.00, "estoque": 30, "tags": ["conectividade", "usb", "hub"]},
 ]
 
+# Catálogo em formato colunar (NumPy) usado na seleção de candidatos
+CATALOGO = CatalogoProdutos(PRODUTOS_MOCK)
+
+# Regras de motivo compiladas (configuráveis por MOTIVOS_CONFIG_ARQUIVO)
+MOTIVOS = MotorMotivos(carregar_config(settings.MOTIVOS_CONFIG_ARQUIVO), PRODUTOS_MOCK)
+
+# Versão do modelo (entra na seed determinística e no cache do motor)
+VERSAO_MODELO = "v2.3.1"
+
 # ============================================
 # HISTÓRICO DE RECOMENDAÇÕES (MOCK)
 # ============================================
@@ -152,7 +180,7 @@ def gerar_id_recomendacao_mock(dias_atras):
     return f"REC-{timestamp}-{random_suffix}"
 
 # Histórico de recomendações dos últimos 30 dias
-RECOMENDACOES_HISTORICO = [
+RECOMENDACOES_MOCK = [
     # Dia 1 - Cliente VIP Maria Santos
     {
         "id_recomendacao": gerar_id_recomendacao_mock(1),
@@ -715,6 +743,9 @@ RECOMENDACOES_HISTORICO = [
     }
 ]
 
+# Store indexado do histórico (inicializado com os dados mockados)
+RECOMENDACOES_HISTORICO = HistoricoRecomendacoes(RECOMENDACOES_MOCK)
+
 # ============================================
 # HISTÓRICO DE FEEDBACKS (MOCK)
 # ============================================
@@ -724,7 +755,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251027143522-1234",
         "data_registro": gerar_data_passada(1),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[0]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[0]["id_recomendacao"],
         "id_produto": "NB002",
         "aceito": True,
         "comprado": True,
@@ -734,7 +765,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251027143545-1235",
         "data_registro": gerar_data_passada(1),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[0]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[0]["id_recomendacao"],
         "id_produto": "MN002",
         "aceito": True,
         "comprado": True,
@@ -744,7 +775,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251027143601-1236",
         "data_registro": gerar_data_passada(1),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[0]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[0]["id_recomendacao"],
         "id_produto": "PR003",
         "aceito": True,
         "comprado": False,
@@ -754,7 +785,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251027143615-1237",
         "data_registro": gerar_data_passada(1),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[0]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[0]["id_recomendacao"],
         "id_produto": "AR003",
         "aceito": False,
         "comprado": False,
@@ -766,7 +797,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251026101234-2341",
         "data_registro": gerar_data_passada(2),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[1]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[1]["id_recomendacao"],
         "id_produto": "SM002",
         "aceito": False,
         "comprado": False,
@@ -776,7 +807,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251026101301-2342",
         "data_registro": gerar_data_passada(2),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[1]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[1]["id_recomendacao"],
         "id_produto": "TB002",
         "aceito": True,
         "comprado": False,
@@ -786,7 +817,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251026101322-2343",
         "data_registro": gerar_data_passada(2),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[1]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[1]["id_recomendacao"],
         "id_produto": "AC001",
         "aceito": True,
         "comprado": True,
@@ -798,7 +829,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251025153012-3451",
         "data_registro": gerar_data_passada(3),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[2]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[2]["id_recomendacao"],
         "id_produto": "SM004",
         "aceito": True,
         "comprado": True,
@@ -808,7 +839,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251025153045-3452",
         "data_registro": gerar_data_passada(3),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[2]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[2]["id_recomendacao"],
         "id_produto": "TB001",
         "aceito": True,
         "comprado": False,
@@ -818,7 +849,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251025153112-3453",
         "data_registro": gerar_data_passada(3),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[2]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[2]["id_recomendacao"],
         "id_produto": "AC002",
         "aceito": True,
         "comprado": True,
@@ -828,7 +859,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251025153134-3454",
         "data_registro": gerar_data_passada(3),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[2]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[2]["id_recomendacao"],
         "id_produto": "PR004",
         "aceito": False,
         "comprado": False,
@@ -840,7 +871,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251023093012-4561",
         "data_registro": gerar_data_passada(5),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[3]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[3]["id_recomendacao"],
         "id_produto": "NB001",
         "aceito": True,
         "comprado": True,
@@ -850,7 +881,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251023093045-4562",
         "data_registro": gerar_data_passada(5),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[3]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[3]["id_recomendacao"],
         "id_produto": "MN001",
         "aceito": True,
         "comprado": True,
@@ -860,7 +891,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251023093112-4563",
         "data_registro": gerar_data_passada(5),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[3]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[3]["id_recomendacao"],
         "id_produto": "PR001",
         "aceito": False,
         "comprado": False,
@@ -872,7 +903,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251021173522-5671",
         "data_registro": gerar_data_passada(7),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[4]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[4]["id_recomendacao"],
         "id_produto": "NB005",
         "aceito": True,
         "comprado": True,
@@ -882,7 +913,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251021173545-5672",
         "data_registro": gerar_data_passada(7),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[4]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[4]["id_recomendacao"],
         "id_produto": "MN003",
         "aceito": True,
         "comprado": True,
@@ -892,7 +923,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251021173601-5673",
         "data_registro": gerar_data_passada(7),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[4]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[4]["id_recomendacao"],
         "id_produto": "PR002",
         "aceito": True,
         "comprado": True,
@@ -902,7 +933,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251021173622-5674",
         "data_registro": gerar_data_passada(7),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[4]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[4]["id_recomendacao"],
         "id_produto": "PR003",
         "aceito": True,
         "comprado": True,
@@ -914,7 +945,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251018113012-6781",
         "data_registro": gerar_data_passada(10),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[5]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[5]["id_recomendacao"],
         "id_produto": "SM001",
         "aceito": True,
         "comprado": True,
@@ -924,7 +955,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251018113045-6782",
         "data_registro": gerar_data_passada(10),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[5]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[5]["id_recomendacao"],
         "id_produto": "TB001",
         "aceito": False,
         "comprado": False,
@@ -934,7 +965,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251018113112-6783",
         "data_registro": gerar_data_passada(10),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[5]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[5]["id_recomendacao"],
         "id_produto": "AC001",
         "aceito": True,
         "comprado": True,
@@ -946,7 +977,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251016143522-7891",
         "data_registro": gerar_data_passada(12),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[6]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[6]["id_recomendacao"],
         "id_produto": "SM003",
         "aceito": True,
         "comprado": True,
@@ -956,7 +987,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251016143545-7892",
         "data_registro": gerar_data_passada(12),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[6]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[6]["id_recomendacao"],
         "id_produto": "TB003",
         "aceito": True,
         "comprado": False,
@@ -966,7 +997,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251016143601-7893",
         "data_registro": gerar_data_passada(12),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[6]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[6]["id_recomendacao"],
         "id_produto": "AR001",
         "aceito": True,
         "comprado": True,
@@ -976,7 +1007,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251016143622-7894",
         "data_registro": gerar_data_passada(12),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[6]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[6]["id_recomendacao"],
         "id_produto": "AC003",
         "aceito": False,
         "comprado": False,
@@ -988,7 +1019,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251013163012-8901",
         "data_registro": gerar_data_passada(15),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[7]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[7]["id_recomendacao"],
         "id_produto": "NB003",
         "aceito": True,
         "comprado": True,
@@ -998,7 +1029,7 @@ FEEDBACKS_HISTORICO = [
     {
         "id_feedback": "FDB-20251013163045-8902",
         "data_registro": gerar_data_passada(15),
-        "id_recomendacao": RECOMENDACOES_HISTORICO[7]["id_recomendacao"],
+        "id_recomendacao": RECOMENDACOES_MOCK[7]["id_recomendacao"],
         "id_produto": "SM005",
         "aceito": True,
         "comprado": False,
@@ -1007,6 +1038,35 @@ FEEDBACKS_HISTORICO = [
     }
 ]
 
+# IDs de FEEDBACKS_HISTORICO (dedup em O(1) ao aplicar eventos de outros workers)
+IDS_FEEDBACKS = {fb["id_feedback"] for fb in FEEDBACKS_HISTORICO}
+
+def adicionar_feedback(feedback: dict) -> bool:
+    """
+    Adiciona o feedback ao histórico e aos agregados
+    Retorna False (sem alterar nada) se o id_feedback já existe
+    """
+    if feedback["id_feedback"] in IDS_FEEDBACKS:
+        return False
+    IDS_FEEDBACKS.add(feedback["id_feedback"])
+    FEEDBACKS_HISTORICO.append(feedback)
+    ESTATISTICAS.registrar_feedback(feedback)
+    RESUMOS_CLIENTES.registrar_feedback(feedback, cliente_da_recomendacao(feedback["id_recomendacao"]))
+    return True
+
+def cliente_da_recomendacao(id_recomendacao: str) -> Optional[str]:
+    """ID do cliente dono da recomendação (None se não existir)"""
+    recomendacao = RECOMENDACOES_HISTORICO.obter(id_recomendacao)
+    return recomendacao["id_cliente"] if recomendacao else None
+
+# Agregador incremental das estatísticas (reconstruído a partir do mock)
+ESTATISTICAS = AgregadorEstatisticas()
+ESTATISTICAS.reconstruir(RECOMENDACOES_HISTORICO, FEEDBACKS_HISTORICO)
+
+# Rollups por cliente para /cliente/{id}/resumo e /cliente/{id}/produtos
+RESUMOS_CLIENTES = ResumosClientes()
+RESUMOS_CLIENTES.reconstruir(RECOMENDACOES_HISTORICO, FEEDBACKS_HISTORICO, cliente_da_recomendacao)
+
 # ============================================
 # ESTATÍSTICAS CALCULADAS
 # ============================================
@@ -1023,203 +1083,326 @@ FEEDBACKS_HISTORICO = [
 # FUNÇÕES AUXILIARES - SIMULAÇÃO DE IA
 # ============================================
 
-def simular_score_ia():
+def simular_score_ia(rng: random.Random = random):
     """Simula score de confiança da IA entre 65-98%"""
-    return round(random.uniform(65.0, 98.0), 2)
+    return round(rng.uniform(65.0, 98.0), 2)
 
-def gerar_motivo_recomendacao(cliente_info: ClienteInfo, produto: dict) -> str:
-    """Gera motivo personalizado baseado no perfil do cliente"""
-    motivos = []
-    
-    # Baseado no histórico de categorias
-    if cliente_info.historico_categorias:
-        if produto["categoria"] in cliente_info.historico_categorias:
-            motivos.append(f"Você já comprou produtos de {produto['categoria']}")
-        else:
-            categorias_complementares = {
-                "Notebooks": ["Periféricos", "Monitores", "Acessórios"],
-                "Smartphones": ["Acessórios", "Armazenamento"],
-                "Tablets": ["Acessórios", "Periféricos"],
-            }
-            for cat_comprada in cliente_info.historico_categorias:
-                if cat_comprada in categorias_complementares:
-                    if produto["categoria"] in categorias_complementares[cat_comprada]:
-                        motivos.append(f"Complementa seu {cat_comprada}")
-    
-    # Baseado no valor médio de compra
-    if cliente_info.valor_medio_compra:
-        if abs(produto["preco"] - cliente_info.valor_medio_compra) < 1000:
-            motivos.append(f"Dentro da sua faixa de preço habitual")
-        elif produto["preco"] < cliente_info.valor_medio_compra:
-            motivos.append(f"Excelente custo-benefício para você")
-    
-    # Baseado na frequência
-    if cliente_info.frequencia_compra == "Alta":
-        motivos.append("Cliente VIP - produto em destaque")
-    
-    # Baseado nas tags do produto
-    if "custo-beneficio" in produto["tags"] and cliente_info.valor_medio_compra and cliente_info.valor_medio_compra < 3000:
-        motivos.append("Melhor custo-benefício da categoria")
-    
-    if "premium" in produto["tags"] and cliente_info.valor_medio_compra and cliente_info.valor_medio_compra > 5000:
-        motivos.append("Produto premium recomendado")
-    
-    # Motivos genéricos da IA
-    motivos_genericos = [
-        "Tendência de compra identificada pela IA",
-        "Produto mais vendido para perfis similares",
-        "Alta taxa de satisfação entre clientes parecidos",
-        "Promoção exclusiva detectada",
-        "Estoque limitado - oportunidade única"
-    ]
-    
-    if not motivos:
-        motivos.append(random.choice(motivos_genericos))
-    
-    return " | ".join(motivos[:2])  # Máximo 2 motivos
+def gerar_motivo_recomendacao(cliente_info: ClienteInfo, produto: dict, rng: random.Random = random) -> str:
+    """Gera motivo personalizado baseado no perfil do cliente (regras em MOTIVOS)"""
+    motivo = MOTIVOS.motivos_lote(cliente_info, [produto])[0]
+    return motivo if motivo is not None else MOTIVOS.generico(rng)
 
-def aplicar_desconto_personalizado(preco: float, cliente_info: ClienteInfo) -> float:
+def aplicar_desconto_personalizado(preco: float, cliente_info: ClienteInfo, rng: random.Random = random) -> float:
     """Aplica desconto personalizado baseado no perfil"""
     desconto = 0.0
     
     # Cliente VIP
     if cliente_info.frequencia_compra == "Alta":
-        desconto = random.uniform(5.0, 15.0)
+        desconto = rng.uniform(5.0, 15.0)
     
     # Primeira compra na categoria
     elif not cliente_info.historico_categorias:
-        desconto = random.uniform(3.0, 10.0)
+        desconto = rng.uniform(3.0, 10.0)
     
     # Desconto aleatório ocasional
-    elif random.random() < 0.3:  # 30% de chance
-        desconto = random.uniform(2.0, 8.0)
+    elif rng.random() < 0.3:  # 30% de chance
+        desconto = rng.uniform(2.0, 8.0)
     
     return round(desconto, 2)
 
-def selecionar_produtos_ia(cliente_info: ClienteInfo, quantidade: int = 5) -> List[dict]:
+def selecionar_produtos_ia(cliente_info: ClienteInfo, quantidade: int = 5, rng: random.Random = random) -> List[dict]:
     """
     Algoritmo de IA simulado para selecionar produtos
     Considera: histórico, preço médio, frequência e categorias
-    """
-    produtos_candidatos = PRODUTOS_MOCK.copy()
-    random.shuffle(produtos_candidatos)
     
-    # Peso maior para categorias já compradas
-    produtos_priorizados = []
-    produtos_novos = []
+    Pontua todo o catálogo em uma passada vetorizada (ver services/catalogo.py)
+    e escolhe o top-k mantendo o mix 60% categorias conhecidas / 40% novas
+    """
+    with etapa("selecao"):
+        return CATALOGO.selecionar(cliente_info, quantidade, rng)
+
+def gerar_id_recomendacao() -> str:
+    """
+    Gera ID único para recomendação
+    Sufixo de uuid4 (64 bits): vários IDs por segundo, em vários workers,
+    sem colisão (o sufixo aleatório de 4 dígitos colidia no /gerar-lote)
+    """
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    return f"REC-{timestamp}-{uuid.uuid4().hex[:16]}"
+
+def gerar_id_feedback() -> str:
+    """Gera ID único para feedback (mesmo formato de gerar_id_recomendacao)"""
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    return f"FDB-{timestamp}-{uuid.uuid4().hex[:16]}"
+
+def restaurar_historico(recomendacoes: List[dict], feedbacks: List[dict]):
+    """
+    Restaura no histórico em memória as recomendações e feedbacks persistidos
+    Chamado no lifespan da aplicação após init_db()
+    """
+    for recomendacao in recomendacoes:
+        if RECOMENDACOES_HISTORICO.adicionar(recomendacao):
+            ESTATISTICAS.registrar_recomendacao(recomendacao)
+            RESUMOS_CLIENTES.registrar_recomendacao(recomendacao)
     
-    for produto in produtos_candidatos:
-        if cliente_info.historico_categorias and produto["categoria"] in cliente_info.historico_categorias:
-            produtos_priorizados.append(produto)
+    for feedback in feedbacks:
+        adicionar_feedback(feedback)
+
+def limpar_estado_local():
+    """Esvazia histórico, feedbacks e agregados deste processo"""
+    RECOMENDACOES_HISTORICO.limpar()
+    FEEDBACKS_HISTORICO.clear()
+    IDS_FEEDBACKS.clear()
+    ESTATISTICAS.limpar()
+    RESUMOS_CLIENTES.limpar()
+
+def aplicar_eventos_estado(eventos: List[dict]):
+    """
+    Aplica eventos publicados por outros workers (services/estado_compartilhado.py)
+    Reaproveita restaurar_historico, que ignora itens já presentes
+    """
+    alterado = False
+    for evento in eventos:
+        if evento["tipo"] == EVENTO_LIMPAR:
+            limpar_estado_local()
+        elif evento["tipo"] == EVENTO_RECOMENDACOES:
+            restaurar_historico(evento["dados"], [])
+        elif evento["tipo"] == EVENTO_FEEDBACKS:
+            restaurar_historico([], evento["dados"])
         else:
-            produtos_novos.append(produto)
+            continue
+        alterado = True
+    if alterado:
+        cache_respostas.invalidar_local("recomendacoes")
+
+estado_compartilhado.configurar(aplicar_eventos_estado)
+
+# ============================================
+# GERAÇÃO DE RECOMENDAÇÕES
+# ============================================
+
+def montar_produtos(
+    cliente: ClienteInfo,
+    produtos_selecionados: List[dict],
+    rng: random.Random
+) -> Tuple[List[ProdutoRecomendado], dict]:
+    """
+    Parte determinística da recomendação: produtos com desconto, score e
+    motivo (usando o RNG do request) e os metadados agregados
+    """
+    # Motivos do lote inteiro de uma vez; o genérico (sorteado) fica no laço
+    # para consumir o RNG na mesma ordem de antes
+    with etapa("motivo"):
+        motivos = MOTIVOS.motivos_lote(cliente, produtos_selecionados)
+    
+    # Montar lista de produtos recomendados (etapas na ordem de consumo do RNG)
+    produtos_recomendados = []
+    for produto, motivo in zip(produtos_selecionados, motivos):
+        with etapa("desconto"):
+            desconto = aplicar_desconto_personalizado(produto["preco"], cliente, rng)
+            preco_final = produto["preco"] * (1 - desconto / 100)
+        
+        with etapa("pontuacao"):
+            confianca = simular_score_ia(rng)
+        
+        with etapa("motivo"):
+            if motivo is None:
+                motivo = MOTIVOS.generico(rng)
+        
+        produto_rec = ProdutoRecomendado(
+            id_produto=produto["id"],
+            nome=produto["nome"],
+            categoria=produto["categoria"],
+            preco=produto["preco"],
+            desconto=desconto,
+            preco_final=round(preco_final, 2),
+            confianca_ia=confianca,
+            motivo_recomendacao=motivo,
+            estoque_disponivel=produto["estoque"],
+            url_imagem=f"https://api.shopinfo.com/images/{produto['id']}.jpg",
+            tags=produto["tags"]
+        )
+        produtos_recomendados.append(produto_rec)
     
-    # Mix: 60% produtos de categorias conhecidas, 40% novos
-    num_priorizados = int(quantidade * 0.6)
-    num_novos = quantidade - num_priorizados
+    # Ordenar por confiança da IA
+    produtos_recomendados.sort(key=lambda x: x.confianca_ia, reverse=True)
     
-    selecionados = (
-        produtos_priorizados[:num_priorizados] + 
-        produtos_novos[:num_novos]
+    metadados = {
+        "perfil_cliente": {
+            "historico_categorias": cliente.historico_categorias or [],
+            "valor_medio": cliente.valor_medio_compra,
+            "frequencia": cliente.frequencia_compra
+        },
+        "confianca_media": round(sum(p.confianca_ia for p in produtos_recomendados) / len(produtos_recomendados), 2),
+        "desconto_medio": round(sum(p.desconto for p in produtos_recomendados) / len(produtos_recomendados), 2),
+        "versao_modelo": VERSAO_MODELO
+    }
+    return produtos_recomendados, metadados
+
+def montar_recomendacao(
+    cliente: ClienteInfo,
+    montagem: Tuple[List[ProdutoRecomendado], dict],
+    inicio_ns: int,
+    semente: int
+) -> RecomendacaoResponse:
+    """
+    Monta a resposta a partir de montar_produtos (possivelmente do cache
+    do motor) com ID, data e tempo de processamento próprios
+    (`inicio_ns`: time.perf_counter_ns() no início do processamento)
+    """
+    produtos_recomendados, metadados = montagem
+    
+    # Calcular tempo de processamento
+    tempo_ms = (time.perf_counter_ns() - inicio_ns) // 1_000_000
+    
+    # Criar resposta
+    id_rec = gerar_id_recomendacao()
+    return RecomendacaoResponse(
+        id_recomendacao=id_rec,
+        id_cliente=cliente.id_cliente,
+        nome_cliente=cliente.nome,
+        data_geracao=datetime.now().isoformat(),
+        produtos_recomendados=produtos_recomendados,
+        total_recomendacoes=len(produtos_recomendados),
+        algoritmo_usado="Collaborative Filtering + Content-Based + Neural Network (Simulado)",
+        tempo_processamento_ms=tempo_ms,
+        metadados={**metadados, "semente": semente}
     )
-    
-    # Garantir que temos a quantidade solicitada
-    if len(selecionados) < quantidade:
-        selecionados += produtos_candidatos[:quantidade - len(selecionados)]
-    
-    return selecionados[:quantidade]
 
-def gerar_id_recomendacao() -> str:
-    """Gera ID único para recomendação"""
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    random_suffix = random.randint(1000, 9999)
-    return f"REC-{timestamp}-{random_suffix}"
+# Motor com RNG por request e cache de (seed, perfil) -> produtos montados
+MOTOR = MotorRecomendacao(
+    selecionar=selecionar_produtos_ia,
+    montar=montar_produtos,
+    versao_modelo=VERSAO_MODELO,
+    max_entradas=settings.MOTOR_CACHE_MAX_ENTRADAS,
+    ttl_segundos=settings.MOTOR_CACHE_TTL_SEGUNDOS
+)
 
-def gerar_id_feedback() -> str:
-    """Gera ID único para feedback"""
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    random_suffix = random.randint(1000, 9999)
-    return f"FDB-{timestamp}-{random_suffix}"
+def salvar_recomendacao(recomendacao: RecomendacaoResponse, publicar: bool = True) -> dict:
+    """
+    Salva no histórico, enfileira gravação no banco e publica para os
+    demais workers (`publicar=False` quando o chamador publica em lote)
+    """
+    recomendacao_dict = recomendacao.dict()
+    if not RECOMENDACOES_HISTORICO.adicionar(recomendacao_dict):
+        # Estatísticas e resumos só contam IDs novos
+        raise HTTPException(
+            status_code=409,
+            detail=f"Recomendação {recomendacao.id_recomendacao} já existe no histórico"
+        )
+    ESTATISTICAS.registrar_recomendacao(recomendacao_dict)
+    RESUMOS_CLIENTES.registrar_recomendacao(recomendacao_dict)
+    fila_escrita.enfileirar_recomendacao(recomendacao_dict)
+    if publicar:
+        estado_compartilhado.publicar(EVENTO_RECOMENDACOES, [recomendacao_dict])
+    return recomendacao_dict
 
 # ============================================
 # ENDPOINTS DA API
 # ============================================
 
+# Máximo de clientes por chamada de /gerar-lote e tamanho do bloco processado por vez
+LIMITE_CLIENTES_LOTE = 50000
+TAMANHO_BLOCO_LOTE = 256
+
 @router.post("/gerar", response_model=RecomendacaoResponse)
-def gerar_recomendacao(cliente: ClienteInfo, quantidade: int = Query(default=5, ge=1, le=20)):
+def gerar_recomendacao(
+    cliente: ClienteInfo,
+    quantidade: int = Query(default=5, ge=1, le=20),
+    seed: Optional[int] = Query(default=None, description="Semente do RNG (resultados reproduzíveis)")
+):
     """
     Gera recomendações personalizadas usando IA simulada
     
     - **cliente**: Informações do cliente para personalização
     - **quantidade**: Número de produtos a recomendar (1-20)
+    - **seed**: Semente opcional; a mesma seed gera os mesmos produtos, descontos e scores.
+      Sem seed, ela é derivada de (id_cliente, versão do modelo, dia): o mesmo
+      cliente recebe o mesmo resultado ao longo do dia. A seed usada volta em
+      `metadados.semente`
     
     Retorna lista de produtos recomendados com scores de confiança
     """
     try:
-        inicio = datetime.now()
-        
-        # Simular processamento da IA
-        produtos_selecionados = selecionar_produtos_ia(cliente, quantidade)
-        
-        # Montar lista de produtos recomendados
-        produtos_recomendados = []
-        for produto in produtos_selecionados:
-            desconto = aplicar_desconto_personalizado(produto["preco"], cliente)
-            preco_final = produto["preco"] * (1 - desconto / 100)
+        # Etapas (seleção, desconto, pontuação, motivo, serialização) vão para /metrics
+        with registrar_etapas():
+            inicio = time.perf_counter_ns()
             
-            produto_rec = ProdutoRecomendado(
-                id_produto=produto["id"],
-                nome=produto["nome"],
-                categoria=produto["categoria"],
-                preco=produto["preco"],
-                desconto=desconto,
-                preco_final=round(preco_final, 2),
-                confianca_ia=simular_score_ia(),
-                motivo_recomendacao=gerar_motivo_recomendacao(cliente, produto),
-                estoque_disponivel=produto["estoque"],
-                url_imagem=f"https://api.shopinfo.com/images/{produto['id']}.jpg",
-                tags=produto["tags"]
-            )
-            produtos_recomendados.append(produto_rec)
-        
-        # Ordenar por confiança da IA
-        produtos_recomendados.sort(key=lambda x: x.confianca_ia, reverse=True)
-        
-        # Calcular tempo de processamento
-        fim = datetime.now()
-        tempo_ms = int((fim - inicio).total_seconds() * 1000)
-        
-        # Criar resposta
-        id_rec = gerar_id_recomendacao()
-        recomendacao = RecomendacaoResponse(
-            id_recomendacao=id_rec,
-            id_cliente=cliente.id_cliente,
-            nome_cliente=cliente.nome,
-            data_geracao=datetime.now().isoformat(),
-            produtos_recomendados=produtos_recomendados,
-            total_recomendacoes=len(produtos_recomendados),
-            algoritmo_usado="Collaborative Filtering + Content-Based + Neural Network (Simulado)",
-            tempo_processamento_ms=tempo_ms,
-            metadados={
-                "perfil_cliente": {
-                    "historico_categorias": cliente.historico_categorias or [],
-                    "valor_medio": cliente.valor_medio_compra,
-                    "frequencia": cliente.frequencia_compra
-                },
-                "confianca_media": round(sum(p.confianca_ia for p in produtos_recomendados) / len(produtos_recomendados), 2),
-                "desconto_medio": round(sum(p.desconto for p in produtos_recomendados) / len(produtos_recomendados), 2),
-                "versao_modelo": "v2.3.1"
-            }
-        )
-        
-        # Salvar no histórico
-        RECOMENDACOES_HISTORICO.append(recomendacao.dict())
-        
-        return recomendacao
+            # Simular processamento da IA (requests idênticos saem do cache do motor)
+            semente, montagem = MOTOR.gerar(cliente, quantidade, seed)
+            recomendacao = montar_recomendacao(cliente, montagem, inicio, semente)
+            
+            # Salvar no histórico e enfileirar gravação no banco
+            salvar_recomendacao(recomendacao)
+            
+            # Serializa aqui (a resposta já é um RecomendacaoResponse validado)
+            with etapa("serializacao"):
+                return Response(recomendacao.model_dump_json(), media_type="application/json")
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao gerar recomendação: {str(e)}")
 
+@router.post("/gerar-lote")
+def gerar_recomendacoes_lote(
+    clientes: List[ClienteInfo],
+    quantidade: int = Query(default=5, ge=1, le=20),
+    seed: Optional[int] = Query(default=None, description="Semente do RNG aplicada a cada cliente")
+):
+    """
+    Gera recomendações para vários clientes em uma única chamada
+    
+    - **clientes**: Lista de ClienteInfo (máximo 50.000)
+    - **quantidade**: Número de produtos por cliente (1-20)
+    - **seed**: Semente opcional; cada cliente recebe o mesmo resultado que
+      `POST /gerar?seed=...` geraria para ele (sem seed, a seed de cada
+      cliente é derivada de id_cliente, versão do modelo e dia, como em /gerar)
+    
+    Os clientes são pontuados em blocos contra o catálogo e o resultado é
+    devolvido em streaming como NDJSON (uma RecomendacaoResponse por linha).
+    Se um cliente falhar, a linha correspondente traz `{"id_cliente", "erro"}`.
+    
+    **Exemplo:**
+    ```
+    POST /api/recomendacoes/gerar-lote?quantidade=5&seed=42
+    [{"id_cliente": "CLI001", "nome": "Maria Santos"}, ...]
+    ```
+    """
+    if not clientes:
+        raise HTTPException(status_code=400, detail="Informe ao menos um cliente")
+    
+    if len(clientes) > LIMITE_CLIENTES_LOTE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo de {LIMITE_CLIENTES_LOTE} clientes por lote (recebidos: {len(clientes)})"
+        )
+    
+    def gerar_linhas():
+        for inicio_bloco in range(0, len(clientes), TAMANHO_BLOCO_LOTE):
+            bloco = clientes[inicio_bloco:inicio_bloco + TAMANHO_BLOCO_LOTE]
+            inicio = time.perf_counter_ns()
+            sementes_rngs = [MOTOR.rng(cliente.id_cliente, seed) for cliente in bloco]
+            selecoes = CATALOGO.selecionar_lote(bloco, quantidade, [rng for _, rng in sementes_rngs])
+            
+            # Linhas do bloco são devolvidas depois de publicadas aos demais workers
+            linhas = []
+            salvas = []
+            for cliente, (semente, rng), produtos_selecionados in zip(bloco, sementes_rngs, selecoes):
+                try:
+                    montagem = montar_produtos(cliente, produtos_selecionados, rng)
+                    recomendacao = montar_recomendacao(cliente, montagem, inicio, semente)
+                    salvas.append(salvar_recomendacao(recomendacao, publicar=False))
+                    linhas.append(recomendacao.model_dump_json() + "\n")
+                except Exception as e:
+                    linhas.append(json.dumps({"id_cliente": cliente.id_cliente, "erro": str(e)}) + "\n")
+            
+            if salvas:
+                estado_compartilhado.publicar(EVENTO_RECOMENDACOES, salvas)
+            yield from linhas
+    
+    return StreamingResponse(gerar_linhas(), media_type="application/x-ndjson")
+
 @router.get("/cliente/{id_cliente}", response_model=List[RecomendacaoResponse])
 def listar_recomendacoes_cliente(
     id_cliente: str,
@@ -1257,11 +1440,9 @@ def listar_recomendacoes_cliente(
     ```
     """
     
-    # Filtrar recomendações do histórico para este cliente
-    recomendacoes_cliente = [
-        rec for rec in RECOMENDACOES_HISTORICO 
-        if rec["id_cliente"] == id_cliente
-    ]
+    # Recomendações do cliente (índice já ordenado por data, mais recente primeiro)
+    estado_compartilhado.sincronizar()
+    recomendacoes_cliente = RECOMENDACOES_HISTORICO.listar_cliente(id_cliente)
     
     # Se não encontrou nenhuma recomendação
     if not recomendacoes_cliente:
@@ -1280,18 +1461,10 @@ def listar_recomendacoes_cliente(
                    f"Use o endpoint POST /api/recomendacoes/gerar para criar novas recomendações."
         )
     
-    # Aplicar ordenação
-    if ordem == "recente":
-        # Ordenar por data de geração (mais recente primeiro)
-        recomendacoes_cliente.sort(
-            key=lambda x: x["data_geracao"], 
-            reverse=True
-        )
-    elif ordem == "antiga":
+    # Aplicar ordenação (o índice já entrega "recente")
+    if ordem == "antiga":
         # Ordenar por data de geração (mais antiga primeiro)
-        recomendacoes_cliente.sort(
-            key=lambda x: x["data_geracao"]
-        )
+        recomendacoes_cliente.reverse()
     elif ordem == "confianca":
         # Ordenar por confiança média da IA (maior primeiro)
         recomendacoes_cliente.sort(
@@ -1329,93 +1502,41 @@ def obter_resumo_cliente(id_cliente: str):
     ```
     """
     
-    # Filtrar recomendações do cliente
-    recomendacoes_cliente = [
-        rec for rec in RECOMENDACOES_HISTORICO 
-        if rec["id_cliente"] == id_cliente
-    ]
+    # Rollup materializado do cliente (atualizado em /gerar e /feedback)
+    estado_compartilhado.sincronizar()
+    resumo = RESUMOS_CLIENTES.obter(id_cliente)
     
-    if not recomendacoes_cliente:
+    if resumo is None:
         raise HTTPException(
             status_code=404,
             detail=f"Cliente '{id_cliente}' não encontrado no histórico de recomendações"
         )
     
-    # Calcular estatísticas
-    total_recomendacoes = len(recomendacoes_cliente)
-    
-    # Total de produtos
-    total_produtos = sum(
-        len(rec["produtos_recomendados"]) 
-        for rec in recomendacoes_cliente
-    )
-    
-    # Confiança média
-    confiancas = [
-        rec["metadados"]["confianca_media"] 
-        for rec in recomendacoes_cliente
-    ]
-    confianca_media = round(sum(confiancas) / len(confiancas), 2)
-    
-    # Desconto médio
-    descontos = [
-        rec["metadados"]["desconto_medio"] 
-        for rec in recomendacoes_cliente
-    ]
-    desconto_medio = round(sum(descontos) / len(descontos), 2)
-    
-    # Categorias mais recomendadas
-    categorias_count = {}
-    for rec in recomendacoes_cliente:
-        for produto in rec["produtos_recomendados"]:
-            cat = produto["categoria"]
-            categorias_count[cat] = categorias_count.get(cat, 0) + 1
-    
-    categorias_top = sorted(
-        categorias_count.items(), 
-        key=lambda x: x[1], 
-        reverse=True
-    )[:5]
-    
-    # Feedbacks do cliente
-    feedbacks_cliente = [
-        fb for fb in FEEDBACKS_HISTORICO
-        if any(
-            rec["id_recomendacao"] == fb["id_recomendacao"]
-            for rec in recomendacoes_cliente
-        )
-    ]
-    
     # Taxa de aceitação
-    total_feedbacks = len(feedbacks_cliente)
-    feedbacks_aceitos = len([fb for fb in feedbacks_cliente if fb["aceito"]])
-    feedbacks_comprados = len([fb for fb in feedbacks_cliente if fb.get("comprado")])
+    total_feedbacks = resumo.total_feedbacks
+    feedbacks_aceitos = resumo.feedbacks_aceitos
+    feedbacks_comprados = resumo.feedbacks_comprados
     
     taxa_aceitacao = round((feedbacks_aceitos / total_feedbacks * 100), 1) if total_feedbacks > 0 else 0
     taxa_conversao = round((feedbacks_comprados / total_feedbacks * 100), 1) if total_feedbacks > 0 else 0
     
-    # Última recomendação
-    ultima_recomendacao = max(
-        recomendacoes_cliente, 
-        key=lambda x: x["data_geracao"]
-    )
-    
-    # Perfil do cliente (do último registro)
+    # Última recomendação e perfil do cliente (do último registro)
+    ultima_recomendacao = resumo.ultima_recomendacao
     perfil_cliente = ultima_recomendacao["metadados"]["perfil_cliente"]
     
     return {
         "id_cliente": id_cliente,
         "nome_cliente": ultima_recomendacao["nome_cliente"],
         "resumo": {
-            "total_recomendacoes": total_recomendacoes,
-            "total_produtos_recomendados": total_produtos,
-            "confianca_media_ia": confianca_media,
-            "desconto_medio_aplicado": desconto_medio,
+            "total_recomendacoes": resumo.total_recomendacoes,
+            "total_produtos_recomendados": resumo.total_produtos,
+            "confianca_media_ia": resumo.confianca_media,
+            "desconto_medio_aplicado": resumo.desconto_medio,
             "ultima_recomendacao": ultima_recomendacao["data_geracao"]
         },
         "categorias_favoritas": [
             {"categoria": cat, "quantidade": qtd}
-            for cat, qtd in categorias_top
+            for cat, qtd in resumo.categorias_top(5)
         ],
         "performance": {
             "total_feedbacks": total_feedbacks,
@@ -1455,32 +1576,18 @@ def listar_produtos_recomendados_cliente(
     ```
     """
     
-    # Filtrar recomendações do cliente
-    recomendacoes_cliente = [
-        rec for rec in RECOMENDACOES_HISTORICO 
-        if rec["id_cliente"] == id_cliente
-    ]
+    # Rollup do cliente já consolida o produto de maior confiança por ID
+    estado_compartilhado.sincronizar()
+    resumo = RESUMOS_CLIENTES.obter(id_cliente)
     
-    if not recomendacoes_cliente:
+    if resumo is None:
         raise HTTPException(
             status_code=404,
             detail=f"Cliente '{id_cliente}' não possui recomendações"
         )
     
-    # Consolidar todos os produtos (usar dict para evitar duplicatas)
-    produtos_consolidados = {}
-    
-    for rec in recomendacoes_cliente:
-        for produto in rec["produtos_recomendados"]:
-            id_prod = produto["id_produto"]
-            
-            # Se produto já existe, manter o de maior confiança
-            if id_prod not in produtos_consolidados or \
-               produto["confianca_ia"] > produtos_consolidados[id_prod]["confianca_ia"]:
-                produtos_consolidados[id_prod] = produto
-    
     # Converter para lista
-    produtos_lista = list(produtos_consolidados.values())
+    produtos_lista = list(resumo.melhores_produtos.values())
     
     # Aplicar filtro de categoria
     if categoria:
@@ -1523,11 +1630,10 @@ def registrar_feedback(feedback: FeedbackRequest):
     Contribui para o aprendizado contínuo do modelo
     """
     try:
-        # Validar se a recomendação existe
-        recomendacao_existe = any(
-            r["id_recomendacao"] == feedback.id_recomendacao 
-            for r in RECOMENDACOES_HISTORICO
-        )
+        # Validar se a recomendação existe (pode ter sido gerada em outro worker)
+        recomendacao_existe = RECOMENDACOES_HISTORICO.existe(feedback.id_recomendacao)
+        if not recomendacao_existe and estado_compartilhado.sincronizar(forcar=True):
+            recomendacao_existe = RECOMENDACOES_HISTORICO.existe(feedback.id_recomendacao)
         
         if not recomendacao_existe:
             raise HTTPException(
@@ -1554,7 +1660,9 @@ def registrar_feedback(feedback: FeedbackRequest):
             "data_registro": datetime.now().isoformat(),
             **feedback.dict()
         }
-        FEEDBACKS_HISTORICO.append(feedback_data)
+        adicionar_feedback(feedback_data)
+        fila_escrita.enfileirar_feedback(feedback_data)
+        estado_compartilhado.publicar(EVENTO_FEEDBACKS, [feedback_data])
         
         # Mensagem de retorno
         if feedback.comprado:
@@ -1578,22 +1686,44 @@ def registrar_feedback(feedback: FeedbackRequest):
 
 @router.get("/historico", response_model=List[RecomendacaoResponse])
 def listar_historico(
+    request: Request,
+    response: Response,
     limite: int = Query(default=20, ge=1, le=100),
-    offset: int = Query(default=0, ge=0)
+    offset: int = Query(default=0, ge=0),
+    cursor: Optional[str] = Query(default=None, description="Cursor de paginação (X-Cursor-Proximo/X-Cursor-Anterior)")
 ):
     """
     Lista histórico de recomendações geradas
     
     - **limite**: Número máximo de registros (1-100)
     - **offset**: Paginação - quantidade de registros a pular
+    - **cursor**: Paginação por cursor sobre (data_geracao, id_recomendacao);
+      tem prioridade sobre `offset`. Os cursores da próxima página e da
+      anterior vêm nos cabeçalhos `X-Cursor-Proximo`, `X-Cursor-Anterior` e `Link`
     """
-    historico_ordenado = sorted(
-        RECOMENDACOES_HISTORICO, 
-        key=lambda x: x["data_geracao"], 
-        reverse=True
+    estado_compartilhado.sincronizar()
+    
+    if cursor:
+        chave, direcao = decodificar_cursor(cursor)
+        if len(chave) != 2 or not all(isinstance(valor, str) for valor in chave):
+            raise HTTPException(status_code=400, detail="Cursor de paginação inválido")
+        itens, tem_mais = RECOMENDACOES_HISTORICO.listar_por_chave(
+            limite, tuple(chave), mais_antigos=direcao == PROXIMO
+        )
+    else:
+        direcao = PROXIMO
+        itens = RECOMENDACOES_HISTORICO.listar_recentes(limite, offset)
+        tem_mais = offset + limite < len(RECOMENDACOES_HISTORICO)
+    
+    pagina = montar_pagina(
+        itens,
+        lambda rec: (rec["data_geracao"], rec["id_recomendacao"]),
+        direcao,
+        tem_mais,
+        inicio=not cursor and not offset
     )
-    
-    return historico_ordenado[offset:offset+limite]
+    definir_cabecalhos(request, response, pagina)
+    return pagina.itens
 
 @router.get("/historico/{id_recomendacao}", response_model=RecomendacaoResponse)
 def buscar_recomendacao(id_recomendacao: str):
@@ -1602,10 +1732,10 @@ def buscar_recomendacao(id_recomendacao: str):
     
     - **id_recomendacao**: ID único da recomendação
     """
-    recomendacao = next(
-        (r for r in RECOMENDACOES_HISTORICO if r["id_recomendacao"] == id_recomendacao),
-        None
-    )
+    estado_compartilhado.sincronizar()
+    recomendacao = RECOMENDACOES_HISTORICO.obter(id_recomendacao)
+    if not recomendacao and estado_compartilhado.sincronizar(forcar=True):
+        recomendacao = RECOMENDACOES_HISTORICO.obter(id_recomendacao)
     
     if not recomendacao:
         raise HTTPException(
@@ -1621,8 +1751,13 @@ def obter_estatisticas():
     Retorna estatísticas do modelo de IA e suas recomendações
     
     Inclui métricas de desempenho, taxas de conversão e insights
+    
+    Lê um snapshot do agregador incremental (tempo constante em relação
+    ao tamanho do histórico)
     """
-    total_recomendacoes = len(RECOMENDACOES_HISTORICO)
+    estado_compartilhado.sincronizar()
+    snapshot = ESTATISTICAS.snapshot()
+    total_recomendacoes = snapshot["total_recomendacoes"]
     
     if total_recomendacoes == 0:
         return EstatisticasIA(
@@ -1635,27 +1770,21 @@ def obter_estatisticas():
         )
     
     # Calcular taxas de aceitação e conversão
-    total_feedbacks = len(FEEDBACKS_HISTORICO)
-    aceitos = sum(1 for f in FEEDBACKS_HISTORICO if f["aceito"])
-    comprados = sum(1 for f in FEEDBACKS_HISTORICO if f.get("comprado", False))
+    total_feedbacks = snapshot["total_feedbacks"]
+    aceitos = snapshot["aceitos"]
+    comprados = snapshot["comprados"]
     
     taxa_aceitacao = (aceitos / total_feedbacks * 100) if total_feedbacks > 0 else 0
     taxa_conversao = (comprados / total_feedbacks * 100) if total_feedbacks > 0 else 0
     
     # Categorias mais recomendadas
-    categorias_count = {}
-    for rec in RECOMENDACOES_HISTORICO:
-        for produto in rec["produtos_recomendados"]:
-            cat = produto["categoria"]
-            categorias_count[cat] = categorias_count.get(cat, 0) + 1
-    
     categorias_top = [
         {"categoria": cat, "quantidade": count}
-        for cat, count in sorted(categorias_count.items(), key=lambda x: x[1], reverse=True)[:5]
+        for cat, count in sorted(snapshot["categorias"].items(), key=lambda x: x[1], reverse=True)[:5]
     ]
     
-    # Horários de pico (simulado)
-    horarios = ["09:00-12:00", "14:00-17:00", "19:00-21:00"]
+    # Horários de pico (histograma por hora de geração)
+    horarios = horarios_pico(snapshot["recomendacoes_por_hora"])
     
     return EstatisticasIA(
         total_recomendacoes_geradas=total_recomendacoes,
@@ -1669,7 +1798,7 @@ def obter_estatisticas():
             "recall": 89.1,
             "f1_score": 86.6,
             "ultima_atualizacao": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "versao": "v2.3.1",
+            "versao": VERSAO_MODELO,
             "algoritmo": "Hybrid Recommender (CF + CB + DNN)"
         }
     )
@@ -1679,9 +1808,13 @@ def limpar_historico():
     """
     Limpa todo o histórico de recomendações e feedbacks
     ⚠️ Usar apenas em ambiente de desenvolvimento/teste
+    
+    Apaga também o que foi persistido (senão restaurar_historico traria o
+    histórico de volta no próximo restart)
     """
-    RECOMENDACOES_HISTORICO.clear()
-    FEEDBACKS_HISTORICO.clear()
+    fila_escrita.apagar_tudo()
+    limpar_estado_local()
+    estado_compartilhado.publicar(EVENTO_LIMPAR, [])
     
     return {
         "success": True,
@@ -2,15 +2,18 @@
 Rotas da API para gerenciamento de usuários
 Endpoints CRUD completos
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime
 import hashlib
 
-from database import get_db
+from database import get_async_db
 from models import Usuario, StatusUsuario, TipoUsuario
+from services.agregados import estatisticas_usuarios, invalidar_estatisticas_usuarios
+from services.busca import motor_busca
+from services.paginacao import definir_cabecalhos, paginar_consulta
 from schemas import (
     UsuarioCreate, 
     UsuarioUpdate, 
@@ -27,47 +30,43 @@ def hash_senha(senha: str) -> str:
     return hashlib.sha256(senha.encode()).hexdigest()
 
 @router.get("/", response_model=List[UsuarioResponse])
-def listar_usuarios(
+async def listar_usuarios(
+    request: Request,
+    response: Response,
     busca: Optional[str] = Query(None, description="Buscar por nome ou email"),
     tipo: Optional[str] = Query(None, description="Filtrar por tipo: admin, gestor, vendedor"),
     status: Optional[str] = Query(None, description="Filtrar por status: ativo, inativo, bloqueado"),
     departamento: Optional[str] = Query(None, description="Filtrar por departamento"),
     limite: int = Query(100, ge=1, le=1000, description="Máximo de resultados"),
     offset: int = Query(0, ge=0, description="Pular N resultados (paginação)"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor de paginação (X-Cursor-Proximo/X-Cursor-Anterior)"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Lista todos os usuários com filtros opcionais
     
     **Filtros disponíveis:**
-    - `busca`: Busca por nome ou email (case insensitive)
+    - `busca`: Busca por nome ou email (case insensitive), mais relevantes primeiro
     - `tipo`: admin, gestor ou vendedor
     - `status`: ativo, inativo ou bloqueado
     - `departamento`: Nome do departamento
     - `limite`: Quantidade máxima de resultados (padrão: 100)
     - `offset`: Pular N resultados para paginação (padrão: 0)
+    - `cursor`: Paginação por cursor sobre (criado_em, id), tem prioridade
+      sobre `offset`; os cursores vêm em `X-Cursor-Proximo`/`X-Cursor-Anterior` e `Link`
     
     **Exemplo:**
     ```
     GET /api/usuarios?busca=silva&tipo=vendedor&status=ativo&limite=10
     ```
     """
-    query = db.query(Usuario)
-    
-    # Filtro de busca (nome ou email)
-    if busca:
-        query = query.filter(
-            or_(
-                Usuario.nome.ilike(f"%{busca}%"),
-                Usuario.email.ilike(f"%{busca}%")
-            )
-        )
+    filtros = []
     
     # Filtro por tipo
     if tipo:
         try:
             tipo_enum = TipoUsuario(tipo)
-            query = query.filter(Usuario.tipo == tipo_enum)
+            filtros.append(Usuario.tipo == tipo_enum)
         except ValueError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -78,7 +77,7 @@ def listar_usuarios(
     if status:
         try:
             status_enum = StatusUsuario(status)
-            query = query.filter(Usuario.status == status_enum)
+            filtros.append(Usuario.status == status_enum)
         except ValueError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -87,15 +86,31 @@ def listar_usuarios(
     
     # Filtro por departamento
     if departamento:
-        query = query.filter(Usuario.departamento.ilike(f"%{departamento}%"))
+        filtros.append(Usuario.departamento.ilike(f"%{departamento}%"))
+    
+    # Busca por nome ou email: ordenada por relevância, paginada por offset
+    if busca:
+        if cursor:
+            raise HTTPException(
+                status_code=400,
+                detail="Paginação por cursor não disponível com busca. Use offset"
+            )
+        return await db.run_sync(
+            lambda sessao: motor_busca.buscar(sessao, "usuarios", sessao.query(Usuario).filter(*filtros), busca, limite, offset)
+        )
     
-    # Paginação e ordenação
-    usuarios = query.order_by(Usuario.criado_em.desc()).offset(offset).limit(limite).all()
+    # Paginação (cursor ou offset) e ordenação
+    pagina = await db.run_sync(
+        lambda sessao: paginar_consulta(
+            sessao.query(Usuario).filter(*filtros), (Usuario.criado_em, Usuario.id), limite, cursor, offset
+        )
+    )
+    definir_cabecalhos(request, response, pagina)
     
-    return usuarios
+    return pagina.itens
 
 @router.get("/stats", response_model=UsuarioStats)
-def obter_estatisticas(db: Session = Depends(get_db)):
+async def obter_estatisticas(db: AsyncSession = Depends(get_async_db)):
     """
     Retorna estatísticas agregadas sobre usuários
     
@@ -117,36 +132,12 @@ def obter_estatisticas(db: Session = Depends(get_db)):
     }
     ```
     """
-    total = db.query(Usuario).count()
-    ativos = db.query(Usuario).filter(Usuario.status == StatusUsuario.ATIVO).count()
-    inativos = db.query(Usuario).filter(Usuario.status == StatusUsuario.INATIVO).count()
-    bloqueados = db.query(Usuario).filter(Usuario.status == StatusUsuario.BLOQUEADO).count()
-    
-    # Contagem por tipo
-    por_tipo = {}
-    tipos = db.query(Usuario.tipo, func.count(Usuario.id)).group_by(Usuario.tipo).all()
-    for tipo, count in tipos:
-        por_tipo[tipo.value if tipo else 'sem_tipo'] = count
-    
-    # Contagem por departamento
-    por_departamento = {}
-    deptos = db.query(Usuario.departamento, func.count(Usuario.id)).group_by(Usuario.departamento).all()
-    for depto, count in deptos:
-        por_departamento[depto if depto else 'sem_departamento'] = count
-    
-    return {
-        "total": total,
-        "ativos": ativos,
-        "inativos": inativos,
-        "bloqueados": bloqueados,
-        "por_tipo": por_tipo,
-        "por_departamento": por_departamento
-    }
+    return await db.run_sync(estatisticas_usuarios)
 
 @router.get("/{usuario_id}", response_model=UsuarioResponse)
-def obter_usuario(
+async def obter_usuario(
     usuario_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Obtém um usuário específico por ID
@@ -160,7 +151,7 @@ def obter_usuario(
     **Erros:**
     - 404: Usuário não encontrado
     """
-    usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
+    usuario = await db.scalar(select(Usuario).where(Usuario.id == usuario_id))
     
     if not usuario:
         raise HTTPException(
@@ -171,9 +162,9 @@ def obter_usuario(
     return usuario
 
 @router.post("/", response_model=UsuarioResponse, status_code=status.HTTP_201_CREATED)
-def criar_usuario(
+async def criar_usuario(
     usuario_data: UsuarioCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Cria um novo usuário
@@ -203,7 +194,7 @@ def criar_usuario(
     - 400: Email já existe ou dados inválidos
     """
     # Verifica se email já existe
-    existe = db.query(Usuario).filter(Usuario.email == usuario_data.email).first()
+    existe = await db.scalar(select(Usuario).where(Usuario.email == usuario_data.email))
     if existe:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -222,16 +213,18 @@ def criar_usuario(
     )
     
     db.add(novo_usuario)
-    db.commit()
-    db.refresh(novo_usuario)
+    await db.commit()
+    invalidar_estatisticas_usuarios()
+    await db.refresh(novo_usuario)
+    motor_busca.atualizar("usuarios", novo_usuario)
     
     return novo_usuario
 
 @router.put("/{usuario_id}", response_model=UsuarioResponse)
-def atualizar_usuario(
+async def atualizar_usuario(
     usuario_id: int,
     usuario_data: UsuarioUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Atualiza um usuário existente
@@ -262,7 +255,7 @@ def atualizar_usuario(
     - 404: Usuário não encontrado
     - 400: Email já está em uso
     """
-    usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
+    usuario = await db.scalar(select(Usuario).where(Usuario.id == usuario_id))
     
     if not usuario:
         raise HTTPException(
@@ -272,7 +265,7 @@ def atualizar_usuario(
     
     # Verifica email duplicado (se estiver sendo alterado)
     if usuario_data.email and usuario_data.email != usuario.email:
-        existe = db.query(Usuario).filter(Usuario.email == usuario_data.email).first()
+        existe = await db.scalar(select(Usuario).where(Usuario.email == usuario_data.email))
         if existe:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -299,15 +292,17 @@ def atualizar_usuario(
     
     usuario.atualizado_em = datetime.utcnow()
     
-    db.commit()
-    db.refresh(usuario)
+    await db.commit()
+    invalidar_estatisticas_usuarios()
+    await db.refresh(usuario)
+    motor_busca.atualizar("usuarios", usuario)
     
     return usuario
 
 @router.delete("/{usuario_id}", status_code=status.HTTP_204_NO_CONTENT)
-def deletar_usuario(
+async def deletar_usuario(
     usuario_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Deleta um usuário
@@ -321,7 +316,7 @@ def deletar_usuario(
     
     **Atenção:** Esta operação é irreversível!
     """
-    usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
+    usuario = await db.scalar(select(Usuario).where(Usuario.id == usuario_id))
     
     if not usuario:
         raise HTTPException(
@@ -329,16 +324,18 @@ def deletar_usuario(
             detail=f"Usuário com ID {usuario_id} não encontrado"
         )
     
-    db.delete(usuario)
-    db.commit()
+    await db.delete(usuario)
+    await db.commit()
+    invalidar_estatisticas_usuarios()
+    motor_busca.remover("usuarios", usuario_id)
     
     return None
 
 @router.patch("/{usuario_id}/status", response_model=UsuarioResponse)
-def alterar_status_usuario(
+async def alterar_status_usuario(
     usuario_id: int,
     novo_status: str = Query(..., description="Novo status: ativo, inativo ou bloqueado"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Altera apenas o status do usuário
@@ -362,7 +359,7 @@ def alterar_status_usuario(
     - 404: Usuário não encontrado
     - 400: Status inválido
     """
-    usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
+    usuario = await db.scalar(select(Usuario).where(Usuario.id == usuario_id))
     
     if not usuario:
         raise HTTPException(
@@ -380,7 +377,8 @@ def alterar_status_usuario(
         )
     
     usuario.atualizado_em = datetime.utcnow()
-    db.commit()
-    db.refresh(usuario)
+    await db.commit()
+    invalidar_estatisticas_usuarios()
+    await db.refresh(usuario)
     
     return usuario
\ No newline at end of file
@@ -2,7 +2,7 @@
 Schemas Pydantic para validação de dados
 Request/Response models
 """
-from pydantic import BaseModel, EmailStr, Field, validator
+from pydantic import BaseModel, EmailStr, Field, validator, model_validator
 from typing import Optional
 from datetime import datetime
 from enum import Enum
@@ -199,7 +199,7 @@ class FonteDadosCreate(BaseModel):
     headers_json: Optional[dict] = Field(None, description="Headers HTTP customizados")
     
     # Para arquivos
-    caminho_arquivo: Optional[str] = Field(None, max_length=500, description="Caminho do arquivo")
+    caminho_arquivo: Optional[str] = Field(None, max_length=500, description="Caminho do arquivo (relativo a ARQUIVOS_DIRETORIO)")
     encoding: str = Field(default="utf-8", description="Encoding do arquivo")
     delimiter: str = Field(default=",", max_length=10, description="Delimitador CSV")
     
@@ -215,25 +215,28 @@ class FonteDadosCreate(BaseModel):
             raise ValueError("Nome não pode ser vazio")
         return v
     
-    @validator('tipo')
-    def validar_tipo_configs(cls, v, values):
-        """Valida se as configurações necessárias foram fornecidas"""
-        tipo = v
+    @model_validator(mode='after')
+    def validar_tipo_configs(self):
+        """
+        Valida se as configurações necessárias foram fornecidas
+        (após todos os campos, pois `tipo` vem antes de host/url_api/caminho_arquivo)
+        """
+        tipo = self.tipo
         
         # Validações por tipo
         if tipo in [TipoFonteEnum.MYSQL, TipoFonteEnum.POSTGRESQL, TipoFonteEnum.SQLSERVER, TipoFonteEnum.ORACLE]:
-            if not all([values.get('host'), values.get('database'), values.get('username')]):
-                raise ValueError(f"Para {tipo}, é necessário fornecer: host, database, username")
+            if not all([self.host, self.database, self.username]):
+                raise ValueError(f"Para {tipo.value}, é necessário fornecer: host, database, username")
         
         elif tipo == TipoFonteEnum.API:
-            if not values.get('url_api'):
+            if not self.url_api:
                 raise ValueError("Para API, é necessário fornecer url_api")
         
         elif tipo in [TipoFonteEnum.CSV, TipoFonteEnum.EXCEL]:
-            if not values.get('caminho_arquivo'):
-                raise ValueError(f"Para {tipo}, é necessário fornecer caminho_arquivo")
+            if not self.caminho_arquivo:
+                raise ValueError(f"Para {tipo.value}, é necessário fornecer caminho_arquivo")
         
-        return v
+        return self
     
     class Config:
         json_schema_extra = {
@@ -306,6 +309,7 @@ class FonteDadosResponse(BaseModel):
     ultima_sincronizacao: Optional[datetime]
     proxima_sincronizacao: Optional[datetime]
     frequencia_sync_horas: int
+    watermark: Optional[dict] = None
     
     total_registros_importados: int
     total_erros: int
@@ -402,6 +406,8 @@ class SincronizacaoResponse(BaseModel):
     registros_atualizados: int
     registros_com_erro: int
     tempo_total_segundos: float
+    registros_por_segundo: Optional[float] = None
+    paginas_por_segundo: Optional[float] = None
     data_sincronizacao: datetime
     
     class Config:
@@ -413,10 +419,60 @@ class SincronizacaoResponse(BaseModel):
                 "registros_atualizados": 340,
                 "registros_com_erro": 0,
                 "tempo_total_segundos": 58.7,
+                "registros_por_segundo": 21.3,
+                "paginas_por_segundo": None,
                 "data_sincronizacao": "2025-10-28T14:30:00"
             }
         }
 
+class JobSincronizacaoResponse(BaseModel):
+    """Job de sincronização em segundo plano"""
+    id: int
+    fonte_id: int
+    status: str
+    force: bool
+    tentativas: int
+    registros_processados: int
+    total_estimado: Optional[int]
+    progresso_percent: Optional[float]
+    eta_segundos: Optional[float]
+    registros_importados: int
+    registros_atualizados: int
+    registros_com_erro: int
+    registros_por_segundo: Optional[float]
+    paginas_por_segundo: Optional[float]
+    mensagem: Optional[str]
+    criado_em: datetime
+    iniciado_em: Optional[datetime]
+    concluido_em: Optional[datetime]
+    heartbeat_em: Optional[datetime]
+    
+    class Config:
+        from_attributes = True
+        json_schema_extra = {
+            "example": {
+                "id": 42,
+                "fonte_id": 3,
+                "status": "running",
+                "force": False,
+                "tentativas": 1,
+                "registros_processados": 1800,
+                "total_estimado": 4200,
+                "progresso_percent": 42.9,
+                "eta_segundos": 12.5,
+                "registros_importados": 0,
+                "registros_atualizados": 0,
+                "registros_com_erro": 0,
+                "registros_por_segundo": None,
+                "paginas_por_segundo": None,
+                "mensagem": None,
+                "criado_em": "2025-10-28T14:30:00",
+                "iniciado_em": "2025-10-28T14:30:01",
+                "concluido_em": None,
+                "heartbeat_em": "2025-10-28T14:30:10"
+            }
+        }
+
 class FonteDadosStats(BaseModel):
     """Estatísticas de fontes de dados"""
     total: int
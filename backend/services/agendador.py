@@ -0,0 +1,177 @@
+"""
+Agendador de sincronizações - IARECOMEND
+Dispara sincronizações automáticas a partir de proxima_sincronizacao
+"""
+import asyncio
+import heapq
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import update
+
+from config import settings
+from database import SessionLocal
+from models import FonteDados, StatusFonte
+from services.jobs import FilaJobsSincronizacao, fila_jobs
+
+
+class AgendadorSincronizacao:
+    """
+    Agendador de sincronizações automáticas
+
+    - A cada `intervalo_recarga_segundos` uma única consulta (índice
+      status + proxima_sincronizacao) carrega as fontes ativas que vencem
+      dentro do horizonte e monta um min-heap pelo horário de execução
+    - Cada fonte recebe um jitter aleatório sobre proxima_sincronizacao,
+      espalhando as fontes que vencem no mesmo horário (ex: virada da hora)
+    - O loop dorme até o topo do heap vencer (ou até a próxima recarga)
+    - Com vários workers uvicorn, todos rodam o agendador; a fonte é
+      reivindicada com lock de linha (FOR UPDATE SKIP LOCKED no PostgreSQL)
+      e um UPDATE condicional em status/proxima_sincronizacao, então só um
+      processo cria o job de cada vencimento
+    """
+
+    def __init__(
+        self,
+        fila: FilaJobsSincronizacao,
+        session_factory=SessionLocal,
+        intervalo_recarga_segundos: float = 60,
+        horizonte_segundos: float = 300,
+        jitter_segundos: float = 120
+    ):
+        self.fila = fila
+        self.session_factory = session_factory
+        self.intervalo_recarga_segundos = intervalo_recarga_segundos
+        self.horizonte_segundos = horizonte_segundos
+        self.jitter_segundos = jitter_segundos
+
+        # Heap de (executar_em, fonte_id, proxima_sincronizacao)
+        self._heap: List[Tuple[datetime, int, datetime]] = []
+        self._tarefa: Optional[asyncio.Task] = None
+        self.disparadas = 0
+
+    # ---------- Ciclo de vida ----------
+
+    def iniciar(self):
+        """Inicia o loop do agendador (chamado no lifespan)"""
+        self._tarefa = asyncio.create_task(self._loop(), name="agendador-sync")
+
+    async def encerrar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            await asyncio.gather(self._tarefa, return_exceptions=True)
+            self._tarefa = None
+
+    # ---------- Heap ----------
+
+    def _executar_em(self, proxima: datetime, agora: datetime) -> datetime:
+        """Horário de disparo: vencimento (ou agora, se atrasada) + jitter"""
+        return max(proxima, agora) + timedelta(seconds=random.uniform(0, self.jitter_segundos))
+
+    def recarregar(self) -> int:
+        """
+        Reconstrói o heap com as fontes que vencem dentro do horizonte
+        Mantém o jitter já sorteado das fontes cujo vencimento não mudou
+        """
+        agora = datetime.utcnow()
+        limite = agora + timedelta(seconds=self.horizonte_segundos)
+
+        with self.session_factory() as db:
+            vencendo = db.query(FonteDados.id, FonteDados.proxima_sincronizacao).filter(
+                FonteDados.status == StatusFonte.ATIVA,
+                FonteDados.proxima_sincronizacao <= limite
+            ).all()
+
+        anteriores: Dict[Tuple[int, datetime], datetime] = {
+            (fonte_id, proxima): executar_em for executar_em, fonte_id, proxima in self._heap
+        }
+
+        heap = [
+            (anteriores.get((fonte_id, proxima)) or self._executar_em(proxima, agora), fonte_id, proxima)
+            for fonte_id, proxima in vencendo
+        ]
+        heapq.heapify(heap)
+        self._heap = heap
+        return len(heap)
+
+    def vencidas(self, agora: datetime) -> List[Tuple[int, datetime]]:
+        """Remove do heap e retorna as fontes cujo horário de disparo já passou"""
+        prontas = []
+        while self._heap and self._heap[0][0] <= agora:
+            _, fonte_id, proxima = heapq.heappop(self._heap)
+            prontas.append((fonte_id, proxima))
+        return prontas
+
+    # ---------- Disparo ----------
+
+    def disparar(self, fonte_id: int, proxima: datetime) -> Optional[int]:
+        """
+        Reivindica a fonte e enfileira o job; retorna o ID do job ou None
+        se outro processo já reivindicou (ou a fonte mudou desde a recarga)
+        """
+        with self.session_factory() as db:
+            fonte = (
+                db.query(FonteDados)
+                .filter(
+                    FonteDados.id == fonte_id,
+                    FonteDados.status == StatusFonte.ATIVA,
+                    FonteDados.proxima_sincronizacao == proxima
+                )
+                .with_for_update(skip_locked=True)
+                .first()
+            )
+            if fonte is None:
+                return None
+
+            # Compare-and-set: garante exclusividade também no SQLite (sem lock de linha)
+            resultado = db.execute(
+                update(FonteDados)
+                .where(
+                    FonteDados.id == fonte_id,
+                    FonteDados.status == StatusFonte.ATIVA,
+                    FonteDados.proxima_sincronizacao == proxima
+                )
+                .values(status=StatusFonte.SINCRONIZANDO)
+            )
+            if resultado.rowcount != 1:
+                db.rollback()
+                return None
+
+            job = self.fila.enfileirar(db, fonte, force=False)
+            self.disparadas += 1
+            return job.id
+
+    async def _loop(self):
+        proxima_recarga = datetime.min
+
+        while True:
+            agora = datetime.utcnow()
+
+            try:
+                if agora >= proxima_recarga:
+                    proxima_recarga = agora + timedelta(seconds=self.intervalo_recarga_segundos)
+                    await asyncio.to_thread(self.recarregar)
+
+                for fonte_id, proxima in self.vencidas(agora):
+                    job_id = await asyncio.to_thread(self.disparar, fonte_id, proxima)
+                    if job_id is not None:
+                        print(f"⏰ Sincronização automática da fonte {fonte_id} agendada (job {job_id})")
+            except Exception as e:
+                print(f"❌ Erro no agendador de sincronizações: {e}")
+
+            # Dorme até o próximo disparo ou a próxima recarga
+            acordar = proxima_recarga
+            if self._heap:
+                acordar = min(acordar, self._heap[0][0])
+            espera = (acordar - datetime.utcnow()).total_seconds()
+            await asyncio.sleep(max(espera, 0.05))
+
+
+# Instância global usada pelo lifespan
+agendador = AgendadorSincronizacao(
+    fila_jobs,
+    intervalo_recarga_segundos=settings.AGENDADOR_INTERVALO_RECARGA_SEGUNDOS,
+    horizonte_segundos=settings.AGENDADOR_HORIZONTE_SEGUNDOS,
+    jitter_segundos=settings.AGENDADOR_JITTER_SEGUNDOS
+)
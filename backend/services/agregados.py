@@ -0,0 +1,159 @@
+"""
+Agregados do dashboard - IARECOMEND
+Estatísticas de fontes e usuários em uma única consulta cada
+"""
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import FonteDados, StatusFonte, StatusUsuario, Usuario
+from services.cache import CacheTTL
+from services.estado_compartilhado import EVENTO_INVALIDAR, estado_compartilhado
+
+# Chaves do cache de agregados
+CHAVE_STATS_FONTES = "stats:fontes"
+CHAVE_STATS_USUARIOS = "stats:usuarios"
+
+cache_agregados = CacheTTL(settings.STATS_CACHE_TTL_SEGUNDOS)
+
+
+def _usa_grouping_sets(db: Session) -> bool:
+    """GROUPING SETS no PostgreSQL; nos demais (SQLite), GROUP BY completo"""
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def calcular_estatisticas_fontes(db: Session) -> dict:
+    """
+    Estatísticas de fontes em uma consulta
+
+    PostgreSQL: GROUPING SETS ((status), (tipo), ()) devolve as contagens
+    por status, por tipo e a linha de totais (soma/máximo) de uma vez.
+    Outros bancos: GROUP BY status, tipo (poucas combinações) somado aqui.
+    """
+    contagem = func.count(FonteDados.id)
+    soma_registros = func.sum(FonteDados.total_registros_importados)
+    ultima_sync = func.max(FonteDados.ultima_sincronizacao)
+
+    por_status = {s: 0 for s in StatusFonte}
+    por_tipo = {}
+    total = 0
+    total_registros = 0
+    ultima = None
+
+    if _usa_grouping_sets(db):
+        linhas = db.execute(
+            select(
+                FonteDados.status, FonteDados.tipo,
+                func.grouping(FonteDados.status), func.grouping(FonteDados.tipo),
+                contagem, soma_registros, ultima_sync
+            ).group_by(func.grouping_sets(tuple_(FonteDados.status), tuple_(FonteDados.tipo), tuple_()))
+        ).all()
+
+        for status_fonte, tipo, sem_status, sem_tipo, quantidade, soma, maximo in linhas:
+            if not sem_status:
+                por_status[status_fonte] = quantidade
+            elif not sem_tipo:
+                por_tipo[tipo.value] = quantidade
+            else:
+                total, total_registros, ultima = quantidade, soma or 0, maximo
+    else:
+        linhas = db.execute(
+            select(FonteDados.status, FonteDados.tipo, contagem, soma_registros, ultima_sync)
+            .group_by(FonteDados.status, FonteDados.tipo)
+        ).all()
+
+        for status_fonte, tipo, quantidade, soma, maximo in linhas:
+            por_status[status_fonte] += quantidade
+            por_tipo[tipo.value] = por_tipo.get(tipo.value, 0) + quantidade
+            total += quantidade
+            total_registros += soma or 0
+            if maximo is not None and (ultima is None or maximo > ultima):
+                ultima = maximo
+
+    return {
+        "total": total,
+        "ativas": por_status[StatusFonte.ATIVA],
+        "inativas": por_status[StatusFonte.INATIVA],
+        "com_erro": por_status[StatusFonte.ERRO],
+        "pendentes": por_status[StatusFonte.PENDENTE],
+        "sincronizando": por_status[StatusFonte.SINCRONIZANDO],
+        "por_tipo": por_tipo,
+        "total_registros_todos": total_registros,
+        "ultima_sincronizacao_geral": ultima,
+    }
+
+
+def calcular_estatisticas_usuarios(db: Session) -> dict:
+    """
+    Estatísticas de usuários em uma consulta
+    (GROUPING SETS por status/tipo/departamento no PostgreSQL)
+    """
+    contagem = func.count(Usuario.id)
+
+    por_status = {s: 0 for s in StatusUsuario}
+    por_tipo = {}
+    por_departamento = {}
+
+    def somar(destino: dict, chave, quantidade: int):
+        destino[chave] = destino.get(chave, 0) + quantidade
+
+    if _usa_grouping_sets(db):
+        linhas = db.execute(
+            select(
+                Usuario.status, Usuario.tipo, Usuario.departamento,
+                func.grouping(Usuario.status), func.grouping(Usuario.tipo),
+                contagem
+            ).group_by(func.grouping_sets(
+                tuple_(Usuario.status), tuple_(Usuario.tipo), tuple_(Usuario.departamento)
+            ))
+        ).all()
+
+        for status_usuario, tipo, departamento, sem_status, sem_tipo, quantidade in linhas:
+            if not sem_status:
+                por_status[status_usuario] = quantidade
+            elif not sem_tipo:
+                somar(por_tipo, tipo.value if tipo else 'sem_tipo', quantidade)
+            else:
+                somar(por_departamento, departamento or 'sem_departamento', quantidade)
+    else:
+        linhas = db.execute(
+            select(Usuario.status, Usuario.tipo, Usuario.departamento, contagem)
+            .group_by(Usuario.status, Usuario.tipo, Usuario.departamento)
+        ).all()
+
+        for status_usuario, tipo, departamento, quantidade in linhas:
+            por_status[status_usuario] += quantidade
+            somar(por_tipo, tipo.value if tipo else 'sem_tipo', quantidade)
+            somar(por_departamento, departamento or 'sem_departamento', quantidade)
+
+    return {
+        "total": sum(por_status.values()),
+        "ativos": por_status[StatusUsuario.ATIVO],
+        "inativos": por_status[StatusUsuario.INATIVO],
+        "bloqueados": por_status[StatusUsuario.BLOQUEADO],
+        "por_tipo": por_tipo,
+        "por_departamento": por_departamento,
+    }
+
+
+def estatisticas_fontes(db: Session) -> dict:
+    return cache_agregados.obter(CHAVE_STATS_FONTES, lambda: calcular_estatisticas_fontes(db))
+
+def estatisticas_usuarios(db: Session) -> dict:
+    return cache_agregados.obter(CHAVE_STATS_USUARIOS, lambda: calcular_estatisticas_usuarios(db))
+
+def invalidar_estatisticas_fontes():
+    cache_agregados.invalidar(CHAVE_STATS_FONTES)
+
+def invalidar_estatisticas_usuarios():
+    cache_agregados.invalidar(CHAVE_STATS_USUARIOS)
+
+def _invalidar_de_outro_worker(namespaces: list):
+    """Escritas em outro worker (invalidações do cache de respostas replicadas)"""
+    if "fontes" in namespaces:
+        invalidar_estatisticas_fontes()
+    if "usuarios" in namespaces:
+        invalidar_estatisticas_usuarios()
+
+if settings.ESTADO_BACKEND != "memoria":
+    estado_compartilhado.ouvir(EVENTO_INVALIDAR, _invalidar_de_outro_worker)
@@ -0,0 +1,249 @@
+"""
+Busca textual - IARECOMEND
+Filtro `busca` de usuários e fontes com ranking por similaridade:
+pg_trgm (índices GIN) no PostgreSQL e índice de trigramas em memória
+nos demais bancos (SQLite em desenvolvimento)
+"""
+import re
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import func, or_, text
+from sqlalchemy.orm import Session
+
+from models import FonteDados, Usuario
+
+# Índices GIN de trigramas criados no PostgreSQL: (nome, tabela, coluna)
+INDICES_TRIGRAMA = (
+    ("ix_usuarios_nome_trgm", "usuarios", "nome"),
+    ("ix_usuarios_email_trgm", "usuarios", "email"),
+    ("ix_fontes_dados_nome_trgm", "fontes_dados", "nome"),
+)
+
+# IDs verificados por consulta no fallback em memória (limite do IN)
+TAMANHO_LOTE_IDS = 500
+
+_PALAVRAS = re.compile(r"\w+")
+
+
+def _trigramas_texto(texto: str) -> Set[str]:
+    """Trigramas do texto bruto (para achar candidatos a substring)"""
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+def trigramas_palavras(texto: str) -> Set[str]:
+    """Trigramas no estilo pg_trgm: palavras com "  " antes e " " depois"""
+    trigramas = set()
+    for palavra in _PALAVRAS.findall(texto.lower()):
+        trigramas |= _trigramas_texto(f"  {palavra} ")
+    return trigramas
+
+def similaridade(a: str, b: str) -> float:
+    """Mesma fórmula do similarity() do pg_trgm: |A ∩ B| / |A ∪ B|"""
+    ta, tb = trigramas_palavras(a), trigramas_palavras(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+
+class IndiceTrigramas:
+    """
+    Índice invertido trigrama -> ids, em memória
+
+    Reproduz `ILIKE '%termo%'` sem varrer tudo: os candidatos são a
+    interseção das listas dos trigramas do termo, depois confirmados por
+    substring. Termos com menos de 3 caracteres varrem os documentos.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._textos: Dict[int, Tuple[str, ...]] = {}
+        self._postings: Dict[str, Set[int]] = {}
+
+    def _indexar(self, id_doc: int, textos: Tuple[str, ...]):
+        self._textos[id_doc] = textos
+        for texto in textos:
+            for trigrama in _trigramas_texto(texto):
+                self._postings.setdefault(trigrama, set()).add(id_doc)
+
+    def _desindexar(self, id_doc: int):
+        textos = self._textos.pop(id_doc, None)
+        if textos is None:
+            return
+        for texto in textos:
+            for trigrama in _trigramas_texto(texto):
+                ids = self._postings.get(trigrama)
+                if ids is not None:
+                    ids.discard(id_doc)
+                    if not ids:
+                        del self._postings[trigrama]
+
+    def carregar(self, documentos: Iterable[Tuple[int, Sequence[Optional[str]]]]):
+        with self._lock:
+            self._textos.clear()
+            self._postings.clear()
+            for id_doc, textos in documentos:
+                self._indexar(id_doc, tuple((t or "").lower() for t in textos))
+
+    def atualizar(self, id_doc: int, textos: Sequence[Optional[str]]):
+        with self._lock:
+            self._desindexar(id_doc)
+            self._indexar(id_doc, tuple((t or "").lower() for t in textos))
+
+    def remover(self, id_doc: int):
+        with self._lock:
+            self._desindexar(id_doc)
+
+    def buscar(self, termo: str) -> List[Tuple[int, float]]:
+        """(id, similaridade) dos documentos que contêm o termo, mais relevantes primeiro"""
+        termo = termo.lower()
+        with self._lock:
+            trigramas = _trigramas_texto(termo)
+            if trigramas:
+                listas = sorted((self._postings.get(t, set()) for t in trigramas), key=len)
+                candidatos = set(listas[0]).intersection(*listas[1:])
+            else:
+                candidatos = self._textos.keys()
+            encontrados = [
+                (id_doc, self._textos[id_doc]) for id_doc in candidatos
+                if any(termo in texto for texto in self._textos[id_doc])
+            ]
+
+        ranking = [
+            (id_doc, max(similaridade(termo, texto) for texto in textos))
+            for id_doc, textos in encontrados
+        ]
+        ranking.sort(key=lambda item: (item[1], item[0]), reverse=True)
+        return ranking
+
+    def __len__(self) -> int:
+        return len(self._textos)
+
+
+class MotorBusca:
+    """
+    Busca por entidade registrada ('usuarios', 'fontes')
+
+    - PostgreSQL com pg_trgm: ILIKE usa os índices GIN e o resultado é
+      ordenado por similarity() (maior entre as colunas)
+    - PostgreSQL sem a extensão: ILIKE sem ranking (comportamento antigo)
+    - Outros bancos: índice em memória por entidade (SQLite em
+      desenvolvimento). Cada processo tem o seu, guardado junto com a
+      assinatura da tabela (count, max(id), max(atualizado_em)); cada busca
+      confere a assinatura e recarrega o índice se outro worker escreveu.
+      As rotas de escrita (`atualizar`/`remover`) descartam o índice local.
+    """
+
+    def __init__(self):
+        self.pg_trgm = False
+        self._entidades: Dict[str, tuple] = {}
+        self._indices: Dict[str, Tuple[IndiceTrigramas, tuple]] = {}
+        self._alteracoes = 0
+        self._lock = Lock()
+
+    def registrar(self, entidade: str, coluna_id, colunas: Sequence, coluna_atualizacao):
+        self._entidades[entidade] = (coluna_id, tuple(colunas), coluna_atualizacao)
+
+    # ---------- Índices ----------
+
+    def criar_indices(self, engine) -> bool:
+        """Cria a extensão pg_trgm e os índices GIN (só PostgreSQL)"""
+        if engine.dialect.name != "postgresql":
+            return False
+
+        try:
+            with engine.begin() as conexao:
+                conexao.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                for nome, tabela, coluna in INDICES_TRIGRAMA:
+                    conexao.execute(text(
+                        f"CREATE INDEX IF NOT EXISTS {nome} ON {tabela} USING gin ({coluna} gin_trgm_ops)"
+                    ))
+            self.pg_trgm = True
+            print(f"✅ Índices de busca (pg_trgm): {len(INDICES_TRIGRAMA)}")
+        except Exception as e:
+            self.pg_trgm = False
+            print(f"⚠️  pg_trgm indisponível, busca sem índice: {e}")
+        return self.pg_trgm
+
+    def _indice(self, db: Session, entidade: str) -> IndiceTrigramas:
+        coluna_id, colunas, coluna_atualizacao = self._entidades[entidade]
+        alteracoes = self._alteracoes
+        # Uma consulta agregada por busca: detecta inserções, exclusões e
+        # edições feitas por qualquer worker
+        assinatura = tuple(db.query(func.count(coluna_id), func.max(coluna_id), func.max(coluna_atualizacao)).one())
+
+        atual = self._indices.get(entidade)
+        if atual is not None and atual[1] == assinatura:
+            return atual[0]
+
+        # Carrega fora do lock: com AsyncSession.run_sync a consulta cede o
+        # event loop, e outra busca na mesma thread travaria no Lock.
+        # Escritas durante a carga podem ter ficado de fora: nesse caso o
+        # índice serve só esta busca e a próxima recarrega
+        linhas = db.query(coluna_id, *colunas).all()
+        indice = IndiceTrigramas()
+        indice.carregar((linha[0], linha[1:]) for linha in linhas)
+        with self._lock:
+            if alteracoes == self._alteracoes:
+                self._indices[entidade] = (indice, assinatura)
+        return indice
+
+    def atualizar(self, entidade: str, objeto):
+        """Após create/update: a próxima busca recarrega o índice"""
+        self._descartar(entidade)
+
+    def remover(self, entidade: str, id_doc: int):
+        self._descartar(entidade)
+
+    def _descartar(self, entidade: str):
+        with self._lock:
+            self._alteracoes += 1
+            self._indices.pop(entidade, None)
+
+    def limpar(self):
+        with self._lock:
+            self._indices.clear()
+
+    # ---------- Busca ----------
+
+    def buscar(self, db: Session, entidade: str, query, termo: str, limite: int, offset: int = 0) -> list:
+        """
+        Página de `query` (já com os demais filtros) que casa com o termo,
+        mais relevantes primeiro
+        """
+        coluna_id, colunas, _ = self._entidades[entidade]
+        padrao = f"%{termo}%"
+        dialeto = db.get_bind().dialect.name
+
+        if dialeto == "postgresql":
+            query = query.filter(or_(*(coluna.ilike(padrao) for coluna in colunas)))
+            if self.pg_trgm:
+                notas = [func.similarity(coluna, termo) for coluna in colunas]
+                relevancia = notas[0] if len(notas) == 1 else func.greatest(*notas)
+                query = query.order_by(relevancia.desc(), coluna_id.desc())
+            else:
+                query = query.order_by(coluna_id.desc())
+            return query.offset(offset).limit(limite).all()
+
+        ranking = self._indice(db, entidade).buscar(termo)
+
+        # Aplica os demais filtros da consulta em lotes, na ordem do ranking
+        resultado = []
+        pular = offset
+        for inicio in range(0, len(ranking), TAMANHO_LOTE_IDS):
+            ids = [id_doc for id_doc, _ in ranking[inicio:inicio + TAMANHO_LOTE_IDS]]
+            encontrados = {getattr(obj, coluna_id.key): obj for obj in query.filter(coluna_id.in_(ids))}
+            for id_doc in ids:
+                if id_doc not in encontrados:
+                    continue
+                if pular:
+                    pular -= 1
+                    continue
+                resultado.append(encontrados[id_doc])
+                if len(resultado) == limite:
+                    return resultado
+        return resultado
+
+
+motor_busca = MotorBusca()
+motor_busca.registrar("usuarios", Usuario.id, (Usuario.nome, Usuario.email), Usuario.atualizado_em)
+motor_busca.registrar("fontes", FonteDados.id, (FonteDados.nome,), FonteDados.atualizado_em)
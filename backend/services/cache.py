@@ -0,0 +1,149 @@
+"""
+Cache de resultados com TTL - IARECOMEND
+Resultados caros (agregados do dashboard) guardados por alguns segundos
+e invalidados explicitamente pelas rotas de escrita, e os backends do
+cache de respostas HTTP (services/cache_respostas.py)
+"""
+import importlib
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class CacheTTL:
+    """
+    Cache chave -> valor com expiração
+
+    O TTL limita a defasagem entre processos (cada worker uvicorn tem o
+    seu cache); dentro do processo, as rotas de escrita chamam
+    `invalidar` e a próxima leitura já recalcula.
+    """
+
+    def __init__(self, ttl_segundos: float = 5.0):
+        self.ttl_segundos = ttl_segundos
+        self._lock = Lock()
+        self._valores: Dict[str, Tuple[float, Any]] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def obter(self, chave: str, calcular: Callable[[], Any]) -> Any:
+        """Valor em cache ou `calcular()` (guardado até expirar)"""
+        agora = time.monotonic()
+        with self._lock:
+            item = self._valores.get(chave)
+            if item is not None and item[0] > agora:
+                self.hits += 1
+                return item[1]
+            self.misses += 1
+
+        valor = calcular()
+
+        with self._lock:
+            self._valores[chave] = (time.monotonic() + self.ttl_segundos, valor)
+        return valor
+
+    def invalidar(self, *chaves: str):
+        with self._lock:
+            for chave in chaves:
+                self._valores.pop(chave, None)
+
+    def limpar(self):
+        with self._lock:
+            self._valores.clear()
+
+
+# ============================================
+# BACKENDS PLUGÁVEIS (CACHE DE RESPOSTAS)
+# ============================================
+
+class BackendCache:
+    """
+    Interface de armazenamento do cache de respostas
+
+    Além das entradas (chave -> valor com TTL), o backend guarda os
+    contadores de versão por namespace. Um backend compartilhado
+    (Redis, memcached, tabela SQL) deve implementar os quatro métodos de
+    forma atômica entre processos e serializar os valores, que são
+    tuplas de bytes/str.
+    """
+
+    def obter(self, chave: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def gravar(self, chave: str, valor: Any, ttl_segundos: float):
+        raise NotImplementedError
+
+    def versao(self, namespace: str) -> int:
+        raise NotImplementedError
+
+    def incrementar(self, namespace: str) -> int:
+        raise NotImplementedError
+
+    def limpar(self):
+        pass
+
+
+class BackendMemoriaLRU(BackendCache):
+    """
+    Backend em processo: LRU limitado por quantidade de entradas
+
+    Versões e entradas são locais ao processo; com vários workers, as
+    invalidações dos outros chegam pelo log de estado compartilhado
+    (CacheRespostas.compartilhar_versoes, ESTADO_BACKEND mmap ou sql).
+    """
+
+    def __init__(self, max_entradas: int = 1000):
+        self.max_entradas = max_entradas
+        self._lock = Lock()
+        self._entradas: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._versoes: Dict[str, int] = {}
+
+    def obter(self, chave: str) -> Optional[Any]:
+        with self._lock:
+            item = self._entradas.get(chave)
+            if item is None:
+                return None
+            if item[0] <= time.monotonic():
+                del self._entradas[chave]
+                return None
+            self._entradas.move_to_end(chave)
+            return item[1]
+
+    def gravar(self, chave: str, valor: Any, ttl_segundos: float):
+        with self._lock:
+            self._entradas[chave] = (time.monotonic() + ttl_segundos, valor)
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def versao(self, namespace: str) -> int:
+        return self._versoes.get(namespace, 0)
+
+    def incrementar(self, namespace: str) -> int:
+        with self._lock:
+            versao = self._versoes[namespace] = self._versoes.get(namespace, 0) + 1
+            return versao
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+
+def carregar_backend(nome: str, max_entradas: int = 1000) -> BackendCache:
+    """
+    Backend pela configuração: "memoria" ou "pacote.modulo:Classe"
+    (classe sem argumentos obrigatórios que implementa BackendCache)
+    """
+    if nome in ("", "memoria"):
+        return BackendMemoriaLRU(max_entradas)
+
+    modulo, _, classe = nome.partition(":")
+    backend = getattr(importlib.import_module(modulo), classe)()
+    if not isinstance(backend, BackendCache):
+        raise TypeError(f"{nome} não implementa BackendCache")
+    return backend
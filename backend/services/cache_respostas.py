@@ -0,0 +1,243 @@
+"""
+Cache de respostas HTTP com ETag - IARECOMEND
+GETs de leitura frequente (listagens e estatísticas consultadas em
+polling pelo frontend) servidos do cache enquanto a versão dos dados não
+muda; If-None-Match com o ETag atual responde 304 sem executar a rota
+"""
+import asyncio
+import hashlib
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from config import settings
+from services.cache import BackendCache, carregar_backend
+from services.estado_compartilhado import EVENTO_INVALIDAR, EVENTO_LIMPAR, EstadoCompartilhado, estado_compartilhado
+
+# GETs cacheados (caminho sem barra final) -> namespaces dos quais dependem
+ROTAS_CACHEADAS: Dict[str, Tuple[str, ...]] = {
+    "/api/usuarios": ("usuarios",),
+    "/api/usuarios/stats": ("usuarios",),
+    "/api/fontes": ("fontes",),
+    "/api/fontes/stats": ("fontes",),
+    "/api/recomendacoes/estatisticas": ("recomendacoes",),
+}
+
+NAMESPACES = tuple(sorted({ns for namespaces in ROTAS_CACHEADAS.values() for ns in namespaces}))
+
+# Escritas bem-sucedidas (POST/PUT/PATCH/DELETE) sob o prefixo incrementam o namespace
+PREFIXOS_ESCRITA: Dict[str, str] = {
+    "/api/usuarios": "usuarios",
+    "/api/fontes": "fontes",
+    "/api/recomendacoes": "recomendacoes",
+}
+
+# Cabeçalhos da resposta original guardados junto com o corpo
+CABECALHOS_CACHEADOS = (b"content-type", b"x-cursor-proximo", b"x-cursor-anterior", b"link")
+
+METODOS_LEITURA = ("GET", "HEAD", "OPTIONS")
+
+
+class CacheRespostas:
+    """
+    Versões por namespace + entradas (ETag, corpo, cabeçalhos)
+
+    A chave de uma entrada é rota + query string normalizada + versões
+    dos namespaces da rota: incrementar a versão ("usuarios", "fontes",
+    "recomendacoes") invalida de uma vez todas as respostas que dependem
+    dela, sem precisar enumerar chaves.
+
+    Com vários workers, `compartilhar_versoes` replica os incrementos pelo
+    log de estado compartilhado; sem isso cada worker só vê as próprias
+    escritas até o TTL das entradas expirar.
+    """
+
+    def __init__(self, backend: BackendCache, ttl_segundos: float = 30.0):
+        self.backend = backend
+        self.ttl_segundos = ttl_segundos
+
+        self._sincronizadores: Dict[str, List[Callable[[], object]]] = {}
+        self._estado: Optional[EstadoCompartilhado] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.respostas_304 = 0
+
+    def chave(self, caminho: str, query_string: bytes, namespaces: Iterable[str]) -> str:
+        parametros = sorted(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True))
+        versoes = ",".join(f"{ns}={self.backend.versao(ns)}" for ns in namespaces)
+        return f"{caminho}?{urlencode(parametros)}|{versoes}"
+
+    def sincronizar_antes(self, namespace: str, sincronizar: Callable[[], object]):
+        """
+        Registra uma função chamada antes de cada leitura do namespace
+        Estado replicado de outros workers (services/estado_compartilhado.py)
+        só chega ao processo quando alguém sincroniza; sem isso um hit nunca
+        veria as escritas dos outros workers até o TTL expirar
+        """
+        self._sincronizadores.setdefault(namespace, []).append(sincronizar)
+
+    def compartilhar_versoes(self, estado: EstadoCompartilhado):
+        """
+        Publica cada invalidação no log de estado e aplica as dos outros
+        workers antes de cada leitura (no máximo ESTADO_INTERVALO_LEITURA_SEGUNDOS
+        de defasagem, em vez do TTL). Um "limpar" no log mmap trunca eventos
+        ainda não lidos: invalida todos os namespaces.
+        """
+        self._estado = estado
+        estado.ouvir(EVENTO_INVALIDAR, lambda namespaces: self.invalidar_local(*namespaces))
+        estado.ouvir(EVENTO_LIMPAR, lambda _: self.invalidar_local(*NAMESPACES))
+        for namespace in NAMESPACES:
+            self.sincronizar_antes(namespace, estado.sincronizar)
+
+    async def sincronizar(self, namespaces: Iterable[str]):
+        """Aplica as escritas pendentes dos namespaces (incrementa as versões afetadas)"""
+        for namespace in namespaces:
+            for sincronizar in self._sincronizadores.get(namespace, ()):
+                await asyncio.to_thread(sincronizar)
+
+    def invalidar(self, *namespaces: str):
+        """Chamado pelas escritas (middleware e jobs de sincronização); replica para os outros workers"""
+        self.invalidar_local(*namespaces)
+        if self._estado is not None:
+            self._estado.publicar(EVENTO_INVALIDAR, list(namespaces))
+
+    def invalidar_local(self, *namespaces: str):
+        """Só neste processo (eventos já replicados por outro worker)"""
+        for namespace in namespaces:
+            self.backend.incrementar(namespace)
+
+    def metricas(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "respostas_304": self.respostas_304,
+            "taxa_hit": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def _etag(corpo: bytes) -> bytes:
+    return b'"' + hashlib.sha1(corpo).hexdigest()[:20].encode() + b'"'
+
+def _cabecalho(scope, nome: bytes) -> Optional[bytes]:
+    for chave, valor in scope["headers"]:
+        if chave == nome:
+            return valor
+    return None
+
+def _etag_confere(if_none_match: Optional[bytes], etag: bytes) -> bool:
+    if not if_none_match:
+        return False
+    candidatos = [c.strip() for c in if_none_match.split(b",")]
+    return b"*" in candidatos or etag in candidatos or b"W/" + etag in candidatos
+
+
+class CacheRespostasMiddleware:
+    """
+    Middleware ASGI do cache de respostas
+
+    - GET em ROTAS_CACHEADAS: hit devolve o corpo guardado (ou 304 se o
+      If-None-Match confere) sem chamar a rota; miss executa a rota,
+      calcula o ETag do corpo e guarda respostas 200
+    - Escrita com sucesso sob PREFIXOS_ESCRITA: incrementa a versão do
+      namespace antes de a resposta ser enviada ao cliente
+    """
+
+    def __init__(self, app, cache: "CacheRespostas"):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        caminho = scope["path"].rstrip("/") or "/"
+        metodo = scope["method"]
+
+        if metodo == "GET" and caminho in ROTAS_CACHEADAS:
+            await self._leitura(scope, receive, send, caminho, ROTAS_CACHEADAS[caminho])
+        elif metodo not in METODOS_LEITURA:
+            namespace = next((ns for prefixo, ns in PREFIXOS_ESCRITA.items() if caminho.startswith(prefixo)), None)
+            if namespace is None:
+                await self.app(scope, receive, send)
+            else:
+                await self._escrita(scope, receive, send, namespace)
+        else:
+            await self.app(scope, receive, send)
+
+    async def _escrita(self, scope, receive, send, namespace: str):
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start" and mensagem["status"] < 400:
+                # Publicar no log de estado pode ir ao banco (backend sql)
+                await asyncio.to_thread(self.cache.invalidar, namespace)
+            await send(mensagem)
+
+        await self.app(scope, receive, enviar)
+
+    async def _leitura(self, scope, receive, send, caminho: str, namespaces: Tuple[str, ...]):
+        await self.cache.sincronizar(namespaces)
+        chave = self.cache.chave(caminho, scope["query_string"], namespaces)
+        if_none_match = _cabecalho(scope, b"if-none-match")
+
+        entrada = self.cache.backend.obter(chave)
+        if entrada is not None:
+            self.cache.hits += 1
+            etag, corpo, cabecalhos = entrada
+            await self._responder(send, etag, corpo, list(cabecalhos), if_none_match, b"HIT")
+            return
+
+        self.cache.misses += 1
+        inicio = {}
+        partes = []
+
+        async def capturar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                inicio.update(mensagem)
+            elif mensagem["type"] == "http.response.body":
+                partes.append(mensagem.get("body", b""))
+                if not mensagem.get("more_body", False):
+                    await finalizar()
+
+        async def finalizar():
+            corpo = b"".join(partes)
+            if inicio.get("status") != 200:
+                await send(inicio)
+                await send({"type": "http.response.body", "body": corpo})
+                return
+
+            etag = _etag(corpo)
+            cabecalhos = [(k, v) for k, v in inicio.get("headers", []) if k.lower() in CABECALHOS_CACHEADOS]
+            self.cache.backend.gravar(chave, (etag, corpo, tuple(cabecalhos)), self.cache.ttl_segundos)
+            await self._responder(send, etag, corpo, cabecalhos, if_none_match, b"MISS")
+
+        await self.app(scope, receive, capturar)
+
+    async def _responder(self, send, etag: bytes, corpo: bytes, cabecalhos: list,
+                         if_none_match: Optional[bytes], estado: bytes):
+        cabecalhos = cabecalhos + [
+            (b"etag", etag),
+            (b"cache-control", b"private, no-cache"),
+            (b"x-cache", estado),
+        ]
+
+        if _etag_confere(if_none_match, etag):
+            self.cache.respostas_304 += 1
+            cabecalhos = [(k, v) for k, v in cabecalhos if k.lower() != b"content-type"]
+            await send({"type": "http.response.start", "status": 304, "headers": cabecalhos})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        cabecalhos.append((b"content-length", str(len(corpo)).encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": cabecalhos})
+        await send({"type": "http.response.body", "body": corpo})
+
+
+cache_respostas = CacheRespostas(
+    carregar_backend(settings.CACHE_RESPOSTAS_BACKEND, settings.CACHE_RESPOSTAS_MAX_ENTRADAS),
+    ttl_segundos=settings.CACHE_RESPOSTAS_TTL_SEGUNDOS
+)
+
+# Vários workers (Procfile: --workers 2 com ESTADO_BACKEND=mmap): versões compartilhadas
+if settings.ESTADO_BACKEND != "memoria":
+    cache_respostas.compartilhar_versoes(estado_compartilhado)
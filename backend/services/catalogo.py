@@ -0,0 +1,205 @@
+"""
+Catálogo vetorizado de produtos - IARECOMEND
+Matriz NumPy do catálogo para pontuação de candidatos em uma única passada
+"""
+import random
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+# Pesos do score de cada candidato
+PESO_AFINIDADE = 0.5      # Categoria já comprada pelo cliente
+PESO_PRECO = 0.3          # Proximidade do valor médio de compra
+PESO_FREQUENCIA = 0.15    # Tags alinhadas à frequência de compra
+PESO_RUIDO = 0.35         # Exploração (mantém variedade entre requests)
+
+# Mix de categorias: 60% conhecidas, 40% novas
+PROPORCAO_CONHECIDAS = 0.6
+
+# Limite de células (clientes x produtos) da matriz de scores de um bloco do lote
+CELULAS_POR_BLOCO = 4_000_000
+
+# Tags que recebem boost conforme a frequência de compra do cliente
+TAGS_POR_FREQUENCIA = {
+    "Alta": ["premium", "flagship", "gaming"],
+    "Média": ["produtividade", "intermediario"],
+    "Baixa": ["custo-beneficio", "economico", "basico"],
+}
+
+
+class CatalogoProdutos:
+    """
+    Catálogo de produtos em formato colunar
+
+    - `categorias`: id inteiro da categoria de cada produto
+    - `precos` / `estoques`: vetores numéricos
+    - `tags`: bitset (uint64) com uma coluna para cada 64 tags do vocabulário
+
+    Os dicts originais são mantidos para montar a resposta dos selecionados.
+    """
+
+    def __init__(self, produtos: List[dict]):
+        self.produtos = list(produtos)
+
+        self.nomes_categorias: List[str] = sorted({p["categoria"] for p in self.produtos})
+        self.id_categoria: Dict[str, int] = {c: i for i, c in enumerate(self.nomes_categorias)}
+
+        vocabulario = sorted({tag for p in self.produtos for tag in p.get("tags", [])})
+        self.id_tag: Dict[str, int] = {t: i for i, t in enumerate(vocabulario)}
+        palavras = max(1, (len(vocabulario) + 63) // 64)
+
+        total = len(self.produtos)
+        self.categorias = np.empty(total, dtype=np.int32)
+        self.precos = np.empty(total, dtype=np.float64)
+        self.estoques = np.empty(total, dtype=np.int32)
+        self.tags = np.zeros((total, palavras), dtype=np.uint64)
+
+        for i, produto in enumerate(self.produtos):
+            self.categorias[i] = self.id_categoria[produto["categoria"]]
+            self.precos[i] = produto["preco"]
+            self.estoques[i] = produto.get("estoque", 0)
+            for tag in produto.get("tags", []):
+                bit = self.id_tag[tag]
+                self.tags[i, bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+
+        self.disponiveis = self.estoques > 0
+        self._cache_tags: Dict[str, np.ndarray] = {}
+        self._cache_frequencia: Dict[Optional[str], np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.produtos)
+
+    # ---------- Máscaras ----------
+
+    def mascara_tag(self, tag: str) -> np.ndarray:
+        """Máscara booleana dos produtos que possuem a tag"""
+        mascara = self._cache_tags.get(tag)
+        if mascara is None:
+            bit = self.id_tag.get(tag)
+            if bit is None:
+                mascara = np.zeros(len(self), dtype=bool)
+            else:
+                palavra = self.tags[:, bit // 64]
+                mascara = (palavra >> np.uint64(bit % 64)) & np.uint64(1) == 1
+            self._cache_tags[tag] = mascara
+        return mascara
+
+    def mascara_tags(self, tags: Iterable[str]) -> np.ndarray:
+        """Máscara dos produtos que possuem pelo menos uma das tags"""
+        mascara = np.zeros(len(self), dtype=bool)
+        for tag in tags:
+            mascara |= self.mascara_tag(tag)
+        return mascara
+
+    def mascara_frequencia(self, frequencia: Optional[str]) -> np.ndarray:
+        """Máscara das tags com boost para a frequência de compra (cacheada)"""
+        mascara = self._cache_frequencia.get(frequencia)
+        if mascara is None:
+            mascara = self.mascara_tags(TAGS_POR_FREQUENCIA.get(frequencia, []))
+            self._cache_frequencia[frequencia] = mascara
+        return mascara
+
+    def matriz_conhecidas(self, clientes: List) -> np.ndarray:
+        """Matriz (clientes x produtos) das categorias já compradas por cliente"""
+        por_categoria = np.zeros((len(clientes), len(self.nomes_categorias)), dtype=bool)
+        for linha, cliente_info in enumerate(clientes):
+            for categoria in cliente_info.historico_categorias or []:
+                coluna = self.id_categoria.get(categoria)
+                if coluna is not None:
+                    por_categoria[linha, coluna] = True
+        return por_categoria[:, self.categorias]
+
+    # ---------- Pontuação ----------
+
+    def ruido(self, rng: random.Random) -> np.ndarray:
+        """Termo de exploração do score, derivado do RNG do request"""
+        return np.random.default_rng(rng.getrandbits(64)).random(len(self))
+
+    def pontuar_lote(self, clientes: List, ruidos: np.ndarray, conhecidas: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Matriz de scores (clientes x produtos) em uma única passada vetorizada
+
+        Produtos sem estoque recebem -inf e nunca são selecionados.
+        """
+        if conhecidas is None:
+            conhecidas = self.matriz_conhecidas(clientes)
+
+        valores = np.array([c.valor_medio_compra or 0.0 for c in clientes], dtype=np.float64)[:, None]
+        com_valor = valores > 0
+        distancia = np.abs(self.precos - valores) / np.where(com_valor, valores, 1.0)
+        proximidade_preco = np.where(com_valor, 1.0 - np.minimum(distancia, 1.0), 0.5)
+
+        boost_frequencia = np.stack([self.mascara_frequencia(c.frequencia_compra) for c in clientes])
+
+        scores = (
+            PESO_AFINIDADE * conhecidas
+            + PESO_PRECO * proximidade_preco
+            + PESO_FREQUENCIA * boost_frequencia
+            + PESO_RUIDO * ruidos
+        )
+        return np.where(self.disponiveis, scores, -np.inf)
+
+    def pontuar(self, cliente_info, ruido: np.ndarray) -> np.ndarray:
+        """Score de todos os produtos para um cliente"""
+        return self.pontuar_lote([cliente_info], ruido[None, :])[0]
+
+    def selecionar(self, cliente_info, quantidade: int = 5, rng: random.Random = random) -> List[dict]:
+        """
+        Seleciona os `quantidade` melhores produtos respeitando o mix
+        de 60% categorias conhecidas e 40% categorias novas
+        """
+        return next(self.selecionar_lote([cliente_info], quantidade, [rng]))
+
+    def selecionar_lote(self, clientes: List, quantidade: int, rngs: List[random.Random]) -> Iterator[List[dict]]:
+        """
+        Seleciona produtos para vários clientes de uma vez (gerador)
+
+        Os clientes são pontuados em blocos (limitados por CELULAS_POR_BLOCO)
+        para manter a memória constante. Cada cliente usa o seu próprio RNG,
+        então o resultado é idêntico ao de `selecionar` com o mesmo RNG.
+        """
+        por_bloco = max(1, CELULAS_POR_BLOCO // max(len(self), 1))
+
+        for inicio in range(0, len(clientes), por_bloco):
+            bloco = clientes[inicio:inicio + por_bloco]
+            ruidos = np.stack([self.ruido(rng) for rng in rngs[inicio:inicio + por_bloco]])
+            conhecidas = self.matriz_conhecidas(bloco)
+            scores = self.pontuar_lote(bloco, ruidos, conhecidas)
+
+            for linha in range(len(bloco)):
+                indices = selecionar_mix(scores[linha], conhecidas[linha], quantidade)
+                yield [self.produtos[i] for i in indices]
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Índices dos k maiores scores finitos, em ordem decrescente (argpartition)"""
+    validos = int(np.isfinite(scores).sum())
+    k = min(k, validos)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    if k < len(scores):
+        candidatos = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidatos = np.arange(len(scores))
+    ordem = np.argsort(-scores[candidatos], kind="stable")
+    return candidatos[ordem][:k]
+
+def selecionar_mix(scores: np.ndarray, conhecidas: np.ndarray, quantidade: int) -> List[int]:
+    """
+    Aplica a restrição de mix sobre os scores:
+    int(60%) de categorias conhecidas, o restante de categorias novas e,
+    se faltar produto em algum grupo, completa com os melhores restantes
+    """
+    num_conhecidas = int(quantidade * PROPORCAO_CONHECIDAS)
+    num_novas = quantidade - num_conhecidas
+
+    selecionados = list(top_k(np.where(conhecidas, scores, -np.inf), num_conhecidas))
+    selecionados += list(top_k(np.where(conhecidas, -np.inf, scores), num_novas))
+
+    if len(selecionados) < quantidade:
+        restantes = scores.copy()
+        restantes[selecionados] = -np.inf
+        selecionados += list(top_k(restantes, quantidade - len(selecionados)))
+
+    return [int(i) for i in selecionados[:quantidade]]
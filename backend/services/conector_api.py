@@ -0,0 +1,430 @@
+"""
+Conector de APIs HTTP - IARECOMEND
+Ingestão assíncrona de fontes do tipo API: cliente HTTP com pool de
+conexões, paginação por página ou cursor, páginas em paralelo, respeito
+a 429/Retry-After e parse de JSON em streaming
+"""
+import asyncio
+import json
+import random
+import time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from config import settings
+from database import engine
+from services.ingestao_arquivos import descartar_carga, gravar_bloco, substituir_carga
+
+# Status HTTP que indicam limite de taxa / indisponibilidade temporária
+STATUS_RETENTATIVA = {429, 502, 503, 504}
+
+# Registros acumulados antes de cada gravação no banco
+TAMANHO_LOTE_GRAVACAO = 1000
+
+# Espera máxima entre tentativas (segundos)
+ESPERA_MAXIMA = 60.0
+
+
+class ErroAPI(Exception):
+    """Falha definitiva ao buscar uma página da API"""
+
+
+# ============================================
+# CLIENTE HTTP (POOL COMPARTILHADO)
+# ============================================
+
+_cliente: Optional[httpx.AsyncClient] = None
+
+def cliente_http() -> httpx.AsyncClient:
+    """Cliente HTTP compartilhado (conexões keep-alive reaproveitadas entre syncs)"""
+    global _cliente
+    if _cliente is None or _cliente.is_closed:
+        _cliente = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.API_TIMEOUT_SEGUNDOS),
+            limits=httpx.Limits(
+                max_connections=settings.API_MAX_CONEXOES,
+                max_keepalive_connections=settings.API_MAX_CONEXOES
+            ),
+            follow_redirects=True
+        )
+    return _cliente
+
+async def fechar_cliente():
+    """Fecha o pool de conexões (chamado no encerramento da aplicação)"""
+    global _cliente
+    if _cliente is not None:
+        await _cliente.aclose()
+        _cliente = None
+
+
+# ============================================
+# CONFIGURAÇÃO
+# ============================================
+
+class ConfigAPI:
+    """
+    Configuração em `parametros_adicionais.api`
+
+    Exemplo (paginação por número de página):
+        {
+            "paginacao": "pagina",
+            "caminho_registros": "data",
+            "parametro_pagina": "page",
+            "parametro_tamanho": "per_page",
+            "tamanho_pagina": 100,
+            "concorrencia": 4
+        }
+
+    Exemplo (cursor):
+        {"paginacao": "cursor", "caminho_registros": "items",
+         "caminho_cursor": "next_cursor", "parametro_cursor": "cursor"}
+
+    `caminho_registros` vazio significa que a resposta já é a lista.
+    """
+
+    def __init__(self, parametros: dict):
+        api = parametros.get("api") or {}
+
+        self.paginacao: str = api.get("paginacao", "nenhuma")
+        if self.paginacao not in ("pagina", "cursor", "nenhuma"):
+            raise ValueError("paginacao deve ser 'pagina', 'cursor' ou 'nenhuma'")
+
+        self.caminho_registros: str = api.get("caminho_registros", "")
+        self.parametro_pagina: str = api.get("parametro_pagina", "page")
+        self.pagina_inicial: int = int(api.get("pagina_inicial", 1))
+        self.parametro_tamanho: Optional[str] = api.get("parametro_tamanho", "per_page")
+        self.tamanho_pagina: int = int(api.get("tamanho_pagina", 100))
+        self.caminho_total_paginas: Optional[str] = api.get("caminho_total_paginas")
+        self.caminho_cursor: str = api.get("caminho_cursor", "next_cursor")
+        self.parametro_cursor: str = api.get("parametro_cursor", "cursor")
+        self.concorrencia: int = max(1, int(api.get("concorrencia", settings.API_CONCORRENCIA)))
+        self.max_paginas: int = int(api.get("max_paginas", 100000))
+        self.max_tentativas: int = int(api.get("max_tentativas", 5))
+        self.requisicoes_por_segundo: Optional[float] = api.get("requisicoes_por_segundo")
+        self.cabecalho_api_key: Optional[str] = api.get("cabecalho_api_key")
+        self.coluna_chave: Optional[str] = api.get("coluna_chave")
+        self.parametros_fixos: Dict[str, Any] = api.get("parametros", {})
+
+    @property
+    def prefixo_item(self) -> str:
+        """Prefixo ijson dos itens da lista de registros"""
+        return f"{self.caminho_registros}.item" if self.caminho_registros else "item"
+
+
+def cabecalhos(config: dict, cfg: ConfigAPI) -> Dict[str, str]:
+    headers = {"Accept": "application/json"}
+    headers.update(config.get("headers_json") or {})
+    if config.get("api_key"):
+        if cfg.cabecalho_api_key:
+            headers[cfg.cabecalho_api_key] = config["api_key"]
+        else:
+            headers.setdefault("Authorization", f"Bearer {config['api_key']}")
+    return headers
+
+
+# ============================================
+# LIMITE DE TAXA
+# ============================================
+
+class LimitadorTaxa:
+    """
+    Espaça as requisições (requisicoes_por_segundo) e aplica pausas
+    globais: um 429 com Retry-After pausa todas as requisições da sync
+    """
+
+    def __init__(self, requisicoes_por_segundo: Optional[float] = None):
+        self.intervalo = 1.0 / requisicoes_por_segundo if requisicoes_por_segundo else 0.0
+        self._proxima = 0.0
+        self._pausa_ate = 0.0
+        self._lock = asyncio.Lock()
+
+    def pausar(self, segundos: float):
+        self._pausa_ate = max(self._pausa_ate, time.monotonic() + segundos)
+
+    async def aguardar(self):
+        async with self._lock:
+            agora = time.monotonic()
+            inicio = max(agora, self._proxima, self._pausa_ate)
+            self._proxima = inicio + self.intervalo
+        if inicio > agora:
+            await asyncio.sleep(inicio - agora)
+
+
+def espera_retry_after(valor: Optional[str]) -> Optional[float]:
+    """Segundos indicados no header Retry-After (número ou data HTTP)"""
+    if not valor:
+        return None
+    try:
+        return max(float(valor), 0.0)
+    except ValueError:
+        pass
+    try:
+        data = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    return max((data - datetime.now(tz=data.tzinfo)).total_seconds(), 0.0)
+
+def espera_backoff(tentativa: int) -> float:
+    """Backoff exponencial com jitter: ~0.5s, 1s, 2s, 4s..."""
+    return min(ESPERA_MAXIMA, 0.5 * 2 ** tentativa) * random.uniform(0.5, 1.0)
+
+
+# ============================================
+# PARSE EM STREAMING
+# ============================================
+
+class _LeitorResposta:
+    """Adapta o corpo da resposta httpx para o `read()` assíncrono do ijson"""
+
+    def __init__(self, resposta: httpx.Response):
+        self._partes = resposta.aiter_bytes()
+
+    async def read(self, tamanho: int = -1) -> bytes:
+        if tamanho == 0:
+            return b""  # ijson lê 0 bytes para detectar bytes/str
+        # b"" significa fim do corpo para o ijson: pula partes vazias
+        async for parte in self._partes:
+            if parte:
+                return parte
+        return b""
+
+
+def _valor_no_caminho(documento: Any, caminho: str) -> Any:
+    for parte in filter(None, caminho.split(".")):
+        if not isinstance(documento, dict):
+            return None
+        documento = documento.get(parte)
+    return documento
+
+async def eventos_resposta(resposta: httpx.Response, cfg: ConfigAPI, metadados: Dict[str, Any]) -> AsyncIterator[Any]:
+    """
+    Itens da resposta, um a um, sem carregar o corpo inteiro (ijson)
+    Cursor e total de páginas são preenchidos em `metadados` durante o parse
+
+    Sem ijson instalado, o corpo é lido inteiro e parseado com json.
+    """
+    campos = {}
+    if cfg.paginacao == "cursor":
+        campos[cfg.caminho_cursor] = "cursor"
+    if cfg.caminho_total_paginas:
+        campos[cfg.caminho_total_paginas] = "total_paginas"
+
+    try:
+        import ijson
+    except ImportError:
+        ijson = None
+
+    if ijson is None:
+        documento = json.loads(await resposta.aread())
+        for caminho, chave in campos.items():
+            metadados[chave] = _valor_no_caminho(documento, caminho)
+        itens = _valor_no_caminho(documento, cfg.caminho_registros) if cfg.caminho_registros else documento
+        for item in itens or []:
+            yield item
+        return
+
+    prefixo = cfg.prefixo_item
+    construtor = None
+    fim = None
+
+    async for caminho, evento, valor in ijson.parse_async(_LeitorResposta(resposta), use_float=True):
+        if construtor is not None:
+            construtor.event(evento, valor)
+            if caminho == prefixo and evento == fim:
+                yield construtor.value
+                construtor = None
+        elif caminho == prefixo:
+            if evento in ("start_map", "start_array"):
+                construtor = ijson.ObjectBuilder()
+                construtor.event(evento, valor)
+                fim = "end_map" if evento == "start_map" else "end_array"
+            else:
+                yield valor
+        elif caminho in campos and evento in ("string", "number", "null", "boolean"):
+            metadados[campos[caminho]] = valor
+
+
+# ============================================
+# INGESTÃO
+# ============================================
+
+class IngestaoAPI:
+    """Estado de uma sincronização de API (contadores, gravação, limites)"""
+
+    def __init__(self, config: dict, progresso: Optional[Callable[[int, Optional[int]], None]] = None,
+                 cliente: Optional[httpx.AsyncClient] = None, bind=None):
+        self.config = config
+        self.cfg = ConfigAPI(config.get("parametros_adicionais") or {})
+        self.progresso = progresso
+        self.cliente = cliente or cliente_http()
+        self.bind = bind or engine
+        self.headers = cabecalhos(config, self.cfg)
+        self.limitador = LimitadorTaxa(self.cfg.requisicoes_por_segundo)
+        self.marca = datetime.utcnow()
+
+        self.paginas = 0
+        self.registros = 0
+        self.retentativas = 0
+
+    async def _gravar(self, itens: List[Any]):
+        linhas = [
+            {
+                "fonte_id": self.config["id"],
+                "chave": str(item[self.cfg.coluna_chave])
+                if self.cfg.coluna_chave and isinstance(item, dict) and item.get(self.cfg.coluna_chave) is not None
+                else None,
+                "dados": item if isinstance(item, dict) else {"valor": item},
+                "importado_em": self.marca,
+            }
+            for item in itens
+        ]
+
+        def gravar():
+            with self.bind.begin() as conexao:
+                gravar_bloco(conexao, linhas)
+
+        await asyncio.to_thread(gravar)
+        self.registros += len(linhas)
+        if self.progresso:
+            self.progresso(self.registros, None)
+
+    async def buscar_pagina(self, params: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        """
+        Busca uma página e grava os itens em lotes durante o parse
+        Retorna (quantidade de itens, metadados: cursor/total_paginas)
+
+        Se a conexão cair no meio da página, a nova tentativa pula os itens
+        que já foram gravados (a API devolve a mesma página na mesma ordem)
+        """
+        url = self.config["url_api"]
+        params = {**self.cfg.parametros_fixos, **params}
+        gravados = 0
+
+        for tentativa in range(self.cfg.max_tentativas):
+            await self.limitador.aguardar()
+            try:
+                async with self.cliente.stream("GET", url, params=params, headers=self.headers) as resposta:
+                    if resposta.status_code in STATUS_RETENTATIVA:
+                        espera = espera_retry_after(resposta.headers.get("Retry-After"))
+                        if espera is None:
+                            espera = espera_backoff(tentativa)
+                        self.limitador.pausar(espera)
+                        self.retentativas += 1
+                        continue
+
+                    if resposta.status_code >= 400:
+                        raise ErroAPI(f"HTTP {resposta.status_code} em {resposta.request.url}")
+
+                    metadados: Dict[str, Any] = {}
+                    quantidade = 0
+                    lote: List[Any] = []
+                    async for item in eventos_resposta(resposta, self.cfg, metadados):
+                        quantidade += 1
+                        if quantidade <= gravados:
+                            continue
+                        lote.append(item)
+                        if len(lote) >= TAMANHO_LOTE_GRAVACAO:
+                            await self._gravar(lote)
+                            gravados += len(lote)
+                            lote = []
+                    if lote:
+                        await self._gravar(lote)
+                        gravados += len(lote)
+
+                    self.paginas += 1
+                    return quantidade, metadados
+
+            except (httpx.TransportError, httpx.DecodingError) as e:
+                if tentativa + 1 >= self.cfg.max_tentativas:
+                    raise ErroAPI(f"Falha de conexão com a API: {e}")
+                self.retentativas += 1
+                await asyncio.sleep(espera_backoff(tentativa))
+
+        raise ErroAPI(f"Limite de {self.cfg.max_tentativas} tentativas excedido em {url}")
+
+    def _params_pagina(self, pagina: int) -> Dict[str, Any]:
+        params = {self.cfg.parametro_pagina: pagina}
+        if self.cfg.parametro_tamanho:
+            params[self.cfg.parametro_tamanho] = self.cfg.tamanho_pagina
+        return params
+
+    async def _por_pagina(self):
+        """
+        Páginas numeradas buscadas em paralelo (até `concorrencia`)
+        A última página é a primeira com menos itens que `tamanho_pagina`
+        (ou `caminho_total_paginas`, se a API informar)
+        """
+        proxima = self.cfg.pagina_inicial
+        ultima = self.cfg.pagina_inicial + self.cfg.max_paginas - 1
+
+        async def trabalhador():
+            nonlocal proxima, ultima
+            while proxima <= ultima:
+                pagina = proxima
+                proxima += 1
+                quantidade, metadados = await self.buscar_pagina(self._params_pagina(pagina))
+
+                if metadados.get("total_paginas"):
+                    ultima = min(ultima, self.cfg.pagina_inicial + int(metadados["total_paginas"]) - 1)
+                if quantidade < self.cfg.tamanho_pagina:
+                    ultima = min(ultima, pagina)
+
+        trabalhadores = [asyncio.create_task(trabalhador()) for _ in range(self.cfg.concorrencia)]
+        try:
+            await asyncio.gather(*trabalhadores)
+        except BaseException:
+            for tarefa in trabalhadores:
+                tarefa.cancel()
+            await asyncio.gather(*trabalhadores, return_exceptions=True)
+            raise
+
+    async def _por_cursor(self):
+        """Paginação por cursor (sequencial: cada página indica a próxima)"""
+        cursor = None
+        for _ in range(self.cfg.max_paginas):
+            params = {self.cfg.parametro_cursor: cursor} if cursor else {}
+            if self.cfg.parametro_tamanho:
+                params[self.cfg.parametro_tamanho] = self.cfg.tamanho_pagina
+            _, metadados = await self.buscar_pagina(params)
+            cursor = metadados.get("cursor")
+            if not cursor:
+                break
+
+    async def executar(self) -> dict:
+        fonte_id = self.config["id"]
+        inicio = time.perf_counter()
+
+        try:
+            if self.cfg.paginacao == "pagina":
+                await self._por_pagina()
+            elif self.cfg.paginacao == "cursor":
+                await self._por_cursor()
+            else:
+                await self.buscar_pagina({})
+            await asyncio.to_thread(substituir_carga, self.bind, fonte_id, self.marca)
+        except BaseException:
+            await asyncio.shield(asyncio.to_thread(descartar_carga, self.bind, fonte_id, self.marca))
+            raise
+
+        tempo = time.perf_counter() - inicio
+        if self.progresso:
+            self.progresso(self.registros, self.registros)
+
+        return {
+            "registros_importados": self.registros,
+            "registros_atualizados": 0,
+            "registros_com_erro": 0,
+            "registros_por_segundo": round(self.registros / tempo, 1) if tempo > 0 else None,
+            "paginas_por_segundo": round(self.paginas / tempo, 2) if tempo > 0 else None,
+            "paginas": self.paginas,
+            "retentativas": self.retentativas,
+            "substitui_carga": True,
+        }
+
+
+async def importar_api(config: dict, progresso: Optional[Callable[[int, Optional[int]], None]] = None) -> dict:
+    """Importa todos os registros da API da fonte"""
+    return await IngestaoAPI(config, progresso).executar()
@@ -0,0 +1,232 @@
+"""
+Conectores de fontes de dados - IARECOMEND
+Testes de conexão e sincronizações assíncronas, com timeout por fonte
+e limite de sincronizações simultâneas por tipo de fonte
+"""
+import asyncio
+import base64
+import random
+import time
+from typing import Callable, Dict, Optional
+
+from config import settings
+from services import conector_api, ingestao_arquivos, sincronizacao_incremental
+from services.pool_conectores import DRIVERS_POR_TIPO, pool_conectores
+
+# Callback de progresso: (registros_processados, total_estimado)
+CallbackProgresso = Callable[[int, Optional[int]], None]
+
+
+def criptografar_senha(senha: str) -> str:
+    """
+    Criptografia simples para demonstração
+    EM PRODUÇÃO: usar Fernet ou similar
+    """
+    if not senha:
+        return None
+    # Apenas para demonstração - em produção usar criptografia real
+    return base64.b64encode(senha.encode()).decode()
+
+def descriptografar_senha(senha_cripto: str) -> str:
+    """Descriptografa senha"""
+    if not senha_cripto:
+        return None
+    return base64.b64decode(senha_cripto.encode()).decode()
+
+def configuracao_fonte(fonte) -> dict:
+    """Configuração de uma FonteDados para os conectores (inclui credenciais)"""
+    config = fonte.to_dict()
+    config['senha'] = descriptografar_senha(fonte.senha_criptografada)
+    config['api_key'] = fonte.api_key
+    config['headers_json'] = fonte.headers_json
+    return config
+
+
+class LimitadorConcorrencia:
+    """
+    Limita quantas sincronizações de um mesmo tipo rodam ao mesmo tempo
+
+    Um semáforo por tipo de fonte (mysql, api, csv...). As demais ficam
+    aguardando na fila do semáforo sem ocupar threads do servidor.
+    """
+
+    def __init__(self, limite_por_tipo: int):
+        self.limite_por_tipo = limite_por_tipo
+        self._semaforos: Dict[str, asyncio.Semaphore] = {}
+
+    def semaforo(self, tipo: str) -> asyncio.Semaphore:
+        semaforo = self._semaforos.get(tipo)
+        if semaforo is None:
+            semaforo = self._semaforos[tipo] = asyncio.Semaphore(self.limite_por_tipo)
+        return semaforo
+
+    def em_uso(self) -> Dict[str, int]:
+        """Sincronizações em andamento por tipo"""
+        return {
+            tipo: self.limite_por_tipo - semaforo._value
+            for tipo, semaforo in self._semaforos.items()
+        }
+
+
+limitador_sync = LimitadorConcorrencia(settings.SYNC_CONCORRENCIA_POR_TIPO)
+
+
+def timeout_fonte(config: dict, padrao: float) -> float:
+    """Timeout da fonte: `timeout_segundos` em parametros_adicionais ou o padrão"""
+    parametros = config.get('parametros_adicionais') or {}
+    try:
+        return float(parametros.get('timeout_segundos', padrao))
+    except (TypeError, ValueError):
+        return padrao
+
+
+async def _simular_teste_conexao(config: dict) -> dict:
+    """
+    Simula teste de conexão com a fonte de dados
+    EM PRODUÇÃO: implementar conexões reais
+    """
+    await asyncio.sleep(random.uniform(0.5, 1.5))  # Simula latência
+
+    tipo = config.get('tipo')
+
+    # Simula falha aleatória (10% de chance)
+    if random.random() < 0.1:
+        return {
+            'sucesso': False,
+            'mensagem': f'Erro ao conectar: Timeout na conexão com {tipo}',
+            'tempo_resposta_ms': random.uniform(3000, 5000),
+            'detalhes': {'erro': 'Connection timeout'}
+        }
+
+    # Sucesso
+    detalhes_por_tipo = {
+        'mysql': {'versao_servidor': 'MySQL 8.0.35', 'charset': 'utf8mb4', 'tabelas_encontradas': random.randint(20, 100)},
+        'postgresql': {'versao_servidor': 'PostgreSQL 15.3', 'encoding': 'UTF8', 'schemas': random.randint(2, 10)},
+        'sqlserver': {'versao_servidor': 'SQL Server 2022', 'collation': 'Latin1_General_CI_AS'},
+        'oracle': {'versao_servidor': 'Oracle 19c', 'sid': config.get('database', 'ORCL')},
+        'mongodb': {'versao_servidor': 'MongoDB 7.0', 'collections': random.randint(10, 50)},
+        'api': {'endpoint': config.get('url_api'), 'status_code': 200, 'formato': 'JSON'},
+        'csv': {'linhas_encontradas': random.randint(100, 10000), 'colunas': random.randint(5, 30)},
+        'excel': {'planilhas': random.randint(1, 5), 'linhas_total': random.randint(500, 20000)}
+    }
+
+    return {
+        'sucesso': True,
+        'mensagem': f'Conexão estabelecida com sucesso em {tipo.upper()}!',
+        'tempo_resposta_ms': random.uniform(50, 300),
+        'detalhes': detalhes_por_tipo.get(tipo, {})
+    }
+
+def _testar_relacional_sync(config: dict) -> dict:
+    """
+    Testa a conexão com uma fonte relacional usando a engine do pool
+    (a conexão aberta no teste fica quente para as próximas syncs)
+    """
+    tipo = getattr(config.get('tipo'), 'value', config.get('tipo'))
+    inicio = time.perf_counter()
+
+    try:
+        engine = pool_conectores.engine(config)
+        with engine.connect() as conexao:
+            engine.dialect.do_ping(conexao.connection.dbapi_connection)
+            versao = engine.dialect.server_version_info
+    except Exception as e:
+        # Configuração inválida não deve ficar ocupando o pool
+        pool_conectores.invalidar(config=config)
+        if isinstance(e, ImportError):
+            mensagem = f'Driver {DRIVERS_POR_TIPO[tipo]} não instalado no servidor'
+        else:
+            mensagem = f'Erro ao conectar em {tipo}: {e.__class__.__name__}'
+        return {
+            'sucesso': False,
+            'mensagem': mensagem,
+            'tempo_resposta_ms': (time.perf_counter() - inicio) * 1000,
+            'detalhes': {'erro': str(e).splitlines()[0] if str(e) else e.__class__.__name__}
+        }
+
+    return {
+        'sucesso': True,
+        'mensagem': f'Conexão estabelecida com sucesso em {tipo.upper()}!',
+        'tempo_resposta_ms': (time.perf_counter() - inicio) * 1000,
+        'detalhes': {
+            'versao_servidor': '.'.join(str(parte) for parte in versao) if versao else None,
+            'dialeto': engine.dialect.name
+        }
+    }
+
+async def testar_conexao(config: dict) -> dict:
+    """
+    Testa a conexão respeitando o timeout da fonte
+    Um timeout vira um resultado de falha, não uma exceção
+
+    Fontes relacionais conectam de fato (via pool de conectores);
+    os demais tipos ainda são simulados.
+    """
+    timeout = timeout_fonte(config, settings.TESTE_CONEXAO_TIMEOUT_SEGUNDOS)
+    inicio = time.perf_counter()
+
+    if config.get('tipo') in DRIVERS_POR_TIPO:
+        teste = asyncio.to_thread(_testar_relacional_sync, config)
+    else:
+        teste = _simular_teste_conexao(config)
+
+    try:
+        return await asyncio.wait_for(teste, timeout)
+    except asyncio.TimeoutError:
+        return {
+            'sucesso': False,
+            'mensagem': f'Erro ao conectar: tempo limite de {timeout:.0f}s excedido',
+            'tempo_resposta_ms': (time.perf_counter() - inicio) * 1000,
+            'detalhes': {'erro': 'Connection timeout', 'timeout_segundos': timeout}
+        }
+
+
+async def _simular_importacao(config: dict, progresso: Optional[CallbackProgresso] = None) -> dict:
+    """
+    Simula a importação de dados da fonte
+    EM PRODUÇÃO: implementar lógica real de importação
+    """
+    total = random.randint(100, 5000)
+    etapas = 10
+    duracao = random.uniform(1, 3)  # Simula processamento
+
+    for etapa in range(1, etapas + 1):
+        await asyncio.sleep(duracao / etapas)
+        if progresso:
+            progresso(total * etapa // etapas, total)
+
+    return {
+        'registros_importados': total,
+        'registros_atualizados': random.randint(10, 500),
+        'registros_com_erro': random.randint(0, 10)
+    }
+
+async def sincronizar(
+    config: dict,
+    timeout: Optional[float] = None,
+    progresso: Optional[CallbackProgresso] = None
+) -> dict:
+    """
+    Executa a importação da fonte como corrotina
+    CSV/Excel usam a ingestão em blocos (services/ingestao_arquivos.py) e
+    fontes relacionais com `incremental` configurado puxam só o que mudou
+    (services/sincronizacao_incremental.py); APIs usam services/conector_api.py
+
+    - Aguarda vaga no limitador do tipo da fonte
+    - Cancela a importação se exceder o timeout (asyncio.TimeoutError)
+    - Reporta o andamento via `progresso(processados, total_estimado)`
+    """
+    if timeout is None:
+        timeout = timeout_fonte(config, settings.SYNC_TIMEOUT_SEGUNDOS)
+
+    if config.get('tipo') in ('csv', 'excel'):
+        importar = ingestao_arquivos.importar_arquivo
+    elif config.get('tipo') == 'api':
+        importar = conector_api.importar_api
+    elif sincronizacao_incremental.usa_incremental(config):
+        importar = sincronizacao_incremental.sincronizar_incremental
+    else:
+        importar = _simular_importacao
+    
+    async with limitador_sync.semaforo(config.get('tipo')):
+        return await asyncio.wait_for(importar(config, progresso), timeout)
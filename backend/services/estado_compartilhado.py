@@ -0,0 +1,354 @@
+"""
+Estado compartilhado entre workers - IARECOMEND
+Histórico de recomendações e feedbacks consistente entre processos
+(uvicorn --workers N) por meio de um log de eventos plugável
+"""
+import json
+import mmap
+import os
+import struct
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import delete, insert, select
+
+from config import settings
+from database import engine
+from models import EventoEstado
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem flock, o backend mmap fica indisponível
+    fcntl = None
+
+# Tipos de evento
+EVENTO_RECOMENDACOES = "recomendacoes"
+EVENTO_FEEDBACKS = "feedbacks"
+EVENTO_LIMPAR = "limpar"
+EVENTO_INVALIDAR = "invalidar"  # versões de namespaces do cache de respostas
+
+
+class LogEventos:
+    """
+    Interface do log de eventos compartilhado
+
+    `publicar` anexa um evento; `ler_novos` devolve, em ordem, os eventos
+    anexados desde a última leitura deste processo (podendo repetir
+    eventos já vistos: a aplicação é idempotente), com `criado_em`
+    (timestamp unix da publicação).
+    """
+
+    def publicar(self, evento: dict):
+        raise NotImplementedError
+
+    def ler_novos(self) -> List[dict]:
+        raise NotImplementedError
+
+
+class LogMemoria(LogEventos):
+    """Processo único: nada a compartilhar"""
+
+    def publicar(self, evento: dict):
+        pass
+
+    def ler_novos(self) -> List[dict]:
+        return []
+
+
+class LogMmap(LogEventos):
+    """
+    Log em arquivo local lido via mmap (workers na mesma máquina)
+
+    Formato: cabeçalho [marca][geração: u64][base: u64] seguido de
+    registros [tamanho: u32][criado_em: f64][JSON]. Escritas usam flock
+    exclusivo e leituras flock compartilhado, então um leitor nunca vê
+    registro pela metade.
+
+    Leitores guardam a posição lógica (bytes desde o início da geração);
+    `base` é a posição lógica do primeiro registro ainda no arquivo:
+    - A compactação (no máximo a cada minuto, em `publicar`) descarta os
+      registros mais antigos que `retencao_segundos` (nesse prazo a fila de
+      escrita já os gravou nas tabelas definitivas) e avança `base`;
+      leitores atrasados pulam para o primeiro registro mantido
+    - O evento "limpar" trunca o arquivo e incrementa a geração: leitores
+      que detectam a nova geração recomeçam do início
+    """
+
+    MARCA = b"IARECEV2"
+    CABECALHO = struct.Struct("<8sQQ")
+    REGISTRO = struct.Struct("<Id")
+    INTERVALO_COMPACTACAO_SEGUNDOS = 60
+
+    def __init__(self, caminho: str, retencao_segundos: float = 3600):
+        if fcntl is None:
+            raise RuntimeError("Backend mmap requer fcntl (Linux/macOS)")
+        self.caminho = caminho
+        self.retencao_segundos = retencao_segundos
+        self._fd: Optional[int] = None
+        self._pid: Optional[int] = None
+        self._geracao: Optional[int] = None
+        self._posicao = 0
+        self._proxima_compactacao = 0.0
+
+    def _abrir(self) -> int:
+        """Abre por processo (descritores herdados num fork não são usados)"""
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = os.open(self.caminho, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                # Arquivo novo ou de outro formato: recomeça vazio
+                cabecalho = os.pread(self._fd, self.CABECALHO.size, 0)
+                if len(cabecalho) < self.CABECALHO.size or not cabecalho.startswith(self.MARCA):
+                    os.ftruncate(self._fd, 0)
+                    os.pwrite(self._fd, self.CABECALHO.pack(self.MARCA, 0, 0), 0)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return self._fd
+
+    def _ler_cabecalho(self, fd: int):
+        _, geracao, base = self.CABECALHO.unpack(os.pread(fd, self.CABECALHO.size, 0))
+        return geracao, base
+
+    def publicar(self, evento: dict):
+        fd = self._abrir()
+        dados = json.dumps(evento, separators=(",", ":"), default=str).encode()
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if evento["tipo"] == EVENTO_LIMPAR:
+                geracao, _ = self._ler_cabecalho(fd)
+                os.ftruncate(fd, 0)
+                os.pwrite(fd, self.CABECALHO.pack(self.MARCA, geracao + 1, 0), 0)
+            elif time.monotonic() >= self._proxima_compactacao:
+                self._proxima_compactacao = time.monotonic() + self.INTERVALO_COMPACTACAO_SEGUNDOS
+                self._compactar(fd)
+            fim = os.fstat(fd).st_size
+            os.pwrite(fd, self.REGISTRO.pack(len(dados), time.time()) + dados, fim)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def _compactar(self, fd: int):
+        """Descarta os registros anteriores à retenção (chamado com flock exclusivo)"""
+        tamanho = os.fstat(fd).st_size
+        limite = time.time() - self.retencao_segundos
+        corte = self.CABECALHO.size
+        with mmap.mmap(fd, tamanho, access=mmap.ACCESS_READ) as mapa:
+            while corte + self.REGISTRO.size <= tamanho:
+                comprimento, criado_em = self.REGISTRO.unpack_from(mapa, corte)
+                if criado_em >= limite:
+                    break
+                corte += self.REGISTRO.size + comprimento
+            mantidos = mapa[corte:tamanho]
+
+        descartados = corte - self.CABECALHO.size
+        if not descartados:
+            return
+        geracao, base = self._ler_cabecalho(fd)
+        os.pwrite(fd, mantidos, self.CABECALHO.size)
+        os.ftruncate(fd, self.CABECALHO.size + len(mantidos))
+        os.pwrite(fd, self.CABECALHO.pack(self.MARCA, geracao, base + descartados), 0)
+
+    def ler_novos(self) -> List[dict]:
+        fd = self._abrir()
+        eventos = []
+        fcntl.flock(fd, fcntl.LOCK_SH)
+        try:
+            tamanho = os.fstat(fd).st_size
+            if tamanho < self.CABECALHO.size:
+                return eventos
+
+            with mmap.mmap(fd, tamanho, access=mmap.ACCESS_READ) as mapa:
+                _, geracao, base = self.CABECALHO.unpack_from(mapa, 0)
+                if geracao != self._geracao:
+                    self._geracao = geracao
+                    self._posicao = 0
+                # Registros anteriores a `base` foram compactados
+                self._posicao = max(self._posicao, base)
+
+                fisica = self.CABECALHO.size + self._posicao - base
+                while fisica + self.REGISTRO.size <= tamanho:
+                    comprimento, criado_em = self.REGISTRO.unpack_from(mapa, fisica)
+                    inicio = fisica + self.REGISTRO.size
+                    if inicio + comprimento > tamanho:
+                        break
+                    evento = json.loads(mapa[inicio:inicio + comprimento])
+                    evento["criado_em"] = criado_em
+                    eventos.append(evento)
+                    fisica = inicio + comprimento
+                    self._posicao = fisica - self.CABECALHO.size + base
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        return eventos
+
+
+class LogSQL(LogEventos):
+    """
+    Log na tabela eventos_estado (workers em máquinas diferentes)
+
+    Lê por `criado_em` com uma janela de sobreposição (ids de sequência
+    podem ser confirmados fora de ordem) e descarta os ids já vistos.
+    Eventos mais antigos que `retencao_segundos` são apagados: nesse
+    prazo a fila de escrita já gravou recomendações e feedbacks nas
+    tabelas definitivas.
+    """
+
+    JANELA_SOBREPOSICAO = timedelta(seconds=5)
+
+    def __init__(self, bind=None, retencao_segundos: float = 3600):
+        self.bind = bind if bind is not None else engine
+        self.retencao = timedelta(seconds=retencao_segundos)
+        self._marca: Optional[datetime] = None
+        self._vistos: Dict[int, datetime] = {}
+        self._proxima_limpeza = 0.0
+
+    def publicar(self, evento: dict):
+        tabela = EventoEstado.__table__
+        with self.bind.begin() as conexao:
+            conexao.execute(insert(tabela).values(
+                origem=evento["origem"], tipo=evento["tipo"], dados=evento["dados"], criado_em=datetime.utcnow()
+            ))
+
+    def ler_novos(self) -> List[dict]:
+        tabela = EventoEstado.__table__
+        agora = datetime.utcnow()
+        if self._marca is None:
+            self._marca = agora - self.retencao
+
+        with self.bind.connect() as conexao:
+            linhas = conexao.execute(
+                select(tabela.c.id, tabela.c.origem, tabela.c.tipo, tabela.c.dados, tabela.c.criado_em)
+                .where(tabela.c.criado_em >= self._marca - self.JANELA_SOBREPOSICAO)
+                .order_by(tabela.c.criado_em, tabela.c.id)
+            ).all()
+
+        eventos = []
+        for id_evento, origem, tipo, dados, criado_em in linhas:
+            if id_evento in self._vistos:
+                continue
+            self._vistos[id_evento] = criado_em
+            eventos.append({
+                "origem": origem,
+                "tipo": tipo,
+                "dados": dados,
+                "criado_em": criado_em.replace(tzinfo=timezone.utc).timestamp(),
+            })
+            self._marca = max(self._marca, criado_em)
+
+        limite = self._marca - self.JANELA_SOBREPOSICAO
+        self._vistos = {i: c for i, c in self._vistos.items() if c >= limite}
+
+        if time.monotonic() >= self._proxima_limpeza:
+            self._proxima_limpeza = time.monotonic() + 60
+            with self.bind.begin() as conexao:
+                conexao.execute(delete(tabela).where(tabela.c.criado_em < agora - self.retencao))
+
+        return eventos
+
+
+class EstadoCompartilhado:
+    """
+    Replica entre workers as escritas no estado do recomendador
+
+    Cada worker aplica as próprias escritas localmente e publica o evento;
+    antes de leituras, `sincronizar` aplica os eventos dos outros workers
+    (via callback configurado pelas rotas e ouvintes por tipo de evento,
+    como o cache de respostas). Com o log em memória é no-op.
+    """
+
+    def __init__(self, log: LogEventos, intervalo_leitura_segundos: float = 0.5):
+        self.log = log
+        self.intervalo_leitura_segundos = intervalo_leitura_segundos
+        self.origem = uuid.uuid4().hex
+        self._aplicar: Optional[Callable[[List[dict]], None]] = None
+        self._ouvintes: Dict[str, List[Callable[[list], None]]] = {}
+        self._lock = Lock()
+        self._proxima_leitura = 0.0
+        self._inicio = time.time()
+
+        self.publicados = 0
+        self.aplicados = 0
+        self.erros = 0
+
+    def configurar(self, aplicar: Callable[[List[dict]], None]):
+        self._aplicar = aplicar
+
+    def ouvir(self, tipo: str, ouvinte: Callable[[list], None]):
+        """Chama `ouvinte(dados)` para cada evento do tipo vindo de outro worker"""
+        self._ouvintes.setdefault(tipo, []).append(ouvinte)
+
+    def marcar_inicio(self):
+        """
+        Chamado no lifespan antes de restaurar o histórico do banco: um
+        "limpar" publicado antes disso já está refletido no banco e não
+        deve apagar o que for restaurado
+        """
+        self._inicio = time.time()
+
+    def publicar(self, tipo: str, dados: list):
+        """Publica o evento; falha no log não desfaz a escrita local"""
+        if isinstance(self.log, LogMemoria):
+            return
+        try:
+            self.log.publicar({"origem": self.origem, "tipo": tipo, "dados": dados})
+            self.publicados += 1
+        except Exception as e:
+            self.erros += 1
+            print(f"⚠️  Erro ao publicar evento de estado ({tipo}): {e}")
+
+    def sincronizar(self, forcar: bool = False) -> int:
+        """
+        Aplica eventos de outros workers
+        Sem `forcar`, lê no máximo a cada `intervalo_leitura_segundos`
+        (use `forcar` quando um item não foi encontrado localmente)
+        """
+        if isinstance(self.log, LogMemoria) or (self._aplicar is None and not self._ouvintes):
+            return 0
+
+        with self._lock:
+            agora = time.monotonic()
+            if not forcar and agora < self._proxima_leitura:
+                return 0
+            self._proxima_leitura = agora + self.intervalo_leitura_segundos
+
+            try:
+                eventos = [e for e in self.log.ler_novos() if e.get("origem") != self.origem]
+            except Exception as e:
+                self.erros += 1
+                print(f"⚠️  Erro ao ler eventos de estado: {e}")
+                return 0
+
+            # O log traz eventos anteriores ao início do worker: reaplicar
+            # recomendações/feedbacks é idempotente, mas um "limpar" antigo
+            # apagaria o histórico restaurado do banco. Um "limpar" publicado
+            # depois do início (mesmo antes da primeira leitura) vale.
+            eventos = [
+                e for e in eventos
+                if e["tipo"] != EVENTO_LIMPAR or e.get("criado_em", 0) >= self._inicio
+            ]
+
+            if eventos:
+                if self._aplicar is not None:
+                    self._aplicar(eventos)
+                for evento in eventos:
+                    for ouvinte in self._ouvintes.get(evento["tipo"], ()):
+                        ouvinte(evento["dados"])
+                self.aplicados += len(eventos)
+            return len(eventos)
+
+
+def carregar_log(nome: str) -> LogEventos:
+    """Backend pela configuração ESTADO_BACKEND: memoria, mmap ou sql"""
+    if nome == "mmap":
+        return LogMmap(settings.ESTADO_MMAP_CAMINHO, retencao_segundos=settings.ESTADO_RETENCAO_SEGUNDOS)
+    if nome == "sql":
+        return LogSQL(retencao_segundos=settings.ESTADO_RETENCAO_SEGUNDOS)
+    return LogMemoria()
+
+
+estado_compartilhado = EstadoCompartilhado(
+    carregar_log(settings.ESTADO_BACKEND),
+    intervalo_leitura_segundos=settings.ESTADO_INTERVALO_LEITURA_SEGUNDOS
+)
@@ -0,0 +1,97 @@
+"""
+Estatísticas incrementais do recomendador - IARECOMEND
+Contadores atualizados a cada recomendação/feedback, lidos em tempo constante
+"""
+from collections import Counter
+from datetime import datetime
+from threading import Lock
+from typing import Iterable, List
+
+# Quantidade de faixas horárias retornadas em horarios_pico
+TOTAL_HORARIOS_PICO = 3
+
+
+def _hora(data_iso: str) -> int:
+    """Hora do dia (0-23) de uma data ISO 8601"""
+    return datetime.fromisoformat(data_iso).hour
+
+
+class AgregadorEstatisticas:
+    """
+    Agregador incremental das estatísticas do modelo
+
+    Mantém contadores de recomendações, feedbacks (aceitos/comprados),
+    produtos por categoria e histogramas por hora do dia. O endpoint
+    /estatisticas lê apenas o `snapshot()`, sem percorrer o histórico.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.limpar()
+
+    def limpar(self):
+        """Zera todos os contadores"""
+        with self._lock:
+            self.total_recomendacoes = 0
+            self.total_feedbacks = 0
+            self.aceitos = 0
+            self.comprados = 0
+            self.categorias: Counter = Counter()
+            self.recomendacoes_por_hora: List[int] = [0] * 24
+            self.feedbacks_por_hora: List[int] = [0] * 24
+
+    def registrar_recomendacao(self, recomendacao: dict):
+        """Atualiza os contadores com uma nova recomendação"""
+        categorias = Counter(p["categoria"] for p in recomendacao["produtos_recomendados"])
+        hora = _hora(recomendacao["data_geracao"])
+
+        with self._lock:
+            self.total_recomendacoes += 1
+            self.categorias.update(categorias)
+            self.recomendacoes_por_hora[hora] += 1
+
+    def registrar_feedback(self, feedback: dict):
+        """Atualiza os contadores com um novo feedback"""
+        hora = _hora(feedback["data_registro"])
+
+        with self._lock:
+            self.total_feedbacks += 1
+            if feedback["aceito"]:
+                self.aceitos += 1
+            if feedback.get("comprado"):
+                self.comprados += 1
+            self.feedbacks_por_hora[hora] += 1
+
+    def reconstruir(self, recomendacoes: Iterable[dict], feedbacks: Iterable[dict]):
+        """Recalcula tudo a partir do histórico completo"""
+        self.limpar()
+        for recomendacao in recomendacoes:
+            self.registrar_recomendacao(recomendacao)
+        for feedback in feedbacks:
+            self.registrar_feedback(feedback)
+
+    def snapshot(self) -> dict:
+        """Cópia consistente dos contadores"""
+        with self._lock:
+            return {
+                "total_recomendacoes": self.total_recomendacoes,
+                "total_feedbacks": self.total_feedbacks,
+                "aceitos": self.aceitos,
+                "comprados": self.comprados,
+                "categorias": dict(self.categorias),
+                "recomendacoes_por_hora": list(self.recomendacoes_por_hora),
+                "feedbacks_por_hora": list(self.feedbacks_por_hora),
+            }
+
+
+def horarios_pico(por_hora: List[int], total: int = TOTAL_HORARIOS_PICO) -> List[str]:
+    """
+    Faixas de uma hora com mais ocorrências, em ordem cronológica
+    Exemplo: ["09:00-10:00", "14:00-15:00", "19:00-20:00"]
+    """
+    horas = sorted(
+        (hora for hora in range(24) if por_hora[hora] > 0),
+        key=lambda hora: por_hora[hora],
+        reverse=True
+    )[:total]
+    return [f"{hora:02d}:00-{(hora + 1) % 24:02d}:00" for hora in sorted(horas)]
@@ -0,0 +1,130 @@
+"""
+Armazenamento do histórico de recomendações - IARECOMEND
+Store em memória com índices por recomendação, cliente e data de geração
+"""
+from bisect import bisect_left, bisect_right, insort
+from threading import RLock
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class HistoricoRecomendacoes:
+    """
+    Histórico de recomendações com índices em memória
+
+    Índices mantidos:
+    - `_por_id`: id_recomendacao -> recomendação (busca O(1))
+    - `_por_cliente`: id_cliente -> lista de (data_geracao, id_recomendacao)
+      ordenada por data (listagem O(k) por cliente)
+    - `_por_data`: lista global de (data_geracao, id_recomendacao) ordenada
+      por data (paginação do histórico sem reordenar a cada request)
+
+    As datas são strings ISO 8601, que ordenam corretamente como texto.
+    """
+
+    def __init__(self, recomendacoes: Optional[Iterable[dict]] = None):
+        self._lock = RLock()
+        self._por_id: Dict[str, dict] = {}
+        self._por_cliente: Dict[str, List[Tuple[str, str]]] = {}
+        self._por_data: List[Tuple[str, str]] = []
+
+        for recomendacao in recomendacoes or []:
+            self.adicionar(recomendacao)
+
+    @staticmethod
+    def _inserir_ordenado(indice: List[Tuple[str, str]], chave: Tuple[str, str]):
+        """Insere mantendo a ordem; o caso comum (mais recente) é um append"""
+        if not indice or indice[-1] <= chave:
+            indice.append(chave)
+        else:
+            insort(indice, chave)
+
+    def adicionar(self, recomendacao: dict) -> bool:
+        """
+        Adiciona uma recomendação ao histórico
+        Retorna False (sem alterar nada) se o id_recomendacao já existe:
+        quem mantém contadores derivados só deve contar as novas
+        """
+        id_rec = recomendacao["id_recomendacao"]
+
+        with self._lock:
+            if id_rec in self._por_id:
+                return False
+
+            chave = (recomendacao["data_geracao"], id_rec)
+            self._por_id[id_rec] = recomendacao
+            self._inserir_ordenado(
+                self._por_cliente.setdefault(recomendacao["id_cliente"], []),
+                chave
+            )
+            self._inserir_ordenado(self._por_data, chave)
+        return True
+
+    def obter(self, id_recomendacao: str) -> Optional[dict]:
+        """Busca uma recomendação pelo ID"""
+        return self._por_id.get(id_recomendacao)
+
+    def existe(self, id_recomendacao: str) -> bool:
+        """Verifica se a recomendação existe"""
+        return id_recomendacao in self._por_id
+
+    def listar_cliente(self, id_cliente: str, mais_recentes_primeiro: bool = True) -> List[dict]:
+        """Lista as recomendações de um cliente ordenadas por data de geração"""
+        with self._lock:
+            chaves = list(self._por_cliente.get(id_cliente, ()))
+
+        if mais_recentes_primeiro:
+            chaves.reverse()
+
+        return [self._por_id[id_rec] for _, id_rec in chaves]
+
+    def total_cliente(self, id_cliente: str) -> int:
+        """Quantidade de recomendações de um cliente"""
+        return len(self._por_cliente.get(id_cliente, ()))
+
+    def listar_recentes(self, limite: int, offset: int = 0) -> List[dict]:
+        """Página do histórico global, mais recentes primeiro"""
+        with self._lock:
+            fim = len(self._por_data) - offset
+            if fim <= 0:
+                return []
+            inicio = max(fim - limite, 0)
+            chaves = self._por_data[inicio:fim]
+
+        return [self._por_id[id_rec] for _, id_rec in reversed(chaves)]
+
+    def listar_por_chave(
+        self, limite: int, chave: Tuple[str, str], mais_antigos: bool = True
+    ) -> Tuple[List[dict], bool]:
+        """
+        Página relativa a uma chave (data_geracao, id_recomendacao), mais
+        recentes primeiro: os `limite` itens anteriores à chave
+        (`mais_antigos`) ou os seguintes. Busca binária no índice por data.
+        Retorna (itens, há mais itens na mesma direção)
+        """
+        with self._lock:
+            if mais_antigos:
+                fim = bisect_left(self._por_data, chave)
+                inicio = max(fim - limite, 0)
+                tem_mais = inicio > 0
+            else:
+                inicio = bisect_right(self._por_data, chave)
+                fim = min(inicio + limite, len(self._por_data))
+                tem_mais = fim < len(self._por_data)
+            chaves = self._por_data[inicio:fim]
+
+        return [self._por_id[id_rec] for _, id_rec in reversed(chaves)], tem_mais
+
+    def limpar(self):
+        """Remove todas as recomendações e índices"""
+        with self._lock:
+            self._por_id.clear()
+            self._por_cliente.clear()
+            self._por_data.clear()
+
+    def __len__(self) -> int:
+        return len(self._por_id)
+
+    def __iter__(self) -> Iterator[dict]:
+        with self._lock:
+            valores = list(self._por_id.values())
+        return iter(valores)
@@ -0,0 +1,390 @@
+"""
+Ingestão de arquivos CSV/Excel - IARECOMEND
+Leitura em blocos (gerador), validação por esquema e gravação em lote
+com memória constante, independente do tamanho do arquivo
+"""
+import asyncio
+import csv
+import io
+import json
+import os
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import settings
+from database import engine
+from models import RegistroImportado
+
+# Quantidade máxima de erros de validação guardados como amostra
+MAXIMO_AMOSTRA_ERROS = 10
+
+
+class ImportacaoCancelada(Exception):
+    """Importação interrompida (timeout ou encerramento do worker)"""
+
+
+# ============================================
+# ESQUEMA DE VALIDAÇÃO
+# ============================================
+
+def _converter_bool(valor: Any) -> bool:
+    if isinstance(valor, bool):
+        return valor
+    texto = str(valor).strip().lower()
+    if texto in ("1", "true", "t", "sim", "s", "yes", "y"):
+        return True
+    if texto in ("0", "false", "f", "nao", "não", "n", "no"):
+        return False
+    raise ValueError(f"valor booleano inválido: {valor!r}")
+
+def _converter_data(valor: Any) -> str:
+    if isinstance(valor, datetime):
+        return valor.date().isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return date.fromisoformat(str(valor).strip()).isoformat()
+
+def _converter_data_hora(valor: Any) -> str:
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return datetime.fromisoformat(str(valor).strip()).isoformat()
+
+def _converter_int(valor: Any) -> int:
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return int(str(valor).strip())
+
+# Conversores por tipo declarado; todos retornam valores serializáveis em JSON
+CONVERSORES: Dict[str, Callable[[Any], Any]] = {
+    "str": lambda v: str(v).strip(),
+    "int": _converter_int,
+    "float": lambda v: float(str(v).strip().replace(",", ".")) if not isinstance(v, (int, float)) else float(v),
+    "bool": _converter_bool,
+    "date": _converter_data,
+    "datetime": _converter_data_hora,
+}
+
+
+class EsquemaArquivo:
+    """
+    Esquema declarado em `parametros_adicionais.esquema`
+
+    Exemplo:
+        {
+            "colunas": {
+                "id_cliente": {"tipo": "str", "obrigatorio": true},
+                "valor": "float",
+                "data_compra": "date"
+            },
+            "chave": "id_cliente"
+        }
+
+    Sem esquema, todas as colunas são aceitas como texto.
+    """
+
+    def __init__(self, definicao: Optional[dict] = None):
+        definicao = definicao or {}
+        self.colunas: Dict[str, Tuple[Callable[[Any], Any], bool]] = {}
+
+        for nome, spec in (definicao.get("colunas") or {}).items():
+            if isinstance(spec, str):
+                spec = {"tipo": spec}
+            tipo = spec.get("tipo", "str")
+            if tipo not in CONVERSORES:
+                raise ValueError(f"Tipo '{tipo}' inválido para a coluna '{nome}' (use {', '.join(CONVERSORES)})")
+            self.colunas[nome] = (CONVERSORES[tipo], bool(spec.get("obrigatorio", False)))
+
+        self.chave: Optional[str] = definicao.get("chave")
+
+    def validar(self, linha: Dict[str, Any]) -> Dict[str, Any]:
+        """Converte a linha para os tipos declarados; ValueError se inválida"""
+        if None in linha:
+            raise ValueError("linha com mais colunas que o cabeçalho")
+
+        if not self.colunas:
+            return {
+                coluna: (None if valor is None or valor == "" else str(valor))
+                for coluna, valor in linha.items()
+            }
+
+        dados = {}
+        for coluna, (converter, obrigatorio) in self.colunas.items():
+            valor = linha.get(coluna)
+            if valor is None or (isinstance(valor, str) and valor.strip() == ""):
+                if obrigatorio:
+                    raise ValueError(f"coluna obrigatória '{coluna}' vazia")
+                dados[coluna] = None
+                continue
+            try:
+                dados[coluna] = converter(valor)
+            except (TypeError, ValueError):
+                raise ValueError(f"valor inválido na coluna '{coluna}': {valor!r}")
+        return dados
+
+    def chave_de(self, dados: Dict[str, Any]) -> Optional[str]:
+        if self.chave is None or dados.get(self.chave) is None:
+            return None
+        return str(dados[self.chave])
+
+
+# ============================================
+# LEITORES EM BLOCOS
+# ============================================
+
+class LeitorCSV:
+    """Lê o CSV em blocos de `tamanho_bloco` linhas (dicts por cabeçalho)"""
+
+    def __init__(self, caminho: str, encoding: str = "utf-8", delimiter: str = ",", tamanho_bloco: int = 10000):
+        self.caminho = caminho
+        self.encoding = encoding or "utf-8"
+        self.delimiter = delimiter or ","
+        self.tamanho_bloco = tamanho_bloco
+        self.tamanho_arquivo = os.path.getsize(caminho)
+        self.bytes_lidos = 0
+
+    def estimar_total(self, processados: int) -> Optional[int]:
+        """Total de linhas estimado pela fração do arquivo já lida"""
+        if not self.bytes_lidos:
+            return None
+        return max(processados, int(processados * self.tamanho_arquivo / self.bytes_lidos))
+
+    def blocos(self) -> Iterator[List[Dict[str, Any]]]:
+        with open(self.caminho, "rb") as binario:
+            texto = io.TextIOWrapper(binario, encoding=self.encoding, newline="")
+            leitor = csv.DictReader(texto, delimiter=self.delimiter)
+
+            bloco = []
+            for linha in leitor:
+                bloco.append(linha)
+                if len(bloco) >= self.tamanho_bloco:
+                    self.bytes_lidos = binario.tell()
+                    yield bloco
+                    bloco = []
+
+            self.bytes_lidos = self.tamanho_arquivo
+            if bloco:
+                yield bloco
+
+
+class LeitorExcel:
+    """Lê a planilha em modo read-only (openpyxl), em blocos de linhas"""
+
+    def __init__(self, caminho: str, planilha: Optional[str] = None, tamanho_bloco: int = 10000):
+        try:
+            import openpyxl
+        except ImportError:
+            raise RuntimeError("Importação de Excel requer o pacote openpyxl (pip install openpyxl)")
+
+        self.caminho = caminho
+        self.tamanho_bloco = tamanho_bloco
+        self._livro = openpyxl.load_workbook(caminho, read_only=True, data_only=True)
+        self._planilha = self._livro[planilha] if planilha else self._livro.active
+        self._total_linhas = self._planilha.max_row
+
+    def estimar_total(self, processados: int) -> Optional[int]:
+        if not self._total_linhas:
+            return None
+        return max(processados, self._total_linhas - 1)  # Sem o cabeçalho
+
+    def blocos(self) -> Iterator[List[Dict[str, Any]]]:
+        try:
+            linhas = self._planilha.iter_rows(values_only=True)
+            cabecalho = next(linhas, None)
+            if cabecalho is None:
+                return
+            colunas = [str(c) if c is not None else f"coluna_{i + 1}" for i, c in enumerate(cabecalho)]
+
+            bloco = []
+            for valores in linhas:
+                if all(v is None for v in valores):
+                    continue  # Linhas vazias ao final da planilha
+                linha = dict(zip(colunas, valores))
+                if len(valores) > len(colunas) and any(v is not None for v in valores[len(colunas):]):
+                    linha[None] = list(valores[len(colunas):])
+                bloco.append(linha)
+                if len(bloco) >= self.tamanho_bloco:
+                    yield bloco
+                    bloco = []
+
+            if bloco:
+                yield bloco
+        finally:
+            self._livro.close()
+
+
+# ============================================
+# GRAVAÇÃO EM LOTE
+# ============================================
+
+def _copiar_postgres(conexao, linhas: List[dict]):
+    """Grava o bloco com COPY ... FROM STDIN (CSV em memória)"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    for linha in linhas:
+        escritor.writerow([
+            linha["fonte_id"],
+            linha["chave"],
+            json.dumps(linha["dados"], ensure_ascii=False),
+            linha["importado_em"].isoformat(),
+        ])
+    buffer.seek(0)
+
+    tabela = RegistroImportado.__tablename__
+    cursor = conexao.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {tabela} (fonte_id, chave, dados, importado_em) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+def gravar_bloco(conexao, linhas: List[dict]):
+    """COPY no PostgreSQL; executemany (INSERT em lote) nos demais bancos"""
+    if not linhas:
+        return
+    if conexao.dialect.name == "postgresql":
+        _copiar_postgres(conexao, linhas)
+    else:
+        conexao.execute(RegistroImportado.__table__.insert(), linhas)
+
+
+def substituir_carga(bind, fonte_id: int, marca: datetime):
+    """Remove os registros da fonte que não são da carga `marca` (carga concluída)"""
+    tabela = RegistroImportado.__table__
+    with bind.begin() as conexao:
+        conexao.execute(
+            tabela.delete().where(tabela.c.fonte_id == fonte_id, tabela.c.importado_em != marca)
+        )
+
+def descartar_carga(bind, fonte_id: int, marca: datetime):
+    """Remove os registros parciais da carga `marca` (carga com falha)"""
+    tabela = RegistroImportado.__table__
+    with bind.begin() as conexao:
+        conexao.execute(
+            tabela.delete().where(tabela.c.fonte_id == fonte_id, tabela.c.importado_em == marca)
+        )
+
+
+# ============================================
+# IMPORTAÇÃO
+# ============================================
+
+def resolver_caminho(caminho: str) -> str:
+    """
+    Caminho absoluto do arquivo dentro de ARQUIVOS_DIRETORIO
+    `caminho_arquivo` vem da configuração da fonte (editável pela API):
+    relativo ao diretório, e qualquer caminho que saia dele (../, absoluto
+    ou link simbólico) é recusado
+    """
+    base = os.path.realpath(settings.ARQUIVOS_DIRETORIO)
+    completo = os.path.realpath(os.path.join(base, caminho))
+    if os.path.commonpath([base, completo]) != base:
+        raise PermissionError(f"Arquivo fora do diretório permitido: {caminho}")
+    return completo
+
+def criar_leitor(config: dict, tamanho_bloco: int):
+    parametros = config.get("parametros_adicionais") or {}
+    caminho = config.get("caminho_arquivo")
+    if not caminho:
+        raise FileNotFoundError("Fonte sem caminho_arquivo")
+
+    caminho = resolver_caminho(caminho)
+    if not os.path.exists(caminho):
+        raise FileNotFoundError(f"Arquivo não encontrado: {config['caminho_arquivo']}")
+
+    if config.get("tipo") == "excel":
+        return LeitorExcel(caminho, parametros.get("planilha"), tamanho_bloco)
+    return LeitorCSV(caminho, config.get("encoding"), config.get("delimiter"), tamanho_bloco)
+
+def importar_arquivo_sync(
+    config: dict,
+    progresso: Optional[Callable[[int, Optional[int]], None]] = None,
+    cancelar: Optional[threading.Event] = None,
+    bind=None
+) -> dict:
+    """
+    Importa o arquivo da fonte (bloqueante; roda em thread)
+
+    Cada bloco é gravado em uma transação curta (não segura locks durante
+    a importação inteira). Todos os registros desta carga levam a mesma
+    marca em `importado_em`; ao final, a carga anterior da fonte é removida
+    e, se a importação falhar no meio, os registros parciais desta carga
+    são descartados.
+    """
+    parametros = config.get("parametros_adicionais") or {}
+    tamanho_bloco = int(parametros.get("tamanho_bloco", settings.INGESTAO_TAMANHO_BLOCO))
+    esquema = EsquemaArquivo(parametros.get("esquema"))
+    leitor = criar_leitor(config, tamanho_bloco)
+    fonte_id = config["id"]
+    bind = bind or engine
+
+    importados = 0
+    com_erro = 0
+    erros_amostra: List[str] = []
+    numero_linha = 1  # Cabeçalho
+    marca = datetime.utcnow()
+    inicio = time.perf_counter()
+
+    try:
+        for bloco in leitor.blocos():
+            if cancelar is not None and cancelar.is_set():
+                raise ImportacaoCancelada()
+
+            validas = []
+            for linha in bloco:
+                numero_linha += 1
+                try:
+                    dados = esquema.validar(linha)
+                except ValueError as e:
+                    com_erro += 1
+                    if len(erros_amostra) < MAXIMO_AMOSTRA_ERROS:
+                        erros_amostra.append(f"linha {numero_linha}: {e}")
+                    continue
+                validas.append({
+                    "fonte_id": fonte_id,
+                    "chave": esquema.chave_de(dados),
+                    "dados": dados,
+                    "importado_em": marca,
+                })
+
+            with bind.begin() as conexao:
+                gravar_bloco(conexao, validas)
+            importados += len(validas)
+
+            if progresso:
+                processados = importados + com_erro
+                progresso(processados, leitor.estimar_total(processados))
+
+        substituir_carga(bind, fonte_id, marca)
+    except BaseException:
+        descartar_carga(bind, fonte_id, marca)
+        raise
+
+    tempo = time.perf_counter() - inicio
+    processados = importados + com_erro
+    if progresso:
+        progresso(processados, processados)
+
+    return {
+        "registros_importados": importados,
+        "registros_atualizados": 0,
+        "registros_com_erro": com_erro,
+        "registros_por_segundo": round(processados / tempo, 1) if tempo > 0 else None,
+        "erros_amostra": erros_amostra,
+        "substitui_carga": True,
+    }
+
+async def importar_arquivo(config: dict, progresso: Optional[Callable[[int, Optional[int]], None]] = None) -> dict:
+    """
+    Importação assíncrona: a leitura/gravação roda em uma thread e é
+    interrompida no próximo bloco se a corrotina for cancelada (timeout)
+    """
+    cancelar = threading.Event()
+    try:
+        return await asyncio.to_thread(importar_arquivo_sync, config, progresso, cancelar)
+    except asyncio.CancelledError:
+        cancelar.set()
+        raise
@@ -0,0 +1,387 @@
+"""
+Fila de jobs de sincronização - IARECOMEND
+Jobs persistidos no banco, executados por um pool de workers assíncronos
+com lease + heartbeat para recuperar sincronizações travadas
+"""
+import asyncio
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from models import FonteDados, StatusFonte, JobSincronizacao, StatusJob
+from services import conectores
+from services.agregados import invalidar_estatisticas_fontes
+from services.cache_respostas import cache_respostas
+
+# Status que indicam um job ainda em andamento
+STATUS_ATIVOS = (StatusJob.PENDENTE, StatusJob.EXECUTANDO)
+
+
+class ProgressoJob:
+    """Progresso em memória do job; gravado no banco a cada heartbeat"""
+
+    def __init__(self):
+        self.processados = 0
+        self.total: Optional[int] = None
+
+    def __call__(self, processados: int, total: Optional[int]):
+        self.processados = processados
+        self.total = total
+
+
+def aplicar_resultado(fonte: FonteDados, resultado: dict, tempo_total: float):
+    """
+    Atualiza estatísticas da fonte com o resultado da importação
+    Cargas que substituem a anterior (arquivo/API) definem o total de
+    registros; sincronizações incrementais somam os novos
+    """
+    fonte.ultima_sincronizacao = datetime.utcnow()
+    fonte.proxima_sincronizacao = datetime.utcnow() + timedelta(hours=fonte.frequencia_sync_horas)
+    if resultado.get('substitui_carga'):
+        fonte.total_registros_importados = resultado['registros_importados']
+    else:
+        fonte.total_registros_importados += resultado['registros_importados']
+    fonte.total_erros += resultado['registros_com_erro']
+    fonte.tempo_ultima_sync_segundos = tempo_total
+    fonte.status = StatusFonte.ATIVA
+
+    if resultado['registros_com_erro'] > 0:
+        fonte.mensagem_ultimo_erro = f"{resultado['registros_com_erro']} registros com erro de validação"
+        if resultado.get('erros_amostra'):
+            fonte.mensagem_ultimo_erro += f" (ex: {resultado['erros_amostra'][0]})"
+    else:
+        fonte.mensagem_ultimo_erro = None
+
+
+class FilaJobsSincronizacao:
+    """
+    Fila de jobs de sincronização com pool de workers
+
+    - `enfileirar` grava o job (status pending) e marca a fonte como syncing
+    - Cada worker reivindica o job pendente mais antigo com um UPDATE
+      condicional (status = pending), então vários processos uvicorn podem
+      compartilhar a mesma fila sem executar o mesmo job duas vezes
+    - Durante a execução, o worker renova o lease e grava o progresso a cada
+      heartbeat; se o processo morrer, o lease expira e `recuperar_expirados`
+      devolve o job para a fila (ou marca erro após JOBS_MAX_TENTATIVAS)
+    - Fontes em syncing sem nenhum job ativo também são recuperadas
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        workers: int = 2,
+        lease_segundos: int = 60,
+        heartbeat_segundos: int = 10,
+        max_tentativas: int = 3,
+        intervalo_poll_segundos: float = 1.0
+    ):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.lease_segundos = lease_segundos
+        self.heartbeat_segundos = heartbeat_segundos
+        self.max_tentativas = max_tentativas
+        self.intervalo_poll_segundos = intervalo_poll_segundos
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+
+        self._tarefas: List[asyncio.Task] = []
+        self._novo_job: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # ---------- Enfileiramento e consulta ----------
+
+    def enfileirar(self, db: Session, fonte: FonteDados, force: bool = False) -> JobSincronizacao:
+        """Cria o job e marca a fonte como sincronizando (na mesma transação)"""
+        job = JobSincronizacao(fonte_id=fonte.id, status=StatusJob.PENDENTE, force=force)
+        fonte.status = StatusFonte.SINCRONIZANDO
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        invalidar_estatisticas_fontes()
+        cache_respostas.invalidar("fontes")
+
+        # Chamado de threads (rotas síncronas, agendador): acorda os workers no loop
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._novo_job.set)
+
+        return job
+
+    def enfileirar_se_livre(self, db: Session, fonte: FonteDados, force: bool = False) -> Optional[JobSincronizacao]:
+        """
+        Reivindica a fonte com compare-and-set (status != syncing) e enfileira
+        o job; retorna None se outra requisição, o agendador ou outro processo
+        já reivindicou a fonte (mesmo UPDATE condicional do agendador)
+        """
+        resultado = db.execute(
+            update(FonteDados)
+            .where(FonteDados.id == fonte.id, FonteDados.status != StatusFonte.SINCRONIZANDO)
+            .values(status=StatusFonte.SINCRONIZANDO)
+        )
+        if resultado.rowcount != 1 or self.job_ativo(db, fonte.id):
+            db.rollback()
+            return None
+
+        return self.enfileirar(db, fonte, force=force)
+
+    @staticmethod
+    def job_ativo(db: Session, fonte_id: int) -> Optional[JobSincronizacao]:
+        """Job pendente ou em execução da fonte, se houver"""
+        return db.query(JobSincronizacao).filter(
+            JobSincronizacao.fonte_id == fonte_id,
+            JobSincronizacao.status.in_(STATUS_ATIVOS)
+        ).first()
+
+    # ---------- Ciclo de vida ----------
+
+    async def iniciar(self):
+        """Recupera jobs órfãos e inicia os workers (chamado no lifespan)"""
+        self._novo_job = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        await asyncio.to_thread(self.recuperar_expirados)
+
+        self._tarefas = [
+            asyncio.create_task(self._worker(), name=f"job-worker-{i}")
+            for i in range(self.workers)
+        ]
+        self._tarefas.append(asyncio.create_task(self._recuperador(), name="job-recuperador"))
+
+    async def encerrar(self):
+        """Cancela os workers; jobs em execução voltam para a fila"""
+        for tarefa in self._tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+        self._tarefas = []
+        self._loop = None
+
+    # ---------- Workers ----------
+
+    async def _worker(self):
+        while True:
+            job_id = await asyncio.to_thread(self._reivindicar)
+
+            if job_id is None:
+                self._novo_job.clear()
+                try:
+                    await asyncio.wait_for(self._novo_job.wait(), self.intervalo_poll_segundos)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._executar(job_id)
+
+    async def _recuperador(self):
+        while True:
+            await asyncio.sleep(max(self.lease_segundos / 2, 1))
+            try:
+                await asyncio.to_thread(self.recuperar_expirados)
+            except Exception as e:
+                print(f"❌ Erro ao recuperar jobs expirados: {e}")
+
+    def _reivindicar(self) -> Optional[int]:
+        """Pega o job pendente mais antigo; retorna o ID ou None"""
+        with self.session_factory() as db:
+            candidatos = (
+                db.query(JobSincronizacao.id)
+                .filter(JobSincronizacao.status == StatusJob.PENDENTE)
+                .order_by(JobSincronizacao.criado_em, JobSincronizacao.id)
+                .limit(5)
+                .all()
+            )
+
+            agora = datetime.utcnow()
+            for (job_id,) in candidatos:
+                resultado = db.execute(
+                    update(JobSincronizacao)
+                    .where(JobSincronizacao.id == job_id, JobSincronizacao.status == StatusJob.PENDENTE)
+                    .values(
+                        status=StatusJob.EXECUTANDO,
+                        worker_id=self.worker_id,
+                        lease_ate=agora + timedelta(seconds=self.lease_segundos),
+                        heartbeat_em=agora,
+                        iniciado_em=agora,
+                        tentativas=JobSincronizacao.tentativas + 1
+                    )
+                )
+                db.commit()
+                if resultado.rowcount == 1:
+                    return job_id
+
+        return None
+
+    def _heartbeat(self, job_id: int, progresso: ProgressoJob) -> bool:
+        """Renova o lease e grava o progresso; False se o lease foi perdido"""
+        with self.session_factory() as db:
+            agora = datetime.utcnow()
+            resultado = db.execute(
+                update(JobSincronizacao)
+                .where(
+                    JobSincronizacao.id == job_id,
+                    JobSincronizacao.worker_id == self.worker_id,
+                    JobSincronizacao.status == StatusJob.EXECUTANDO
+                )
+                .values(
+                    lease_ate=agora + timedelta(seconds=self.lease_segundos),
+                    heartbeat_em=agora,
+                    registros_processados=progresso.processados,
+                    total_estimado=progresso.total
+                )
+            )
+            db.commit()
+            return resultado.rowcount == 1
+
+    def _carregar_config(self, job_id: int) -> Optional[dict]:
+        with self.session_factory() as db:
+            job = db.get(JobSincronizacao, job_id)
+            fonte = db.get(FonteDados, job.fonte_id)
+            if fonte is None:
+                job.status = StatusJob.ERRO
+                job.mensagem = f"Fonte {job.fonte_id} não existe mais"
+                job.concluido_em = datetime.utcnow()
+                db.commit()
+                return None
+            return conectores.configuracao_fonte(fonte)
+
+    def _finalizar(self, job_id: int, progresso: ProgressoJob, resultado: Optional[dict],
+                   tempo_total: float, erro: Optional[str] = None):
+        """Grava o resultado no job e na fonte na mesma transação"""
+        with self.session_factory() as db:
+            job = db.get(JobSincronizacao, job_id)
+            if job is None or job.worker_id != self.worker_id or job.status != StatusJob.EXECUTANDO:
+                return  # Lease perdido: outro worker assumiu o job
+
+            fonte = db.get(FonteDados, job.fonte_id)
+            job.concluido_em = datetime.utcnow()
+            job.lease_ate = None
+            job.registros_processados = progresso.processados
+            job.total_estimado = progresso.total
+
+            if erro is None:
+                job.status = StatusJob.CONCLUIDO
+                job.registros_importados = resultado['registros_importados']
+                job.registros_atualizados = resultado['registros_atualizados']
+                job.registros_com_erro = resultado['registros_com_erro']
+                job.registros_por_segundo = resultado.get('registros_por_segundo')
+                job.paginas_por_segundo = resultado.get('paginas_por_segundo')
+                job.mensagem = 'Sincronização concluída com sucesso'
+                if fonte is not None:
+                    aplicar_resultado(fonte, resultado, tempo_total)
+            else:
+                job.status = StatusJob.ERRO
+                job.mensagem = erro
+                if fonte is not None:
+                    fonte.status = StatusFonte.ERRO
+                    fonte.mensagem_ultimo_erro = erro
+
+            db.commit()
+        invalidar_estatisticas_fontes()
+        cache_respostas.invalidar("fontes")
+
+    def _liberar(self, job_id: int):
+        """Devolve o job para a fila (encerramento do processo)"""
+        with self.session_factory() as db:
+            db.execute(
+                update(JobSincronizacao)
+                .where(JobSincronizacao.id == job_id, JobSincronizacao.worker_id == self.worker_id)
+                .values(status=StatusJob.PENDENTE, worker_id=None, lease_ate=None)
+            )
+            db.commit()
+
+    async def _executar(self, job_id: int):
+        config = await asyncio.to_thread(self._carregar_config, job_id)
+        if config is None:
+            return
+
+        progresso = ProgressoJob()
+        inicio = time.time()
+        sincronizacao = asyncio.create_task(conectores.sincronizar(config, progresso=progresso))
+
+        try:
+            # Heartbeats enquanto a sincronização roda
+            while True:
+                concluidas, _ = await asyncio.wait({sincronizacao}, timeout=self.heartbeat_segundos)
+                if concluidas:
+                    break
+                if not await asyncio.to_thread(self._heartbeat, job_id, progresso):
+                    sincronizacao.cancel()
+                    print(f"⚠️  Job {job_id}: lease perdido, sincronização cancelada")
+                    return
+
+            resultado = sincronizacao.result()
+            erro = None
+        except asyncio.CancelledError:
+            sincronizacao.cancel()
+            await asyncio.to_thread(self._liberar, job_id)
+            raise
+        except asyncio.TimeoutError:
+            resultado, erro = None, "Tempo limite de sincronização excedido"
+        except Exception as e:
+            resultado, erro = None, f"Erro durante sincronização: {e}"
+
+        await asyncio.to_thread(self._finalizar, job_id, progresso, resultado, time.time() - inicio, erro)
+
+    # ---------- Recuperação ----------
+
+    def recuperar_expirados(self) -> int:
+        """
+        Recupera jobs cujo lease expirou e fontes presas em syncing
+        Retorna a quantidade de itens recuperados
+        """
+        agora = datetime.utcnow()
+        recuperados = 0
+
+        with self.session_factory() as db:
+            expirados = db.query(JobSincronizacao).filter(
+                JobSincronizacao.status == StatusJob.EXECUTANDO,
+                JobSincronizacao.lease_ate < agora
+            ).all()
+
+            for job in expirados:
+                job.worker_id = None
+                job.lease_ate = None
+                if job.tentativas < self.max_tentativas:
+                    job.status = StatusJob.PENDENTE
+                else:
+                    job.status = StatusJob.ERRO
+                    job.concluido_em = agora
+                    job.mensagem = f"Sincronização interrompida após {job.tentativas} tentativas"
+                recuperados += 1
+            db.flush()
+
+            # Fontes em syncing sem job ativo (worker morreu antes de finalizar)
+            fontes_ativas = db.query(JobSincronizacao.fonte_id).filter(
+                JobSincronizacao.status.in_(STATUS_ATIVOS)
+            )
+            travadas = db.query(FonteDados).filter(
+                FonteDados.status == StatusFonte.SINCRONIZANDO,
+                FonteDados.id.notin_(fontes_ativas)
+            ).all()
+
+            for fonte in travadas:
+                fonte.status = StatusFonte.ERRO
+                fonte.mensagem_ultimo_erro = "Sincronização interrompida. Execute novamente."
+                recuperados += 1
+
+            db.commit()
+
+        if recuperados:
+            invalidar_estatisticas_fontes()
+            cache_respostas.invalidar("fontes")
+            print(f"♻️  {recuperados} jobs/fontes de sincronização recuperados")
+        return recuperados
+
+
+# Instância global usada pelas rotas e pelo lifespan
+fila_jobs = FilaJobsSincronizacao(
+    workers=settings.JOBS_WORKERS,
+    lease_segundos=settings.JOBS_LEASE_SEGUNDOS,
+    heartbeat_segundos=settings.JOBS_HEARTBEAT_SEGUNDOS,
+    max_tentativas=settings.JOBS_MAX_TENTATIVAS,
+    intervalo_poll_segundos=settings.JOBS_INTERVALO_POLL_SEGUNDOS
+)
@@ -0,0 +1,359 @@
+"""
+Métricas da aplicação - IARECOMEND
+Registro em memória de contadores, medidores e histogramas com rótulos,
+exportado no formato texto do Prometheus em GET /metrics, middleware de
+métricas HTTP por rota e spans de etapas dentro dos endpoints
+"""
+import bisect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from starlette.routing import Match
+
+# Limites (segundos) dos histogramas de latência
+BUCKETS_LATENCIA = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+# Rótulo de rota para trabalho fora de um request (jobs, agendador, startup)
+SEM_ROTA = "sem_rota"
+
+# Rótulo de rota para paths que não casam com nenhuma rota (evita um rótulo por URL)
+ROTA_NAO_ENCONTRADA = "nao_encontrada"
+
+# Escopo ASGI do request em andamento (o roteador do FastAPI grava nele a
+# rota casada); visível nas threads do threadpool e nos greenlets do SQLAlchemy
+_escopo_atual: ContextVar[Optional[dict]] = ContextVar("escopo_atual", default=None)
+
+
+def rota_atual() -> str:
+    """Template da rota do request em andamento ('/api/fontes/{fonte_id}')"""
+    escopo = _escopo_atual.get()
+    if escopo is None:
+        return SEM_ROTA
+    rota = escopo.get("route")
+    return getattr(rota, "path", None) or SEM_ROTA
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _formatar_rotulos(nomes: Sequence[str], valores: Sequence[str], extra: str = "") -> str:
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+def _formatar_numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+class Metrica:
+    """Base: nome, descrição e rótulos; séries indexadas pela tupla de valores"""
+    tipo = "untyped"
+
+    def __init__(self, nome: str, descricao: str, rotulos: Sequence[str] = ()):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = tuple(rotulos)
+        self._lock = Lock()
+
+    def _chave(self, rotulos: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(rotulos.get(nome, "")) for nome in self.rotulos)
+
+    def linhas(self) -> List[str]:
+        raise NotImplementedError
+
+    def exportar(self) -> str:
+        cabecalho = [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} {self.tipo}"]
+        return "\n".join(cabecalho + self.linhas())
+
+
+class Contador(Metrica):
+    """Valor que só cresce (total de eventos)"""
+    tipo = "counter"
+
+    def __init__(self, nome: str, descricao: str, rotulos: Sequence[str] = ()):
+        super().__init__(nome, descricao, rotulos)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, valor: float = 1.0, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0.0) + valor
+
+    def valor(self, **rotulos) -> float:
+        return self._valores.get(self._chave(rotulos), 0.0)
+
+    def linhas(self) -> List[str]:
+        with self._lock:
+            itens = sorted(self._valores.items())
+        return [f"{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_numero(v)}" for chave, v in itens]
+
+
+class Medidor(Metrica):
+    """Valor instantâneo (conexões em uso, requests em andamento)"""
+    tipo = "gauge"
+
+    def __init__(self, nome: str, descricao: str, rotulos: Sequence[str] = ()):
+        super().__init__(nome, descricao, rotulos)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+
+    def definir(self, valor: float, **rotulos):
+        with self._lock:
+            self._valores[self._chave(rotulos)] = valor
+
+    def inc(self, valor: float = 1.0, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0.0) + valor
+
+    def dec(self, valor: float = 1.0, **rotulos):
+        self.inc(-valor, **rotulos)
+
+    def valor(self, **rotulos) -> float:
+        return self._valores.get(self._chave(rotulos), 0.0)
+
+    def linhas(self) -> List[str]:
+        with self._lock:
+            itens = sorted(self._valores.items())
+        return [f"{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_numero(v)}" for chave, v in itens]
+
+
+class Histograma(Metrica):
+    """Distribuição em buckets cumulativos (le), com soma e contagem"""
+    tipo = "histogram"
+
+    def __init__(self, nome: str, descricao: str, rotulos: Sequence[str] = (),
+                 buckets: Sequence[float] = BUCKETS_LATENCIA):
+        super().__init__(nome, descricao, rotulos)
+        self.buckets = tuple(sorted(buckets))
+        # chave -> [contagem por bucket (não cumulativa) + +Inf, soma]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observar(self, valor: float, **rotulos):
+        chave = self._chave(rotulos)
+        posicao = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][posicao] += 1
+            serie[1] += valor
+
+    def contagem(self, **rotulos) -> int:
+        serie = self._series.get(self._chave(rotulos))
+        return sum(serie[0]) if serie else 0
+
+    def linhas(self) -> List[str]:
+        with self._lock:
+            itens = sorted((chave, (list(contagens), soma)) for chave, (contagens, soma) in self._series.items())
+
+        linhas = []
+        for chave, (contagens, soma) in itens:
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + (float("inf"),), contagens):
+                acumulado += contagem
+                le = f'le="{_formatar_numero(limite)}"'
+                linhas.append(f"{self.nome}_bucket{_formatar_rotulos(self.rotulos, chave, le)} {acumulado}")
+            rotulos = _formatar_rotulos(self.rotulos, chave)
+            linhas.append(f"{self.nome}_sum{rotulos} {_formatar_numero(soma)}")
+            linhas.append(f"{self.nome}_count{rotulos} {acumulado}")
+        return linhas
+
+
+class RegistroMetricas:
+    """
+    Métricas da aplicação por nome
+
+    `contador`/`medidor`/`histograma` devolvem a métrica existente com o
+    mesmo nome (módulos podem declarar as suas sem coordenação). Coletores
+    registrados rodam antes de cada exportação, para medidores lidos sob
+    demanda (ex.: estado atual do pool de conexões).
+    """
+
+    def __init__(self, prefixo: str = ""):
+        self.prefixo = prefixo
+        self._metricas: Dict[str, Metrica] = {}
+        self._coletores: List[Callable[[], None]] = []
+        self._lock = Lock()
+
+    def _obter(self, classe, nome: str, *args, **kwargs):
+        nome = self.prefixo + nome
+        with self._lock:
+            metrica = self._metricas.get(nome)
+            if metrica is None:
+                metrica = self._metricas[nome] = classe(nome, *args, **kwargs)
+            elif not isinstance(metrica, classe):
+                raise ValueError(f"Métrica {nome} já registrada como {metrica.tipo}")
+        return metrica
+
+    def contador(self, nome: str, descricao: str, rotulos: Sequence[str] = ()) -> Contador:
+        return self._obter(Contador, nome, descricao, rotulos)
+
+    def medidor(self, nome: str, descricao: str, rotulos: Sequence[str] = ()) -> Medidor:
+        return self._obter(Medidor, nome, descricao, rotulos)
+
+    def histograma(self, nome: str, descricao: str, rotulos: Sequence[str] = (),
+                   buckets: Sequence[float] = BUCKETS_LATENCIA) -> Histograma:
+        return self._obter(Histograma, nome, descricao, rotulos, buckets)
+
+    def coletor(self, funcao: Callable[[], None]):
+        self._coletores.append(funcao)
+
+    def exportar(self) -> str:
+        """Texto no formato de exposição do Prometheus (version=0.0.4)"""
+        for coletar in self._coletores:
+            try:
+                coletar()
+            except Exception as e:
+                print(f"⚠️  Erro no coletor de métricas: {e}")
+
+        with self._lock:
+            metricas = sorted(self._metricas.values(), key=lambda m: m.nome)
+        return "\n".join(m.exportar() for m in metricas) + "\n"
+
+
+registro_metricas = RegistroMetricas(prefixo="iarecomend_")
+
+HTTP_REQUESTS = registro_metricas.contador(
+    "http_requests_total",
+    "Requests HTTP atendidos",
+    ("metodo", "rota", "status")
+)
+HTTP_DURACAO = registro_metricas.histograma(
+    "http_request_duracao_segundos",
+    "Latência dos requests HTTP (do início do request ao último byte)",
+    ("metodo", "rota")
+)
+HTTP_EM_ANDAMENTO = registro_metricas.medidor(
+    "http_requests_em_andamento",
+    "Requests HTTP em processamento",
+    ("metodo", "rota")
+)
+ETAPA_DURACAO = registro_metricas.histograma(
+    "etapa_duracao_segundos",
+    "Duração das etapas instrumentadas dentro dos endpoints",
+    ("rota", "etapa")
+)
+
+
+# ============================================
+# SPANS DE ETAPAS
+# ============================================
+
+# Acumulador de etapas do request em andamento (None: spans desligados)
+_etapas_atuais: ContextVar[Optional[Dict[str, int]]] = ContextVar("etapas_atuais", default=None)
+
+
+@contextmanager
+def registrar_etapas():
+    """
+    Coleta os spans `etapa(...)` executados dentro do bloco e grava, ao
+    sair, a duração total de cada etapa em ETAPA_DURACAO (rótulo da rota
+    atual). Etapas repetidas (uma por produto) são somadas.
+    """
+    acumulado: Dict[str, int] = {}
+    token = _etapas_atuais.set(acumulado)
+    try:
+        yield acumulado
+    finally:
+        _etapas_atuais.reset(token)
+        rota = rota_atual()
+        for nome, duracao_ns in acumulado.items():
+            ETAPA_DURACAO.observar(duracao_ns / 1e9, rota=rota, etapa=nome)
+
+
+@contextmanager
+def etapa(nome: str):
+    """Span de uma etapa (perf_counter_ns); fora de registrar_etapas não mede nada"""
+    acumulado = _etapas_atuais.get()
+    if acumulado is None:
+        yield
+        return
+
+    inicio = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        acumulado[nome] = acumulado.get(nome, 0) + time.perf_counter_ns() - inicio
+
+
+# ============================================
+# MIDDLEWARE HTTP
+# ============================================
+
+class MetricasMiddleware:
+    """
+    Middleware ASGI de métricas HTTP
+
+    - Publica o escopo do request em `_escopo_atual` (rótulo de rota das
+      métricas gravadas durante o request, como as do pool de conexões)
+    - Conta requests por método/rota/status, mede a latência com
+      perf_counter_ns e mantém os requests em andamento por rota
+
+    O rótulo é o template da rota ('/api/fontes/{fonte_id}'), resolvido
+    contra o roteador antes de chamar a aplicação (o gauge de em andamento
+    precisa dele na entrada) e memorizado por método + path.
+    """
+
+    MAX_ROTAS_MEMORIZADAS = 4096
+
+    def __init__(self, app, roteador=None):
+        self.app = app
+        self.roteador = roteador
+        self._rotas: Dict[Tuple[str, str], str] = {}
+
+    def _resolver_rota(self, scope) -> str:
+        chave = (scope["method"], scope["path"])
+        rota = self._rotas.get(chave)
+        if rota is not None:
+            return rota
+
+        rota = ROTA_NAO_ENCONTRADA
+        for candidata in getattr(self.roteador, "routes", ()):
+            casamento, _ = candidata.matches(scope)
+            if casamento == Match.FULL:
+                rota = getattr(candidata, "path", ROTA_NAO_ENCONTRADA)
+                break
+            if casamento == Match.PARTIAL and rota == ROTA_NAO_ENCONTRADA:
+                rota = getattr(candidata, "path", ROTA_NAO_ENCONTRADA)
+
+        if len(self._rotas) >= self.MAX_ROTAS_MEMORIZADAS:
+            self._rotas.clear()
+        self._rotas[chave] = rota
+        return rota
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metodo = scope["method"]
+        rota = self._resolver_rota(scope)
+        resposta = {"status": 500}
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                resposta["status"] = mensagem["status"]
+            await send(mensagem)
+
+        token = _escopo_atual.set(scope)
+        HTTP_EM_ANDAMENTO.inc(metodo=metodo, rota=rota)
+        inicio = time.perf_counter_ns()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracao = (time.perf_counter_ns() - inicio) / 1e9
+            HTTP_EM_ANDAMENTO.dec(metodo=metodo, rota=rota)
+            HTTP_DURACAO.observar(duracao, metodo=metodo, rota=rota)
+            HTTP_REQUESTS.inc(metodo=metodo, rota=rota, status=str(resposta["status"]))
+            _escopo_atual.reset(token)
@@ -0,0 +1,223 @@
+"""
+Motor de motivos de recomendação - IARECOMEND
+Regras de motivo (categorias complementares, faixas de preço, frequência
+e tags) compiladas uma vez em tabelas de consulta a partir de configuração
+"""
+import json
+import random
+from threading import Lock
+from typing import Dict, List, Optional, Sequence
+
+# Regras padrão (equivalentes às que ficavam fixas em gerar_motivo_recomendacao)
+# Podem ser substituídas por um JSON com a mesma estrutura (MOTIVOS_CONFIG_ARQUIVO)
+CONFIG_PADRAO = {
+    # categoria comprada -> categorias que a complementam
+    "complementares": {
+        "Notebooks": ["Periféricos", "Monitores", "Acessórios"],
+        "Smartphones": ["Acessórios", "Armazenamento"],
+        "Tablets": ["Acessórios", "Periféricos"],
+    },
+    "historico": {
+        "mesma_categoria": "Você já comprou produtos de {categoria}",
+        "complementar": "Complementa seu {categoria_comprada}",
+    },
+    # Avaliadas em ordem; vale a primeira que casar (valor médio informado)
+    "faixas_preco": [
+        {"diferenca_max": 1000, "motivo": "Dentro da sua faixa de preço habitual"},
+        {"abaixo_do_valor_medio": True, "motivo": "Excelente custo-benefício para você"},
+    ],
+    "frequencia": {
+        "Alta": "Cliente VIP - produto em destaque",
+    },
+    # Tag do produto + limites do valor médio do cliente (exclusivos)
+    "tags": [
+        {"tag": "custo-beneficio", "valor_medio_max": 3000, "motivo": "Melhor custo-benefício da categoria"},
+        {"tag": "premium", "valor_medio_min": 5000, "motivo": "Produto premium recomendado"},
+    ],
+    # Sorteados quando nenhuma regra se aplica
+    "genericos": [
+        "Tendência de compra identificada pela IA",
+        "Produto mais vendido para perfis similares",
+        "Alta taxa de satisfação entre clientes parecidos",
+        "Promoção exclusiva detectada",
+        "Estoque limitado - oportunidade única",
+    ],
+    "max_motivos": 2,
+    "separador": " | ",
+}
+
+
+def carregar_config(caminho: Optional[str]) -> dict:
+    """CONFIG_PADRAO com as chaves do arquivo JSON (se informado) sobrepostas"""
+    config = dict(CONFIG_PADRAO)
+    if caminho:
+        with open(caminho, encoding="utf-8") as arquivo:
+            config.update(json.load(arquivo))
+    return config
+
+
+class _ContextoCliente:
+    """Partes do cliente que valem para todos os produtos do lote"""
+    __slots__ = ("historico", "bits_historico", "valor_medio", "fixos", "bits_tags", "complementos")
+
+    def __init__(self, historico, bits_historico, valor_medio, fixos, bits_tags):
+        self.historico = historico    # (categoria, id) das categorias conhecidas, na ordem informada
+        self.bits_historico = bits_historico
+        self.valor_medio = valor_medio
+        self.fixos = fixos            # Motivo de frequência (não depende do produto)
+        self.bits_tags = bits_tags    # Regras de tag ativas para o valor médio do cliente
+        self.complementos: Dict[int, List[str]] = {}
+
+
+class MotorMotivos:
+    """
+    Regras compiladas em tabelas
+
+    - Categorias viram ids; o histórico do cliente vira um bitset e cada
+      categoria guarda o bitset das categorias que ela complementa
+      (`_complementa[id]`): sem interseção, nenhum laço no histórico
+    - Só a configuração e o catálogo registram categorias (sob `_lock`);
+      categorias do histórico informado pelo cliente que não existem no
+      catálogo são ignoradas, então requests não fazem as tabelas crescer
+    - Regras de tag viram bits; cada produto do catálogo guarda
+      (id da categoria, bitset de tags) pré-calculados por id_produto
+    - Faixas de preço viram limites relativos ao valor médio do cliente
+    - `motivos_lote` resolve o contexto do cliente uma vez e emite os
+      motivos de todos os produtos do lote; `None` indica produto sem
+      regra aplicável (o chamador sorteia um genérico com o RNG do request)
+    """
+
+    def __init__(self, config: Optional[dict] = None, produtos: Sequence[dict] = ()):
+        config = config or CONFIG_PADRAO
+        self.max_motivos: int = config["max_motivos"]
+        self.separador: str = config["separador"]
+        self.genericos: List[str] = list(config["genericos"])
+        self.msg_mesma_categoria: str = config["historico"]["mesma_categoria"]
+        self.msg_complementar: str = config["historico"]["complementar"]
+        self.faixas = [
+            (faixa.get("diferenca_max"), bool(faixa.get("abaixo_do_valor_medio")), faixa["motivo"])
+            for faixa in config["faixas_preco"]
+        ]
+        self.frequencia: Dict[str, str] = dict(config["frequencia"])
+        self.regras_tags = [
+            (regra["tag"], regra.get("valor_medio_min"), regra.get("valor_medio_max"), regra["motivo"])
+            for regra in config["tags"]
+        ]
+
+        # Categorias -> ids e bitsets de complemento
+        self._lock = Lock()
+        self._categorias: Dict[str, int] = {}
+        self._complementa: List[int] = []
+        for comprada, complementos in config["complementares"].items():
+            bit_comprada = 1 << self._id_categoria(comprada)
+            for categoria in complementos:
+                self._complementa[self._id_categoria(categoria)] |= bit_comprada
+
+        # Tags com regra -> bit da regra (uma tag pode ter várias regras)
+        self._bits_por_tag: Dict[str, int] = {}
+        for posicao, (tag, _, _, _) in enumerate(self.regras_tags):
+            self._bits_por_tag[tag] = self._bits_por_tag.get(tag, 0) | (1 << posicao)
+
+        self._produtos: Dict[str, tuple] = {}
+        self.compilar_catalogo(produtos)
+
+    def _id_categoria(self, categoria: str) -> int:
+        """Id da categoria, registrando-a (configuração e catálogo; com `_lock` depois do __init__)"""
+        id_categoria = self._categorias.get(categoria)
+        if id_categoria is None:
+            id_categoria = self._categorias[categoria] = len(self._complementa)
+            self._complementa.append(0)
+        return id_categoria
+
+    def _compilar_produto(self, produto: dict) -> tuple:
+        bits_tags = 0
+        for tag in produto.get("tags") or ():
+            bits_tags |= self._bits_por_tag.get(tag, 0)
+        return self._id_categoria(produto["categoria"]), bits_tags
+
+    def compilar_catalogo(self, produtos: Sequence[dict]):
+        """Pré-calcula (id da categoria, bitset de tags) por produto"""
+        with self._lock:
+            for produto in produtos:
+                self._produtos[produto["id"]] = self._compilar_produto(produto)
+
+    # ---------- Emissão ----------
+
+    def contexto(self, cliente_info) -> _ContextoCliente:
+        historico = []
+        bits_historico = 0
+        for categoria in cliente_info.historico_categorias or ():
+            id_categoria = self._categorias.get(categoria)
+            if id_categoria is not None:
+                historico.append((categoria, id_categoria))
+                bits_historico |= 1 << id_categoria
+
+        valor_medio = cliente_info.valor_medio_compra
+        bits_tags = 0
+        if valor_medio:
+            for posicao, (_, minimo, maximo, _) in enumerate(self.regras_tags):
+                if (minimo is None or valor_medio > minimo) and (maximo is None or valor_medio < maximo):
+                    bits_tags |= 1 << posicao
+
+        fixos = [self.frequencia[cliente_info.frequencia_compra]] if cliente_info.frequencia_compra in self.frequencia else []
+        return _ContextoCliente(historico, bits_historico, valor_medio, fixos, bits_tags)
+
+    def _motivos_historico(self, ctx: _ContextoCliente, id_categoria: int, categoria: str) -> List[str]:
+        if ctx.bits_historico >> id_categoria & 1:
+            return [self.msg_mesma_categoria.format(categoria=categoria)]
+
+        if not ctx.bits_historico & self._complementa[id_categoria]:
+            return []
+
+        motivos = ctx.complementos.get(id_categoria)
+        if motivos is None:
+            # Na ordem do histórico (repetições incluídas), como antes
+            motivos = ctx.complementos[id_categoria] = [
+                self.msg_complementar.format(categoria_comprada=comprada)
+                for comprada, id_comprada in ctx.historico
+                if self._complementa[id_categoria] >> id_comprada & 1
+            ]
+        return motivos
+
+    def _motivo_preco(self, ctx: _ContextoCliente, preco: float) -> Optional[str]:
+        for diferenca_max, abaixo, motivo in self.faixas:
+            if diferenca_max is not None and abs(preco - ctx.valor_medio) < diferenca_max:
+                return motivo
+            if abaixo and preco < ctx.valor_medio:
+                return motivo
+        return None
+
+    def motivos_lote(self, cliente_info, produtos: Sequence[dict]) -> List[Optional[str]]:
+        """Motivo de cada produto (None quando nenhuma regra se aplica)"""
+        ctx = self.contexto(cliente_info)
+        resultado = []
+
+        for produto in produtos:
+            compilado = self._produtos.get(produto["id"])
+            if compilado is None:
+                # Produto fora do catálogo compilado: entra no catálogo
+                self.compilar_catalogo([produto])
+                compilado = self._produtos[produto["id"]]
+            id_categoria, bits_tags = compilado
+
+            motivos = list(self._motivos_historico(ctx, id_categoria, produto["categoria"])) if ctx.bits_historico else []
+            if ctx.valor_medio:
+                motivo_preco = self._motivo_preco(ctx, produto["preco"])
+                if motivo_preco:
+                    motivos.append(motivo_preco)
+            motivos.extend(ctx.fixos)
+
+            ativos = bits_tags & ctx.bits_tags
+            posicao = 0
+            while ativos and len(motivos) < self.max_motivos:
+                if ativos & 1:
+                    motivos.append(self.regras_tags[posicao][3])
+                ativos >>= 1
+                posicao += 1
+
+            resultado.append(self.separador.join(motivos[:self.max_motivos]) if motivos else None)
+
+        return resultado
+
+    def generico(self, rng: random.Random) -> str:
+        return rng.choice(self.genericos)
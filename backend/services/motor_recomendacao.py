@@ -0,0 +1,97 @@
+"""
+Motor de recomendação determinístico - IARECOMEND
+RNG próprio por request, semeado por (id_cliente, versão do modelo, dia)
+ou por uma seed explícita, e cache do resultado por seed + perfil
+"""
+import hashlib
+import json
+import random
+from datetime import date
+from typing import Any, Callable, Optional, Tuple
+
+from services.cache import BackendMemoriaLRU
+
+
+def semente_deterministica(id_cliente: str, versao_modelo: str, dia: date) -> int:
+    """
+    Seed estável: o mesmo cliente recebe a mesma recomendação no mesmo dia e versão
+    (48 bits, para caber sem perda num número JSON/JavaScript)
+    """
+    digest = hashlib.sha256(f"{id_cliente}|{versao_modelo}|{dia.isoformat()}".encode()).digest()
+    return int.from_bytes(digest[:6], "big")
+
+def impressao_cliente(dados_cliente: dict) -> str:
+    """Fingerprint do ClienteInfo (campos ordenados; listas na ordem recebida)"""
+    serializado = json.dumps(dados_cliente, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(serializado.encode()).hexdigest()[:24]
+
+
+class MotorRecomendacao:
+    """
+    Gera a parte determinística da recomendação (produtos, descontos,
+    scores, motivos) com um `random.Random` exclusivo do request
+
+    - `seed` explícita tem prioridade; sem ela, a seed vem de
+      semente_deterministica(id_cliente, versao_modelo, hoje)
+    - O resultado de `gerar` é guardado num LRU com TTL, chaveado por
+      versão + seed + quantidade + fingerprint do cliente: requests
+      idênticos não pontuam o catálogo de novo
+
+    `selecionar(cliente, quantidade, rng)` e `montar(cliente, produtos, rng)`
+    são fornecidos pelas rotas; o valor devolvido por `montar` é
+    compartilhado entre hits e não deve ser alterado pelo chamador.
+    """
+
+    def __init__(
+        self,
+        selecionar: Callable,
+        montar: Callable,
+        versao_modelo: str,
+        max_entradas: int = 10000,
+        ttl_segundos: float = 300.0
+    ):
+        self.selecionar = selecionar
+        self.montar = montar
+        self.versao_modelo = versao_modelo
+        self.ttl_segundos = ttl_segundos
+        self._cache = BackendMemoriaLRU(max_entradas)
+
+        self.hits = 0
+        self.misses = 0
+
+    def semente(self, id_cliente: str, seed: Optional[int] = None) -> int:
+        if seed is not None:
+            return seed
+        return semente_deterministica(id_cliente, self.versao_modelo, date.today())
+
+    def rng(self, id_cliente: str, seed: Optional[int] = None) -> Tuple[int, random.Random]:
+        semente = self.semente(id_cliente, seed)
+        return semente, random.Random(semente)
+
+    def gerar(self, cliente, quantidade: int, seed: Optional[int] = None) -> Tuple[int, Any]:
+        """(seed usada, resultado de `montar`), do cache quando possível"""
+        semente, rng = self.rng(cliente.id_cliente, seed)
+        chave = f"{self.versao_modelo}|{semente}|{quantidade}|{impressao_cliente(cliente.model_dump())}"
+
+        resultado = self._cache.obter(chave)
+        if resultado is not None:
+            self.hits += 1
+            return semente, resultado
+
+        self.misses += 1
+        produtos = self.selecionar(cliente, quantidade, rng)
+        resultado = self.montar(cliente, produtos, rng)
+        self._cache.gravar(chave, resultado, self.ttl_segundos)
+        return semente, resultado
+
+    def limpar_cache(self):
+        self._cache.limpar()
+
+    def metricas(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entradas": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "taxa_hit": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,146 @@
+"""
+Paginação por cursor (keyset) - IARECOMEND
+Cursores opacos sobre (data, id) para listagens mais recentes primeiro:
+o custo de uma página não depende de quantas vieram antes
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy import and_, or_
+
+# Direções do cursor
+PROXIMO = "proximo"    # itens mais antigos que a chave
+ANTERIOR = "anterior"  # itens mais recentes que a chave
+
+
+class Pagina:
+    """Itens da página e cursores para a próxima/anterior (None se não houver)"""
+
+    def __init__(self, itens: List[Any], cursor_proximo: Optional[str] = None, cursor_anterior: Optional[str] = None):
+        self.itens = itens
+        self.cursor_proximo = cursor_proximo
+        self.cursor_anterior = cursor_anterior
+
+
+# ============================================
+# CURSOR OPACO
+# ============================================
+
+def _valor_cursor(valor: Any) -> Any:
+    return valor.isoformat() if isinstance(valor, datetime) else valor
+
+def codificar_cursor(chave: Sequence[Any], direcao: str = PROXIMO) -> str:
+    """Cursor base64url de {"c": chave, "d": direção}"""
+    conteudo = json.dumps({"c": [_valor_cursor(v) for v in chave], "d": direcao}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(conteudo.encode()).decode().rstrip("=")
+
+def decodificar_cursor(cursor: str) -> Tuple[list, str]:
+    """(chave, direção) do cursor; cursor inválido vira 400"""
+    try:
+        conteudo = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        chave, direcao = conteudo["c"], conteudo["d"]
+        if not isinstance(chave, list) or direcao not in (PROXIMO, ANTERIOR):
+            raise ValueError(direcao)
+        return chave, direcao
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginação inválido"
+        )
+
+
+# ============================================
+# KEYSET EM CONSULTAS SQLALCHEMY
+# ============================================
+
+def paginar_consulta(query, colunas: Sequence, limite: int, cursor: Optional[str] = None, offset: int = 0) -> Pagina:
+    """
+    Página de `query` ordenada por `colunas` (decrescente), ex: (criado_em, id)
+
+    Sem cursor usa `offset` (modo antigo, compatível); com cursor, filtra
+    (data, id) < chave (próxima) ou > chave (anterior) e usa o índice
+    composto das colunas. Busca `limite + 1` linhas para saber se há mais.
+    """
+    primeira, desempate = colunas
+    direcao = PROXIMO
+
+    if cursor:
+        chave, direcao = decodificar_cursor(cursor)
+        try:
+            valor, valor_desempate = chave
+            if primeira.type.python_type is datetime:
+                valor = datetime.fromisoformat(valor)
+        except (ValueError, TypeError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor de paginação inválido"
+            )
+
+        if direcao == PROXIMO:
+            query = query.filter(or_(primeira < valor, and_(primeira == valor, desempate < valor_desempate)))
+        else:
+            query = query.filter(or_(primeira > valor, and_(primeira == valor, desempate > valor_desempate)))
+
+    if direcao == PROXIMO:
+        query = query.order_by(primeira.desc(), desempate.desc())
+        if not cursor and offset:
+            query = query.offset(offset)
+    else:
+        query = query.order_by(primeira.asc(), desempate.asc())
+
+    itens = query.limit(limite + 1).all()
+    tem_mais = len(itens) > limite
+    itens = itens[:limite]
+    if direcao == ANTERIOR:
+        itens.reverse()
+
+    def chave_do(item) -> tuple:
+        return getattr(item, primeira.key), getattr(item, desempate.key)
+
+    return montar_pagina(itens, chave_do, direcao, tem_mais, inicio=not cursor and not offset)
+
+
+def montar_pagina(itens: List[Any], chave_do, direcao: str, tem_mais: bool, inicio: bool) -> Pagina:
+    """Cursores a partir do primeiro/último item da página"""
+    if not itens:
+        return Pagina(itens)
+
+    if direcao == PROXIMO:
+        proximo = tem_mais
+        anterior = not inicio
+    else:
+        proximo = True
+        anterior = tem_mais
+
+    return Pagina(
+        itens,
+        cursor_proximo=codificar_cursor(chave_do(itens[-1]), PROXIMO) if proximo else None,
+        cursor_anterior=codificar_cursor(chave_do(itens[0]), ANTERIOR) if anterior else None
+    )
+
+
+# ============================================
+# CABEÇALHOS DA RESPOSTA
+# ============================================
+
+def definir_cabecalhos(request: Request, response: Response, pagina: Pagina):
+    """
+    Cursores nos cabeçalhos (o corpo continua sendo a lista de itens):
+    `X-Cursor-Proximo`, `X-Cursor-Anterior` e `Link` (rel="next"/"prev")
+    """
+    links = []
+    for cursor, cabecalho, rel in (
+        (pagina.cursor_proximo, "X-Cursor-Proximo", "next"),
+        (pagina.cursor_anterior, "X-Cursor-Anterior", "prev"),
+    ):
+        if cursor:
+            response.headers[cabecalho] = cursor
+            url = request.url.remove_query_params("offset").include_query_params(cursor=cursor)
+            links.append(f'<{url}>; rel="{rel}"')
+
+    if links:
+        response.headers["Link"] = ", ".join(links)
@@ -0,0 +1,218 @@
+"""
+Perfilador de requests - IARECOMEND
+Profiler por amostragem ligado por request (cabeçalho com token ou taxa de
+amostragem nas Settings); pilhas no formato "collapsed" (flamegraph.pl,
+speedscope, inferno) guardadas num buffer circular
+"""
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import List, Optional
+
+from config import settings
+
+CABECALHO_PERFIL = b"x-perfil"
+CABECALHO_ID = b"x-perfil-id"
+
+# Arquivos do backend aparecem nas pilhas com caminho relativo (routes/..., services/...)
+_DIRETORIO_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _nome_quadro(codigo) -> str:
+    arquivo = codigo.co_filename
+    if arquivo.startswith(_DIRETORIO_BACKEND):
+        arquivo = os.path.relpath(arquivo, _DIRETORIO_BACKEND)
+    else:
+        arquivo = "/".join(arquivo.replace("\\", "/").split("/")[-2:])
+    return f"{codigo.co_name} ({arquivo}:{codigo.co_firstlineno})"
+
+
+class Perfil:
+    """Amostras de um request: pilha collapsed -> quantidade"""
+
+    def __init__(self, id_perfil: int, metodo: str, caminho: str, intervalo_ms: float):
+        self.id = id_perfil
+        self.metodo = metodo
+        self.caminho = caminho
+        self.rota = caminho
+        self.status = 0
+        self.intervalo_ms = intervalo_ms
+        self.inicio = datetime.utcnow()
+        self.duracao_ms = 0.0
+        self.pilhas: Counter = Counter()
+
+    @property
+    def amostras(self) -> int:
+        return sum(self.pilhas.values())
+
+    def collapsed(self) -> str:
+        """Uma linha por pilha: 'raiz;...;folha quantidade', raiz = método + rota"""
+        raiz = f"{self.metodo} {self.rota}".replace(";", ",")
+        return "".join(f"{raiz};{pilha} {n}\n" for pilha, n in self.pilhas.most_common())
+
+    def resumo(self) -> dict:
+        return {
+            "id": self.id,
+            "metodo": self.metodo,
+            "rota": self.rota,
+            "caminho": self.caminho,
+            "status": self.status,
+            "inicio": self.inicio.isoformat(),
+            "duracao_ms": round(self.duracao_ms, 2),
+            "intervalo_ms": self.intervalo_ms,
+            "amostras": self.amostras,
+        }
+
+
+class Amostrador(threading.Thread):
+    """
+    Thread que lê `sys._current_frames()` a cada intervalo enquanto o
+    request roda e atribui ao perfil:
+
+    - na thread do event loop, as pilhas que passam pelo quadro do
+      middleware deste request (roteamento, validação, rotas async,
+      serialização), a partir desse quadro
+    - nas demais threads (threadpool das rotas síncronas), as pilhas que
+      passam pelo código da rota casada (ou de funções definidas nela,
+      como o gerador do streaming de /gerar-lote), a partir dele. Requests
+      simultâneos na mesma rota se misturam aqui, o que não distorce o
+      perfil agregado da rota
+    """
+
+    def __init__(self, perfil: Perfil, quadro_ancora, escopo: dict, intervalo_segundos: float):
+        super().__init__(name=f"perfil-{perfil.id}", daemon=True)
+        self.perfil = perfil
+        self.quadro_ancora = quadro_ancora
+        self.escopo = escopo
+        self.intervalo_segundos = intervalo_segundos
+        self.parar = threading.Event()
+        self._codigos: Optional[frozenset] = None
+
+    def _codigos_rota(self) -> frozenset:
+        """Código da rota casada e das funções definidas dentro dela (geradores de streaming)"""
+        if self._codigos is None:
+            codigo = getattr(self.escopo.get("endpoint"), "__code__", None)
+            if codigo is None:
+                return frozenset()
+            aninhados = [c for c in codigo.co_consts if hasattr(c, "co_code")]
+            self._codigos = frozenset([codigo, *aninhados])
+        return self._codigos
+
+    def _amostrar(self):
+        codigos_rota = self._codigos_rota()
+        proprio = threading.get_ident()
+
+        for id_thread, quadro in sys._current_frames().items():
+            if id_thread == proprio:
+                continue
+            pilha = []
+            while quadro is not None:
+                pilha.append(quadro.f_code)
+                if quadro is self.quadro_ancora or quadro.f_code in codigos_rota:
+                    self.perfil.pilhas[";".join(_nome_quadro(c) for c in reversed(pilha))] += 1
+                    break
+                quadro = quadro.f_back
+
+    def run(self):
+        while not self.parar.wait(self.intervalo_segundos):
+            self._amostrar()
+
+
+class Perfilador:
+    """
+    Decide quais requests perfilar e guarda os últimos `max_perfis`
+
+    - Cabeçalho `X-Perfil: <PERFIL_TOKEN>` perfila o request (o id volta
+      em `X-Perfil-Id`); sem token configurado o cabeçalho é ignorado
+    - `taxa_amostragem` (0 a 1) perfila uma fração aleatória dos requests
+    """
+
+    def __init__(self, taxa_amostragem: float = 0.0, token: str = "",
+                 intervalo_ms: float = 2.0, max_perfis: int = 50):
+        self.taxa_amostragem = taxa_amostragem
+        self.token = token.encode() if token else b""
+        self.intervalo_ms = intervalo_ms
+        self._perfis: deque = deque(maxlen=max_perfis)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def ativo(self) -> bool:
+        return self.taxa_amostragem > 0 or bool(self.token)
+
+    def deve_perfilar(self, scope) -> bool:
+        if self.token:
+            for chave, valor in scope["headers"]:
+                if chave == CABECALHO_PERFIL:
+                    return valor == self.token
+        return self.taxa_amostragem > 0 and random.random() < self.taxa_amostragem
+
+    def novo_perfil(self, metodo: str, caminho: str) -> Perfil:
+        return Perfil(next(self._ids), metodo, caminho, self.intervalo_ms)
+
+    def guardar(self, perfil: Perfil):
+        with self._lock:
+            self._perfis.append(perfil)
+
+    def ultimos(self, limite: int) -> List[Perfil]:
+        """Mais recentes primeiro"""
+        with self._lock:
+            return list(itertools.islice(reversed(self._perfis), limite))
+
+    def obter(self, id_perfil: int) -> Optional[Perfil]:
+        with self._lock:
+            return next((p for p in self._perfis if p.id == id_perfil), None)
+
+
+class PerfiladorMiddleware:
+    """
+    Middleware ASGI do perfilador; só é registrado quando o perfilador
+    está ativo (taxa > 0 ou token configurado), então desligado não custa
+    nada. Ligado, requests não sorteados pagam a leitura dos cabeçalhos e
+    um random().
+    """
+
+    def __init__(self, app, perfilador: "Perfilador"):
+        self.app = app
+        self.perfilador = perfilador
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.perfilador.deve_perfilar(scope):
+            await self.app(scope, receive, send)
+            return
+
+        perfil = self.perfilador.novo_perfil(scope["method"], scope["path"])
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                perfil.status = mensagem["status"]
+                mensagem = {**mensagem, "headers": list(mensagem.get("headers", [])) + [
+                    (CABECALHO_ID, str(perfil.id).encode())
+                ]}
+            await send(mensagem)
+
+        amostrador = Amostrador(perfil, sys._getframe(), scope, self.perfilador.intervalo_ms / 1000)
+        inicio = time.perf_counter_ns()
+        amostrador.start()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            amostrador.parar.set()
+            amostrador.join(timeout=1)
+            perfil.duracao_ms = (time.perf_counter_ns() - inicio) / 1e6
+            rota = scope.get("route")
+            perfil.rota = getattr(rota, "path", None) or perfil.caminho
+            self.perfilador.guardar(perfil)
+
+
+perfilador = Perfilador(
+    taxa_amostragem=settings.PERFIL_TAXA_AMOSTRAGEM,
+    token=settings.PERFIL_TOKEN,
+    intervalo_ms=settings.PERFIL_INTERVALO_MS,
+    max_perfis=settings.PERFIL_MAX_PERFIS
+)
@@ -0,0 +1,287 @@
+"""
+Persistência de recomendações e feedbacks - IARECOMEND
+Fila de escrita (write-behind) com gravação em lote no banco de dados
+"""
+import queue
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import engine
+from models import Recomendacao, ItemRecomendado, FeedbackRecomendacao
+
+
+def _para_datetime(valor) -> Optional[datetime]:
+    """Converte string ISO (formato do histórico) para datetime"""
+    if valor is None or isinstance(valor, datetime):
+        return valor
+    return datetime.fromisoformat(valor)
+
+def linhas_recomendacao(recomendacao: dict) -> List[Tuple[object, dict]]:
+    """Converte o dict de RecomendacaoResponse em linhas para as tabelas"""
+    linhas = [(Recomendacao.__table__, {
+        "id_recomendacao": recomendacao["id_recomendacao"],
+        "id_cliente": recomendacao["id_cliente"],
+        "nome_cliente": recomendacao["nome_cliente"],
+        "data_geracao": _para_datetime(recomendacao["data_geracao"]),
+        "total_recomendacoes": recomendacao["total_recomendacoes"],
+        "algoritmo_usado": recomendacao.get("algoritmo_usado"),
+        "tempo_processamento_ms": recomendacao.get("tempo_processamento_ms"),
+        "metadados": recomendacao.get("metadados"),
+    })]
+
+    for posicao, produto in enumerate(recomendacao["produtos_recomendados"]):
+        linhas.append((ItemRecomendado.__table__, {
+            "id_recomendacao": recomendacao["id_recomendacao"],
+            "posicao": posicao,
+            "id_produto": produto["id_produto"],
+            "nome": produto["nome"],
+            "categoria": produto["categoria"],
+            "preco": produto["preco"],
+            "desconto": produto.get("desconto") or 0.0,
+            "preco_final": produto["preco_final"],
+            "confianca_ia": produto["confianca_ia"],
+            "motivo_recomendacao": produto.get("motivo_recomendacao"),
+            "estoque_disponivel": produto.get("estoque_disponivel", 0),
+            "url_imagem": produto.get("url_imagem"),
+            "tags": produto.get("tags") or [],
+        }))
+
+    return linhas
+
+def linha_feedback(feedback: dict) -> Tuple[object, dict]:
+    """Converte o dict do histórico de feedbacks em linha para a tabela"""
+    return (FeedbackRecomendacao.__table__, {
+        "id_feedback": feedback["id_feedback"],
+        "id_recomendacao": feedback["id_recomendacao"],
+        "id_produto": feedback["id_produto"],
+        "aceito": feedback["aceito"],
+        "comprado": bool(feedback.get("comprado")),
+        "motivo_recusa": feedback.get("motivo_recusa"),
+        "observacoes": feedback.get("observacoes"),
+        "data_registro": _para_datetime(feedback["data_registro"]),
+    })
+
+def identificar_linha(linha: dict) -> str:
+    """Identificação da linha para o log de erros"""
+    if "id_feedback" in linha:
+        return linha["id_feedback"]
+    if "posicao" in linha:
+        return f"{linha['id_recomendacao']}#{linha['posicao']}"
+    return linha["id_recomendacao"]
+
+
+class FilaEscrita:
+    """
+    Fila de escrita assíncrona (write-behind)
+
+    O request apenas enfileira as linhas; uma thread de fundo agrupa até
+    `tamanho_lote` linhas e grava cada tabela com um único INSERT em modo
+    executemany. O INSERT ignora chaves já gravadas e, se o lote falhar
+    mesmo assim, as linhas são regravadas uma a uma. A fila é limitada: se estiver cheia, a linha é descartada
+    e contabilizada em `descartados` em vez de bloquear o request.
+    """
+
+    def __init__(
+        self,
+        bind=None,
+        tamanho_maximo: int = 10000,
+        tamanho_lote: int = 500,
+        intervalo_segundos: float = 1.0
+    ):
+        self.bind = bind if bind is not None else engine
+        self.tamanho_lote = tamanho_lote
+        self.intervalo_segundos = intervalo_segundos
+        self._fila: "queue.Queue[Tuple[object, dict]]" = queue.Queue(maxsize=tamanho_maximo)
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock_gravacao = threading.Lock()
+
+        # Contadores para monitoramento
+        self.gravados = 0
+        self.descartados = 0
+        self.erros = 0
+
+    # ---------- API usada pelos endpoints ----------
+
+    def enfileirar_recomendacao(self, recomendacao: dict) -> bool:
+        """Enfileira recomendação e seus itens. Não bloqueia."""
+        return self._enfileirar(linhas_recomendacao(recomendacao))
+
+    def enfileirar_feedback(self, feedback: dict) -> bool:
+        """Enfileira um feedback. Não bloqueia."""
+        return self._enfileirar([linha_feedback(feedback)])
+
+    def _enfileirar(self, linhas: List[Tuple[object, dict]]) -> bool:
+        for posicao, linha in enumerate(linhas):
+            try:
+                self._fila.put_nowait(linha)
+            except queue.Full:
+                self.descartados += len(linhas) - posicao
+                print(f"⚠️  Fila de persistência cheia: {len(linhas) - posicao} registros descartados")
+                return False
+        return True
+
+    @property
+    def pendentes(self) -> int:
+        return self._fila.qsize()
+
+    # ---------- Ciclo de vida ----------
+
+    def iniciar(self):
+        """Inicia a thread de gravação (chamado no lifespan da aplicação)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, name="fila-escrita", daemon=True)
+        self._thread.start()
+
+    def encerrar(self, timeout: float = 10.0):
+        """Para a thread e grava tudo que ainda estiver na fila"""
+        self._parar.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def _executar(self):
+        while not self._parar.is_set():
+            self._parar.wait(self.intervalo_segundos)
+            self.flush()
+
+    # ---------- Gravação ----------
+
+    def _drenar(self) -> List[Tuple[object, dict]]:
+        lote = []
+        while len(lote) < self.tamanho_lote:
+            try:
+                lote.append(self._fila.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def flush(self) -> int:
+        """Grava todos os lotes pendentes; retorna o total de linhas gravadas"""
+        with self._lock_gravacao:
+            return self._gravar_pendentes()
+
+    def _gravar_pendentes(self) -> int:
+        total = 0
+        while True:
+            lote = self._drenar()
+            if not lote:
+                break
+            total += self._gravar(lote)
+        return total
+
+    def apagar_tudo(self):
+        """
+        Grava o que estiver na fila e apaga recomendações, itens e feedbacks
+        persistidos. Sob o lock de gravação: nenhum lote em andamento reaparece
+        depois da limpeza.
+        """
+        with self._lock_gravacao:
+            self._gravar_pendentes()
+            with self.bind.begin() as conn:
+                for tabela in (FeedbackRecomendacao.__table__, ItemRecomendado.__table__, Recomendacao.__table__):
+                    conn.execute(tabela.delete())
+
+    def _insert(self, tabela):
+        """
+        INSERT idempotente: linha com chave única já gravada é ignorada
+        (ON CONFLICT DO NOTHING no PostgreSQL e no SQLite)
+        """
+        dialeto = self.bind.dialect.name
+        if dialeto == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+            return insert(tabela).on_conflict_do_nothing()
+        if dialeto == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+            return insert(tabela).on_conflict_do_nothing()
+        return tabela.insert()
+
+    def _gravar(self, lote: List[Tuple[object, dict]]) -> int:
+        # Agrupa por tabela preservando a ordem (recomendação antes dos itens)
+        por_tabela: Dict[object, List[dict]] = {}
+        for tabela, linha in lote:
+            por_tabela.setdefault(tabela, []).append(linha)
+
+        try:
+            with self.bind.begin() as conn:
+                for tabela, linhas in por_tabela.items():
+                    conn.execute(self._insert(tabela), linhas)
+        except Exception as e:
+            # Uma linha inválida não pode derrubar o lote inteiro
+            print(f"⚠️  Erro ao gravar lote de {len(lote)} registros, gravando linha a linha: {e}")
+            return self._gravar_linha_a_linha(lote)
+
+        self.gravados += len(lote)
+        return len(lote)
+
+    def _gravar_linha_a_linha(self, lote: List[Tuple[object, dict]]) -> int:
+        """Uma transação por linha: só a linha problemática é descartada (e logada)"""
+        gravadas = 0
+        for tabela, linha in lote:
+            try:
+                with self.bind.begin() as conn:
+                    conn.execute(self._insert(tabela), [linha])
+            except Exception as e:
+                self.erros += 1
+                print(f"❌ Erro ao gravar {tabela.name} {identificar_linha(linha)}: {e}")
+                continue
+            gravadas += 1
+
+        self.gravados += gravadas
+        return gravadas
+
+def carregar_historico(db: Session, limite: int) -> Tuple[List[dict], List[dict]]:
+    """
+    Carrega as recomendações mais recentes (com itens) e seus feedbacks
+    Usado na inicialização para restaurar o histórico em memória
+    """
+    recomendacoes = (
+        db.query(Recomendacao)
+        .order_by(Recomendacao.data_geracao.desc())
+        .limit(limite)
+        .all()
+    )
+    if not recomendacoes:
+        return [], []
+
+    ids = [rec.id_recomendacao for rec in recomendacoes]
+    itens_por_rec: Dict[str, List[ItemRecomendado]] = {}
+    feedbacks = []
+
+    # Consulta em blocos para não estourar o limite de parâmetros do IN
+    for inicio in range(0, len(ids), 1000):
+        bloco = ids[inicio:inicio + 1000]
+        itens = (
+            db.query(ItemRecomendado)
+            .filter(ItemRecomendado.id_recomendacao.in_(bloco))
+            .order_by(ItemRecomendado.id_recomendacao, ItemRecomendado.posicao)
+            .all()
+        )
+        for item in itens:
+            itens_por_rec.setdefault(item.id_recomendacao, []).append(item)
+
+        feedbacks.extend(
+            fb.to_dict() for fb in
+            db.query(FeedbackRecomendacao)
+            .filter(FeedbackRecomendacao.id_recomendacao.in_(bloco))
+            .order_by(FeedbackRecomendacao.data_registro)
+            .all()
+        )
+
+    historico = [rec.to_dict(itens_por_rec.get(rec.id_recomendacao)) for rec in reversed(recomendacoes)]
+    return historico, feedbacks
+
+
+# Instância global usada pelas rotas e pelo lifespan
+fila_escrita = FilaEscrita(
+    tamanho_maximo=settings.PERSISTENCIA_TAMANHO_FILA,
+    tamanho_lote=settings.PERSISTENCIA_TAMANHO_LOTE,
+    intervalo_segundos=settings.PERSISTENCIA_INTERVALO_SEGUNDOS
+)
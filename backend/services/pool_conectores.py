@@ -0,0 +1,197 @@
+"""
+Pool de conectores por fonte de dados - IARECOMEND
+Mantém engines SQLAlchemy "quentes" por fonte externa, com expiração
+por ociosidade, limite LRU e invalidação quando a configuração muda
+"""
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, Engine
+
+from config import settings
+
+# Campos da configuração que definem a conexão (mudou algum, muda a chave)
+CAMPOS_CONEXAO = (
+    "tipo", "host", "port", "database", "username", "senha",
+    "url_api", "api_key", "headers_json",
+)
+
+# Driver SQLAlchemy de cada tipo de fonte relacional
+DRIVERS_POR_TIPO = {
+    "mysql": "mysql+pymysql",
+    "postgresql": "postgresql+psycopg2",
+    "sqlserver": "mssql+pyodbc",
+    "oracle": "oracle+oracledb",
+}
+
+
+def url_fonte(config: dict):
+    """
+    URL de conexão da fonte, montada de host/port/database/credenciais
+
+    `parametros_adicionais.url` (URL SQLAlchemy arbitrária, ex:
+    sqlite:///fonte.db) só é aceita com FONTES_PERMITIR_URL=True: a
+    configuração é editável pela API e a URL poderia apontar para o banco
+    da própria aplicação ou para hosts internos
+    """
+    parametros = config.get("parametros_adicionais") or {}
+    if parametros.get("url"):
+        if not settings.FONTES_PERMITIR_URL:
+            raise ValueError("parametros_adicionais.url não é permitido (habilite FONTES_PERMITIR_URL)")
+        return parametros["url"]
+
+    return URL.create(
+        DRIVERS_POR_TIPO[config["tipo"]],
+        username=config.get("username"),
+        password=config.get("senha"),
+        host=config.get("host"),
+        port=config.get("port"),
+        database=config.get("database"),
+    )
+
+def hash_configuracao(config: dict) -> str:
+    """Hash estável dos campos de conexão (inclui credenciais)"""
+    parametros = config.get("parametros_adicionais") or {}
+    campos = {campo: getattr(config.get(campo), "value", config.get(campo)) for campo in CAMPOS_CONEXAO}
+    campos["url"] = parametros.get("url")
+    serializado = json.dumps(campos, sort_keys=True, default=str)
+    return hashlib.sha256(serializado.encode()).hexdigest()[:16]
+
+
+class _Entrada:
+    __slots__ = ("engine", "ultimo_uso")
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.ultimo_uso = time.monotonic()
+
+
+class PoolConectores:
+    """
+    Engines por (fonte_id, hash da configuração)
+
+    - `engine(config)` reaproveita a engine da fonte (hit) ou cria uma nova
+      (miss); cada engine tem seu próprio pool pequeno de conexões
+    - Entradas sem uso há mais de `ocioso_segundos` são descartadas
+    - Acima de `tamanho_maximo` entradas, a menos usada recentemente sai
+    - `invalidar(fonte_id)` descarta as engines da fonte (atualizar/excluir)
+
+    Configurações ainda não salvas (teste de conexão antes de criar a
+    fonte) usam fonte_id None; a chave continua distinta pelo hash.
+    """
+
+    def __init__(self, tamanho_maximo: int = 50, ocioso_segundos: float = 600, conexoes_por_fonte: int = 2):
+        self.tamanho_maximo = tamanho_maximo
+        self.ocioso_segundos = ocioso_segundos
+        self.conexoes_por_fonte = conexoes_por_fonte
+
+        self._lock = Lock()
+        self._entradas: "OrderedDict[Tuple[Optional[int], str], _Entrada]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions_ociosas = 0
+        self.evictions_lru = 0
+        self.invalidacoes = 0
+
+    def _criar_engine(self, config: dict) -> Engine:
+        return create_engine(
+            url_fonte(config),
+            pool_size=self.conexoes_por_fonte,
+            max_overflow=0,
+            pool_pre_ping=True,
+            pool_recycle=int(self.ocioso_segundos) or -1
+        )
+
+    def engine(self, config: dict) -> Engine:
+        """Engine da fonte (criada na primeira vez e reaproveitada depois)"""
+        chave = (config.get("id"), hash_configuracao(config))
+        descartadas = []
+
+        with self._lock:
+            descartadas += self._remover_ociosas()
+
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                self.hits += 1
+                self._entradas.move_to_end(chave)
+            else:
+                self.misses += 1
+                entrada = self._entradas[chave] = _Entrada(self._criar_engine(config))
+
+                while len(self._entradas) > self.tamanho_maximo:
+                    _, antiga = self._entradas.popitem(last=False)
+                    descartadas.append(antiga.engine)
+                    self.evictions_lru += 1
+
+            entrada.ultimo_uso = time.monotonic()
+
+        for engine in descartadas:
+            engine.dispose()
+        return entrada.engine
+
+    def _remover_ociosas(self):
+        """Remove do início do LRU as entradas ociosas (chamar com o lock)"""
+        limite = time.monotonic() - self.ocioso_segundos
+        descartadas = []
+        while self._entradas:
+            chave, entrada = next(iter(self._entradas.items()))
+            if entrada.ultimo_uso > limite:
+                break
+            del self._entradas[chave]
+            descartadas.append(entrada.engine)
+            self.evictions_ociosas += 1
+        return descartadas
+
+    def remover_ociosas(self) -> int:
+        with self._lock:
+            descartadas = self._remover_ociosas()
+        for engine in descartadas:
+            engine.dispose()
+        return len(descartadas)
+
+    def invalidar(self, fonte_id: Optional[int] = None, config: Optional[dict] = None):
+        """Descarta as engines da fonte (ou só a da configuração informada)"""
+        with self._lock:
+            if config is not None:
+                chaves = [(config.get("id"), hash_configuracao(config))]
+            else:
+                chaves = [chave for chave in self._entradas if chave[0] == fonte_id]
+            descartadas = [self._entradas.pop(chave).engine for chave in chaves if chave in self._entradas]
+            self.invalidacoes += len(descartadas)
+
+        for engine in descartadas:
+            engine.dispose()
+
+    def limpar(self):
+        with self._lock:
+            descartadas = [entrada.engine for entrada in self._entradas.values()]
+            self._entradas.clear()
+        for engine in descartadas:
+            engine.dispose()
+
+    def metricas(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entradas": len(self._entradas),
+                "tamanho_maximo": self.tamanho_maximo,
+                "hits": self.hits,
+                "misses": self.misses,
+                "taxa_hit": round(self.hits / total, 4) if total else 0.0,
+                "evictions_ociosas": self.evictions_ociosas,
+                "evictions_lru": self.evictions_lru,
+                "invalidacoes": self.invalidacoes,
+            }
+
+
+pool_conectores = PoolConectores(
+    tamanho_maximo=settings.POOL_CONECTORES_TAMANHO_MAXIMO,
+    ocioso_segundos=settings.POOL_CONECTORES_OCIOSO_SEGUNDOS,
+    conexoes_por_fonte=settings.POOL_CONECTORES_CONEXOES_POR_FONTE
+)
@@ -0,0 +1,122 @@
+"""
+Resumo materializado por cliente - IARECOMEND
+Rollups atualizados incrementalmente em /gerar e /feedback
+"""
+import copy
+from collections import Counter
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+class ResumoCliente:
+    """Agregados de um cliente (equivalente a recalcular sobre todo o histórico)"""
+
+    def __init__(self, id_cliente: str):
+        self.id_cliente = id_cliente
+        self.total_recomendacoes = 0
+        self.total_produtos = 0
+        self.soma_confianca = 0.0
+        self.soma_desconto = 0.0
+        self.categorias: Counter = Counter()
+        self.total_feedbacks = 0
+        self.feedbacks_aceitos = 0
+        self.feedbacks_comprados = 0
+        # id_produto -> produto recomendado com maior confiança
+        self.melhores_produtos: Dict[str, dict] = {}
+        # Recomendação mais recente (nome e perfil vêm dela)
+        self.ultima_recomendacao: Optional[dict] = None
+
+    @property
+    def confianca_media(self) -> float:
+        return round(self.soma_confianca / self.total_recomendacoes, 2) if self.total_recomendacoes else 0
+
+    @property
+    def desconto_medio(self) -> float:
+        return round(self.soma_desconto / self.total_recomendacoes, 2) if self.total_recomendacoes else 0
+
+    def categorias_top(self, limite: int = 5) -> List[tuple]:
+        return sorted(self.categorias.items(), key=lambda x: x[1], reverse=True)[:limite]
+
+    def _aplicar_recomendacao(self, recomendacao: dict):
+        produtos = recomendacao["produtos_recomendados"]
+
+        self.total_recomendacoes += 1
+        self.total_produtos += len(produtos)
+        self.soma_confianca += recomendacao["metadados"]["confianca_media"]
+        self.soma_desconto += recomendacao["metadados"]["desconto_medio"]
+
+        for produto in produtos:
+            self.categorias[produto["categoria"]] += 1
+            atual = self.melhores_produtos.get(produto["id_produto"])
+            if atual is None or produto["confianca_ia"] > atual["confianca_ia"]:
+                self.melhores_produtos[produto["id_produto"]] = produto
+
+        if (self.ultima_recomendacao is None
+                or recomendacao["data_geracao"] > self.ultima_recomendacao["data_geracao"]):
+            self.ultima_recomendacao = recomendacao
+
+    def _aplicar_feedback(self, feedback: dict):
+        self.total_feedbacks += 1
+        if feedback["aceito"]:
+            self.feedbacks_aceitos += 1
+        if feedback.get("comprado"):
+            self.feedbacks_comprados += 1
+
+
+class ResumosClientes:
+    """
+    Rollups de todos os clientes, indexados por id_cliente
+
+    Os endpoints /cliente/{id}/resumo e /cliente/{id}/produtos leem daqui
+    em vez de reprocessar o histórico. Qualquer escrita no histórico deve
+    passar por `registrar_recomendacao`/`registrar_feedback`, e limpezas
+    do histórico por `limpar`, para que os rollups nunca fiquem defasados.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._resumos: Dict[str, ResumoCliente] = {}
+
+    def obter(self, id_cliente: str) -> Optional[ResumoCliente]:
+        """Cópia do rollup do cliente (segura para leitura fora do lock)"""
+        with self._lock:
+            resumo = self._resumos.get(id_cliente)
+            if resumo is None:
+                return None
+            copia = copy.copy(resumo)
+            copia.categorias = Counter(resumo.categorias)
+            copia.melhores_produtos = dict(resumo.melhores_produtos)
+            return copia
+
+    def registrar_recomendacao(self, recomendacao: dict):
+        with self._lock:
+            resumo = self._resumos.get(recomendacao["id_cliente"])
+            if resumo is None:
+                resumo = self._resumos[recomendacao["id_cliente"]] = ResumoCliente(recomendacao["id_cliente"])
+            resumo._aplicar_recomendacao(recomendacao)
+
+    def registrar_feedback(self, feedback: dict, id_cliente: Optional[str]):
+        """Aplica o feedback ao cliente dono da recomendação (ignorado se desconhecido)"""
+        if id_cliente is None:
+            return
+        with self._lock:
+            resumo = self._resumos.get(id_cliente)
+            if resumo is not None:
+                resumo._aplicar_feedback(feedback)
+
+    def limpar(self):
+        with self._lock:
+            self._resumos.clear()
+
+    def reconstruir(
+        self,
+        recomendacoes: Iterable[dict],
+        feedbacks: Iterable[dict],
+        cliente_da_recomendacao: Callable[[str], Optional[str]]
+    ):
+        """Recalcula todos os rollups a partir do histórico completo"""
+        self.limpar()
+        for recomendacao in recomendacoes:
+            self.registrar_recomendacao(recomendacao)
+        for feedback in feedbacks:
+            self.registrar_feedback(feedback, cliente_da_recomendacao(feedback["id_recomendacao"]))
@@ -0,0 +1,272 @@
+"""
+Sincronização incremental de fontes relacionais - IARECOMEND
+Puxa apenas as linhas alteradas desde o último watermark, em lotes
+paginados por keyset, e persiste o watermark na FonteDados
+"""
+import asyncio
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import MetaData, Table, and_, bindparam, func, or_, select, true, update
+
+from config import settings
+from database import engine
+from models import FonteDados, RegistroImportado
+from services.ingestao_arquivos import ImportacaoCancelada, gravar_bloco
+from services.pool_conectores import DRIVERS_POR_TIPO, pool_conectores
+
+
+def usa_incremental(config: dict) -> bool:
+    """Fonte relacional com `parametros_adicionais.incremental` configurado"""
+    parametros = config.get("parametros_adicionais") or {}
+    return config.get("tipo") in DRIVERS_POR_TIPO and bool(parametros.get("incremental"))
+
+
+# ============================================
+# WATERMARK
+# ============================================
+
+def _codificar(valor: Any) -> Tuple[str, Any]:
+    """Valor do watermark em formato JSON: (tipo, valor)"""
+    if isinstance(valor, datetime):
+        return "datetime", valor.isoformat()
+    if isinstance(valor, date):
+        return "date", valor.isoformat()
+    if isinstance(valor, Decimal):
+        return "decimal", str(valor)
+    if isinstance(valor, (int, float)):
+        return "numero", valor
+    return "str", str(valor)
+
+def _decodificar(tipo: str, valor: Any) -> Any:
+    if tipo == "datetime":
+        return datetime.fromisoformat(valor)
+    if tipo == "date":
+        return date.fromisoformat(valor)
+    if tipo == "decimal":
+        return Decimal(valor)
+    return valor
+
+def _valor_json(valor: Any) -> Any:
+    """Converte valores da linha de origem para JSON"""
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return bytes(valor).hex()
+    return valor
+
+
+class ConfigIncremental:
+    """
+    Configuração em `parametros_adicionais.incremental`
+
+    Exemplo:
+        {
+            "tabela": "vendas",
+            "coluna_watermark": "atualizado_em",
+            "coluna_chave": "id",
+            "tamanho_lote": 5000
+        }
+
+    Só com `coluna_chave` (chave única e crescente), ela mesma é o
+    watermark. Com as duas, a chave é obrigatória: desempata linhas com o
+    mesmo watermark no corte do lote (keyset por (watermark, chave)) e
+    identifica o registro em registros_importados.
+    """
+
+    def __init__(self, parametros: dict):
+        incremental = parametros.get("incremental") or {}
+        if not incremental.get("tabela"):
+            raise ValueError("Sincronização incremental requer 'tabela' em parametros_adicionais.incremental")
+
+        self.tabela: str = incremental["tabela"]
+        self.schema: Optional[str] = incremental.get("schema")
+        coluna_chave: Optional[str] = incremental.get("coluna_chave")
+        if not coluna_chave:
+            raise ValueError("Sincronização incremental requer 'coluna_chave' em parametros_adicionais.incremental")
+        self.coluna_watermark: str = incremental.get("coluna_watermark") or coluna_chave
+        # Watermark na própria chave: não há empate a desempatar
+        self.coluna_chave: Optional[str] = None if coluna_chave == self.coluna_watermark else coluna_chave
+        self.tamanho_lote = int(incremental.get("tamanho_lote", settings.INCREMENTAL_TAMANHO_LOTE))
+
+    @property
+    def coluna_registro(self) -> str:
+        """Coluna que identifica o registro em registros_importados"""
+        return self.coluna_chave or self.coluna_watermark
+
+
+def filtro_keyset(tabela: Table, cfg: ConfigIncremental, watermark: Optional[dict]):
+    """Linhas depois do watermark: (wm > v) OR (wm = v AND chave > k)"""
+    if not watermark:
+        return true()
+
+    coluna_wm = tabela.c[cfg.coluna_watermark]
+    valor = _decodificar(watermark["tipo"], watermark["valor"])
+    if cfg.coluna_chave is None:
+        return coluna_wm > valor
+
+    chave = _decodificar(watermark["chave_tipo"], watermark["chave"])
+    return or_(coluna_wm > valor, and_(coluna_wm == valor, tabela.c[cfg.coluna_chave] > chave))
+
+def watermark_da_linha(linha: Dict[str, Any], cfg: ConfigIncremental) -> dict:
+    tipo, valor = _codificar(linha[cfg.coluna_watermark])
+    watermark = {"coluna": cfg.coluna_watermark, "tipo": tipo, "valor": valor}
+    if cfg.coluna_chave is not None:
+        watermark["coluna_chave"] = cfg.coluna_chave
+        watermark["chave_tipo"], watermark["chave"] = _codificar(linha[cfg.coluna_chave])
+    return watermark
+
+def watermark_valido(watermark: Optional[dict], cfg: ConfigIncremental) -> bool:
+    """Watermark persistido vale para a configuração atual (mesmas colunas)"""
+    if not watermark or watermark.get("coluna") != cfg.coluna_watermark:
+        return False
+    if cfg.coluna_chave is None:
+        return True
+    return watermark.get("coluna_chave") == cfg.coluna_chave and watermark.get("chave") is not None
+
+
+# ============================================
+# GRAVAÇÃO (UPSERT POR CHAVE)
+# ============================================
+
+def gravar_lote(conexao, fonte_id: int, linhas: List[Dict[str, Any]], cfg: ConfigIncremental) -> Tuple[int, int]:
+    """
+    Insere ou atualiza o lote em registros_importados (por fonte_id + chave)
+    Retorna (inseridos, atualizados)
+    """
+    tabela = RegistroImportado.__table__
+    agora = datetime.utcnow()
+    registros = {
+        str(linha[cfg.coluna_registro]): {k: _valor_json(v) for k, v in linha.items()}
+        for linha in linhas
+    }
+
+    existentes = set(conexao.execute(
+        select(tabela.c.chave).where(tabela.c.fonte_id == fonte_id, tabela.c.chave.in_(list(registros)))
+    ).scalars())
+
+    novos = [
+        {"fonte_id": fonte_id, "chave": chave, "dados": dados, "importado_em": agora}
+        for chave, dados in registros.items() if chave not in existentes
+    ]
+    alterados = [
+        {"b_chave": chave, "b_dados": dados}
+        for chave, dados in registros.items() if chave in existentes
+    ]
+
+    gravar_bloco(conexao, novos)
+    if alterados:
+        conexao.execute(
+            update(tabela)
+            .where(tabela.c.fonte_id == fonte_id, tabela.c.chave == bindparam("b_chave"))
+            .values(dados=bindparam("b_dados"), importado_em=agora),
+            alterados
+        )
+
+    return len(novos), len(alterados)
+
+
+# ============================================
+# SINCRONIZAÇÃO
+# ============================================
+
+def sincronizar_incremental_sync(
+    config: dict,
+    progresso: Optional[Callable[[int, Optional[int]], None]] = None,
+    cancelar: Optional[threading.Event] = None,
+    bind=None
+) -> dict:
+    """
+    Sincronização incremental (bloqueante; roda em thread)
+
+    Cada lote é lido da origem com keyset pagination ordenada por
+    (watermark, chave) e gravado junto com o novo watermark na mesma
+    transação: se a sincronização cair no meio, a próxima continua
+    do último lote gravado.
+    """
+    parametros = config.get("parametros_adicionais") or {}
+    cfg = ConfigIncremental(parametros)
+    fonte_id = config["id"]
+    bind = bind or engine
+
+    with bind.connect() as conexao:
+        watermark = conexao.execute(
+            select(FonteDados.watermark).where(FonteDados.id == fonte_id)
+        ).scalar()
+
+    # Watermark de outras colunas (configuração alterada) não vale: recomeça
+    if not watermark_valido(watermark, cfg):
+        watermark = None
+
+    origem = pool_conectores.engine(config)
+    inseridos = atualizados = 0
+    inicio = time.perf_counter()
+
+    with origem.connect() as conexao_origem:
+        tabela = Table(cfg.tabela, MetaData(), schema=cfg.schema, autoload_with=conexao_origem)
+        ordem = [tabela.c[cfg.coluna_watermark]]
+        if cfg.coluna_chave is not None:
+            ordem.append(tabela.c[cfg.coluna_chave])
+
+        total = conexao_origem.execute(
+            select(func.count()).select_from(tabela).where(filtro_keyset(tabela, cfg, watermark))
+        ).scalar()
+        if progresso:
+            progresso(0, total)
+
+        while True:
+            if cancelar is not None and cancelar.is_set():
+                raise ImportacaoCancelada()
+
+            linhas = [
+                dict(linha._mapping)
+                for linha in conexao_origem.execute(
+                    select(tabela)
+                    .where(filtro_keyset(tabela, cfg, watermark))
+                    .order_by(*ordem)
+                    .limit(cfg.tamanho_lote)
+                )
+            ]
+            if not linhas:
+                break
+
+            watermark = watermark_da_linha(linhas[-1], cfg)
+            with bind.begin() as conexao:
+                novos, alterados = gravar_lote(conexao, fonte_id, linhas, cfg)
+                conexao.execute(
+                    update(FonteDados.__table__)
+                    .where(FonteDados.__table__.c.id == fonte_id)
+                    .values(watermark=watermark)
+                )
+            inseridos += novos
+            atualizados += alterados
+
+            if progresso:
+                progresso(inseridos + atualizados, max(total, inseridos + atualizados))
+
+            if len(linhas) < cfg.tamanho_lote:
+                break
+
+    tempo = time.perf_counter() - inicio
+    processados = inseridos + atualizados
+    return {
+        "registros_importados": inseridos,
+        "registros_atualizados": atualizados,
+        "registros_com_erro": 0,
+        "registros_por_segundo": round(processados / tempo, 1) if tempo > 0 else None,
+        "watermark": watermark,
+    }
+
+async def sincronizar_incremental(config: dict, progresso: Optional[Callable[[int, Optional[int]], None]] = None) -> dict:
+    """Versão assíncrona: roda em thread e para no próximo lote se cancelada"""
+    cancelar = threading.Event()
+    try:
+        return await asyncio.to_thread(sincronizar_incremental_sync, config, progresso, cancelar)
+    except asyncio.CancelledError:
+        cancelar.set()
+        raise
@@ -0,0 +1,43 @@
+"""
+Configuração dos testes - IARECOMEND
+As Settings são lidas na importação de config: o ambiente precisa estar
+pronto antes de qualquer import da aplicação
+
+Rodar a partir de backend/:
+    python -m pytest tests
+"""
+import os
+import tempfile
+
+DIRETORIO_TESTES = tempfile.mkdtemp(prefix="iarecomend-testes-")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DIRETORIO_TESTES, 'testes.db')}"
+os.environ["DEBUG"] = "False"
+os.environ["AGENDADOR_ATIVO"] = "False"
+os.environ["CACHE_RESPOSTAS_ATIVO"] = "False"
+os.environ["ESTADO_BACKEND"] = "memoria"
+os.environ["PERFIL_TAXA_AMOSTRAGEM"] = "0"
+os.environ["PERFIL_TOKEN"] = ""
+
+import pytest
+from sqlalchemy import create_engine
+
+from models import Base
+
+
+@pytest.fixture
+def engine_sqlite(tmp_path):
+    """Banco SQLite próprio do teste, com todas as tabelas criadas"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'banco.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture(scope="module")
+def cliente_api():
+    """Aplicação com o lifespan completo sobre o banco dos testes"""
+    from fastapi.testclient import TestClient
+    from app import app
+
+    with TestClient(app) as cliente:
+        yield cliente
@@ -0,0 +1,58 @@
+"""
+Testes da busca textual (services/busca.py) no fallback em memória (SQLite)
+"""
+from sqlalchemy.orm import sessionmaker
+
+from models import Usuario
+from services.busca import MotorBusca
+
+
+def novo_motor() -> MotorBusca:
+    """Um MotorBusca por worker, como cada processo uvicorn tem o seu"""
+    motor = MotorBusca()
+    motor.registrar("usuarios", Usuario.id, (Usuario.nome, Usuario.email), Usuario.atualizado_em)
+    return motor
+
+def buscar(motor: MotorBusca, db, termo: str) -> list:
+    return [u.nome for u in motor.buscar(db, "usuarios", db.query(Usuario), termo, limite=10)]
+
+
+def test_escritas_de_outro_worker_aparecem_na_busca(engine_sqlite):
+    sessoes = sessionmaker(bind=engine_sqlite)
+    worker_a, worker_b = novo_motor(), novo_motor()
+
+    with sessoes() as db:
+        db.add(Usuario(nome="Maria Santos", email="maria@example.com", senha_hash="x"))
+        db.commit()
+        assert buscar(worker_b, db, "santos") == ["Maria Santos"]  # índice do worker B carregado
+
+        # Criado pelo worker A
+        joao = Usuario(nome="João Santos", email="joao@example.com", senha_hash="x")
+        db.add(joao)
+        db.commit()
+        worker_a.atualizar("usuarios", joao)
+        assert sorted(buscar(worker_b, db, "santos")) == ["João Santos", "Maria Santos"]
+
+        # Editado pelo worker A
+        joao.nome = "João Oliveira"
+        db.commit()
+        worker_a.atualizar("usuarios", joao)
+        assert buscar(worker_b, db, "santos") == ["Maria Santos"]
+        assert buscar(worker_b, db, "oliveira") == ["João Oliveira"]
+
+        # Excluído pelo worker A
+        db.delete(joao)
+        db.commit()
+        worker_a.remover("usuarios", joao.id)
+        assert buscar(worker_b, db, "oliveira") == []
+
+def test_indice_reaproveitado_sem_escritas(engine_sqlite):
+    motor = novo_motor()
+    with sessionmaker(bind=engine_sqlite)() as db:
+        db.add(Usuario(nome="Ana Lima", email="ana@example.com", senha_hash="x"))
+        db.commit()
+        buscar(motor, db, "lima")
+        indice = motor._indices["usuarios"][0]
+
+        buscar(motor, db, "ana")
+        assert motor._indices["usuarios"][0] is indice
@@ -0,0 +1,85 @@
+"""
+Testes do cache de respostas (services/cache_respostas.py)
+"""
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from services.cache import BackendMemoriaLRU
+from services.cache_respostas import CacheRespostas, CacheRespostasMiddleware
+
+ROTA = "/api/recomendacoes/estatisticas"
+
+
+def montar_app(cache: CacheRespostas, estado: dict) -> FastAPI:
+    app = FastAPI()
+
+    @app.get(ROTA)
+    def estatisticas():
+        estado["execucoes"] += 1
+        return {"total": estado["total"]}
+
+    app.add_middleware(CacheRespostasMiddleware, cache=cache)
+    return app
+
+def buscar(app, vezes: int) -> list:
+    async def executar():
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://teste") as cliente:
+            return [await cliente.get(ROTA) for _ in range(vezes)]
+    return asyncio.run(executar())
+
+
+def test_hit_nao_executa_a_rota():
+    cache = CacheRespostas(BackendMemoriaLRU())
+    estado = {"total": 1, "execucoes": 0}
+
+    respostas = buscar(montar_app(cache, estado), 3)
+
+    assert [r.headers["x-cache"] for r in respostas] == ["MISS", "HIT", "HIT"]
+    assert estado["execucoes"] == 1
+
+def test_hit_sincroniza_escritas_de_outros_workers():
+    cache = CacheRespostas(BackendMemoriaLRU())
+    estado = {"total": 1, "execucoes": 0}
+    eventos_pendentes = []
+
+    def sincronizar():
+        # Simula estado_compartilhado.sincronizar aplicando o /gerar de outro worker
+        while eventos_pendentes:
+            estado["total"] += eventos_pendentes.pop()
+            cache.invalidar("recomendacoes")
+
+    cache.sincronizar_antes("recomendacoes", sincronizar)
+    app = montar_app(cache, estado)
+
+    assert buscar(app, 2)[1].json() == {"total": 1}
+
+    eventos_pendentes.append(1)
+    resposta = buscar(app, 1)[0]
+
+    assert resposta.headers["x-cache"] == "MISS"
+    assert resposta.json() == {"total": 2}
+
+def test_invalidacao_de_um_worker_chega_ao_outro(tmp_path):
+    from services.estado_compartilhado import EstadoCompartilhado, LogMmap
+
+    caminho = str(tmp_path / "estado.log")
+    apps, estados = [], []
+    for _ in range(2):
+        cache = CacheRespostas(BackendMemoriaLRU())
+        cache.compartilhar_versoes(EstadoCompartilhado(LogMmap(caminho), intervalo_leitura_segundos=0))
+        estados.append({"total": 1, "execucoes": 0})
+        apps.append((cache, montar_app(cache, estados[-1])))
+    (cache_a, _), (_, app_b) = apps
+
+    assert buscar(app_b, 2)[1].headers["x-cache"] == "HIT"
+
+    # Escrita tratada pelo worker A (mesmo banco, dado novo para os dois)
+    estados[1]["total"] = 2
+    cache_a.invalidar("recomendacoes")
+
+    resposta = buscar(app_b, 1)[0]
+    assert resposta.headers["x-cache"] == "MISS"
+    assert resposta.json() == {"total": 2}
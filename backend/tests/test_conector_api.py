@@ -0,0 +1,163 @@
+"""
+Testes da ingestão de APIs (services/conector_api.py) contra um servidor
+HTTP local simulado
+"""
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+import pytest
+from sqlalchemy import func, select
+
+from models import RegistroImportado
+from services.conector_api import ErroAPI, IngestaoAPI
+
+TOTAL_REGISTROS = 25
+TAMANHO_PAGINA = 10
+TAMANHO_PAGINA_GRANDE = 1500
+
+
+class ApiSimulada(BaseHTTPRequestHandler):
+    """
+    Rotas:
+    - /paginas?page=N&per_page=M: páginas numeradas com total_pages
+    - /cursor?cursor=N: páginas encadeadas por next_cursor
+    - /limite: 429 com Retry-After na primeira chamada
+    - /quebra: página grande cuja primeira resposta cai a 75% do corpo
+    - /erro: 404
+    """
+    chamadas = {}
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, documento, status=200, cabecalhos=None):
+        corpo = json.dumps(documento).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {chave: valores[0] for chave, valores in parse_qs(url.query).items()}
+        chamadas = ApiSimulada.chamadas[url.path] = ApiSimulada.chamadas.get(url.path, 0) + 1
+
+        if url.path == "/paginas":
+            pagina, tamanho = int(params["page"]), int(params["per_page"])
+            inicio = (pagina - 1) * tamanho
+            itens = [{"id": i} for i in range(inicio, min(inicio + tamanho, TOTAL_REGISTROS))]
+            self._json({"data": itens, "total_pages": -(-TOTAL_REGISTROS // tamanho)})
+
+        elif url.path == "/cursor":
+            inicio = int(params.get("cursor", 0))
+            fim = min(inicio + TAMANHO_PAGINA, TOTAL_REGISTROS)
+            self._json({
+                "items": [{"id": i} for i in range(inicio, fim)],
+                "next_cursor": str(fim) if fim < TOTAL_REGISTROS else None,
+            })
+
+        elif url.path == "/limite":
+            if chamadas == 1:
+                self._json({"erro": "limite"}, status=429, cabecalhos={"Retry-After": "0"})
+            else:
+                self._json([{"id": 1}, {"id": 2}])
+
+        elif url.path == "/quebra":
+            corpo = json.dumps([{"id": i} for i in range(TAMANHO_PAGINA_GRANDE)]).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            if chamadas == 1:
+                self.wfile.write(corpo[:len(corpo) * 3 // 4])
+                self.wfile.flush()
+                self.close_connection = True
+            else:
+                self.wfile.write(corpo)
+
+        else:
+            self._json({"erro": "não encontrado"}, status=404)
+
+
+@pytest.fixture(scope="module")
+def servidor():
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), ApiSimulada)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{servidor.server_address[1]}"
+    servidor.shutdown()
+    servidor.server_close()
+
+@pytest.fixture(autouse=True)
+def zerar_chamadas():
+    ApiSimulada.chamadas.clear()
+
+
+def ingerir(engine, url: str, api: dict) -> dict:
+    config = {
+        "id": 1,
+        "tipo": "api",
+        "url_api": url,
+        "parametros_adicionais": {"api": {"coluna_chave": "id", "max_tentativas": 3, **api}},
+    }
+
+    async def executar():
+        async with httpx.AsyncClient(trust_env=False) as cliente:
+            return await IngestaoAPI(config, cliente=cliente, bind=engine).executar()
+
+    return asyncio.run(executar())
+
+def chaves_gravadas(engine) -> list:
+    with engine.connect() as conexao:
+        return conexao.execute(select(RegistroImportado.chave)).scalars().all()
+
+
+def test_paginacao_por_pagina_em_paralelo(servidor, engine_sqlite):
+    resultado = ingerir(engine_sqlite, f"{servidor}/paginas", {
+        "paginacao": "pagina", "caminho_registros": "data", "caminho_total_paginas": "total_pages",
+        "tamanho_pagina": TAMANHO_PAGINA, "concorrencia": 3,
+    })
+
+    assert resultado["registros_importados"] == TOTAL_REGISTROS
+    assert resultado["paginas"] == 3
+    assert sorted(map(int, chaves_gravadas(engine_sqlite))) == list(range(TOTAL_REGISTROS))
+
+def test_paginacao_por_cursor(servidor, engine_sqlite):
+    resultado = ingerir(engine_sqlite, f"{servidor}/cursor", {
+        "paginacao": "cursor", "caminho_registros": "items", "caminho_cursor": "next_cursor",
+        "parametro_tamanho": None,
+    })
+
+    assert resultado["registros_importados"] == TOTAL_REGISTROS
+    assert resultado["paginas"] == 3
+    assert len(set(chaves_gravadas(engine_sqlite))) == TOTAL_REGISTROS
+
+def test_429_respeita_retry_after(servidor, engine_sqlite):
+    resultado = ingerir(engine_sqlite, f"{servidor}/limite", {})
+
+    assert resultado["retentativas"] == 1
+    assert resultado["registros_importados"] == 2
+    assert ApiSimulada.chamadas["/limite"] == 2
+
+def test_conexao_interrompida_nao_duplica_registros(servidor, engine_sqlite):
+    resultado = ingerir(engine_sqlite, f"{servidor}/quebra", {"tamanho_pagina": TAMANHO_PAGINA_GRANDE})
+
+    chaves = chaves_gravadas(engine_sqlite)
+    assert ApiSimulada.chamadas["/quebra"] == 2
+    assert resultado["retentativas"] == 1
+    assert resultado["registros_importados"] == TAMANHO_PAGINA_GRANDE
+    assert len(chaves) == len(set(chaves)) == TAMANHO_PAGINA_GRANDE
+
+def test_erro_http_descarta_a_carga(servidor, engine_sqlite):
+    with pytest.raises(ErroAPI):
+        ingerir(engine_sqlite, f"{servidor}/erro", {})
+
+    with engine_sqlite.connect() as conexao:
+        assert conexao.execute(select(func.count(RegistroImportado.id))).scalar() == 0
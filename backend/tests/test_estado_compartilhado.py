@@ -0,0 +1,91 @@
+"""
+Testes do estado compartilhado entre workers (services/estado_compartilhado.py)
+"""
+import os
+import time
+
+from services.estado_compartilhado import EVENTO_LIMPAR, EVENTO_RECOMENDACOES, LogMmap
+
+
+def evento(numero: int, tipo: str = EVENTO_RECOMENDACOES) -> dict:
+    return {"origem": "teste", "tipo": tipo, "dados": [numero]}
+
+def numeros(eventos) -> list:
+    return [e["dados"][0] for e in eventos]
+
+def compactar_no_proximo(log: LogMmap):
+    log._proxima_compactacao = 0.0
+
+
+def test_mmap_entrega_cada_evento_uma_vez(tmp_path):
+    caminho = str(tmp_path / "estado.log")
+    escritor, leitor = LogMmap(caminho), LogMmap(caminho)
+
+    escritor.publicar(evento(1))
+    escritor.publicar(evento(2))
+    assert numeros(leitor.ler_novos()) == [1, 2]
+    assert leitor.ler_novos() == []
+
+    escritor.publicar(evento(3))
+    assert numeros(leitor.ler_novos()) == [3]
+
+def test_mmap_compacta_eventos_fora_da_retencao(tmp_path):
+    caminho = str(tmp_path / "estado.log")
+    escritor = LogMmap(caminho, retencao_segundos=0.2)
+    atrasado = LogMmap(caminho)
+
+    for numero in range(1, 4):
+        escritor.publicar(evento(numero))
+    assert numeros(atrasado.ler_novos()) == [1, 2, 3]
+    escritor.publicar(evento(4))  # `atrasado` ainda não leu este
+    tamanho_antes = os.path.getsize(caminho)
+
+    time.sleep(0.3)
+    compactar_no_proximo(escritor)
+    escritor.publicar(evento(5))
+
+    assert os.path.getsize(caminho) < tamanho_antes
+    # Novo worker não reprocessa o que já saiu da retenção
+    assert numeros(LogMmap(caminho).ler_novos()) == [5]
+    # Leitor atrasado pula para o primeiro registro mantido, sem repetir nem ler lixo
+    assert numeros(atrasado.ler_novos()) == [5]
+
+def test_mmap_leitor_em_dia_continua_depois_da_compactacao(tmp_path):
+    caminho = str(tmp_path / "estado.log")
+    escritor = LogMmap(caminho, retencao_segundos=0.2)
+    leitor = LogMmap(caminho)
+
+    escritor.publicar(evento(1))
+    time.sleep(0.3)
+    escritor.publicar(evento(2))
+    assert numeros(leitor.ler_novos()) == [1, 2]
+
+    compactar_no_proximo(escritor)
+    escritor.publicar(evento(3))
+    escritor.publicar(evento(4))
+
+    assert numeros(leitor.ler_novos()) == [3, 4]
+    assert numeros(LogMmap(caminho).ler_novos()) == [2, 3, 4]
+
+def test_mmap_limpar_recomeca_a_geracao(tmp_path):
+    caminho = str(tmp_path / "estado.log")
+    escritor, leitor = LogMmap(caminho), LogMmap(caminho)
+
+    escritor.publicar(evento(1))
+    assert numeros(leitor.ler_novos()) == [1]
+
+    escritor.publicar(evento(0, EVENTO_LIMPAR))
+    escritor.publicar(evento(2))
+
+    eventos = leitor.ler_novos()
+    assert [e["tipo"] for e in eventos] == [EVENTO_LIMPAR, EVENTO_RECOMENDACOES]
+    assert numeros(eventos) == [0, 2]
+
+def test_mmap_descarta_arquivo_de_formato_antigo(tmp_path):
+    caminho = tmp_path / "estado.log"
+    caminho.write_bytes(b"\x00" * 8 + b"\x05\x00\x00\x00{}")
+
+    log = LogMmap(str(caminho))
+    assert log.ler_novos() == []
+    log.publicar(evento(1))
+    assert numeros(LogMmap(str(caminho)).ler_novos()) == [1]
@@ -0,0 +1,133 @@
+"""
+Consistência do histórico entre workers: dois processos com a aplicação
+completa, o mesmo banco e o mesmo log mmap (ESTADO_BACKEND=mmap), como
+`uvicorn --workers 2`
+"""
+import multiprocessing
+
+import pytest
+
+BASE = "/api/recomendacoes"
+
+
+def worker(diretorio: str, comandos, respostas):
+    """Processo filho: sobe a aplicação e executa requests recebidos pela fila"""
+    import os
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{diretorio}/compartilhado.db",
+        "DEBUG": "False",
+        "AGENDADOR_ATIVO": "False",
+        "CACHE_RESPOSTAS_ATIVO": "True",
+        "ESTADO_BACKEND": "mmap",
+        "ESTADO_MMAP_CAMINHO": f"{diretorio}/estado.log",
+        "ESTADO_INTERVALO_LEITURA_SEGUNDOS": "0",
+        "PERFIL_TAXA_AMOSTRAGEM": "0",
+        "PERFIL_TOKEN": "",
+    })
+    from fastapi.testclient import TestClient
+    from app import app
+
+    with TestClient(app) as cliente:
+        respostas.put("pronto")
+        for metodo, url, corpo in iter(comandos.get, None):
+            resposta = cliente.request(metodo, url, json=corpo)
+            respostas.put((resposta.status_code, resposta.json()))
+
+
+class Worker:
+    def __init__(self, contexto, diretorio: str):
+        self.comandos, self.respostas = contexto.Queue(), contexto.Queue()
+        self.processo = contexto.Process(target=worker, args=(diretorio, self.comandos, self.respostas), daemon=True)
+        self.processo.start()
+        assert self.respostas.get(timeout=60) == "pronto"
+
+    def request(self, metodo: str, url: str, corpo=None):
+        self.comandos.put((metodo, url, corpo))
+        return self.respostas.get(timeout=30)
+
+    def encerrar(self):
+        self.comandos.put(None)
+        self.processo.join(30)
+
+
+@pytest.fixture
+def workers(tmp_path):
+    contexto = multiprocessing.get_context("spawn")
+    # Um de cada vez: os dois criam as tabelas no mesmo banco
+    criados = [Worker(contexto, str(tmp_path))]
+    criados.append(Worker(contexto, str(tmp_path)))
+    yield criados
+    for w in criados:
+        w.encerrar()
+
+
+def test_escritas_de_um_worker_visiveis_no_outro(workers):
+    a, b = workers
+    status, _ = a.request("DELETE", f"{BASE}/historico/limpar")
+    assert status == 200
+
+    # Estatísticas em cache no worker B antes da escrita em A
+    status, antes = b.request("GET", f"{BASE}/estatisticas")
+    assert status == 200 and antes["total_recomendacoes_geradas"] == 0
+
+    status, recomendacao = a.request("POST", f"{BASE}/gerar?quantidade=3", {
+        "id_cliente": "CLI-MP-1", "nome": "Cliente Multiprocesso", "historico_categorias": ["Notebooks"],
+    })
+    assert status == 200
+    id_rec = recomendacao["id_recomendacao"]
+
+    # Gerada em A, encontrada em B
+    status, encontrada = b.request("GET", f"{BASE}/historico/{id_rec}")
+    assert status == 200 and encontrada["id_cliente"] == "CLI-MP-1"
+
+    # Feedback registrado em B sobre a recomendação de A
+    status, _ = b.request("POST", f"{BASE}/feedback", {
+        "id_recomendacao": id_rec,
+        "id_produto": recomendacao["produtos_recomendados"][0]["id_produto"],
+        "aceito": True,
+        "comprado": True,
+    })
+    assert status == 200
+
+    # Os dois workers enxergam o mesmo estado (B serve /estatisticas do cache)
+    for w in (a, b):
+        status, estatisticas = w.request("GET", f"{BASE}/estatisticas")
+        assert status == 200
+        assert estatisticas["total_recomendacoes_geradas"] == 1
+        assert estatisticas["taxa_conversao"] == 100.0
+
+        status, resumo = w.request("GET", f"{BASE}/cliente/CLI-MP-1/resumo")
+        assert status == 200
+        assert resumo["resumo"]["total_recomendacoes"] == 1
+        assert resumo["performance"]["compras_realizadas"] == 1
+
+
+def test_limpar_em_um_worker_limpa_o_outro(workers):
+    a, b = workers
+    status, recomendacao = a.request("POST", f"{BASE}/gerar?quantidade=2", {
+        "id_cliente": "CLI-MP-2", "nome": "Cliente Multiprocesso",
+    })
+    assert status == 200
+    assert b.request("GET", f"{BASE}/historico/{recomendacao['id_recomendacao']}")[0] == 200
+
+    assert b.request("DELETE", f"{BASE}/historico/limpar")[0] == 200
+
+    assert a.request("GET", f"{BASE}/historico/{recomendacao['id_recomendacao']}")[0] == 404
+    assert a.request("GET", f"{BASE}/estatisticas")[1]["total_recomendacoes_geradas"] == 0
+
+def test_cache_de_usuarios_invalidado_nos_dois_workers(workers):
+    a, b = workers
+    # Listagem e stats em cache no worker B
+    status, antes = b.request("GET", "/api/usuarios/stats")
+    assert status == 200
+    assert b.request("GET", "/api/usuarios/")[0] == 200
+
+    status, criado = a.request("POST", "/api/usuarios/", {
+        "nome": "Usuário Multiprocesso", "email": "multiprocesso@example.com", "senha": "segredo123",
+    })
+    assert status == 201
+
+    status, depois = b.request("GET", "/api/usuarios/stats")
+    assert status == 200 and depois["total"] == antes["total"] + 1
+    status, usuarios = b.request("GET", "/api/usuarios/")
+    assert status == 200 and criado["id"] in [u["id"] for u in usuarios]
@@ -0,0 +1,128 @@
+"""
+Testes do agregador incremental de /estatisticas (services/estatisticas.py):
+o resultado incremental precisa ser igual ao recálculo completo
+"""
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.estatisticas import AgregadorEstatisticas, horarios_pico
+
+CATEGORIAS = ["Notebooks", "Smartphones", "Tablets", "Monitores", "Periféricos", "Acessórios"]
+
+
+def historico_aleatorio(semente: int, total: int = 300):
+    """Recomendações e feedbacks sintéticos com horas e categorias variadas"""
+    rng = random.Random(semente)
+    inicio = datetime(2025, 1, 1)
+    recomendacoes, feedbacks = [], []
+
+    for i in range(total):
+        data = inicio + timedelta(minutes=rng.randint(0, 60 * 24 * 30))
+        recomendacoes.append({
+            "id_recomendacao": f"REC-{i}",
+            "data_geracao": data.isoformat(),
+            "produtos_recomendados": [
+                {"id_produto": f"PROD{rng.randint(1, 50)}", "categoria": rng.choice(CATEGORIAS)}
+                for _ in range(rng.randint(1, 8))
+            ],
+        })
+        for _ in range(rng.randint(0, 3)):
+            aceito = rng.random() < 0.6
+            feedbacks.append({
+                "id_feedback": f"FDB-{len(feedbacks)}",
+                "id_recomendacao": f"REC-{i}",
+                "aceito": aceito,
+                "comprado": aceito and rng.random() < 0.5,
+                "data_registro": (data + timedelta(minutes=rng.randint(1, 600))).isoformat(),
+            })
+    return recomendacoes, feedbacks
+
+def recalculo_completo(recomendacoes, feedbacks) -> dict:
+    """Referência: percorre o histórico inteiro, como o endpoint fazia antes do agregador"""
+    recomendacoes_por_hora = [0] * 24
+    feedbacks_por_hora = [0] * 24
+    for rec in recomendacoes:
+        recomendacoes_por_hora[datetime.fromisoformat(rec["data_geracao"]).hour] += 1
+    for fb in feedbacks:
+        feedbacks_por_hora[datetime.fromisoformat(fb["data_registro"]).hour] += 1
+
+    return {
+        "total_recomendacoes": len(recomendacoes),
+        "total_feedbacks": len(feedbacks),
+        "aceitos": sum(1 for fb in feedbacks if fb["aceito"]),
+        "comprados": sum(1 for fb in feedbacks if fb.get("comprado")),
+        "categorias": dict(Counter(p["categoria"] for rec in recomendacoes for p in rec["produtos_recomendados"])),
+        "recomendacoes_por_hora": recomendacoes_por_hora,
+        "feedbacks_por_hora": feedbacks_por_hora,
+    }
+
+
+@pytest.mark.parametrize("semente", [1, 2, 3])
+def test_incremental_igual_ao_recalculo(semente):
+    recomendacoes, feedbacks = historico_aleatorio(semente)
+
+    # Intercala recomendações e feedbacks como chegariam em /gerar e /feedback
+    agregador = AgregadorEstatisticas()
+    feedbacks_por_rec = {}
+    for fb in feedbacks:
+        feedbacks_por_rec.setdefault(fb["id_recomendacao"], []).append(fb)
+    for rec in recomendacoes:
+        agregador.registrar_recomendacao(rec)
+        for fb in feedbacks_por_rec.get(rec["id_recomendacao"], []):
+            agregador.registrar_feedback(fb)
+
+    assert agregador.snapshot() == recalculo_completo(recomendacoes, feedbacks)
+
+def test_reconstruir_igual_ao_incremental():
+    recomendacoes, feedbacks = historico_aleatorio(4)
+    incremental = AgregadorEstatisticas()
+    for rec in recomendacoes:
+        incremental.registrar_recomendacao(rec)
+    for fb in feedbacks:
+        incremental.registrar_feedback(fb)
+
+    reconstruido = AgregadorEstatisticas()
+    reconstruido.registrar_recomendacao(recomendacoes[0])  # estado anterior é descartado
+    reconstruido.reconstruir(recomendacoes, feedbacks)
+
+    assert reconstruido.snapshot() == incremental.snapshot()
+
+def test_horarios_pico_em_ordem_cronologica():
+    por_hora = [0] * 24
+    por_hora[20], por_hora[9], por_hora[14], por_hora[3] = 5, 9, 7, 1
+
+    assert horarios_pico(por_hora) == ["09:00-10:00", "14:00-15:00", "20:00-21:00"]
+    assert horarios_pico([0] * 24) == []
+
+
+def test_endpoint_igual_ao_recalculo_do_historico(cliente_api):
+    from routes.recomendacoes import FEEDBACKS_HISTORICO, RECOMENDACOES_HISTORICO
+
+    cliente_api.delete("/api/recomendacoes/historico/limpar")
+    for i in range(12):
+        recomendacao = cliente_api.post(
+            "/api/recomendacoes/gerar?quantidade=4",
+            json={"id_cliente": f"CLI-EST-{i % 4}", "nome": "Cliente", "historico_categorias": ["Notebooks"]},
+        ).json()
+        for j, produto in enumerate(recomendacao["produtos_recomendados"][: i % 3]):
+            resposta = cliente_api.post("/api/recomendacoes/feedback", json={
+                "id_recomendacao": recomendacao["id_recomendacao"],
+                "id_produto": produto["id_produto"],
+                "aceito": j % 2 == 0,
+                "comprado": j == 0,
+            })
+            assert resposta.status_code == 200
+
+    estatisticas = cliente_api.get("/api/recomendacoes/estatisticas").json()
+    referencia = recalculo_completo(list(RECOMENDACOES_HISTORICO), FEEDBACKS_HISTORICO)
+
+    assert estatisticas["total_recomendacoes_geradas"] == referencia["total_recomendacoes"] == 12
+    assert estatisticas["taxa_aceitacao"] == round(referencia["aceitos"] / referencia["total_feedbacks"] * 100, 2)
+    assert estatisticas["taxa_conversao"] == round(referencia["comprados"] / referencia["total_feedbacks"] * 100, 2)
+    assert {c["categoria"]: c["quantidade"] for c in estatisticas["categorias_mais_recomendadas"]} == dict(
+        sorted(referencia["categorias"].items(), key=lambda x: x[1], reverse=True)[:5]
+    )
+    assert estatisticas["horarios_pico"] == horarios_pico(referencia["recomendacoes_por_hora"])
@@ -0,0 +1,34 @@
+"""
+Testes da fila de jobs de sincronização (services/jobs.py)
+"""
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from models import FonteDados, JobSincronizacao, StatusFonte, TipoFonte
+from services.jobs import FilaJobsSincronizacao
+
+
+def criar_fonte(engine) -> int:
+    with sessionmaker(bind=engine)() as db:
+        fonte = FonteDados(nome="Fonte Jobs", tipo=TipoFonte.API, status=StatusFonte.ATIVA)
+        db.add(fonte)
+        db.commit()
+        return fonte.id
+
+
+def test_enfileirar_se_livre_reivindica_a_fonte_uma_vez(engine_sqlite):
+    fonte_id = criar_fonte(engine_sqlite)
+    sessoes = sessionmaker(bind=engine_sqlite)
+    fila = FilaJobsSincronizacao(session_factory=sessoes)
+
+    # Duas requisições leram a fonte como ativa antes de qualquer uma enfileirar
+    with sessoes() as primeira, sessoes() as segunda:
+        fonte_a, fonte_b = primeira.get(FonteDados, fonte_id), segunda.get(FonteDados, fonte_id)
+        assert fonte_a.status == fonte_b.status == StatusFonte.ATIVA
+
+        assert fila.enfileirar_se_livre(primeira, fonte_a) is not None
+        assert fila.enfileirar_se_livre(segunda, fonte_b) is None
+
+    with sessoes() as db:
+        assert db.execute(select(func.count(JobSincronizacao.id))).scalar() == 1
+        assert db.get(FonteDados, fonte_id).status == StatusFonte.SINCRONIZANDO
@@ -0,0 +1,34 @@
+"""
+Testes do motor de motivos (services/motivos.py)
+"""
+from types import SimpleNamespace
+
+from services.motivos import CONFIG_PADRAO, MotorMotivos
+
+PRODUTOS = [
+    {"id": "P1", "categoria": "Notebooks", "preco": 4000, "tags": []},
+    {"id": "P2", "categoria": "Periféricos", "preco": 300, "tags": []},
+]
+
+
+def cliente(*categorias: str):
+    return SimpleNamespace(historico_categorias=list(categorias), valor_medio_compra=None, frequencia_compra=None)
+
+
+def test_categorias_do_cliente_nao_crescem_as_tabelas():
+    motor = MotorMotivos(CONFIG_PADRAO, PRODUTOS)
+    categorias = dict(motor._categorias)
+
+    for numero in range(100):
+        motor.motivos_lote(cliente(f"Inventada {numero}"), PRODUTOS)
+
+    assert motor._categorias == categorias
+    assert len(motor._complementa) == len(categorias)
+
+def test_categorias_desconhecidas_sao_ignoradas():
+    motor = MotorMotivos(CONFIG_PADRAO, PRODUTOS)
+
+    motivos = motor.motivos_lote(cliente("Inventada", "Notebooks", "Notebooks"), PRODUTOS)
+
+    assert motivos[0] == "Você já comprou produtos de Notebooks"
+    assert motivos[1] == "Complementa seu Notebooks | Complementa seu Notebooks"
@@ -0,0 +1,146 @@
+"""
+Testes da fila de escrita (services/persistencia.py) com SQLite no lugar
+do PostgreSQL
+"""
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models import FeedbackRecomendacao, ItemRecomendado, Recomendacao
+from services.persistencia import FilaEscrita, carregar_historico
+
+
+def nova_recomendacao(id_rec: str, id_cliente: str = "CLI001", produtos: int = 2) -> dict:
+    return {
+        "id_recomendacao": id_rec,
+        "id_cliente": id_cliente,
+        "nome_cliente": "Cliente Teste",
+        "data_geracao": "2025-01-10T12:00:00",
+        "total_recomendacoes": produtos,
+        "algoritmo_usado": "teste",
+        "tempo_processamento_ms": 1.5,
+        "metadados": {"versao_modelo": "teste"},
+        "produtos_recomendados": [{
+            "id_produto": f"PROD{i:03d}",
+            "nome": f"Produto {i}",
+            "categoria": "Notebooks",
+            "preco": 100.0,
+            "desconto": 10.0,
+            "preco_final": 90.0,
+            "confianca_ia": 0.9,
+            "motivo_recomendacao": "teste",
+            "estoque_disponivel": 5,
+            "tags": ["teste"],
+        } for i in range(produtos)],
+    }
+
+def novo_feedback(id_feedback: str, id_rec: str) -> dict:
+    return {
+        "id_feedback": id_feedback,
+        "id_recomendacao": id_rec,
+        "id_produto": "PROD000",
+        "aceito": True,
+        "comprado": False,
+        "data_registro": "2025-01-10T12:05:00",
+    }
+
+def contar(engine, modelo) -> int:
+    with engine.connect() as conexao:
+        return conexao.execute(select(func.count()).select_from(modelo.__table__)).scalar()
+
+
+def test_enfileirar_nao_grava_ate_o_flush(engine_sqlite):
+    fila = FilaEscrita(bind=engine_sqlite)
+    fila.enfileirar_recomendacao(nova_recomendacao("REC-1"))
+
+    assert fila.pendentes == 3
+    assert contar(engine_sqlite, Recomendacao) == 0
+
+    assert fila.flush() == 3
+    assert contar(engine_sqlite, Recomendacao) == 1
+    assert contar(engine_sqlite, ItemRecomendado) == 2
+    assert fila.gravados == 3
+
+def test_flush_grava_em_lotes(engine_sqlite):
+    fila = FilaEscrita(bind=engine_sqlite, tamanho_lote=7)
+    for i in range(10):
+        fila.enfileirar_recomendacao(nova_recomendacao(f"REC-{i}"))
+        fila.enfileirar_feedback(novo_feedback(f"FDB-{i}", f"REC-{i}"))
+
+    assert fila.flush() == 40
+    assert fila.pendentes == 0
+    assert contar(engine_sqlite, Recomendacao) == 10
+    assert contar(engine_sqlite, ItemRecomendado) == 20
+    assert contar(engine_sqlite, FeedbackRecomendacao) == 10
+
+def test_fila_cheia_descarta_sem_bloquear(engine_sqlite):
+    fila = FilaEscrita(bind=engine_sqlite, tamanho_maximo=4)
+
+    assert fila.enfileirar_recomendacao(nova_recomendacao("REC-1")) is True
+    assert fila.enfileirar_recomendacao(nova_recomendacao("REC-2")) is False
+    assert fila.descartados == 2
+    assert fila.pendentes == 4
+
+def test_id_duplicado_nao_derruba_o_lote(engine_sqlite):
+    fila = FilaEscrita(bind=engine_sqlite)
+    fila.enfileirar_recomendacao(nova_recomendacao("REC-1"))
+    fila.flush()
+
+    # Mesmo lote: recomendação repetida, recomendação nova e feedback
+    fila.enfileirar_recomendacao(nova_recomendacao("REC-1", produtos=0))
+    fila.enfileirar_recomendacao(nova_recomendacao("REC-2"))
+    fila.enfileirar_feedback(novo_feedback("FDB-1", "REC-2"))
+    fila.flush()
+
+    assert contar(engine_sqlite, Recomendacao) == 2
+    assert contar(engine_sqlite, FeedbackRecomendacao) == 1
+    assert fila.erros == 0
+
+def test_linha_invalida_descarta_so_a_linha(engine_sqlite):
+    fila = FilaEscrita(bind=engine_sqlite)
+    invalida = nova_recomendacao("REC-INVALIDA", produtos=0)
+    invalida["nome_cliente"] = None  # NOT NULL
+
+    fila.enfileirar_recomendacao(nova_recomendacao("REC-1"))
+    fila.enfileirar_recomendacao(invalida)
+    fila.enfileirar_feedback(novo_feedback("FDB-1", "REC-1"))
+
+    assert fila.flush() == 4
+    assert fila.erros == 1
+    assert contar(engine_sqlite, Recomendacao) == 1
+    assert contar(engine_sqlite, ItemRecomendado) == 2
+    assert contar(engine_sqlite, FeedbackRecomendacao) == 1
+
+def test_encerrar_grava_pendentes(engine_sqlite):
+    fila = FilaEscrita(bind=engine_sqlite, intervalo_segundos=60)
+    fila.iniciar()
+    fila.enfileirar_recomendacao(nova_recomendacao("REC-1"))
+    fila.encerrar()
+
+    assert fila.pendentes == 0
+    assert contar(engine_sqlite, Recomendacao) == 1
+
+def test_carregar_historico_restaura_itens_e_feedbacks(engine_sqlite):
+    fila = FilaEscrita(bind=engine_sqlite)
+    fila.enfileirar_recomendacao(nova_recomendacao("REC-1", produtos=3))
+    fila.enfileirar_feedback(novo_feedback("FDB-1", "REC-1"))
+    fila.flush()
+
+    with Session(engine_sqlite) as db:
+        recomendacoes, feedbacks = carregar_historico(db, limite=10)
+
+    assert [r["id_recomendacao"] for r in recomendacoes] == ["REC-1"]
+    assert [p["id_produto"] for p in recomendacoes[0]["produtos_recomendados"]] == ["PROD000", "PROD001", "PROD002"]
+    assert [f["id_feedback"] for f in feedbacks] == ["FDB-1"]
+
+def test_apagar_tudo_grava_pendentes_e_esvazia_tabelas(engine_sqlite):
+    fila = FilaEscrita(bind=engine_sqlite)
+    fila.enfileirar_recomendacao(nova_recomendacao("REC-1"))
+    fila.flush()
+    fila.enfileirar_recomendacao(nova_recomendacao("REC-2"))
+    fila.enfileirar_feedback(novo_feedback("FDB-1", "REC-2"))
+
+    fila.apagar_tudo()
+
+    assert fila.pendentes == 0
+    for modelo in (Recomendacao, ItemRecomendado, FeedbackRecomendacao):
+        assert contar(engine_sqlite, modelo) == 0
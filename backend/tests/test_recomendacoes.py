@@ -0,0 +1,22 @@
+"""
+Testes das rotas de recomendação (routes/recomendacoes.py)
+"""
+BASE = "/api/recomendacoes"
+
+CLIENTE = {"id_cliente": "CLI-DUP-1", "nome": "Cliente Duplicado", "historico_categorias": ["Notebooks"]}
+
+
+def test_gerar_com_id_repetido_responde_409(cliente_api, monkeypatch):
+    import routes.recomendacoes as recomendacoes
+
+    cliente_api.delete(f"{BASE}/historico/limpar")
+    monkeypatch.setattr(recomendacoes, "gerar_id_recomendacao", lambda: "REC-DUPLICADA")
+
+    assert cliente_api.post(f"{BASE}/gerar", json=CLIENTE).status_code == 200
+    resposta = cliente_api.post(f"{BASE}/gerar", json=CLIENTE)
+
+    assert resposta.status_code == 409
+    assert "REC-DUPLICADA" in resposta.json()["detail"]
+    # O duplicado não entra no histórico nem nas estatísticas
+    assert len(cliente_api.get(f"{BASE}/historico").json()) == 1
+    assert cliente_api.get(f"{BASE}/estatisticas").json()["total_recomendacoes_geradas"] == 1
@@ -0,0 +1,141 @@
+"""
+Testes dos rollups por cliente (services/resumo_clientes.py) servidos por
+/cliente/{id}/resumo e /cliente/{id}/produtos: sem defasagem depois de
+/gerar e /feedback, e invalidados por DELETE /historico/limpar
+"""
+from collections import Counter
+
+from fastapi.testclient import TestClient
+
+BASE = "/api/recomendacoes"
+
+
+def gerar(cliente_api, id_cliente: str, quantidade: int = 5) -> dict:
+    resposta = cliente_api.post(f"{BASE}/gerar?quantidade={quantidade}", json={
+        "id_cliente": id_cliente,
+        "nome": f"Cliente {id_cliente}",
+        "historico_categorias": ["Notebooks", "Smartphones"],
+        "valor_medio_compra": 3000,
+    })
+    assert resposta.status_code == 200
+    return resposta.json()
+
+def feedback(cliente_api, recomendacao: dict, posicao: int, aceito: bool, comprado: bool = False):
+    resposta = cliente_api.post(f"{BASE}/feedback", json={
+        "id_recomendacao": recomendacao["id_recomendacao"],
+        "id_produto": recomendacao["produtos_recomendados"][posicao]["id_produto"],
+        "aceito": aceito,
+        "comprado": comprado,
+    })
+    assert resposta.status_code == 200
+
+def resumo_recalculado(id_cliente: str) -> dict:
+    """Referência: varre o histórico inteiro, como os endpoints faziam antes dos rollups"""
+    from routes.recomendacoes import FEEDBACKS_HISTORICO, RECOMENDACOES_HISTORICO
+
+    recomendacoes = [rec for rec in RECOMENDACOES_HISTORICO if rec["id_cliente"] == id_cliente]
+    ids = {rec["id_recomendacao"] for rec in recomendacoes}
+    feedbacks = [fb for fb in FEEDBACKS_HISTORICO if fb["id_recomendacao"] in ids]
+    categorias = Counter(p["categoria"] for rec in recomendacoes for p in rec["produtos_recomendados"])
+
+    melhores = {}
+    for rec in recomendacoes:
+        for produto in rec["produtos_recomendados"]:
+            atual = melhores.get(produto["id_produto"])
+            if atual is None or produto["confianca_ia"] > atual["confianca_ia"]:
+                melhores[produto["id_produto"]] = produto
+
+    return {
+        "total_recomendacoes": len(recomendacoes),
+        "total_produtos_recomendados": sum(len(rec["produtos_recomendados"]) for rec in recomendacoes),
+        "confianca_media_ia": round(sum(r["metadados"]["confianca_media"] for r in recomendacoes) / len(recomendacoes), 2),
+        "desconto_medio_aplicado": round(sum(r["metadados"]["desconto_medio"] for r in recomendacoes) / len(recomendacoes), 2),
+        "ultima_recomendacao": max(rec["data_geracao"] for rec in recomendacoes),
+        "categorias": dict(categorias),
+        "total_feedbacks": len(feedbacks),
+        "feedbacks_positivos": sum(1 for fb in feedbacks if fb["aceito"]),
+        "compras_realizadas": sum(1 for fb in feedbacks if fb.get("comprado")),
+        "melhores_produtos": melhores,
+    }
+
+def conferir_com_recalculo(cliente_api, id_cliente: str):
+    resumo = cliente_api.get(f"{BASE}/cliente/{id_cliente}/resumo").json()
+    produtos = cliente_api.get(f"{BASE}/cliente/{id_cliente}/produtos?limite=100").json()
+    referencia = resumo_recalculado(id_cliente)
+
+    for campo in ("total_recomendacoes", "total_produtos_recomendados", "confianca_media_ia",
+                  "desconto_medio_aplicado", "ultima_recomendacao"):
+        assert resumo["resumo"][campo] == referencia[campo], campo
+    for campo in ("total_feedbacks", "feedbacks_positivos", "compras_realizadas"):
+        assert resumo["performance"][campo] == referencia[campo], campo
+    for item in resumo["categorias_favoritas"]:
+        assert referencia["categorias"][item["categoria"]] == item["quantidade"]
+
+    assert {p["id_produto"]: p["confianca_ia"] for p in produtos["produtos"]} == {
+        id_produto: p["confianca_ia"] for id_produto, p in referencia["melhores_produtos"].items()
+    }
+    return resumo, produtos
+
+
+def test_resumo_atualizado_a_cada_gerar(cliente_api):
+    cliente_api.delete(f"{BASE}/historico/limpar")
+
+    for total in range(1, 4):
+        gerar(cliente_api, "CLI-RES-1")
+        resumo, _ = conferir_com_recalculo(cliente_api, "CLI-RES-1")
+        assert resumo["resumo"]["total_recomendacoes"] == total
+
+def test_resumo_atualizado_a_cada_feedback(cliente_api):
+    cliente_api.delete(f"{BASE}/historico/limpar")
+    recomendacao = gerar(cliente_api, "CLI-RES-2")
+    gerar(cliente_api, "CLI-RES-3")
+
+    feedback(cliente_api, recomendacao, 0, aceito=True, comprado=True)
+    feedback(cliente_api, recomendacao, 1, aceito=False)
+
+    resumo, _ = conferir_com_recalculo(cliente_api, "CLI-RES-2")
+    assert resumo["performance"]["total_feedbacks"] == 2
+    assert resumo["performance"]["taxa_aceitacao_percent"] == 50.0
+    assert resumo["performance"]["taxa_conversao_percent"] == 50.0
+
+    # Feedback de um cliente não vaza para o outro
+    outro, _ = conferir_com_recalculo(cliente_api, "CLI-RES-3")
+    assert outro["performance"]["total_feedbacks"] == 0
+
+def test_produtos_consolidados_e_filtrados(cliente_api):
+    cliente_api.delete(f"{BASE}/historico/limpar")
+    for _ in range(3):
+        gerar(cliente_api, "CLI-RES-4", quantidade=8)
+
+    _, produtos = conferir_com_recalculo(cliente_api, "CLI-RES-4")
+    confiancas = [p["confianca_ia"] for p in produtos["produtos"]]
+    assert confiancas == sorted(confiancas, reverse=True)
+
+    categoria = produtos["produtos"][0]["categoria"]
+    filtrados = cliente_api.get(f"{BASE}/cliente/CLI-RES-4/produtos?categoria={categoria.lower()}").json()
+    assert filtrados["produtos"] and all(p["categoria"] == categoria for p in filtrados["produtos"])
+
+def test_limpar_historico_invalida_rollups(cliente_api):
+    gerar(cliente_api, "CLI-RES-5")
+    assert cliente_api.get(f"{BASE}/cliente/CLI-RES-5/resumo").status_code == 200
+
+    assert cliente_api.delete(f"{BASE}/historico/limpar").status_code == 200
+
+    assert cliente_api.get(f"{BASE}/cliente/CLI-RES-5/resumo").status_code == 404
+    assert cliente_api.get(f"{BASE}/cliente/CLI-RES-5/produtos").status_code == 404
+
+    # Depois da limpeza o rollup recomeça do zero
+    gerar(cliente_api, "CLI-RES-5")
+    resumo, _ = conferir_com_recalculo(cliente_api, "CLI-RES-5")
+    assert resumo["resumo"]["total_recomendacoes"] == 1
+
+def test_limpar_historico_sobrevive_ao_restart(cliente_api):
+    from app import app
+
+    gerar(cliente_api, "CLI-RES-6")
+    cliente_api.delete(f"{BASE}/historico/limpar")
+
+    # Novo lifespan: restaurar_historico lê o banco, que também foi limpo
+    with TestClient(app) as reiniciado:
+        assert reiniciado.get(f"{BASE}/cliente/CLI-RES-6/resumo").status_code == 404
+        assert reiniciado.get(f"{BASE}/historico").json() == []
@@ -0,0 +1,127 @@
+"""
+Testes da sincronização incremental (services/sincronizacao_incremental.py)
+contra uma fonte SQLite no lugar do banco relacional de origem
+"""
+import sqlite3
+import threading
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from config import settings
+from models import FonteDados, RegistroImportado, StatusFonte, TipoFonte
+from services.ingestao_arquivos import ImportacaoCancelada
+from services.sincronizacao_incremental import ConfigIncremental, sincronizar_incremental_sync
+
+FONTE_ID = 1
+
+
+@pytest.fixture(autouse=True)
+def permitir_url(monkeypatch):
+    monkeypatch.setattr(settings, "FONTES_PERMITIR_URL", True)
+
+@pytest.fixture
+def origem(tmp_path):
+    """Tabela `vendas` de origem: ids 1..10, com os ids 3..8 empatados no mesmo atualizado_em"""
+    caminho = str(tmp_path / "origem.db")
+    conexao = sqlite3.connect(caminho)
+    conexao.execute("CREATE TABLE vendas (id INTEGER PRIMARY KEY, valor REAL, atualizado_em TEXT)")
+    conexao.executemany("INSERT INTO vendas VALUES (?, ?, ?)", [
+        (i, float(i), "2024-01-01 00:00:%02d" % (i if i < 3 or i > 8 else 3)) for i in range(1, 11)
+    ])
+    conexao.commit()
+    conexao.close()
+    return caminho
+
+@pytest.fixture
+def fonte(engine_sqlite):
+    with sessionmaker(bind=engine_sqlite)() as db:
+        db.add(FonteDados(id=FONTE_ID, nome="Origem SQLite", tipo=TipoFonte.POSTGRESQL, status=StatusFonte.ATIVA))
+        db.commit()
+
+
+def config(origem: str, **incremental) -> dict:
+    incremental = {"tabela": "vendas", "coluna_watermark": "atualizado_em", "coluna_chave": "id",
+                   "tamanho_lote": 4, **incremental}
+    return {
+        "id": FONTE_ID,
+        "tipo": "postgresql",
+        "parametros_adicionais": {"url": f"sqlite:///{origem}", "incremental": incremental},
+    }
+
+def sincronizar(engine, origem: str, **incremental) -> dict:
+    return sincronizar_incremental_sync(config(origem, **incremental), bind=engine)
+
+def registros(engine) -> dict:
+    with engine.connect() as conexao:
+        linhas = conexao.execute(select(RegistroImportado.chave, RegistroImportado.dados))
+        return {chave: dados for chave, dados in linhas}
+
+def watermark(engine) -> dict:
+    with engine.connect() as conexao:
+        return conexao.execute(select(FonteDados.watermark).where(FonteDados.id == FONTE_ID)).scalar()
+
+def executar(origem: str, sql: str, *parametros):
+    conexao = sqlite3.connect(origem)
+    conexao.execute(sql, parametros)
+    conexao.commit()
+    conexao.close()
+
+
+def test_watermark_sem_chave_e_rejeitado(origem):
+    with pytest.raises(ValueError):
+        ConfigIncremental(config(origem, coluna_chave=None)["parametros_adicionais"])
+
+def test_empates_no_watermark_entre_lotes(engine_sqlite, origem, fonte):
+    # Lotes de 4: o corte cai no meio das linhas com o mesmo atualizado_em
+    resultado = sincronizar(engine_sqlite, origem)
+
+    assert resultado["registros_importados"] == 10
+    assert resultado["registros_atualizados"] == 0
+    assert sorted(map(int, registros(engine_sqlite))) == list(range(1, 11))
+    assert watermark(engine_sqlite)["chave"] == 10
+
+    # Nada novo: a próxima sincronização não relê nenhuma linha
+    assert sincronizar(engine_sqlite, origem)["registros_importados"] == 0
+
+def test_retoma_do_watermark_depois_de_interrupcao(engine_sqlite, origem, fonte):
+    cancelar = threading.Event()
+
+    def progresso(processados, total):
+        if processados:
+            cancelar.set()  # cai depois do primeiro lote gravado
+
+    with pytest.raises(ImportacaoCancelada):
+        sincronizar_incremental_sync(config(origem), progresso, cancelar, bind=engine_sqlite)
+    assert len(registros(engine_sqlite)) == 4
+    assert watermark(engine_sqlite)["chave"] == 4
+
+    resultado = sincronizar(engine_sqlite, origem)
+
+    assert resultado["registros_importados"] == 6
+    assert resultado["registros_atualizados"] == 0
+    assert sorted(map(int, registros(engine_sqlite))) == list(range(1, 11))
+
+def test_linha_alterada_conta_como_atualizada(engine_sqlite, origem, fonte):
+    sincronizar(engine_sqlite, origem)
+    executar(origem, "UPDATE vendas SET valor = 99, atualizado_em = '2024-01-02 00:00:00' WHERE id = 5")
+
+    resultado = sincronizar(engine_sqlite, origem)
+
+    assert resultado["registros_importados"] == 0
+    assert resultado["registros_atualizados"] == 1
+    gravados = registros(engine_sqlite)
+    assert len(gravados) == 10
+    assert gravados["5"]["valor"] == 99
+
+def test_troca_da_coluna_de_watermark_recomeca(engine_sqlite, origem, fonte):
+    sincronizar(engine_sqlite, origem)
+    assert watermark(engine_sqlite)["coluna"] == "atualizado_em"
+
+    # Watermark no próprio id: o valor salvo (um timestamp) não serve mais
+    resultado = sincronizar(engine_sqlite, origem, coluna_watermark="id")
+
+    assert resultado["registros_importados"] == 0
+    assert resultado["registros_atualizados"] == 10
+    assert watermark(engine_sqlite) == {"coluna": "id", "tipo": "numero", "valor": 10}